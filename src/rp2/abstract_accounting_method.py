@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Iterator, NamedTuple, Optional
+from typing import Iterator, List, NamedTuple, Optional
 
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.in_transaction import InTransaction
@@ -27,6 +27,14 @@ class TaxableEventAndAcquiredLot(NamedTuple):
     acquired_lot_amount: RP2Decimal
 
 
+# Gain/loss entries computed by AbstractLotPairingMethod.pair_in_batch(), as parallel lists in the order the generic lot-pairing loop of the tax
+# engine would create them (acquired lot is None for earn-typed taxable events).
+class BatchPairing(NamedTuple):
+    taxable_events: List[AbstractTransaction]
+    acquired_lots: List[Optional[InTransaction]]
+    crypto_amounts: List[RP2Decimal]
+
+
 class TaxableEventsExhaustedException(Exception):
     def __init__(self, message: str = "") -> None:
         self.__message = message
@@ -53,6 +61,8 @@ class AcquiredLotsExhaustedException(Exception):
         return self.__message
 
 
+# Base class of all accounting methods. Lot-pairing methods (e.g. FIFO, LIFO) derive from AbstractLotPairingMethod, pooled-cost methods (e.g.
+# total average) from AbstractPooledCostMethod: the tax engine computes gain/loss entries differently for each kind.
 class AbstractAccountingMethod:
     @classmethod
     def type_check(cls, name: str, instance: "AbstractAccountingMethod") -> "AbstractAccountingMethod":
@@ -62,10 +72,43 @@ class AbstractAccountingMethod:
             raise RP2TypeError(f"Parameter '{name}' is not of type {cls.__name__}: {instance}")
         return instance
 
+    def validate_acquired_lot_ancestor_timestamp(self, acquired_lot: InTransaction, acquired_lot_parent: InTransaction) -> bool:
+        raise NotImplementedError("Abstract function")
+
+    @property
+    def name(self) -> str:
+        return f"{self.__class__.__module__.rsplit('.', 1)[1]}"
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+# Base class of accounting methods that pair taxable events with acquired lots: the tax engine drives the pairing one step at a time with the
+# functions below (or all at once, see pair_in_batch()).
+class AbstractLotPairingMethod(AbstractAccountingMethod):
     # Iterators yield transactions in ascending chronological order
     def initialize(self, taxable_event_iterator: Iterator[AbstractTransaction], acquired_lot_iterator: Iterator[InTransaction]) -> None:
         raise NotImplementedError("Abstract function")
 
+    # Used to resume tax computation from a checkpoint (see tax_checkpoint): like initialize(), but the taxable event iterator starts after the
+    # checkpoint and the first len(acquired_lot_amounts) lots yielded by the acquired lot iterator have already been disposed of, partially or
+    # totally: acquired_lot_amounts contains the amount left of each.
+    def initialize_from_checkpoint(
+        self,
+        taxable_event_iterator: Iterator[AbstractTransaction],
+        acquired_lot_iterator: Iterator[InTransaction],
+        acquired_lot_amounts: List[RP2Decimal],
+    ) -> None:
+        raise NotImplementedError("Abstract function")
+
+    # Optional fast path of the tax engine: pairs all the taxable events with acquired lots at once (both lists are in ascending chronological
+    # order), instead of one step at a time with the functions below. The result must be the same as the generic lot-pairing loop's: methods
+    # return None when they can't guarantee that for the given input and the tax engine then falls back to the generic loop (which is what
+    # this default implementation does for every input).
+    def pair_in_batch(self, taxable_events: List[AbstractTransaction], acquired_lots: List[InTransaction]) -> Optional[BatchPairing]:
+        # pylint: disable=unused-argument
+        return None
+
     def get_next_taxable_event_and_amount(
         self,
         taxable_event: Optional[AbstractTransaction],
@@ -80,12 +123,8 @@ class AbstractAccountingMethod:
     ) -> TaxableEventAndAcquiredLot:
         raise NotImplementedError("Abstract function")
 
-    def validate_acquired_lot_ancestor_timestamp(self, acquired_lot: InTransaction, acquired_lot_parent: InTransaction) -> bool:
+    # Used in per-wallet mode, where each account has its own pool of acquired lots and the tax engine selects lots itself (see tax_engine):
+    # priority of each acquired lot in acquired_lot_list (which is in chronological order). Priorities must be a permutation of
+    # 0..len(acquired_lot_list) - 1 and the available lot with the highest priority is selected.
+    def get_acquired_lot_priorities(self, acquired_lot_list: List[InTransaction]) -> List[int]:
         raise NotImplementedError("Abstract function")
-
-    @property
-    def name(self) -> str:
-        return f"{self.__class__.__module__.rsplit('.', 1)[1]}"
-
-    def __repr__(self) -> str:
-        return self.name
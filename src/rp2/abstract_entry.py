@@ -21,13 +21,24 @@ from rp2.rp2_error import RP2TypeError
 
 
 class AbstractEntry:
+    # Entries are created in large numbers, so they don't have a per-instance __dict__: every class in the hierarchy declares the
+    # attributes it sets in __slots__ (private names in __slots__ are mangled like any other private name).
+    __slots__ = ("__configuration", "__asset", "__entry_index", "__entry_index_owner")
+
     def __init__(
         self,
         configuration: Configuration,
         asset: str,
     ) -> None:
-        self.__configuration = Configuration.type_check("configuration", configuration)
-        self.__asset: str = configuration.type_check_asset("asset", asset)
+        self._init_unchecked(Configuration.type_check("configuration", configuration), configuration.type_check_asset("asset", asset))
+
+    # Same as __init__(), without checking the arguments: used by __init__() and by the trusted constructors of subclasses, whose arguments have
+    # already been checked by the caller.
+    def _init_unchecked(self, configuration: Configuration, asset: str) -> None:
+        self.__configuration: Configuration = configuration
+        self.__asset: str = asset
+        self.__entry_index: int = -1
+        self.__entry_index_owner: Optional[object] = None
 
     @classmethod
     def type_check(cls, name: str, instance: "AbstractEntry") -> "AbstractEntry":
@@ -75,6 +86,22 @@ class AbstractEntry:
     def asset(self) -> str:
         return self.__asset
 
+    # Dense index (0, 1, 2, ...) assigned by the entry set the entry is added to (-1 if it hasn't been assigned): used by EntryTable to store
+    # per-entry values in a list rather than in a dict keyed by the (hashed) entry.
+    @property
+    def entry_index(self) -> int:
+        return self.__entry_index
+
+    # Token identifying the entry set that assigned entry_index (None if it hasn't been assigned): indexes are unique only within that set (and
+    # its views), so EntryTable uses it to tell apart entries indexed by different sets.
+    @property
+    def entry_index_owner(self) -> Optional[object]:
+        return self.__entry_index_owner
+
+    def _set_entry_index(self, entry_index: int, entry_index_owner: Optional[object]) -> None:
+        self.__entry_index = entry_index
+        self.__entry_index_owner = entry_index_owner
+
     @property
     def internal_id(self) -> str:
         raise NotImplementedError("Abstract property")
@@ -88,6 +115,12 @@ class AbstractEntry:
     def crypto_balance_change(self) -> RP2Decimal:
         raise NotImplementedError("Abstract property")
 
+    # Fixed-point value of crypto_balance_change (see fixed_point): None if the configuration isn't in fixed-point mode or if the amount has no
+    # fixed-point value
+    @property
+    def fixed_point_crypto_balance_change(self) -> Optional[int]:
+        raise NotImplementedError("Abstract property")
+
     # How much fiat was gained / lost with this entry
     @property
     def fiat_balance_change(self) -> RP2Decimal:
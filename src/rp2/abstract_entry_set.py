@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from bisect import bisect_left, bisect_right
 from copy import copy
 from datetime import date, datetime
-from typing import Dict, List, Optional, Set
+from heapq import merge
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 from rp2.abstract_entry import AbstractEntry
 from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
@@ -24,6 +27,12 @@ from rp2.intra_transaction import IntraTransaction
 from rp2.out_transaction import OutTransaction
 from rp2.rp2_error import RP2TypeError, RP2ValueError
 
+_ENTRY_SET_TYPE_2_ENTRY_CLASS: Dict[EntrySetType, type] = {
+    EntrySetType.IN: InTransaction,
+    EntrySetType.INTRA: IntraTransaction,
+    EntrySetType.OUT: OutTransaction,
+}
+
 
 class AbstractEntrySet:
     def __init__(
@@ -44,20 +53,46 @@ class AbstractEntrySet:
             raise RP2TypeError("Parameter 'to_date' is not of type date")
         self._to_date: date = to_date
 
-        self._entry_list: List[AbstractEntry] = []  # List for sorting
+        # Entries are kept sorted by timestamp (entries with the same timestamp are kept in insertion order, like a stable sort would): entries
+        # that arrive in order are appended, the others are collected in _unsorted_entries and merged into the list at sort time, so adding
+        # an entry is O(1) and a batch of k out-of-order entries costs O(n + k log k) to merge. The parent of an entry is the entry preceding
+        # it in the list.
+        self._entry_list: List[AbstractEntry] = []
+        self._entry_timestamps: List[datetime] = []
+        self._unsorted_entries: List[AbstractEntry] = []
         self._entry_set: Set[AbstractEntry] = set()  # Set for fast search (at the cost of extra memory)
-        self._entry_to_parent: Dict[AbstractEntry, Optional[AbstractEntry]] = {}
+        # Date of each entry in _entry_list and running maximum of those dates (which is monotonic even when entries have different timezones,
+        # unlike the dates themselves), used to find the bounds of the time window by bisection. They are computed lazily (at sort time) for
+        # the entries that don't have them yet.
+        self._entry_dates: List[date] = []
+        self._entry_max_dates: List[date] = []
         self.__is_sorted: bool = False
+        # Typed sets give each entry a dense index (its insertion order) when it's added, so that per-entry values can be kept in an EntryTable.
+        # Indexes are unique only within the set that assigned them (and its views, which share the owner token): an entry that is already
+        # indexed keeps its index when it's added to another set (see EntryTable). MIXED transaction sets contain entries that are already
+        # indexed by their typed sets, so they don't assign indexes.
+        self._assign_entry_indexes: bool = self.__entry_set_type != EntrySetType.MIXED
+        self._entry_index_owner: object = object()
 
+    # The result is a view of this set in the given time window: it shares the sorted storage of this set (entry list, entry set, timestamps,
+    # dates) and it finds the bounds of its window by bisection when iterating, so nothing is copied or re-sorted. Subclasses recompute only
+    # the fields that depend on the time window (see _update_time_window()). Views are meant for sets that are no longer modified: if the set
+    # is modified anyway, its views keep iterating over the entries it had when they were created (sorting never modifies the shared lists
+    # other than by appending to them: it builds new ones).
     def duplicate(self, from_date: date = MIN_DATE, to_date: date = MAX_DATE) -> "AbstractEntrySet":
         # pylint: disable=protected-access
+        self._check_sort()
         result: AbstractEntrySet = copy(self)
+        result._unsorted_entries = []
         result._from_date = from_date
         result._to_date = to_date
-        # Force sort to recompute fields that are affected by time filter
-        result._force_sort()
+        result._update_time_window()
         return result
 
+    # Called on views created by duplicate(), after the time window has been set: the storage is already sorted.
+    def _update_time_window(self) -> None:
+        pass
+
     def __str__(self) -> str:
         output: List[str] = []
         output.append(f"{type(self).__name__}:")
@@ -112,7 +147,7 @@ class AbstractEntrySet:
 
     @property
     def count(self) -> int:
-        return len(self._entry_list)
+        return len(self._entry_list) + len(self._unsorted_entries)
 
     def add_entry(self, entry: AbstractEntry) -> None:
         AbstractEntry.type_check("entry", entry)
@@ -128,13 +163,67 @@ class AbstractEntrySet:
         if entry in self._entry_set:
             raise RP2ValueError(f"Entry already added: {entry}")
 
-        self._entry_list.append(entry)
+        if self._assign_entry_indexes and entry.entry_index < 0:
+            entry._set_entry_index(self.count, self._entry_index_owner)  # pylint: disable=protected-access
+
+        timestamp: datetime = entry.timestamp
+        if not self._unsorted_entries and (not self._entry_timestamps or timestamp >= self._entry_timestamps[-1]):
+            self._entry_list.append(entry)
+            self._entry_timestamps.append(timestamp)
+        else:
+            self._unsorted_entries.append(entry)
         self._entry_set.add(entry)
         self.__is_sorted = False
 
+    # Bulk version of add_entry(). Entries that are in chronological order and not earlier than the entries of the set (e.g. the output of batch
+    # lot pairing) are checked in one pass and appended at once: otherwise, or if a check fails, they're added one at a time (which raises the
+    # same errors as add_entry()).
+    def add_entries(self, entries: Sequence[AbstractEntry]) -> None:
+        entry_class: type = _ENTRY_SET_TYPE_2_ENTRY_CLASS.get(self.entry_set_type, AbstractEntry)
+        timestamps: List[datetime] = []
+        new_entry_set: Set[AbstractEntry] = set()
+        previous_timestamp: Optional[datetime] = self._entry_timestamps[-1] if self._entry_timestamps else None
+        is_appendable: bool = not self._unsorted_entries
+        entry: AbstractEntry
+        for entry in entries:
+            if not is_appendable:
+                break
+            if not isinstance(entry, entry_class) or entry.asset != self.asset or entry in new_entry_set or entry in self._entry_set:
+                is_appendable = False
+                break
+            timestamp: datetime = entry.timestamp
+            if previous_timestamp is not None and timestamp < previous_timestamp:
+                is_appendable = False
+                break
+            previous_timestamp = timestamp
+            timestamps.append(timestamp)
+            new_entry_set.add(entry)
+
+        if not is_appendable:
+            for entry in entries:
+                self.add_entry(entry)
+            return
+        if not timestamps:
+            return
+
+        if self._assign_entry_indexes:
+            index: int
+            for index, entry in enumerate(entries, self.count):
+                if entry.entry_index < 0:
+                    entry._set_entry_index(index, self._entry_index_owner)  # pylint: disable=protected-access
+        self._entry_list.extend(entries)
+        self._entry_timestamps.extend(timestamps)
+        self._entry_set.update(new_entry_set)
+        self.__is_sorted = False
+
     def is_empty(self) -> bool:
         return self.count == 0
 
+    # Sorts the entries now, rather than lazily at the first read: until entries are added again, reading the set doesn't modify it, so it can be
+    # shared by multiple threads.
+    def sort(self) -> None:
+        self._check_sort()
+
     def _validate_entry(self, entry: AbstractEntry) -> None:
         AbstractEntry.type_check("entry", entry)
         if entry not in self._entry_set:
@@ -143,15 +232,58 @@ class AbstractEntrySet:
     def get_parent(self, entry: AbstractEntry) -> Optional[AbstractEntry]:
         self._validate_entry(entry)
         self._check_sort()
-        return self._entry_to_parent[entry]
+        index: int = self._get_entry_index(entry)
+        return self._entry_list[index - 1] if index > 0 else None
+
+    # Position of the entry in _entry_list: bisection finds the first entry with the same timestamp, then entries with the same timestamp are
+    # scanned (by identity).
+    def _get_entry_index(self, entry: AbstractEntry) -> int:
+        index: int = bisect_left(self._entry_timestamps, entry.timestamp)
+        while self._entry_list[index] is not entry:
+            index += 1
+        return index
 
+    # Merges the out-of-order entries into the sorted entries (see add_entry()) and computes the fields derived from the sorted entries. In this
+    # class these are the dates of entries added since the last call, subclasses can add more. The lists are rebuilt rather than modified in
+    # place, because views created by duplicate() share them.
     def _sort_entries(self) -> None:
-        # Sort entries by date, then add parent
-        self._entry_list.sort(key=_entry_sort_key)
-        parent: Optional[AbstractEntry] = None
-        for entry in self._entry_list:
-            self._entry_to_parent[entry] = parent
-            parent = entry
+        start: int = len(self._entry_dates)
+        if self._unsorted_entries:
+            start = min(start, self.__merge_unsorted_entries())
+        entry_dates: List[date] = self._entry_dates[:start]
+        entry_max_dates: List[date] = self._entry_max_dates[:start]
+        max_date: date = entry_max_dates[-1] if entry_max_dates else MIN_DATE
+        for entry in islice(self._entry_list, start, None):
+            entry_date: date = entry.timestamp.date()
+            entry_dates.append(entry_date)
+            if entry_date > max_date:
+                max_date = entry_date
+            entry_max_dates.append(max_date)
+        self._entry_dates = entry_dates
+        self._entry_max_dates = entry_max_dates
+
+    # Stable merge of the out-of-order entries into the sorted entries: entries with the same timestamp stay in insertion order (entries in
+    # _entry_list were added before the out-of-order ones). Returns the position of the first entry that moved.
+    def __merge_unsorted_entries(self) -> int:
+        unsorted_entries: List[AbstractEntry] = sorted(self._unsorted_entries, key=_entry_sort_key)
+        self._unsorted_entries = []
+        start: int = bisect_right(self._entry_timestamps, unsorted_entries[0].timestamp)
+        merged_entries: List[AbstractEntry] = list(merge(islice(self._entry_list, start, None), unsorted_entries, key=_entry_sort_key))
+        self._entry_list = self._entry_list[:start] + merged_entries
+        self._entry_timestamps = self._entry_timestamps[:start] + [entry.timestamp for entry in merged_entries]
+        return start
+
+    # Returns the range of _entry_list indices that can contain entries in the time window: entries before start are all earlier than from_date
+    # and iteration stops at the first entry later than to_date (end). Entries in the range still need to be checked against from_date, because
+    # dates of entries in different timezones aren't necessarily monotonic.
+    def _get_time_window_bounds(self) -> Tuple[int, int]:
+        self._check_sort()
+        start: int = bisect_left(self._entry_max_dates, self._from_date) if self._from_date > MIN_DATE else 0
+        return (start, self._get_time_window_end())
+
+    # Same as the end of _get_time_window_bounds(), but it can be called at sort time (dates must be already computed).
+    def _get_time_window_end(self) -> int:
+        return bisect_right(self._entry_max_dates, self._to_date) if self._to_date < MAX_DATE else len(self._entry_max_dates)
 
     def _check_sort(self) -> None:
         if not self.__is_sorted:
@@ -169,19 +301,23 @@ class AbstractEntrySet:
 
 class EntrySetIterator:
     def __init__(self, entry_set: AbstractEntrySet) -> None:
-        self.__entry_set: AbstractEntrySet = entry_set
-        self.__entry_set_size: int = self.__entry_set.count
-        self.__index: int = 0
+        # pylint: disable=protected-access
+        self.__index: int
+        self.__end: int
+        self.__index, self.__end = entry_set._get_time_window_bounds()
+        self.__entry_list: List[AbstractEntry] = entry_set._entry_list
+        self.__entry_dates: List[date] = entry_set._entry_dates
+        self.__from_date: date = entry_set.from_date
+
+    def __iter__(self) -> "EntrySetIterator":
+        return self
 
     def __next__(self) -> AbstractEntry:
-        result: Optional[AbstractEntry] = None
-        while self.__index < self.__entry_set_size:
-            result = self.__entry_set._entry_list[self.__index]  # pylint: disable=protected-access
+        while self.__index < self.__end:
+            index: int = self.__index
             self.__index += 1
-            if result.timestamp.date() > self.__entry_set.to_date:
-                raise StopIteration(self)
-            if result.timestamp.date() >= self.__entry_set.from_date:
-                return result
+            if self.__entry_dates[index] >= self.__from_date:
+                return self.__entry_list[index]
         raise StopIteration(self)
 
 
@@ -0,0 +1,49 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Iterator, List
+
+from rp2.rp2_error import RP2TypeError
+
+
+# Input backends (ODS, CSV, etc.) expose the transactions of each asset as a sheet, i.e. a sequence of rows: the parser reads the rows and
+# applies the table grammar (IN / OUT / INTRA / TABLE END), which is the same for all backends. Empty cells are returned as None; numeric
+# cells are returned either as Decimal (typed backends) or as strings (text backends), which the parser converts to RP2Decimal.
+class AbstractInputReader:
+    @classmethod
+    def type_check(cls, name: str, instance: "AbstractInputReader") -> "AbstractInputReader":
+        if not isinstance(name, str):
+            raise RP2TypeError(f"Parameter name is not a string: {repr(name)}")
+        if not isinstance(instance, cls):
+            raise RP2TypeError(f"Parameter '{name}' is not of type {cls.__name__}: {instance}")
+        return instance
+
+    @property
+    def input_file_path(self) -> str:
+        raise NotImplementedError("Abstract function")
+
+    @property
+    def sheet_names(self) -> List[str]:
+        raise NotImplementedError("Abstract function")
+
+    def has_sheet(self, sheet_name: str) -> bool:
+        raise NotImplementedError("Abstract function")
+
+    # Hex digest of the raw content of the sheet: it changes whenever the content of the sheet changes.
+    def get_sheet_digest(self, sheet_name: str) -> str:
+        raise NotImplementedError("Abstract function")
+
+    # Yields the values of each row of the sheet. Rows are padded with None to the maximum row length seen so far.
+    def rows(self, sheet_name: str) -> Iterator[List[Any]]:
+        raise NotImplementedError("Abstract function")
@@ -0,0 +1,41 @@
+# Copyright 2021 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Iterable, Iterator, NamedTuple
+
+from rp2.abstract_accounting_method import AbstractAccountingMethod
+from rp2.abstract_transaction import AbstractTransaction
+from rp2.in_transaction import InTransaction
+from rp2.rp2_decimal import RP2Decimal
+
+
+class TaxableEventAndCostBasis(NamedTuple):
+    taxable_event: AbstractTransaction
+    fiat_cost_basis: RP2Decimal
+
+
+# Base class of pooled-cost accounting methods (e.g. total average): instead of pairing taxable events with acquired lots, these methods keep
+# all acquired lots in a single pool and assign each taxable event a cost basis computed from the pool. They don't have the lot-pairing
+# functions of AbstractLotPairingMethod: the tax engine calls compute_cost_bases() instead and emits exactly one gain/loss per taxable event
+# (without acquired lot).
+class AbstractPooledCostMethod(AbstractAccountingMethod):
+    # Iterables yield transactions in ascending chronological order and can be iterated more than once. The generator yields one entry per
+    # taxable event, in the same order (earn-typed taxable events have zero cost basis) and raises AcquiredLotsExhaustedException if a
+    # taxable event disposes of more crypto than is in the pool.
+    def compute_cost_bases(self, taxable_events: Iterable[AbstractTransaction], acquired_lots: Iterable[InTransaction]) -> Iterator[TaxableEventAndCostBasis]:
+        raise NotImplementedError("Abstract function")
+
+    def validate_acquired_lot_ancestor_timestamp(self, acquired_lot: InTransaction, acquired_lot_parent: InTransaction) -> bool:
+        # Gain/loss entries of pooled-cost methods have no acquired lot, so there is nothing to validate
+        return True
@@ -13,21 +13,83 @@
 # limitations under the License.
 
 
-from typing import Iterator, Optional
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterator, List, Optional
 
 from rp2.abstract_accounting_method import (
-    AbstractAccountingMethod,
+    AbstractLotPairingMethod,
+    AcquiredLotsExhaustedException,
     TaxableEventAndAcquiredLot,
+    TaxableEventsExhaustedException,
 )
 from rp2.abstract_transaction import AbstractTransaction
+from rp2.entry_table import EntryTable
 from rp2.in_transaction import InTransaction
-from rp2.rp2_decimal import RP2Decimal
+from rp2.max_segment_tree import EMPTY, MaxSegmentTree
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2ValueError
 
 
-class AbstractSpecificId(AbstractAccountingMethod):
-    def initialize(self, taxable_event_iterator: Iterator[AbstractTransaction], acquired_lot_iterator: Iterator[InTransaction]) -> None:
+# Base class for accounting methods that can pair a taxable event with any acquired lot that was acquired at or before it (rather than
+# consuming acquired lots in order, like FIFO). Subclasses define which lot is selected by giving each acquired lot a priority (see
+# _get_acquired_lot_priorities()): the lot with the highest priority among the available lots acquired at or before the taxable event is
+# selected in O(log n), using a segment tree over the chronological list of acquired lots.
+class AbstractSpecificId(AbstractLotPairingMethod):
+
+    __taxable_event_iterator: Iterator[AbstractTransaction]
+    __acquired_lot_list: List[InTransaction]
+    __acquired_lot_timestamps: List[datetime]
+    __acquired_lot_2_index: EntryTable[InTransaction, int]
+    __acquired_lot_2_partial_amount: EntryTable[InTransaction, RP2Decimal]
+    __acquired_lot_priorities: List[int]
+    __priority_2_acquired_lot_index: List[int]
+    # Slot i is acquired lot i (in chronological order): its value is the priority of the lot if the lot is available and EMPTY if it's
+    # exhausted or in use, so the maximum value in a prefix of the tree is the priority of the lot to select.
+    __available_acquired_lots: MaxSegmentTree
+
+    # Priority of each acquired lot in acquired_lot_list (which is in chronological order): priorities must be a permutation of
+    # 0..len(acquired_lot_list) - 1 and the available lot with the highest priority is selected.
+    def _get_acquired_lot_priorities(self, acquired_lot_list: List[InTransaction]) -> List[int]:
         raise NotImplementedError("Abstract function")
 
+    def get_acquired_lot_priorities(self, acquired_lot_list: List[InTransaction]) -> List[int]:
+        return self._get_acquired_lot_priorities(acquired_lot_list)
+
+    # Iterators yield transactions in ascending chronological order
+    def initialize(self, taxable_event_iterator: Iterator[AbstractTransaction], acquired_lot_iterator: Iterator[InTransaction]) -> None:
+        self.__taxable_event_iterator = taxable_event_iterator
+        self.__acquired_lot_list = list(acquired_lot_iterator)
+        self.__acquired_lot_timestamps = [acquired_lot.timestamp for acquired_lot in self.__acquired_lot_list]
+        self.__acquired_lot_2_index = EntryTable(len(self.__acquired_lot_list))
+        for index, acquired_lot in enumerate(self.__acquired_lot_list):
+            self.__acquired_lot_2_index[acquired_lot] = index
+        self.__acquired_lot_2_partial_amount = EntryTable(len(self.__acquired_lot_list))
+
+        self.__acquired_lot_priorities = self._get_acquired_lot_priorities(self.__acquired_lot_list)
+        self.__priority_2_acquired_lot_index = [EMPTY] * len(self.__acquired_lot_list)
+        for index, priority in enumerate(self.__acquired_lot_priorities):
+            if not 0 <= priority < len(self.__priority_2_acquired_lot_index) or self.__priority_2_acquired_lot_index[priority] != EMPTY:
+                raise RP2ValueError(f"Internal error: acquired lot priorities are not a permutation of 0..{len(self.__acquired_lot_list) - 1}")
+            self.__priority_2_acquired_lot_index[priority] = index
+        self.__available_acquired_lots = MaxSegmentTree(list(self.__acquired_lot_priorities))
+
+    def initialize_from_checkpoint(
+        self,
+        taxable_event_iterator: Iterator[AbstractTransaction],
+        acquired_lot_iterator: Iterator[InTransaction],
+        acquired_lot_amounts: List[RP2Decimal],
+    ) -> None:
+        self.initialize(taxable_event_iterator, acquired_lot_iterator)
+        if len(acquired_lot_amounts) > len(self.__acquired_lot_list):
+            raise RP2ValueError(f"Internal error: {len(acquired_lot_amounts)} acquired lot amounts for {len(self.__acquired_lot_list)} acquired lots")
+        index: int
+        amount: RP2Decimal
+        for index, amount in enumerate(acquired_lot_amounts):
+            acquired_lot: InTransaction = self.__acquired_lot_list[index]
+            if amount != acquired_lot.crypto_in:
+                self._set_partial_amount(acquired_lot, amount)
+
     def get_next_taxable_event_and_amount(
         self,
         taxable_event: Optional[AbstractTransaction],
@@ -35,12 +97,72 @@ class AbstractSpecificId(AbstractAccountingMethod):
         taxable_event_amount: RP2Decimal,
         acquired_lot_amount: RP2Decimal,
     ) -> TaxableEventAndAcquiredLot:
-        raise NotImplementedError("Abstract function")
+        new_acquired_lot: Optional[InTransaction] = acquired_lot
+        new_acquired_lot_amount: RP2Decimal = acquired_lot_amount - taxable_event_amount if acquired_lot is not None else ZERO
 
+        try:
+            new_taxable_event: AbstractTransaction = next(self.__taxable_event_iterator)
+        except StopIteration:
+            raise TaxableEventsExhaustedException() from None
+        new_taxable_event_amount: RP2Decimal = new_taxable_event.crypto_balance_change
+
+        # If the new taxable event is later than the current one, more acquired lots may now be available: put the current acquired lot back
+        # (with its remaining amount) and select again
+        if taxable_event and taxable_event.timestamp < new_taxable_event.timestamp:
+            if acquired_lot:
+                self._set_partial_amount(acquired_lot, new_acquired_lot_amount)
+            (_, new_acquired_lot, _, new_acquired_lot_amount) = self.get_acquired_lot_for_taxable_event(
+                new_taxable_event, acquired_lot, new_taxable_event_amount, new_acquired_lot_amount
+            )
+
+        return TaxableEventAndAcquiredLot(
+            taxable_event=new_taxable_event,
+            acquired_lot=new_acquired_lot,
+            taxable_event_amount=new_taxable_event_amount,
+            acquired_lot_amount=new_acquired_lot_amount,
+        )
+
+    # After selecting the taxable event, RP2 calls this function to find the acquired_lot to pair with it. This means that the taxable
+    # event can be passed to this function (which is useful for certain accounting methods)
     def get_acquired_lot_for_taxable_event(
         self, taxable_event: AbstractTransaction, acquired_lot: Optional[InTransaction], taxable_event_amount: RP2Decimal, acquired_lot_amount: RP2Decimal
     ) -> TaxableEventAndAcquiredLot:
-        raise NotImplementedError("Abstract function")
+        new_taxable_event_amount: RP2Decimal = taxable_event_amount - acquired_lot_amount
+        # Highest-priority available acquired lot among the ones acquired at or before the taxable event: O(log n)
+        end: int = bisect_right(self.__acquired_lot_timestamps, taxable_event.timestamp)
+        priority: int = self.__available_acquired_lots.get_max(0, end)
+        if priority == EMPTY:
+            raise AcquiredLotsExhaustedException()
+
+        new_acquired_lot: InTransaction = self.__acquired_lot_list[self.__priority_2_acquired_lot_index[priority]]
+        new_acquired_lot_amount: RP2Decimal = (
+            self._get_partial_amount(new_acquired_lot) if self._has_partial_amount(new_acquired_lot) else new_acquired_lot.crypto_in
+        )
+        # The acquired lot is now in use: it's not available until its remaining amount is put back (see get_next_taxable_event_and_amount())
+        self._clear_partial_amount(new_acquired_lot)
+        return TaxableEventAndAcquiredLot(
+            taxable_event=taxable_event,
+            acquired_lot=new_acquired_lot,
+            taxable_event_amount=new_taxable_event_amount,
+            acquired_lot_amount=new_acquired_lot_amount,
+        )
+
+    def _has_partial_amount(self, acquired_lot: InTransaction) -> bool:
+        return acquired_lot in self.__acquired_lot_2_partial_amount
+
+    def _get_partial_amount(self, acquired_lot: InTransaction) -> RP2Decimal:
+        if not self._has_partial_amount(acquired_lot):
+            raise Exception(f"Internal error: acquired lot has no partial amount: {acquired_lot}")
+        return self.__acquired_lot_2_partial_amount[acquired_lot]
+
+    # Acquired lots are available if they have a positive partial amount (or no partial amount at all, if they've never been used)
+    def _set_partial_amount(self, acquired_lot: InTransaction, amount: RP2Decimal) -> None:
+        self.__acquired_lot_2_partial_amount[acquired_lot] = amount
+        index: int = self.__acquired_lot_2_index[acquired_lot]
+        self.__available_acquired_lots.set_value(index, self.__acquired_lot_priorities[index] if amount > ZERO else EMPTY)
+
+    def _clear_partial_amount(self, acquired_lot: InTransaction) -> None:
+        self._set_partial_amount(acquired_lot, ZERO)
 
     def validate_acquired_lot_ancestor_timestamp(self, acquired_lot: InTransaction, acquired_lot_parent: InTransaction) -> bool:
         raise NotImplementedError("Abstract function")
@@ -23,6 +23,8 @@ from rp2.rp2_error import RP2TypeError
 
 
 class AbstractTransaction(AbstractEntry):
+    __slots__ = ("__timestamp", "__transaction_type", "__spot_price", "__internal_id", "__unique_id", "__notes")
+
     def __init__(
         self,
         configuration: Configuration,
@@ -36,12 +38,40 @@ class AbstractTransaction(AbstractEntry):
     ) -> None:
         super().__init__(configuration, asset)
 
-        self.__timestamp: datetime = configuration.type_check_timestamp_from_string("timestamp", timestamp)
-        self.__transaction_type: TransactionType = TransactionType.type_check_from_string("transaction_type", transaction_type)
-        self.__spot_price: RP2Decimal = configuration.type_check_positive_decimal("spot_price", spot_price)
-        self.__internal_id: int = configuration.type_check_internal_id("internal_id", internal_id) if internal_id is not None else id(self)
-        self.__unique_id: str = configuration.type_check_string_or_integer("unique_id", unique_id) if unique_id is not None else ""
-        self.__notes = configuration.type_check_string("notes", notes) if notes else ""
+        self.__init_transaction(
+            configuration.type_check_timestamp_from_string("timestamp", timestamp),
+            TransactionType.type_check_from_string("transaction_type", transaction_type),
+            configuration.type_check_positive_decimal("spot_price", spot_price),
+            configuration.type_check_internal_id("internal_id", internal_id) if internal_id is not None else None,
+            configuration.type_check_string_or_integer("unique_id", unique_id) if unique_id is not None else "",
+            configuration.type_check_string("notes", notes) if notes else "",
+        )
+
+    # Same as __init__(), with arguments that have already been checked and converted (timestamp and transaction_type are parsed, unique_id and
+    # notes are strings): used by the trusted constructors of subclasses (see InTransaction._create_unchecked()).
+    def _init_transaction_unchecked(
+        self,
+        configuration: Configuration,
+        timestamp: datetime,
+        asset: str,
+        transaction_type: TransactionType,
+        spot_price: RP2Decimal,
+        internal_id: Optional[int],
+        unique_id: str,
+        notes: str,
+    ) -> None:
+        self._init_unchecked(configuration, asset)
+        self.__init_transaction(timestamp, transaction_type, spot_price, internal_id, unique_id, notes)
+
+    def __init_transaction(
+        self, timestamp: datetime, transaction_type: TransactionType, spot_price: RP2Decimal, internal_id: Optional[int], unique_id: str, notes: str
+    ) -> None:
+        self.__timestamp: datetime = timestamp
+        self.__transaction_type: TransactionType = transaction_type
+        self.__spot_price: RP2Decimal = spot_price
+        self.__internal_id: int = internal_id if internal_id is not None else id(self)
+        self.__unique_id: str = unique_id
+        self.__notes: str = notes
 
     @classmethod
     def type_check(cls, name: str, instance: "AbstractEntry") -> "AbstractEntry":
@@ -57,7 +87,7 @@ class AbstractTransaction(AbstractEntry):
             raise RP2TypeError(f"Operand has non-AbstractTransaction value {repr(other)}")
         # By definition, internal_id can uniquely identify a transaction: this works even if it's the ODS line from the spreadsheet,
         # since there are no cross-asset transactions (so a spreadsheet line points to a unique transaction for that asset).
-        result: bool = self.internal_id == other.internal_id
+        result: bool = self.__internal_id == other.__internal_id
         return result
 
     def __ne__(self, other: object) -> bool:
@@ -66,7 +96,8 @@ class AbstractTransaction(AbstractEntry):
     def __hash__(self) -> int:
         # By definition, internal_id can uniquely identify a transaction: this works even if it's the ODS line from the spreadsheet,
         # since there are no cross-asset transactions (so a spreadsheet line points to a unique transaction for that asset).
-        return hash(self.internal_id)
+        # The integer id is hashed directly (internal_id converts it to a string).
+        return hash(self.__internal_id)
 
     def to_string(self, indent: int = 0, repr_format: bool = True, extra_data: Optional[List[str]] = None) -> str:
         class_specific_data: List[str] = []
@@ -13,15 +13,28 @@
 # limitations under the License.
 
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Generic, Optional, TypeVar
+from typing import Generic, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
-KeyType = TypeVar("KeyType", int, datetime, Decimal, float, str)  # pylint: disable=invalid-name
+from rp2.rp2_error import RP2ValueError
+
+KeyType = TypeVar("KeyType", int, datetime, Decimal, float, str, Tuple[int, int])  # pylint: disable=invalid-name
 ValueType = TypeVar("ValueType")  # pylint: disable=invalid-name
 
+_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND: timedelta = timedelta(microseconds=1)
+
+
+# Key for entries that are ordered by timestamp and disambiguated by an integer id: (microseconds since the epoch, id). Tuples compare
+# element-wise, so these keys don't need string formatting. The timestamp must be timezone-aware.
+def get_timestamp_key(timestamp: datetime, internal_id: int) -> Tuple[int, int]:
+    return ((timestamp - _EPOCH) // _MICROSECOND, internal_id)
+
 
 class AVLNode(Generic[KeyType, ValueType]):
+    __slots__ = ("__key", "__value", "__height", "__left", "__right")
+
     def __init__(self, key: KeyType, value: ValueType):
         self.__key: KeyType = key
         self.__value: ValueType = value
@@ -77,69 +90,214 @@ class AVLNode(Generic[KeyType, ValueType]):
 class AVLTree(Generic[KeyType, ValueType]):
     def __init__(self) -> None:
         self.__root: Optional[AVLNode[KeyType, ValueType]] = None
+        self.__size: int = 0
+
+    # Builds a balanced tree from (key, value) pairs sorted by key in O(n) (inserting them one by one would take O(n log n) and rotations).
+    @classmethod
+    def from_sorted(cls, items: Sequence[Tuple[KeyType, ValueType]]) -> "AVLTree[KeyType, ValueType]":
+        index: int
+        for index in range(1, len(items)):
+            if items[index][0] < items[index - 1][0]:
+                raise RP2ValueError(f"AVLTree: items are not sorted by key: {repr(items[index - 1][0])} > {repr(items[index][0])}")
+        result: AVLTree[KeyType, ValueType] = cls()
+        result.__root = cls.__build_balanced_subtree(items, 0, len(items))  # pylint: disable=protected-access
+        result.__size = len(items)  # pylint: disable=protected-access
+        return result
+
+    # Subtree of items[start:end]: the middle item is the root, so the heights of the two subtrees differ by at most 1. Recursion depth is
+    # O(log n).
+    @classmethod
+    def __build_balanced_subtree(cls, items: Sequence[Tuple[KeyType, ValueType]], start: int, end: int) -> Optional[AVLNode[KeyType, ValueType]]:
+        if start >= end:
+            return None
+        middle: int = (start + end) // 2
+        result: AVLNode[KeyType, ValueType] = AVLNode(items[middle][0], items[middle][1])
+        result.left = cls.__build_balanced_subtree(items, start, middle)
+        result.right = cls.__build_balanced_subtree(items, middle + 1, end)
+        result.height = 1 + max(cls._get_height(result.left), cls._get_height(result.right))
+        return result
 
     def __repr__(self) -> str:
         return f"{type(self).__name__}(root={repr(self.__root)})"
 
+    def __len__(self) -> int:
+        return self.__size
+
+    # Value of the node with the largest key <= the given key (the name is historical: the comparison is not strict)
     def find_max_value_less_than(self, key: KeyType) -> Optional[ValueType]:
+        return self.find_floor_value(key)
+
+    # Value of the node with the largest key <= the given key
+    def find_floor_value(self, key: KeyType) -> Optional[ValueType]:
         result: Optional[AVLNode[KeyType, ValueType]]
         result = self.find_max_node_less_than_at_node(self.__root, key) if self.__root else None
         return result.value if result is not None else None
 
-    def insert_node(self, key: KeyType, value: ValueType) -> None:
-        new_node: AVLNode[KeyType, ValueType]
-        new_node = self.insert_node_at_node(self.__root, key, value)
-        if self.__root != new_node:
-            self.__root = new_node
-
-    @staticmethod
-    def find_max_node_less_than_at_node(root: AVLNode[KeyType, ValueType], key: KeyType) -> Optional[AVLNode[KeyType, ValueType]]:
-        current_node: Optional[AVLNode[KeyType, ValueType]] = root
+    # Value of the node with the smallest key >= the given key
+    def find_ceiling_value(self, key: KeyType) -> Optional[ValueType]:
+        current_node: Optional[AVLNode[KeyType, ValueType]] = self.__root
         result: Optional[AVLNode[KeyType, ValueType]] = None
         while current_node is not None:
             current_key: KeyType = current_node.key
             try:
-                if current_key > key:
-                    current_node = current_node.left
-                elif current_key < key:
-                    result = current_node
+                if current_key < key:
                     current_node = current_node.right
-                elif current_key == key:
+                elif current_key > key:
+                    result = current_node
+                    current_node = current_node.left
+                else:
                     result = current_node
                     break
             except TypeError as exc:
                 raise TypeError("AVLTree: keys are not comparable") from exc
-        return result
+        return result.value if result is not None else None
 
+    # (key, value) pairs with from_key <= key <= to_key, in key order (None means unbounded). Subtrees outside the range are not visited.
+    def find_range(self, from_key: Optional[KeyType] = None, to_key: Optional[KeyType] = None) -> Iterator[Tuple[KeyType, ValueType]]:
+        stack: List[AVLNode[KeyType, ValueType]] = []
+        current_node: Optional[AVLNode[KeyType, ValueType]] = self.__root
+        while stack or current_node is not None:
+            if current_node is not None:
+                if from_key is not None and current_node.key < from_key:
+                    current_node = current_node.right
+                else:
+                    stack.append(current_node)
+                    current_node = current_node.left
+                continue
+            node: AVLNode[KeyType, ValueType] = stack.pop()
+            if to_key is not None and node.key > to_key:
+                return
+            yield (node.key, node.value)
+            current_node = node.right
+
+    def insert_node(self, key: KeyType, value: ValueType) -> None:
+        self.__root = self.insert_node_at_node(self.__root, key, value)
+        self.__size += 1
+
+    # Inserts in the subtree rooted at root and returns the new root of the subtree. Nodes with the same key go to the right of existing ones.
+    # The insertion is iterative: the path from the root is kept in a list and rebalanced bottom-up.
     def insert_node_at_node(self, root: Optional[AVLNode[KeyType, ValueType]], key: KeyType, value: ValueType) -> AVLNode[KeyType, ValueType]:
+        new_node: AVLNode[KeyType, ValueType] = AVLNode(key, value)
         if not root:
-            return AVLNode(key, value)
+            return new_node
 
-        if key < root.key:
-            root.left = self.insert_node_at_node(root.left, key, value)
+        path: List[AVLNode[KeyType, ValueType]] = []
+        current_node: Optional[AVLNode[KeyType, ValueType]] = root
+        while current_node is not None:
+            path.append(current_node)
+            current_node = current_node.left if key < current_node.key else current_node.right
+        parent: AVLNode[KeyType, ValueType] = path[-1]
+        if key < parent.key:
+            parent.left = new_node
         else:
-            root.right = self.insert_node_at_node(root.right, key, value)
-
+            parent.right = new_node
+        return self.__rebalance_path(path)
+
+    # Deletes one node with the given key (if there are several, which one is unspecified). Returns False if there is no such node.
+    def delete_node(self, key: KeyType) -> bool:
+        path: List[AVLNode[KeyType, ValueType]] = []
+        current_node: Optional[AVLNode[KeyType, ValueType]] = self.__root
+        while current_node is not None and current_node.key != key:
+            path.append(current_node)
+            current_node = current_node.left if key < current_node.key else current_node.right
+        if current_node is None:
+            return False
+
+        parent: Optional[AVLNode[KeyType, ValueType]] = path[-1] if path else None
+        if current_node.left is not None and current_node.right is not None:
+            # Two children: the in-order successor (leftmost node of the right subtree) is unlinked and takes the place of the deleted node
+            node_index: int = len(path)
+            path.append(current_node)
+            successor: AVLNode[KeyType, ValueType] = current_node.right
+            while successor.left is not None:
+                path.append(successor)
+                successor = successor.left
+            successor_parent: AVLNode[KeyType, ValueType] = path[-1]
+            if successor_parent is current_node:
+                current_node.right = successor.right
+            else:
+                successor_parent.left = successor.right
+            successor.left = current_node.left
+            successor.right = current_node.right
+            successor.height = current_node.height
+            path[node_index] = successor
+            self.__replace_child(parent, current_node, successor)
+        else:
+            self.__replace_child(parent, current_node, current_node.left if current_node.left is not None else current_node.right)
+
+        if path:
+            self.__root = self.__rebalance_path(path)
+        self.__size -= 1
+        return True
+
+    def __replace_child(
+        self, parent: Optional[AVLNode[KeyType, ValueType]], child: AVLNode[KeyType, ValueType], new_child: Optional[AVLNode[KeyType, ValueType]]
+    ) -> None:
+        if parent is None:
+            self.__root = new_child
+        elif parent.left is child:
+            parent.left = new_child
+        else:
+            parent.right = new_child
+
+    # Updates heights and rebalances the nodes in path (from the root of a subtree down to a modified node) bottom-up: returns the new root
+    # of the subtree. It stops at the first subtree whose height didn't change, because nodes above it are not affected.
+    def __rebalance_path(self, path: List[AVLNode[KeyType, ValueType]]) -> AVLNode[KeyType, ValueType]:
+        index: int = len(path) - 1
+        while index >= 0:
+            node: AVLNode[KeyType, ValueType] = path[index]
+            old_height: int = node.height
+            new_node: AVLNode[KeyType, ValueType] = self._rebalance(node)
+            if index == 0:
+                return new_node
+            if new_node is not node:
+                parent: AVLNode[KeyType, ValueType] = path[index - 1]
+                if parent.left is node:
+                    parent.left = new_node
+                else:
+                    parent.right = new_node
+            if new_node.height == old_height:
+                break
+            index -= 1
+        return path[0]
+
+    # Rebalancing cases are told apart by the balance factor of the taller child (which also works after deletions, when it can be 0).
+    def _rebalance(self, root: AVLNode[KeyType, ValueType]) -> AVLNode[KeyType, ValueType]:
         root.height = 1 + max(self._get_height(root.left), self._get_height(root.right))
-
         balance_factor: int = self._get_balance_factor(root)
         if balance_factor > 1:
-            # Disable mypy on the next few lines: it complains about root.left possibly being None (and therefore not having
-            # attribute "key"). However since balance_factor is > 1 root.left is guaranteed not to be None.
-            if key < root.left.key:  # type: ignore
-                return self._rotate_right(root)
-            root.left = self._rotate_left(root.left)  # type: ignore
+            # Disable mypy on the next few lines: it complains about root.left possibly being None. However since balance_factor is > 1
+            # root.left is guaranteed not to be None.
+            if self._get_balance_factor(root.left) < 0:  # type: ignore
+                root.left = self._rotate_left(root.left)  # type: ignore
             return self._rotate_right(root)
         if balance_factor < -1:
-            # Disable mypy on the next few lines: it complains about root.right possibly being None (and therefore not having
-            # attribute "key"). However since balance_factor is < -1 root.right is guaranteed not to be None.
-            if key > root.right.key:  # type: ignore
-                return self._rotate_left(root)
-            root.right = self._rotate_right(root.right)  # type: ignore
+            # Disable mypy on the next few lines: it complains about root.right possibly being None. However since balance_factor is < -1
+            # root.right is guaranteed not to be None.
+            if self._get_balance_factor(root.right) > 0:  # type: ignore
+                root.right = self._rotate_right(root.right)  # type: ignore
             return self._rotate_left(root)
-
         return root
 
+    @staticmethod
+    def find_max_node_less_than_at_node(root: AVLNode[KeyType, ValueType], key: KeyType) -> Optional[AVLNode[KeyType, ValueType]]:
+        current_node: Optional[AVLNode[KeyType, ValueType]] = root
+        result: Optional[AVLNode[KeyType, ValueType]] = None
+        while current_node is not None:
+            current_key: KeyType = current_node.key
+            try:
+                if current_key > key:
+                    current_node = current_node.left
+                elif current_key < key:
+                    result = current_node
+                    current_node = current_node.right
+                elif current_key == key:
+                    result = current_node
+                    break
+            except TypeError as exc:
+                raise TypeError("AVLTree: keys are not comparable") from exc
+        return result
+
     # Rotation implementation based on: https://en.wikipedia.org/wiki/Tree_rotation
     def _rotate_left(self, root: AVLNode[KeyType, ValueType]) -> AVLNode[KeyType, ValueType]:
         # Disable mypy on the next few lines: it complains that variables possibly being None (and therefore not having accessible
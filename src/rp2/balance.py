@@ -14,20 +14,24 @@
 
 from dataclasses import dataclass
 from datetime import date
-from typing import Callable, Dict, List, Optional, cast
+from typing import Callable, Dict, List, Optional, Tuple, Type, cast
 
 from rp2.configuration import Configuration, to_string
+from rp2.fixed_point import fixed_point_sum, from_fixed_point
 from rp2.in_transaction import InTransaction
 from rp2.input_data import InputData
 from rp2.intra_transaction import IntraTransaction
 from rp2.logger import LOGGER
 from rp2.out_transaction import OutTransaction
-from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_decimal import RP2Decimal
 from rp2.rp2_error import RP2TypeError
 
 
+# Balance has __slots__ (no per-instance __dict__): fields have no defaults, so the dataclass decorator doesn't need class attributes for them
 @dataclass(frozen=True, eq=True)
 class Balance:
+    __slots__ = ("configuration", "asset", "exchange", "holder", "final_balance", "acquired_balance", "sent_balance", "received_balance")
+
     configuration: Configuration
     asset: str
     exchange: str
@@ -47,6 +51,23 @@ class Balance:
         self.configuration.type_check_decimal("sent_balance", self.sent_balance)
         self.configuration.type_check_decimal("received_balance", self.received_balance)
 
+    # Frozen dataclasses with __slots__ can't be unpickled with the default protocol (which sets slots with setattr()), so instances are
+    # pickled as constructor calls
+    def __reduce__(self) -> Tuple[Type["Balance"], Tuple[Configuration, str, str, str, RP2Decimal, RP2Decimal, RP2Decimal, RP2Decimal]]:
+        return (
+            type(self),
+            (
+                self.configuration,
+                self.asset,
+                self.exchange,
+                self.holder,
+                self.final_balance,
+                self.acquired_balance,
+                self.sent_balance,
+                self.received_balance,
+            ),
+        )
+
     def to_string(self, indent: int = 0, repr_format: bool = True, extra_data: Optional[List[str]] = None) -> str:
         class_specific_data: List[str] = []
         stringify: Callable[[object], str] = repr
@@ -106,10 +127,15 @@ class BalanceSet:
         self.__asset: str = configuration.type_check_asset("in_transaction_set.asset", input_data.asset)
         self._balances: List[Balance] = []
 
-        acquired_balances: Dict[Account, RP2Decimal] = {}
-        sent_balances: Dict[Account, RP2Decimal] = {}
-        received_balances: Dict[Account, RP2Decimal] = {}
-        final_balances: Dict[Account, RP2Decimal] = {}
+        # Amounts are collected per account first and then summed in one batch per account and balance type. Accounts are kept in the order in
+        # which they are first seen. Fixed-point values are collected too (they are None if not in fixed-point mode, see fixed_point).
+        accounts: Dict[Account, None] = {}
+        account_2_acquired_amounts: Dict[Account, List[RP2Decimal]] = {}
+        account_2_sent_amounts: Dict[Account, List[RP2Decimal]] = {}
+        account_2_received_amounts: Dict[Account, List[RP2Decimal]] = {}
+        account_2_fixed_point_acquired_amounts: Dict[Account, List[Optional[int]]] = {}
+        account_2_fixed_point_sent_amounts: Dict[Account, List[Optional[int]]] = {}
+        account_2_fixed_point_received_amounts: Dict[Account, List[Optional[int]]] = {}
 
         from_account: Account
         to_account: Account
@@ -120,8 +146,9 @@ class BalanceSet:
                 break
             in_transaction: InTransaction = cast(InTransaction, transaction)
             to_account = Account(in_transaction.exchange, in_transaction.holder)
-            acquired_balances[to_account] = acquired_balances.get(to_account, ZERO) + in_transaction.crypto_in
-            final_balances[to_account] = final_balances.get(to_account, ZERO) + in_transaction.crypto_in
+            accounts.setdefault(to_account)
+            account_2_acquired_amounts.setdefault(to_account, []).append(in_transaction.crypto_in)
+            account_2_fixed_point_acquired_amounts.setdefault(to_account, []).append(in_transaction.fixed_point_crypto_in)
 
         # Balances for currency that is moved across accounts
         for transaction in self.__input_data.unfiltered_intra_transaction_set:
@@ -130,10 +157,12 @@ class BalanceSet:
             intra_transaction: IntraTransaction = cast(IntraTransaction, transaction)
             from_account = Account(intra_transaction.from_exchange, intra_transaction.from_holder)
             to_account = Account(intra_transaction.to_exchange, intra_transaction.to_holder)
-            sent_balances[from_account] = sent_balances.get(from_account, ZERO) + intra_transaction.crypto_sent
-            received_balances[to_account] = received_balances.get(to_account, ZERO) + intra_transaction.crypto_received
-            final_balances[from_account] = final_balances.get(from_account, ZERO) - intra_transaction.crypto_sent
-            final_balances[to_account] = final_balances.get(to_account, ZERO) + intra_transaction.crypto_received
+            accounts.setdefault(from_account)
+            accounts.setdefault(to_account)
+            account_2_sent_amounts.setdefault(from_account, []).append(intra_transaction.crypto_sent)
+            account_2_received_amounts.setdefault(to_account, []).append(intra_transaction.crypto_received)
+            account_2_fixed_point_sent_amounts.setdefault(from_account, []).append(intra_transaction.fixed_point_crypto_sent)
+            account_2_fixed_point_received_amounts.setdefault(to_account, []).append(intra_transaction.fixed_point_crypto_received)
 
         # Balances for sold and gifted currency
         for transaction in self.__input_data.unfiltered_out_transaction_set:
@@ -141,19 +170,50 @@ class BalanceSet:
                 break
             out_transaction: OutTransaction = cast(OutTransaction, transaction)
             from_account = Account(out_transaction.exchange, out_transaction.holder)
-            sent_balances[from_account] = sent_balances.get(from_account, ZERO) + out_transaction.crypto_out_no_fee + out_transaction.crypto_fee
-            final_balances[from_account] = final_balances.get(from_account, ZERO) - out_transaction.crypto_out_no_fee - out_transaction.crypto_fee
-
-        for account, final_balance in final_balances.items():
+            accounts.setdefault(from_account)
+            sent_amounts: List[RP2Decimal] = account_2_sent_amounts.setdefault(from_account, [])
+            sent_amounts.append(out_transaction.crypto_out_no_fee)
+            sent_amounts.append(out_transaction.crypto_fee)
+            fixed_point_sent_amounts: List[Optional[int]] = account_2_fixed_point_sent_amounts.setdefault(from_account, [])
+            fixed_point_sent_amounts.append(out_transaction.fixed_point_crypto_out_no_fee)
+            fixed_point_sent_amounts.append(out_transaction.fixed_point_crypto_fee)
+
+        for account in accounts:
+            acquired_balance: RP2Decimal
+            sent_balance: RP2Decimal
+            received_balance: RP2Decimal
+            final_balance: RP2Decimal
+            fixed_point_acquired_balance: Optional[int] = fixed_point_sum(account_2_fixed_point_acquired_amounts.get(account, []))
+            fixed_point_sent_balance: Optional[int] = fixed_point_sum(account_2_fixed_point_sent_amounts.get(account, []))
+            fixed_point_received_balance: Optional[int] = fixed_point_sum(account_2_fixed_point_received_amounts.get(account, []))
+            fixed_point_final_balance: Optional[int] = fixed_point_sum(
+                [fixed_point_acquired_balance, fixed_point_received_balance, None if fixed_point_sent_balance is None else -fixed_point_sent_balance]
+            )
+            if (
+                configuration.fixed_point
+                and fixed_point_acquired_balance is not None
+                and fixed_point_sent_balance is not None
+                and fixed_point_received_balance is not None
+                and fixed_point_final_balance is not None
+            ):
+                acquired_balance = from_fixed_point(fixed_point_acquired_balance)
+                sent_balance = from_fixed_point(fixed_point_sent_balance)
+                received_balance = from_fixed_point(fixed_point_received_balance)
+                final_balance = from_fixed_point(fixed_point_final_balance)
+            else:
+                acquired_balance = RP2Decimal.exact_sum(account_2_acquired_amounts.get(account, []))
+                sent_balance = RP2Decimal.exact_sum(account_2_sent_amounts.get(account, []))
+                received_balance = RP2Decimal.exact_sum(account_2_received_amounts.get(account, []))
+                final_balance = acquired_balance + received_balance - sent_balance
             balance = Balance(
                 configuration,
                 self.__asset,
                 account.exchange,
                 account.holder,
                 final_balance,
-                acquired_balances.get(account, ZERO),
-                sent_balances.get(account, ZERO),
-                received_balances.get(account, ZERO),
+                acquired_balance,
+                sent_balance,
+                received_balance,
             )
             LOGGER.debug("created balance: %s", balance)
             self._balances.append(balance)
@@ -0,0 +1,217 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from bisect import bisect_left
+from itertools import accumulate
+from typing import FrozenSet, List, NamedTuple, Optional
+
+from rp2.abstract_accounting_method import BatchPairing
+from rp2.abstract_transaction import AbstractTransaction
+from rp2.entry_types import TransactionType
+from rp2.in_transaction import InTransaction
+from rp2.rp2_decimal import CRYPTO_DECIMALS, RP2_DECIMAL_CONTEXT, ZERO, RP2Decimal
+
+# Amounts are represented as integers with CRYPTO_DECIMALS decimal digits (fixed point). Amounts below 10^_INTEGER_DIGITS with at most
+# CRYPTO_DECIMALS decimal digits are the ones RP2Decimal adds, subtracts and compares exactly (see rp2_decimal).
+_INTEGER_DIGITS: int = RP2_DECIMAL_CONTEXT.prec - CRYPTO_DECIMALS
+_FIXED_POINT_LIMIT: int = 10 ** (_INTEGER_DIGITS + CRYPTO_DECIMALS)
+
+# _POWERS_OF_TEN[n] is 10^n: used to truncate fixed-point values to the exponent of an amount (see _get_amounts())
+_POWERS_OF_TEN: List[int] = [1]
+while len(_POWERS_OF_TEN) <= _INTEGER_DIGITS + CRYPTO_DECIMALS:
+    _POWERS_OF_TEN.append(_POWERS_OF_TEN[-1] * 10)
+
+# Exponent of ZERO, which the generic loop subtracts from the amount left of the acquired lot at earn-typed taxable events (see _get_amounts())
+_ZERO_EXPONENT: int = int(ZERO.as_tuple().exponent)
+
+# Set lookups are cheaper than calling is_earn_type() on each taxable event
+_EARN_TYPES: FrozenSet[TransactionType] = frozenset(transaction_type for transaction_type in TransactionType if transaction_type.is_earn_type())
+
+
+class _FixedPointAmounts(NamedTuple):
+    amounts: List[RP2Decimal]
+    values: List[int]
+    exponents: List[int]
+
+
+# Fixed-point values (and exponents) of the amounts, or None if some amount isn't positive, has more than CRYPTO_DECIMALS decimal digits or isn't
+# below 10^_INTEGER_DIGITS: the generic lot-pairing loop rejects the first ones and can round the others.
+def _to_fixed_point(amounts: List[RP2Decimal]) -> Optional[_FixedPointAmounts]:
+    values: List[int] = []
+    exponents: List[int] = []
+    amount: RP2Decimal
+    for amount in amounts:
+        if not amount.is_finite():
+            return None
+        exponent: int = int(amount.as_tuple().exponent)
+        if exponent < -CRYPTO_DECIMALS:
+            return None
+        value: int = int(RP2_DECIMAL_CONTEXT.scaleb(amount, CRYPTO_DECIMALS))
+        if value <= 0 or value >= _FIXED_POINT_LIMIT:
+            return None
+        values.append(value)
+        exponents.append(exponent)
+    return _FixedPointAmounts(amounts, values, exponents)
+
+
+# Amounts of the entries, with the same representation as the ones of the generic loop. The generic loop keeps the amount left of the current
+# taxable event and of the current acquired lot, computed by subtraction: the result of an exact subtraction has the lower exponent of the
+# operands, so the exponent of an amount left is the lowest exponent of the amounts it was computed from. The amount of an entry is the amount
+# left of the taxable event, if the entry ends with the taxable event, or of the acquired lot. At earn-typed taxable events the generic loop
+# subtracts ZERO from the amount left of the acquired lot. Entries with the amount of a whole taxable event or acquired lot share it.
+def _get_amounts(
+    taxable_event_amounts: _FixedPointAmounts,
+    acquired_lot_amounts: _FixedPointAmounts,
+    entry_taxable_event_indexes: List[int],
+    entry_acquired_lot_indexes: List[int],
+    entry_values: List[int],
+    entry_ends_taxable_events: List[bool],
+    entry_ends_acquired_lots: List[bool],
+) -> List[RP2Decimal]:
+    result: List[RP2Decimal] = []
+    acquired_lot_count: int = len(acquired_lot_amounts.values)
+    taxable_event_exponent: int = 0
+    previous_taxable_event_index: int = -1
+    acquired_lot_exponent: int = acquired_lot_amounts.exponents[0]
+    taxable_event_index: int
+    acquired_lot_index: int
+    value: int
+    ends_taxable_event: bool
+    ends_acquired_lot: bool
+    for taxable_event_index, acquired_lot_index, value, ends_taxable_event, ends_acquired_lot in zip(
+        entry_taxable_event_indexes, entry_acquired_lot_indexes, entry_values, entry_ends_taxable_events, entry_ends_acquired_lots
+    ):
+        if taxable_event_index != previous_taxable_event_index:
+            previous_taxable_event_index = taxable_event_index
+            taxable_event_exponent = taxable_event_amounts.exponents[taxable_event_index]
+        exponent: int
+        if acquired_lot_index < 0:
+            # Earn-typed taxable event
+            exponent = taxable_event_exponent
+            acquired_lot_exponent = min(acquired_lot_exponent, _ZERO_EXPONENT)
+        elif ends_taxable_event:
+            exponent = taxable_event_exponent
+            acquired_lot_exponent = min(acquired_lot_exponent, taxable_event_exponent)
+        else:
+            exponent = acquired_lot_exponent
+            taxable_event_exponent = min(taxable_event_exponent, acquired_lot_exponent)
+        if ends_acquired_lot and acquired_lot_index + 1 < acquired_lot_count:
+            # The generic loop moves to the next lot right away
+            acquired_lot_exponent = acquired_lot_amounts.exponents[acquired_lot_index + 1]
+
+        if value == taxable_event_amounts.values[taxable_event_index] and exponent == taxable_event_amounts.exponents[taxable_event_index]:
+            result.append(taxable_event_amounts.amounts[taxable_event_index])
+        elif ends_acquired_lot and value == acquired_lot_amounts.values[acquired_lot_index] and exponent == acquired_lot_amounts.exponents[acquired_lot_index]:
+            result.append(acquired_lot_amounts.amounts[acquired_lot_index])
+        else:
+            result.append(RP2Decimal(RP2_DECIMAL_CONTEXT.scaleb(value // _POWERS_OF_TEN[CRYPTO_DECIMALS + exponent], exponent)))
+    return result
+
+
+# Batch version of FIFO lot pairing: it computes the same gain/loss entries as the generic lot-pairing loop of the tax engine (see tax_engine)
+# with the FIFO accounting method, all at once. FIFO disposes of the crypto of acquired lots in order, so if acquired lots and (non-earn-typed)
+# taxable events are laid out on the same line according to the running totals of their amounts, each gain/loss entry is the overlap of a
+# taxable event with an acquired lot. Its end is the end of either of them: the merged running totals (fixed-point integers, so that
+# comparisons are exact) are the ends of all entries and binary searches on the running totals find the taxable event and the acquired lot of
+# each entry. Earn-typed taxable events have no acquired lot: they get one entry each, in their position among the taxable events.
+#
+# The result is None if the batch can't reproduce the generic loop exactly: amounts that the generic loop would round or reject (see
+# _to_fixed_point()), lots that aren't enough for the taxable events or taxable events earlier than their acquired lot. The generic loop
+# handles these cases (raising the appropriate error, if any).
+def pair_fifo_in_batch(taxable_events: List[AbstractTransaction], acquired_lots: List[InTransaction]) -> Optional[BatchPairing]:
+    if not taxable_events:
+        return BatchPairing([], [], [])
+    if not acquired_lots:
+        return None
+
+    taxable_event_amounts: Optional[_FixedPointAmounts] = _to_fixed_point([taxable_event.crypto_balance_change for taxable_event in taxable_events])
+    acquired_lot_amounts: Optional[_FixedPointAmounts] = _to_fixed_point([acquired_lot.crypto_in for acquired_lot in acquired_lots])
+    if taxable_event_amounts is None or acquired_lot_amounts is None:
+        return None
+
+    # Positions of the taxable events that are paired with acquired lots (the ones that aren't earn-typed)
+    paired_positions: List[int] = [position for position, taxable_event in enumerate(taxable_events) if taxable_event.transaction_type not in _EARN_TYPES]
+    taxable_event_ends: List[int] = list(accumulate(taxable_event_amounts.values[position] for position in paired_positions))
+    acquired_lot_ends: List[int] = list(accumulate(acquired_lot_amounts.values))
+
+    ends: List[int] = []
+    if taxable_event_ends:
+        total: int = taxable_event_ends[-1]
+        if total > acquired_lot_ends[-1]:
+            # Not enough crypto in acquired lots
+            return None
+        if total == acquired_lot_ends[-1] and paired_positions[-1] < len(taxable_events) - 1:
+            # The last paired taxable event uses up the last acquired lot: the generic loop looks for the next lot as soon as another taxable
+            # event follows (even if it's earn-typed) and fails
+            return None
+        # Each taxable event is paired with the lots from the one containing its start to the one containing its end: acquired lots are in
+        # chronological order, so checking the latter is enough
+        position: int
+        taxable_event_end: int
+        for position, taxable_event_end in zip(paired_positions, taxable_event_ends):
+            if taxable_events[position].timestamp < acquired_lots[bisect_left(acquired_lot_ends, taxable_event_end)].timestamp:
+                return None
+        # Both lists are sorted, so sorting their concatenation is a linear merge: then duplicates (where a taxable event and a lot end together)
+        # are dropped
+        merged_end: int
+        for merged_end in sorted(taxable_event_ends + acquired_lot_ends[: bisect_left(acquired_lot_ends, total)]):
+            if not ends or merged_end != ends[-1]:
+                ends.append(merged_end)
+
+    # Entry i ends at ends[i] and belongs to the first taxable event and acquired lot ending at or after it
+    entry_taxable_event_indexes: List[int] = []
+    entry_acquired_lot_indexes: List[int] = []
+    entry_values: List[int] = []
+    entry_ends_taxable_events: List[bool] = []
+    entry_ends_acquired_lots: List[bool] = []
+    start: int = 0
+    end: int
+    for end in ends:
+        paired_index: int = bisect_left(taxable_event_ends, end)
+        acquired_lot_index: int = bisect_left(acquired_lot_ends, end)
+        entry_taxable_event_indexes.append(paired_positions[paired_index])
+        entry_acquired_lot_indexes.append(acquired_lot_index)
+        entry_values.append(end - start)
+        entry_ends_taxable_events.append(end == taxable_event_ends[paired_index])
+        entry_ends_acquired_lots.append(end == acquired_lot_ends[acquired_lot_index])
+        start = end
+    if len(paired_positions) < len(taxable_events):
+        # Add the entries of earn-typed taxable events in their position (the sort is stable and both parts are already sorted): they have the
+        # whole amount of the taxable event and no acquired lot
+        earn_positions: List[int] = [position for position, taxable_event in enumerate(taxable_events) if taxable_event.transaction_type in _EARN_TYPES]
+        entry_taxable_event_indexes += earn_positions
+        entry_acquired_lot_indexes += [-1] * len(earn_positions)
+        entry_values += [taxable_event_amounts.values[position] for position in earn_positions]
+        entry_ends_taxable_events += [True] * len(earn_positions)
+        entry_ends_acquired_lots += [False] * len(earn_positions)
+        order: List[int] = sorted(range(len(entry_taxable_event_indexes)), key=entry_taxable_event_indexes.__getitem__)
+        entry_taxable_event_indexes = [entry_taxable_event_indexes[index] for index in order]
+        entry_acquired_lot_indexes = [entry_acquired_lot_indexes[index] for index in order]
+        entry_values = [entry_values[index] for index in order]
+        entry_ends_taxable_events = [entry_ends_taxable_events[index] for index in order]
+        entry_ends_acquired_lots = [entry_ends_acquired_lots[index] for index in order]
+
+    return BatchPairing(
+        [taxable_events[index] for index in entry_taxable_event_indexes],
+        [acquired_lots[index] if index >= 0 else None for index in entry_acquired_lot_indexes],
+        _get_amounts(
+            taxable_event_amounts,
+            acquired_lot_amounts,
+            entry_taxable_event_indexes,
+            entry_acquired_lot_indexes,
+            entry_values,
+            entry_ends_taxable_events,
+            entry_ends_acquired_lots,
+        ),
+    )
@@ -14,12 +14,14 @@
 
 from dataclasses import dataclass
 from datetime import date
-from typing import Dict, List, Set, cast
+from typing import Callable, Dict, List, Optional, Set, TypeVar, cast
 
 from rp2.abstract_entry import AbstractEntry
 from rp2.balance import BalanceSet
 from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
+from rp2.entry_table import EntryTable
 from rp2.entry_types import EntrySetType, TransactionType
+from rp2.fixed_point import fixed_point_prefix_sums, fixed_point_sum, from_fixed_point
 from rp2.gain_loss import GainLoss
 from rp2.gain_loss_set import GainLossSet
 from rp2.in_transaction import InTransaction
@@ -31,6 +33,8 @@ from rp2.rp2_decimal import ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
 from rp2.transaction_set import TransactionSet
 
+_Entry = TypeVar("_Entry", bound=AbstractEntry)
+
 
 @dataclass(frozen=True, eq=True)
 class YearlyGainLoss:
@@ -101,15 +105,6 @@ class _YearlyGainLossId:
     is_long_term_capital_gains: bool
 
 
-# Frozen and eq are not set because we don't need to hash instances and we need to modify fields (see _create_yearly_gain_loss_list)
-@dataclass(frozen=True, eq=True)
-class _YearlyGainLossAmounts:
-    crypto_amount: RP2Decimal
-    fiat_amount: RP2Decimal
-    fiat_cost_basis: RP2Decimal
-    fiat_gain_loss: RP2Decimal
-
-
 class ComputedData:
     @classmethod
     def type_check(cls, name: str, instance: "ComputedData") -> "ComputedData":
@@ -120,16 +115,19 @@ class ComputedData:
 
     @staticmethod
     def _compute_price_per_unit(unfiltered_in_transaction_set: TransactionSet, to_date: date) -> RP2Decimal:
-        crypto_in_running_sum: RP2Decimal = ZERO
-        fiat_in_with_fee_running_sum: RP2Decimal = ZERO
+        in_transactions: List[InTransaction] = []
         for entry in unfiltered_in_transaction_set:
             # from_date is not used when computing average price per unit (because we always start from the beginning): only to_date is relevant.
             if entry.timestamp.date() > to_date:
                 break
-            transaction: InTransaction = cast(InTransaction, entry)
-            crypto_in_running_sum += transaction.crypto_in
-            fiat_in_with_fee_running_sum += transaction.fiat_in_with_fee
-        return fiat_in_with_fee_running_sum / crypto_in_running_sum if crypto_in_running_sum is not ZERO else ZERO
+            in_transactions.append(cast(InTransaction, entry))
+        if not in_transactions:
+            return ZERO
+        crypto_in_sum: RP2Decimal = _sum_crypto_amounts(
+            [transaction.crypto_in for transaction in in_transactions], [transaction.fixed_point_crypto_in for transaction in in_transactions]
+        )
+        fiat_in_with_fee_sum: RP2Decimal = RP2Decimal.exact_sum(transaction.fiat_in_with_fee for transaction in in_transactions)
+        return fiat_in_with_fee_sum / crypto_in_sum
 
     @staticmethod
     def _filter_yearly_gain_loss_by_year(unfiltered_yearly_gain_loss_list: List[YearlyGainLoss], from_year: int) -> List[YearlyGainLoss]:
@@ -141,10 +139,10 @@ class ComputedData:
         unfiltered_gain_loss_set: GainLossSet,
         to_date: date = MAX_DATE,
     ) -> List[YearlyGainLoss]:
-        summaries: Dict[_YearlyGainLossId, _YearlyGainLossAmounts] = {}
+        # Gain/loss entries are grouped by year, asset, transaction type and capital gains type first, then each group is summed in one batch
+        key_2_gain_losses: Dict[_YearlyGainLossId, List[GainLoss]] = {}
         entry: AbstractEntry
         key: _YearlyGainLossId
-        value: _YearlyGainLossAmounts
         for entry in unfiltered_gain_loss_set:
             gain_loss: GainLoss = cast(GainLoss, entry)
             if gain_loss.taxable_event.timestamp.date() > to_date:
@@ -155,36 +153,24 @@ class ComputedData:
                 gain_loss.taxable_event.transaction_type,
                 gain_loss.is_long_term_capital_gains(),
             )
-            value = summaries.setdefault(key, _YearlyGainLossAmounts(ZERO, ZERO, ZERO, ZERO))
-            crypto_amount: RP2Decimal = value.crypto_amount + gain_loss.crypto_amount
-            fiat_amount: RP2Decimal = value.fiat_amount + gain_loss.taxable_event_fiat_amount_with_fee_fraction
-            fiat_cost_basis: RP2Decimal = value.fiat_cost_basis + gain_loss.fiat_cost_basis
-            fiat_gain_loss: RP2Decimal = value.fiat_gain_loss + gain_loss.fiat_gain
-            summaries[key] = _YearlyGainLossAmounts(
-                crypto_amount=crypto_amount, fiat_amount=fiat_amount, fiat_cost_basis=fiat_cost_basis, fiat_gain_loss=fiat_gain_loss
-            )
+            key_2_gain_losses.setdefault(key, []).append(gain_loss)
 
         yearly_gain_loss_set: Set[YearlyGainLoss] = set()
-        crypto_taxable_amount_total: RP2Decimal = ZERO
-        fiat_taxable_amount_total: RP2Decimal = ZERO
-        cost_basis_total: RP2Decimal = ZERO
-        gain_loss_total: RP2Decimal = ZERO
-        for (key, value) in summaries.items():
+        gain_losses: List[GainLoss]
+        for key, gain_losses in key_2_gain_losses.items():
             yearly_gain_loss: YearlyGainLoss = YearlyGainLoss(
                 year=key.year,
                 asset=key.asset,
                 transaction_type=key.transaction_type,
                 is_long_term_capital_gains=key.is_long_term_capital_gains,
-                crypto_amount=value.crypto_amount,
-                fiat_amount=value.fiat_amount,
-                fiat_cost_basis=value.fiat_cost_basis,
-                fiat_gain_loss=value.fiat_gain_loss,
+                crypto_amount=_sum_crypto_amounts(
+                    [gain_loss.crypto_amount for gain_loss in gain_losses], [gain_loss.fixed_point_crypto_amount for gain_loss in gain_losses]
+                ),
+                fiat_amount=RP2Decimal.exact_sum(gain_loss.taxable_event_fiat_amount_with_fee_fraction for gain_loss in gain_losses),
+                fiat_cost_basis=RP2Decimal.exact_sum(gain_loss.fiat_cost_basis for gain_loss in gain_losses),
+                fiat_gain_loss=RP2Decimal.exact_sum(gain_loss.fiat_gain for gain_loss in gain_losses),
             )
             yearly_gain_loss_set.add(yearly_gain_loss)
-            crypto_taxable_amount_total += yearly_gain_loss.crypto_amount
-            fiat_taxable_amount_total += yearly_gain_loss.fiat_amount
-            cost_basis_total += yearly_gain_loss.fiat_cost_basis
-            gain_loss_total += yearly_gain_loss.fiat_gain_loss
 
         return list(sorted(yearly_gain_loss_set, key=_yearly_gain_loss_sort_criteria, reverse=True))
 
@@ -208,6 +194,7 @@ class ComputedData:
         TransactionSet.type_check("taxable_event_set", unfiltered_taxable_event_set, EntrySetType.MIXED, asset, True)
         GainLossSet.type_check("gain_loss_set", unfiltered_gain_loss_set)
 
+        self.__unfiltered_gain_loss_set: GainLossSet = unfiltered_gain_loss_set
         self.__filtered_taxable_event_set: TransactionSet = cast(TransactionSet, unfiltered_taxable_event_set.duplicate(from_date=from_date, to_date=to_date))
         self.__filtered_gain_loss_set: GainLossSet = cast(GainLossSet, unfiltered_gain_loss_set.duplicate(from_date=from_date, to_date=to_date))
 
@@ -215,64 +202,58 @@ class ComputedData:
         LOGGER.debug("%s: Created yearly gain-loss list", input_data.asset)
         self.__filtered_yearly_gain_loss_list: List[YearlyGainLoss] = self._filter_yearly_gain_loss_by_year(yearly_gain_loss_list, from_date.year)
 
+        self.__unfiltered_in_transaction_set: TransactionSet = input_data.unfiltered_in_transaction_set
         self.__filtered_in_transaction_set: TransactionSet = input_data.filtered_in_transaction_set
         self.__filtered_intra_transaction_set: TransactionSet = input_data.filtered_intra_transaction_set
+        self.__unfiltered_intra_transaction_set: TransactionSet = input_data.unfiltered_intra_transaction_set
         self.__filtered_out_transaction_set: TransactionSet = input_data.filtered_out_transaction_set
+        self.__unfiltered_out_transaction_set: TransactionSet = input_data.unfiltered_out_transaction_set
 
         self.__filtered_balance_set: BalanceSet = BalanceSet(unfiltered_taxable_event_set.configuration, input_data, to_date)
         self.__filtered_price_per_unit: RP2Decimal = self._compute_price_per_unit(input_data.unfiltered_in_transaction_set, to_date)
 
-        # Compute crypto running sums
-        self.__crypto_in_running_sum: Dict[InTransaction, RP2Decimal] = {}
-        self.__crypto_in_fee_running_sum: Dict[InTransaction, RP2Decimal] = {}
-        self.__crypto_out_running_sum: Dict[OutTransaction, RP2Decimal] = {}
-        self.__crypto_out_fee_running_sum: Dict[OutTransaction, RP2Decimal] = {}
-        self.__crypto_intra_fee_running_sum: Dict[IntraTransaction, RP2Decimal] = {}
-        self.__crypto_gain_loss_running_sum: Dict[GainLoss, RP2Decimal] = {}
-
-        crypto_running_sum: RP2Decimal
-        crypto_fee_running_sum: RP2Decimal
-
-        crypto_running_sum = ZERO
-        crypto_fee_running_sum = ZERO
-        for entry in input_data.unfiltered_in_transaction_set:
-            in_transaction: InTransaction = cast(InTransaction, entry)
-            crypto_running_sum += in_transaction.crypto_in
-            crypto_fee_running_sum += in_transaction.crypto_fee
-            self.__crypto_in_running_sum[in_transaction] = crypto_running_sum
-            self.__crypto_in_fee_running_sum[in_transaction] = crypto_fee_running_sum
-
-        crypto_running_sum = ZERO
-        crypto_fee_running_sum = ZERO
-        for entry in input_data.unfiltered_out_transaction_set:
-            out_transaction: OutTransaction = cast(OutTransaction, entry)
-            crypto_running_sum += out_transaction.crypto_out_no_fee
-            crypto_fee_running_sum += out_transaction.crypto_fee
-            self.__crypto_out_running_sum[out_transaction] = crypto_running_sum
-            self.__crypto_out_fee_running_sum[out_transaction] = crypto_fee_running_sum
-
-        crypto_fee_running_sum = ZERO
-        for entry in input_data.unfiltered_intra_transaction_set:
-            intra_transaction: IntraTransaction = cast(IntraTransaction, entry)
-            crypto_fee_running_sum += intra_transaction.crypto_fee
-            self.__crypto_intra_fee_running_sum[intra_transaction] = crypto_fee_running_sum
-
-        crypto_running_sum = ZERO
-        gain_loss: GainLoss
-        for entry in unfiltered_gain_loss_set:
-            gain_loss = cast(GainLoss, entry)
-            crypto_running_sum += gain_loss.crypto_amount
-            self.__crypto_gain_loss_running_sum[gain_loss] = crypto_running_sum
+        # Compute crypto running sums (one batch per running sum)
+        in_transactions: List[InTransaction] = cast(List[InTransaction], list(input_data.unfiltered_in_transaction_set))
+        self.__crypto_in_running_sum: EntryTable[InTransaction, RP2Decimal] = _create_running_sum_table(
+            in_transactions, lambda t: t.crypto_in, lambda t: t.fixed_point_crypto_in
+        )
+        self.__crypto_in_fee_running_sum: EntryTable[InTransaction, RP2Decimal] = _create_running_sum_table(
+            in_transactions, lambda t: t.crypto_fee, lambda t: t.fixed_point_crypto_fee
+        )
+
+        out_transactions: List[OutTransaction] = cast(List[OutTransaction], list(input_data.unfiltered_out_transaction_set))
+        self.__crypto_out_running_sum: EntryTable[OutTransaction, RP2Decimal] = _create_running_sum_table(
+            out_transactions, lambda t: t.crypto_out_no_fee, lambda t: t.fixed_point_crypto_out_no_fee
+        )
+        self.__crypto_out_fee_running_sum: EntryTable[OutTransaction, RP2Decimal] = _create_running_sum_table(
+            out_transactions, lambda t: t.crypto_fee, lambda t: t.fixed_point_crypto_fee
+        )
+
+        intra_transactions: List[IntraTransaction] = cast(List[IntraTransaction], list(input_data.unfiltered_intra_transaction_set))
+        self.__crypto_intra_fee_running_sum: EntryTable[IntraTransaction, RP2Decimal] = _create_running_sum_table(
+            intra_transactions, lambda t: t.crypto_fee, lambda t: t.fixed_point_crypto_fee
+        )
+
+        gain_losses: List[GainLoss] = cast(List[GainLoss], list(unfiltered_gain_loss_set))
+        self.__crypto_gain_loss_running_sum: EntryTable[GainLoss, RP2Decimal] = _create_running_sum_table(
+            gain_losses, lambda g: g.crypto_amount, lambda g: g.fixed_point_crypto_amount
+        )
 
         # Compute in lot sold percentages
-        self.__in_lot_sold_percentage: Dict[InTransaction, RP2Decimal] = {}
+        in_lots: List[InTransaction] = []
+        in_lot_2_sold_percentages: EntryTable[InTransaction, List[RP2Decimal]] = EntryTable(input_data.unfiltered_in_transaction_set.count)
+        gain_loss: GainLoss
         for entry in self.__filtered_gain_loss_set:
             gain_loss = cast(GainLoss, entry)
             if not gain_loss.acquired_lot or gain_loss.acquired_lot.timestamp.date() < from_date or gain_loss.acquired_lot.timestamp.date() > to_date:
                 continue
-            self.__in_lot_sold_percentage[gain_loss.acquired_lot] = (
-                self.__in_lot_sold_percentage.setdefault(gain_loss.acquired_lot, ZERO) + gain_loss.acquired_lot_fraction_percentage
-            )
+            if gain_loss.acquired_lot not in in_lot_2_sold_percentages:
+                in_lots.append(gain_loss.acquired_lot)
+                in_lot_2_sold_percentages[gain_loss.acquired_lot] = []
+            in_lot_2_sold_percentages[gain_loss.acquired_lot].append(gain_loss.acquired_lot_fraction_percentage)
+        self.__in_lot_sold_percentage: EntryTable[InTransaction, RP2Decimal] = EntryTable(input_data.unfiltered_in_transaction_set.count)
+        for in_lot in in_lots:
+            self.__in_lot_sold_percentage[in_lot] = RP2Decimal.exact_sum(in_lot_2_sold_percentages[in_lot])
 
         if self.__filtered_taxable_event_set.asset != self.__asset:
             raise RP2ValueError(f"Asset mismatch in 'taxable_event_set': expected {self.__asset}, found {self.__filtered_taxable_event_set.asset}")
@@ -299,6 +280,11 @@ class ComputedData:
         """Set of gain/loss mappings in this ComputedData instance."""
         return self.__filtered_gain_loss_set
 
+    @property
+    def unfiltered_gain_loss_set(self) -> GainLossSet:
+        """Set of gain/loss mappings of all taxable events (regardless of from_date and to_date)."""
+        return self.__unfiltered_gain_loss_set
+
     @property
     def yearly_gain_loss_list(self) -> List[YearlyGainLoss]:
         """List of gain/loss summaries in this ComputedData instance, grouped by year."""
@@ -309,16 +295,31 @@ class ComputedData:
         """Set of in-transactions in this ComputedData instance."""
         return self.__filtered_in_transaction_set
 
+    @property
+    def unfiltered_in_transaction_set(self) -> TransactionSet:
+        """Set of all in-transactions (regardless of from_date and to_date)."""
+        return self.__unfiltered_in_transaction_set
+
     @property
     def out_transaction_set(self) -> TransactionSet:
         """Set of out-transactions in this ComputedData instance."""
         return self.__filtered_out_transaction_set
 
+    @property
+    def unfiltered_out_transaction_set(self) -> TransactionSet:
+        """Set of all out-transactions (regardless of from_date and to_date)."""
+        return self.__unfiltered_out_transaction_set
+
     @property
     def intra_transaction_set(self) -> TransactionSet:
         """Set of intra-transactions in this ComputedData instance."""
         return self.__filtered_intra_transaction_set
 
+    @property
+    def unfiltered_intra_transaction_set(self) -> TransactionSet:
+        """Set of all intra-transactions (regardless of from_date and to_date)."""
+        return self.__unfiltered_intra_transaction_set
+
     @property
     def balance_set(self) -> BalanceSet:
         """Set of account balances in this ComputedData instance."""
@@ -362,7 +363,34 @@ class ComputedData:
     def get_in_lot_sold_percentage(self, in_transaction: InTransaction) -> RP2Decimal:
         """Percentage sold for a given InTransaction instance"""
         InTransaction.type_check("in_transaction", in_transaction)
-        return self.__in_lot_sold_percentage[in_transaction] if in_transaction in self.__in_lot_sold_percentage else ZERO
+        return self.__in_lot_sold_percentage.get(in_transaction, ZERO)
+
+
+# Maps each entry to the running sum of the given amount up to (and including) the entry. Running sums are computed in one batch: on the
+# fixed-point values of the amounts, if they all have one (see fixed_point).
+def _create_running_sum_table(
+    entries: List[_Entry], get_amount: Callable[[_Entry], RP2Decimal], get_fixed_point_amount: Callable[[_Entry], Optional[int]]
+) -> EntryTable[_Entry, RP2Decimal]:
+    result: EntryTable[_Entry, RP2Decimal] = EntryTable(len(entries))
+    running_sums: List[RP2Decimal]
+    fixed_point_running_sums: Optional[List[int]] = None
+    if entries and entries[0].configuration.fixed_point:
+        fixed_point_running_sums = fixed_point_prefix_sums([get_fixed_point_amount(entry) for entry in entries])
+    if fixed_point_running_sums is not None:
+        running_sums = [from_fixed_point(running_sum) for running_sum in fixed_point_running_sums]
+    else:
+        running_sums = RP2Decimal.exact_prefix_sums(get_amount(entry) for entry in entries)
+    for entry, running_sum in zip(entries, running_sums):
+        result[entry] = running_sum
+    return result
+
+
+# Sum of the crypto amounts: on their fixed-point values (the parallel list), if they all have one (see fixed_point)
+def _sum_crypto_amounts(amounts: List[RP2Decimal], fixed_point_amounts: List[Optional[int]]) -> RP2Decimal:
+    fixed_point_result: Optional[int] = fixed_point_sum(fixed_point_amounts) if fixed_point_amounts else None
+    if fixed_point_result is not None:
+        return from_fixed_point(fixed_point_result)
+    return RP2Decimal.exact_sum(amounts)
 
 
 def _yearly_gain_loss_sort_criteria(yearly_gain_loss: YearlyGainLoss) -> str:
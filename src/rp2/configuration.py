@@ -14,25 +14,29 @@
 
 import json
 from datetime import date, datetime
+from decimal import Decimal
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from dateutil.parser import parse
 from jsonschema import validate
 
 from rp2.abstract_country import AbstractCountry
 from rp2.configuration_schema import CONFIGURATION_SCHEMA
 from rp2.rp2_decimal import ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.timestamp_parser import TimestampParser, parse_timestamp
 
 MIN_DATE: date = date(1970, 1, 1)
 MAX_DATE: date = date(9999, 12, 31)
 
-DEFAULT_GENERATORS: Set[str] = set([
-    "rp2.plugin.report.rp2_full_report",
-    "rp2.plugin.report.us.tax_report_us",
-    "rp2.plugin.report.us.open_positions",
-])
+DEFAULT_GENERATORS: Set[str] = set(
+    [
+        "rp2.plugin.report.rp2_full_report",
+        "rp2.plugin.report.us.tax_report_us",
+        "rp2.plugin.report.us.open_positions",
+    ]
+)
 
 # Parametrized and extensible method to generate string representation
 def to_string(indent: int = 0, repr_format: bool = True, data: Optional[List[str]] = None) -> str:
@@ -61,6 +65,29 @@ def to_string(indent: int = 0, repr_format: bool = True, data: Optional[List[str
     return separator.join(output)
 
 
+# Precompiled mapping from the columns of a table row to the constructor arguments of the corresponding transaction class: it's computed
+# once from the table header in the config file, so that extracting the arguments of a row is a single itemgetter call.
+class _RowExtractor:
+    def __init__(self, header: Dict[str, int]) -> None:
+        self.__argument_names: Tuple[str, ...] = tuple(header)
+        # The config file schema requires several columns per table, so itemgetter always returns a tuple
+        self.__get_values: Callable[[List[Any]], Tuple[Any, ...]] = itemgetter(*header.values())
+        self.__min_row_length: int = max(header.values()) + 1
+
+    @property
+    def min_row_length(self) -> int:
+        return self.__min_row_length
+
+    def get_argument_pack(self, data: List[Any]) -> Dict[str, Any]:
+        return dict(zip(self.__argument_names, self.__get_values(data)))
+
+    # Column-wise variant of get_argument_pack(): returns the values of each argument in the given rows.
+    def get_argument_columns(self, rows: List[List[Any]]) -> Dict[str, List[Any]]:
+        get_values: Callable[[List[Any]], Tuple[Any, ...]] = self.__get_values
+        row_values: List[Tuple[Any, ...]] = [get_values(data) for data in rows]
+        return {argument_name: [values[position] for values in row_values] for position, argument_name in enumerate(self.__argument_names)}
+
+
 class Configuration:  # pylint: disable=too-many-public-methods
     @classmethod
     def type_check(cls, name: str, instance: "Configuration") -> "Configuration":
@@ -75,6 +102,8 @@ class Configuration:  # pylint: disable=too-many-public-methods
         country: AbstractCountry,
         from_date: date = MIN_DATE,
         to_date: date = MAX_DATE,
+        per_wallet: bool = False,
+        fixed_point: bool = False,
     ) -> None:
         self.__configuration_path: str = self.type_check_string("configuration_path", configuration_path)
         self.__country = AbstractCountry.type_check("country", country)
@@ -87,6 +116,10 @@ class Configuration:  # pylint: disable=too-many-public-methods
 
         if self.__from_date > self.__to_date:
             raise RP2ValueError("Parameter from_date cannot be greater than to_date")
+        # In per-wallet mode each account (exchange and holder) has its own pool of acquired lots (see tax_engine)
+        self.__per_wallet: bool = self.type_check_bool("per_wallet", per_wallet)
+        # In fixed-point mode crypto amounts are added, subtracted and compared as scaled integers, where possible (see fixed_point)
+        self.__fixed_point: bool = self.type_check_bool("fixed_point", fixed_point)
 
         self.__in_header: Dict[str, int]
         self.__out_header: Dict[str, int]
@@ -115,6 +148,10 @@ class Configuration:  # pylint: disable=too-many-public-methods
             if "generators" in json_configuration:
                 self.__generators = set(json_configuration["generators"])
 
+        self.__in_row_extractor: _RowExtractor = _RowExtractor(self.__in_header)
+        self.__out_row_extractor: _RowExtractor = _RowExtractor(self.__out_header)
+        self.__intra_row_extractor: _RowExtractor = _RowExtractor(self.__intra_header)
+
         # Used by __repr__()
         self.__sorted_assets: List[str] = sorted(self.__assets)
         self.__sorted_exchanges: List[str] = sorted(self.__exchanges)
@@ -150,6 +187,14 @@ class Configuration:  # pylint: disable=too-many-public-methods
     def to_date(self) -> date:
         return self.__to_date
 
+    @property
+    def per_wallet(self) -> bool:
+        return self.__per_wallet
+
+    @property
+    def fixed_point(self) -> bool:
+        return self.__fixed_point
+
     @property
     def assets(self) -> Set[str]:
         return self.__assets
@@ -158,27 +203,42 @@ class Configuration:  # pylint: disable=too-many-public-methods
     def generators(self) -> Set[str]:
         return self.__generators
 
-    def __get_table_constructor_argument_pack(self, data: List[Any], table_type: str, header: Dict[str, int]) -> Dict[str, Any]:
-        if not isinstance(data, List):
+    def __check_table_row(self, data: List[Any], table_type: str, row_extractor: _RowExtractor) -> None:
+        if not isinstance(data, list):
             raise RP2TypeError(f"Parameter 'data' value is not a List: {data}")
-        max_column: int = header[max(header, key=header.get)]  # type: ignore
-        if len(data) <= max_column:
+        if len(data) < row_extractor.min_row_length:
             raise RP2ValueError(
                 f"Parameter 'data' has length {len(data)}, but required minimum from {table_type}-table headers in "
-                f"{self.__configuration_path} is {max_column + 1}: {data}"
+                f"{self.__configuration_path} is {row_extractor.min_row_length}: {data}"
             )
-        pack: Dict[str, Any] = {argument: data[position] for argument, position in header.items()}
 
-        return pack
+    def __get_table_constructor_argument_pack(self, data: List[Any], table_type: str, row_extractor: _RowExtractor) -> Dict[str, Any]:
+        self.__check_table_row(data, table_type, row_extractor)
+        return row_extractor.get_argument_pack(data)
+
+    def __get_table_constructor_argument_columns(self, rows: List[List[Any]], table_type: str, row_extractor: _RowExtractor) -> Dict[str, List[Any]]:
+        data: List[Any]
+        for data in rows:
+            self.__check_table_row(data, table_type, row_extractor)
+        return row_extractor.get_argument_columns(rows)
 
     def get_in_table_constructor_argument_pack(self, data: List[Any]) -> Dict[str, Any]:
-        return self.__get_table_constructor_argument_pack(data, "in", self.__in_header)
+        return self.__get_table_constructor_argument_pack(data, "in", self.__in_row_extractor)
 
     def get_out_table_constructor_argument_pack(self, data: List[Any]) -> Dict[str, Any]:
-        return self.__get_table_constructor_argument_pack(data, "out", self.__out_header)
+        return self.__get_table_constructor_argument_pack(data, "out", self.__out_row_extractor)
 
     def get_intra_table_constructor_argument_pack(self, data: List[Any]) -> Dict[str, Any]:
-        return self.__get_table_constructor_argument_pack(data, "intra", self.__intra_header)
+        return self.__get_table_constructor_argument_pack(data, "intra", self.__intra_row_extractor)
+
+    def get_in_table_constructor_argument_columns(self, rows: List[List[Any]]) -> Dict[str, List[Any]]:
+        return self.__get_table_constructor_argument_columns(rows, "in", self.__in_row_extractor)
+
+    def get_out_table_constructor_argument_columns(self, rows: List[List[Any]]) -> Dict[str, List[Any]]:
+        return self.__get_table_constructor_argument_columns(rows, "out", self.__out_row_extractor)
+
+    def get_intra_table_constructor_argument_columns(self, rows: List[List[Any]]) -> Dict[str, List[Any]]:
+        return self.__get_table_constructor_argument_columns(rows, "intra", self.__intra_row_extractor)
 
     def get_in_table_column_position(self, input_parameter: str) -> int:
         self.type_check_string("input_parameter", input_parameter)
@@ -203,10 +263,12 @@ class Configuration:  # pylint: disable=too-many-public-methods
         return cls.type_check_int(name, value)
 
     @classmethod
-    def type_check_timestamp_from_string(cls, name: str, value: str) -> datetime:
+    # The timestamp is parsed with timestamp_parser, if given (e.g. the parser of the column the value comes from), or with the stateless
+    # parse_timestamp() otherwise.
+    def type_check_timestamp_from_string(cls, name: str, value: str, timestamp_parser: Optional[TimestampParser] = None) -> datetime:
         cls.type_check_string(name, value)
         try:
-            result: datetime = parse(value)
+            result: datetime = timestamp_parser.parse(value) if timestamp_parser is not None else parse_timestamp(value)
         except Exception as exc:
             raise RP2ValueError(f"Error parsing parameter '{name}': {str(exc)}") from exc
         if result.tzinfo is None:
@@ -240,7 +302,7 @@ class Configuration:  # pylint: disable=too-many-public-methods
     @classmethod
     def type_check_string_or_integer(cls, name: str, value: str) -> str:
         cls.type_check_parameter_name(name)
-        if not isinstance(value, (str, int, float)):
+        if not isinstance(value, (str, int, float, Decimal)):
             raise RP2TypeError(f"Parameter '{name}' has non-string value {repr(value)}")
         return str(value)
 
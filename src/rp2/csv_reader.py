@@ -0,0 +1,94 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from rp2.abstract_input_reader import AbstractInputReader
+from rp2.rp2_error import RP2ValueError
+
+CSV_EXTENSION: str = ".csv"
+TSV_EXTENSION: str = ".tsv"
+
+_EXTENSION_2_DELIMITER: Dict[str, str] = {
+    CSV_EXTENSION: ",",
+    TSV_EXTENSION: "\t",
+}
+_ENCODING: str = "utf-8-sig"
+_CHUNK_SIZE: int = 1024 * 1024
+
+
+# Streaming CSV / TSV reader: each asset is a separate file named after the asset (e.g. BTC.csv or BTC.tsv), containing the same tables as
+# the corresponding ODS sheet. The input path is either one such file or a directory containing one file per asset. Rows are read one at a
+# time with the csv module. All values are strings (CSV has no cell types), except for empty cells, which are returned as None.
+class CSVReader(AbstractInputReader):
+    def __init__(self, input_file_path: str) -> None:
+        path: Path = Path(input_file_path)
+        if not path.exists():
+            raise RP2ValueError(f"Error: {input_file_path} does not exist")
+        self.__input_file_path: str = input_file_path
+        self.__sheet_name_2_path: Dict[str, Path] = {}
+        self.__sheet_name_2_digest: Dict[str, str] = {}
+        file_paths: List[Path] = sorted(path.iterdir()) if path.is_dir() else [path]
+        for file_path in file_paths:
+            if file_path.suffix not in _EXTENSION_2_DELIMITER or not file_path.is_file():
+                if path.is_dir():
+                    continue
+                raise RP2ValueError(f"Error: {input_file_path} is not a CSV or TSV file")
+            if file_path.stem in self.__sheet_name_2_path:
+                raise RP2ValueError(f"Error: found more than one file for asset {file_path.stem} in {input_file_path}")
+            self.__sheet_name_2_path[file_path.stem] = file_path
+
+    @property
+    def input_file_path(self) -> str:
+        return self.__input_file_path
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.__sheet_name_2_path)
+
+    def has_sheet(self, sheet_name: str) -> bool:
+        return sheet_name in self.__sheet_name_2_path
+
+    def __get_sheet_path(self, sheet_name: str) -> Path:
+        if sheet_name not in self.__sheet_name_2_path:
+            raise RP2ValueError(f"Error: sheet {sheet_name} does not exist in {Path(self.__input_file_path).resolve()}")
+        return self.__sheet_name_2_path[sheet_name]
+
+    # The digest covers the raw bytes of the file. It's computed lazily (and only once), since it's needed only when the cache is enabled.
+    def get_sheet_digest(self, sheet_name: str) -> str:
+        sheet_path: Path = self.__get_sheet_path(sheet_name)
+        result: Optional[str] = self.__sheet_name_2_digest.get(sheet_name)
+        if result is None:
+            sheet_hash: "hashlib._Hash" = hashlib.sha256()
+            with open(sheet_path, "rb") as sheet_file:
+                for chunk in iter(lambda: sheet_file.read(_CHUNK_SIZE), b""):
+                    sheet_hash.update(chunk)
+            result = sheet_hash.hexdigest()
+            self.__sheet_name_2_digest[sheet_name] = result
+        return result
+
+    def rows(self, sheet_name: str) -> Iterator[List[Any]]:
+        sheet_path: Path = self.__get_sheet_path(sheet_name)
+        row_length: int = 0
+        with open(sheet_path, encoding=_ENCODING, newline="") as sheet_file:
+            for row in csv.reader(sheet_file, delimiter=_EXTENSION_2_DELIMITER[sheet_path.suffix]):
+                row_values: List[Any] = [value if value != "" else None for value in row]
+                # Blank lines still have one (empty) cell, like empty ODS rows
+                row_length = max(row_length, len(row_values), 1)
+                if len(row_values) < row_length:
+                    row_values.extend([None] * (row_length - len(row_values)))
+                yield row_values
@@ -0,0 +1,88 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, Generic, Iterator, List, Optional, TypeVar
+
+from rp2.abstract_entry import AbstractEntry
+from rp2.rp2_error import RP2ValueError
+
+KeyType = TypeVar("KeyType", bound=AbstractEntry)
+ValueType = TypeVar("ValueType")
+
+
+# Side table mapping entries to values, backed by a list indexed by the dense entry index that entry sets assign to their entries (see
+# AbstractEntrySet.add_entry()): lookups don't hash the entry. Indexes are unique only within the entry set that assigned them, so the list
+# holds only entries indexed by the same set as the first entry stored in the table: entries indexed by other sets (e.g. entries added to
+# more than one typed set) are kept in a dict. The list grows as needed. None is not a valid value (it marks missing entries).
+class EntryTable(Generic[KeyType, ValueType]):
+    __slots__ = ("__values", "__count", "__entry_index_owner", "__other_entry_2_value")
+
+    def __init__(self, size: int = 0) -> None:
+        self.__values: List[Optional[ValueType]] = [None] * size
+        self.__count: int = 0
+        self.__entry_index_owner: Optional[object] = None
+        self.__other_entry_2_value: Dict[KeyType, ValueType] = {}
+
+    def __len__(self) -> int:
+        return self.__count
+
+    # Entries without an index are never in the table: lookups treat them as missing entries, only __setitem__() rejects them.
+    def __get_value(self, entry: KeyType) -> Optional[ValueType]:
+        index: int = entry.entry_index
+        if index < 0:
+            return None
+        if entry.entry_index_owner is self.__entry_index_owner:
+            return self.__values[index] if index < len(self.__values) else None
+        return self.__other_entry_2_value.get(entry)
+
+    def __contains__(self, entry: KeyType) -> bool:
+        return self.__get_value(entry) is not None
+
+    def __getitem__(self, entry: KeyType) -> ValueType:
+        value: Optional[ValueType] = self.__get_value(entry)
+        if value is None:
+            raise KeyError(entry)
+        return value
+
+    def __setitem__(self, entry: KeyType, value: ValueType) -> None:
+        if value is None:
+            raise RP2ValueError(f"Invalid value None for entry {entry}")
+        index: int = entry.entry_index
+        if index < 0:
+            raise RP2ValueError(f"Entry has not been added to an entry set: {entry}")
+        if self.__entry_index_owner is None:
+            self.__entry_index_owner = entry.entry_index_owner
+        if entry.entry_index_owner is not self.__entry_index_owner:
+            if entry not in self.__other_entry_2_value:
+                self.__count += 1
+            self.__other_entry_2_value[entry] = value
+            return
+        values: List[Optional[ValueType]] = self.__values
+        if index >= len(values):
+            values.extend([None] * (index + 1 - len(values)))
+        if values[index] is None:
+            self.__count += 1
+        values[index] = value
+
+    def get(self, entry: KeyType, default: ValueType) -> ValueType:
+        value: Optional[ValueType] = self.__get_value(entry)
+        return default if value is None else value
+
+    # Values in entry index order (not in insertion order), followed by the values of entries indexed by other sets
+    def values(self) -> Iterator[ValueType]:
+        value: Optional[ValueType]
+        for value in self.__values:
+            if value is not None:
+                yield value
+        yield from self.__other_entry_2_value.values()
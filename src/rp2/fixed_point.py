@@ -0,0 +1,72 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from decimal import Decimal
+from itertools import accumulate
+from typing import List, Optional, cast
+
+from rp2.rp2_decimal import CRYPTO_DECIMALS, RP2_DECIMAL_CONTEXT, RP2Decimal
+
+# Fixed-point backend of crypto amount arithmetic, selected with Configuration.fixed_point. Crypto amounts with at most CRYPTO_DECIMALS decimal
+# digits and below 10^_INTEGER_DIGITS (in absolute value) are represented as Python ints scaled by 10^CRYPTO_DECIMALS (their fixed-point values).
+# RP2Decimal adds, subtracts and compares such amounts exactly (sums and differences of two of them fit in the precision of RP2_DECIMAL_CONTEXT and
+# comparisons quantize to CRYPTO_DECIMALS digits), so int arithmetic on their fixed-point values has the same results, without creating RP2Decimal
+# instances. Products and quotients (e.g. fiat amounts, which are products of spot prices and crypto amounts) are still computed with RP2Decimal.
+# Amounts that can't be represented have no fixed-point value (None): callers then use RP2Decimal arithmetic for the whole computation.
+_INTEGER_DIGITS: int = RP2_DECIMAL_CONTEXT.prec - CRYPTO_DECIMALS - 1
+_SCALE: int = int("1" + "0" * CRYPTO_DECIMALS)
+
+# Fixed-point values are below FIXED_POINT_LIMIT (in absolute value)
+FIXED_POINT_LIMIT: int = int("1" + "0" * (_INTEGER_DIGITS + CRYPTO_DECIMALS))
+
+
+# Fixed-point value of the amount, or None if it has more than CRYPTO_DECIMALS decimal digits or it isn't below 10^_INTEGER_DIGITS (in absolute
+# value).
+def to_fixed_point(amount: Decimal) -> Optional[int]:
+    if not amount.is_finite() or amount.adjusted() >= _INTEGER_DIGITS:
+        return None
+    numerator: int
+    denominator: int
+    numerator, denominator = amount.as_integer_ratio()
+    scale: int
+    remainder: int
+    scale, remainder = divmod(_SCALE, denominator)
+    if remainder != 0:
+        return None
+    return numerator * scale
+
+
+# RP2Decimal with the given fixed-point value. The value is the one computed by RP2Decimal arithmetic, but not necessarily its exponent (e.g.
+# 1.5000000000000 instead of 1.5): this doesn't change the results of further operations or formatted values (e.g. report cells).
+def from_fixed_point(value: int) -> RP2Decimal:
+    return RP2Decimal(RP2_DECIMAL_CONTEXT.scaleb(value, -CRYPTO_DECIMALS))
+
+
+# Sum of the fixed-point values, or None if some value is None or the sum isn't below FIXED_POINT_LIMIT (in absolute value), in which case
+# RP2Decimal arithmetic can round the result.
+def fixed_point_sum(values: List[Optional[int]]) -> Optional[int]:
+    if None in values:
+        return None
+    result: int = sum(cast(List[int], values))
+    return result if -FIXED_POINT_LIMIT < result < FIXED_POINT_LIMIT else None
+
+
+# Prefix-sum variant of fixed_point_sum(): the result contains the running sum of the values at each position, e.g. [1, 2, 3] -> [1, 3, 6].
+def fixed_point_prefix_sums(values: List[Optional[int]]) -> Optional[List[int]]:
+    if None in values:
+        return None
+    result: List[int] = list(accumulate(cast(List[int], values)))
+    if result and (max(result) >= FIXED_POINT_LIMIT or min(result) <= -FIXED_POINT_LIMIT):
+        return None
+    return result
@@ -13,18 +13,21 @@
 # limitations under the License.
 
 from datetime import datetime
-from typing import Callable, List, Optional, cast
+from typing import Callable, List, Optional
 
 from rp2.abstract_accounting_method import AbstractAccountingMethod
 from rp2.abstract_entry import AbstractEntry
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.configuration import Configuration
+from rp2.fixed_point import to_fixed_point
 from rp2.in_transaction import InTransaction
 from rp2.rp2_decimal import ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
 
 
 class GainLoss(AbstractEntry):
+    __slots__ = ("__taxable_event", "__crypto_amount", "__fixed_point_crypto_amount", "__acquired_lot", "__pooled_fiat_cost_basis")
+
     def __init__(
         self,
         configuration: Configuration,
@@ -32,45 +35,157 @@ class GainLoss(AbstractEntry):
         crypto_amount: RP2Decimal,
         taxable_event: AbstractTransaction,
         acquired_lot: Optional[InTransaction],
+        pooled_fiat_cost_basis: Optional[RP2Decimal] = None,
     ) -> None:
 
         AbstractAccountingMethod.type_check("accounting_method", accounting_method)
-        self.__taxable_event: AbstractTransaction = cast(AbstractTransaction, AbstractTransaction.type_check("taxable_event", taxable_event))
-        if not taxable_event.is_taxable():
-            raise RP2ValueError(f"Parameter 'taxable_event' of class {taxable_event.__class__.__name__} is not taxable: {taxable_event}")
-
+        Configuration.type_check("configuration", configuration)
+        fixed_point_crypto_amount: Optional[int] = self.__check_arguments(configuration, crypto_amount, taxable_event, acquired_lot, pooled_fiat_cost_basis)
         super().__init__(configuration, taxable_event.asset)
+        self.__init_gain_loss(crypto_amount, fixed_point_crypto_amount, taxable_event, acquired_lot, pooled_fiat_cost_basis)
 
-        self.__crypto_amount: RP2Decimal = configuration.type_check_positive_decimal("crypto_amount", crypto_amount, non_zero=True)
+    # Checks the arguments of a gain/loss entry, except the ones shared by all the entries (configuration and accounting method), and returns the
+    # fixed-point value of crypto_amount (see fixed_point): used by __init__() and create_batch().
+    @staticmethod
+    def __check_arguments(
+        configuration: Configuration,
+        crypto_amount: RP2Decimal,
+        taxable_event: AbstractTransaction,
+        acquired_lot: Optional[InTransaction],
+        pooled_fiat_cost_basis: Optional[RP2Decimal],
+    ) -> Optional[int]:
+        AbstractTransaction.type_check("taxable_event", taxable_event)
+        if not taxable_event.is_taxable():
+            raise RP2ValueError(f"Parameter 'taxable_event' of class {taxable_event.__class__.__name__} is not taxable: {taxable_event}")
 
+        configuration.type_check_decimal("crypto_amount", crypto_amount)
+        fixed_point_crypto_amount: Optional[int] = to_fixed_point(crypto_amount) if configuration.fixed_point else None
+        # If the fixed-point amounts pass the checks, the RP2Decimal checks of crypto_amount are skipped (otherwise they raise the error)
+        is_crypto_amount_checked: bool = fixed_point_crypto_amount is not None and _is_fixed_point_crypto_amount_valid(
+            fixed_point_crypto_amount, taxable_event, acquired_lot, taxable_event.transaction_type.is_earn_type() or pooled_fiat_cost_basis is not None
+        )
+        if not is_crypto_amount_checked:
+            configuration.type_check_positive_decimal("crypto_amount", crypto_amount, non_zero=True)
+
+        # Pooled-cost accounting methods (e.g. total average) don't pair taxable events with acquired lots: the cost basis of a
+        # non-earn-typed taxable event comes from the pool instead of an acquired lot.
         if not taxable_event.transaction_type.is_earn_type():
-            if acquired_lot is None:
-                raise RP2TypeError("acquired_lot must not be None for non-earn-typed taxable_events")
-            InTransaction.type_check("acquired_lot", acquired_lot)
+            if pooled_fiat_cost_basis is not None:
+                if acquired_lot is not None:
+                    raise RP2TypeError(f"acquired_lot must be None for taxable_events with pooled cost basis, instead it's {acquired_lot}")
+                if not is_crypto_amount_checked and crypto_amount != taxable_event.crypto_balance_change:
+                    raise RP2ValueError(
+                        f"crypto_amount must be == taxable_event.crypto_balance_change for taxable events with pooled cost basis, "
+                        f"but they differ {crypto_amount} != {taxable_event.crypto_balance_change}"
+                    )
+                configuration.type_check_positive_decimal("pooled_fiat_cost_basis", pooled_fiat_cost_basis)
+            else:
+                if acquired_lot is None:
+                    raise RP2TypeError("acquired_lot must not be None for non-earn-typed taxable_events")
+                InTransaction.type_check("acquired_lot", acquired_lot)
         else:
-            if crypto_amount != taxable_event.crypto_balance_change:
+            if pooled_fiat_cost_basis is not None:
+                raise RP2TypeError(f"pooled_fiat_cost_basis must be None for earn-typed taxable_events, instead it's {pooled_fiat_cost_basis}")
+            if not is_crypto_amount_checked and crypto_amount != taxable_event.crypto_balance_change:
                 raise RP2ValueError(
                     f"crypto_amount must be == taxable_event.crypto_balance_change for earn-typed taxable events, "
                     f"but they differ {crypto_amount} != {taxable_event.crypto_balance_change}"
                 )
             if acquired_lot is not None:
                 raise RP2TypeError(f"acquired_lot must be None for earn-typed taxable_events, instead it's {acquired_lot}")
-        self.__acquired_lot: Optional[InTransaction] = acquired_lot
 
-        if self.__crypto_amount > self.__taxable_event.crypto_balance_change or (self.__acquired_lot and self.__crypto_amount > self.__acquired_lot.crypto_in):
+        if not is_crypto_amount_checked and (crypto_amount > taxable_event.crypto_balance_change or (acquired_lot and crypto_amount > acquired_lot.crypto_in)):
             raise RP2ValueError(
-                f"crypto_amount ({self.__crypto_amount}) is greater than taxable event amount ({self.__taxable_event.crypto_balance_change}) "
-                f"or acquired-lot amount ({self.__acquired_lot.crypto_in if self.__acquired_lot else 0}): {self}"
+                f"crypto_amount ({crypto_amount}) is greater than taxable event amount ({taxable_event.crypto_balance_change}) "
+                f"or acquired-lot amount ({acquired_lot.crypto_in if acquired_lot else 0}): {taxable_event}"
             )
 
         if acquired_lot is not None and taxable_event.timestamp < acquired_lot.timestamp:
             raise RP2ValueError(
-                f"Timestamp {taxable_event.timestamp} of taxable_event is earlier than timestamp {acquired_lot.timestamp} " f"of acquired_lot: {self}"
+                f"Timestamp {taxable_event.timestamp} of taxable_event is earlier than timestamp {acquired_lot.timestamp} of acquired_lot: {taxable_event}"
             )
 
         if acquired_lot is not None and taxable_event.asset != acquired_lot.asset:
             raise RP2ValueError(f"taxable_event.asset ({taxable_event.asset}) != acquired_lot.asset ({acquired_lot.asset})")
 
+        return fixed_point_crypto_amount
+
+    # Trusted constructor: the arguments are those of a gain/loss entry that has already been created (and checked) with __init__(), so no check
+    # is performed. Used to restore the gain/loss entries of a tax checkpoint (see tax_engine).
+    @classmethod
+    def _create_unchecked(
+        cls,
+        configuration: Configuration,
+        crypto_amount: RP2Decimal,
+        taxable_event: AbstractTransaction,
+        acquired_lot: Optional[InTransaction],
+        pooled_fiat_cost_basis: Optional[RP2Decimal] = None,
+    ) -> "GainLoss":
+        return cls.__create_unchecked(
+            configuration,
+            crypto_amount,
+            to_fixed_point(crypto_amount) if configuration.fixed_point else None,
+            taxable_event,
+            acquired_lot,
+            pooled_fiat_cost_basis,
+        )
+
+    @classmethod
+    def __create_unchecked(
+        cls,
+        configuration: Configuration,
+        crypto_amount: RP2Decimal,
+        fixed_point_crypto_amount: Optional[int],
+        taxable_event: AbstractTransaction,
+        acquired_lot: Optional[InTransaction],
+        pooled_fiat_cost_basis: Optional[RP2Decimal],
+    ) -> "GainLoss":
+        result: GainLoss = cls.__new__(cls)
+        result._init_unchecked(configuration, taxable_event.asset)
+        result.__init_gain_loss(crypto_amount, fixed_point_crypto_amount, taxable_event, acquired_lot, pooled_fiat_cost_basis)
+        return result
+
+    def __init_gain_loss(
+        self,
+        crypto_amount: RP2Decimal,
+        fixed_point_crypto_amount: Optional[int],
+        taxable_event: AbstractTransaction,
+        acquired_lot: Optional[InTransaction],
+        pooled_fiat_cost_basis: Optional[RP2Decimal],
+    ) -> None:
+        self.__crypto_amount: RP2Decimal = crypto_amount
+        self.__fixed_point_crypto_amount: Optional[int] = fixed_point_crypto_amount
+        self.__taxable_event: AbstractTransaction = taxable_event
+        self.__acquired_lot: Optional[InTransaction] = acquired_lot
+        self.__pooled_fiat_cost_basis: Optional[RP2Decimal] = pooled_fiat_cost_basis
+
+    # Bulk constructor of gain/loss entries with acquired lot or earn-typed taxable event (not pooled cost basis), used by the batch fast path of
+    # lot pairing (see AbstractLotPairingMethod.pair_in_batch()): the lists are parallel. It checks the same conditions as __init__(), but the
+    # arguments shared by all the entries are checked only once.
+    @classmethod
+    def create_batch(
+        cls,
+        configuration: Configuration,
+        accounting_method: AbstractAccountingMethod,
+        crypto_amounts: List[RP2Decimal],
+        taxable_events: List[AbstractTransaction],
+        acquired_lots: List[Optional[InTransaction]],
+    ) -> List["GainLoss"]:
+        Configuration.type_check("configuration", configuration)
+        AbstractAccountingMethod.type_check("accounting_method", accounting_method)
+        if not len(crypto_amounts) == len(taxable_events) == len(acquired_lots):
+            raise RP2ValueError(f"Lists have different lengths: {len(crypto_amounts)}, {len(taxable_events)}, {len(acquired_lots)}")
+
+        result: List[GainLoss] = []
+        crypto_amount: RP2Decimal
+        taxable_event: AbstractTransaction
+        acquired_lot: Optional[InTransaction]
+        for crypto_amount, taxable_event, acquired_lot in zip(crypto_amounts, taxable_events, acquired_lots):
+            fixed_point_crypto_amount: Optional[int] = cls.__check_arguments(configuration, crypto_amount, taxable_event, acquired_lot, None)
+            configuration.type_check_asset("asset", taxable_event.asset)
+            result.append(cls.__create_unchecked(configuration, crypto_amount, fixed_point_crypto_amount, taxable_event, acquired_lot, None))
+        return result
+
     @classmethod
     def type_check(cls, name: str, instance: "AbstractEntry") -> "GainLoss":
         Configuration.type_check_parameter_name(name)
@@ -83,11 +198,10 @@ class GainLoss(AbstractEntry):
             return False
         if not isinstance(other, GainLoss):
             raise RP2TypeError(f"Operand has non-GainLoss value {repr(other)}")
-        self_acquired_lot_internal_id: Optional[str] = self.acquired_lot.internal_id if self.acquired_lot else None
-        other_acquired_lot_internal_id: Optional[str] = other.acquired_lot.internal_id if other.acquired_lot else None
         # By definition, internal_id can uniquely identify a transaction: this works even if it's the ODS line from the spreadsheet,
-        # since there are no cross-asset transactions (so a spreadsheet line points to a unique transaction for that asset).
-        result: bool = self.taxable_event.internal_id == other.taxable_event.internal_id and self_acquired_lot_internal_id == other_acquired_lot_internal_id
+        # since there are no cross-asset transactions (so a spreadsheet line points to a unique transaction for that asset). Transactions
+        # compare (and hash) by internal_id.
+        result: bool = self.taxable_event == other.taxable_event and self.acquired_lot == other.acquired_lot
         return result
 
     def __ne__(self, other: object) -> bool:
@@ -96,7 +210,7 @@ class GainLoss(AbstractEntry):
     def __hash__(self) -> int:
         # By definition, internal_id can uniquely identify a transaction: this works even if it's the ODS line from the spreadsheet,
         # since there are no cross-asset transactions (so a spreadsheet line points to a unique transaction for that asset).
-        return hash((self.taxable_event.internal_id, self.acquired_lot.internal_id if self.acquired_lot else None))
+        return hash((self.taxable_event, self.acquired_lot))
 
     def to_string(self, indent: int = 0, repr_format: bool = True, extra_data: Optional[List[str]] = None) -> str:
         self.configuration.type_check_positive_int("indent", indent)
@@ -144,14 +258,27 @@ class GainLoss(AbstractEntry):
     def acquired_lot(self) -> Optional[InTransaction]:
         return self.__acquired_lot
 
+    # Cost basis assigned by a pooled-cost accounting method (None if the cost basis comes from an acquired lot or if the taxable event is earn-typed)
+    @property
+    def pooled_fiat_cost_basis(self) -> Optional[RP2Decimal]:
+        return self.__pooled_fiat_cost_basis
+
     @property
     def crypto_amount(self) -> RP2Decimal:
         return self.__crypto_amount
 
+    @property
+    def fixed_point_crypto_amount(self) -> Optional[int]:
+        return self.__fixed_point_crypto_amount
+
     @property
     def crypto_balance_change(self) -> RP2Decimal:
         return self.crypto_amount
 
+    @property
+    def fixed_point_crypto_balance_change(self) -> Optional[int]:
+        return self.__fixed_point_crypto_amount
+
     @property
     def fiat_balance_change(self) -> RP2Decimal:
         return self.taxable_event.fiat_balance_change
@@ -175,15 +302,17 @@ class GainLoss(AbstractEntry):
     @property
     def acquired_lot_fraction_percentage(self) -> RP2Decimal:
         if not self.acquired_lot:
-            # Earn-typed taxable events don't have a acquired_lot
-            if not self.taxable_event.transaction_type.is_earn_type():
-                raise Exception("Internal error: acquired lot is None but taxable event is not earn-typed")
+            # Earn-typed taxable events and taxable events with pooled cost basis don't have a acquired_lot
+            if not self.taxable_event.transaction_type.is_earn_type() and self.__pooled_fiat_cost_basis is None:
+                raise Exception("Internal error: acquired lot is None but taxable event is not earn-typed and has no pooled cost basis")
             return ZERO
         return self.crypto_amount / self.acquired_lot.crypto_balance_change
 
     @property
     def fiat_cost_basis(self) -> RP2Decimal:
         if not self.acquired_lot:
+            if self.__pooled_fiat_cost_basis is not None:
+                return self.__pooled_fiat_cost_basis
             # Earn-typed taxable events don't have a acquired_lot and their cost basis is 0
             if not self.taxable_event.transaction_type.is_earn_type():
                 raise Exception("Internal error: acquired lot is None but taxable event is not earn-typed")
@@ -200,8 +329,26 @@ class GainLoss(AbstractEntry):
 
     def is_long_term_capital_gains(self) -> bool:
         if not self.acquired_lot:
-            # Earn-typed taxable events don't have a acquired lot and are always considered short term capital gains
-            if not self.taxable_event.transaction_type.is_earn_type():
-                raise Exception("Internal error: acquired lot is None but taxable event is not earn-typed")
+            # Earn-typed taxable events don't have a acquired lot and are always considered short term capital gains (so are taxable events with
+            # pooled cost basis: the pool has no holding period)
+            if not self.taxable_event.transaction_type.is_earn_type() and self.__pooled_fiat_cost_basis is None:
+                raise Exception("Internal error: acquired lot is None but taxable event is not earn-typed and has no pooled cost basis")
             return False
         return (self.taxable_event.timestamp - self.acquired_lot.timestamp).days >= self.configuration.country.long_term_capital_gain_period()
+
+
+# True if the fixed-point value of the crypto amount of a gain/loss passes the checks of GainLoss.__check_arguments() against the amounts of its
+# taxable event and acquired lot (whole taxable event amount, if is_whole_taxable_event). False if it doesn't or if some of these amounts has no
+# fixed-point value. The acquired lot hasn't been type-checked yet.
+def _is_fixed_point_crypto_amount_valid(crypto_amount: int, taxable_event: AbstractTransaction, acquired_lot: object, is_whole_taxable_event: bool) -> bool:
+    taxable_event_amount: Optional[int] = taxable_event.fixed_point_crypto_balance_change
+    if taxable_event_amount is None or not 0 < crypto_amount <= taxable_event_amount:
+        return False
+    if is_whole_taxable_event and crypto_amount != taxable_event_amount:
+        return False
+    if acquired_lot is None:
+        return True
+    if not isinstance(acquired_lot, InTransaction):
+        return False
+    acquired_lot_amount: Optional[int] = acquired_lot.fixed_point_crypto_in
+    return acquired_lot_amount is not None and crypto_amount <= acquired_lot_amount
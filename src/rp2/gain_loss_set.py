@@ -13,14 +13,16 @@
 # limitations under the License.
 
 from datetime import date
-from typing import Dict, List, Optional, cast
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, cast
 
 from rp2.abstract_accounting_method import AbstractAccountingMethod
 from rp2.abstract_entry import AbstractEntry
 from rp2.abstract_entry_set import AbstractEntrySet
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
+from rp2.entry_table import EntryTable
 from rp2.entry_types import TransactionType
+from rp2.fixed_point import to_fixed_point
 from rp2.gain_loss import GainLoss
 from rp2.in_transaction import InTransaction
 from rp2.logger import LOGGER
@@ -28,6 +30,20 @@ from rp2.rp2_decimal import ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
 
 
+# Fractions of the first entries of a gain/loss set, restored from a checkpoint (see tax_checkpoint) rather than computed. The taxable events of
+# these entries are complete, acquired lots may not be: acquired_lot_2_amount contains the amount disposed of by these entries of each lot that
+# is partially disposed of.
+class FractionCheckpoint(NamedTuple):
+    taxable_event_fractions: List[int]
+    # Entries without acquired lot have no fraction (their value is ignored)
+    acquired_lot_fractions: List[int]
+    acquired_lot_2_amount: Dict[InTransaction, RP2Decimal]
+
+
+# Crypto amounts used to compute fractions: RP2Decimal amounts or their fixed-point values (see fixed_point)
+_Amount = TypeVar("_Amount", int, RP2Decimal)
+
+
 class GainLossSet(AbstractEntrySet):
     @classmethod
     def type_check(cls, name: str, instance: "GainLossSet") -> "GainLossSet":
@@ -45,17 +61,36 @@ class GainLossSet(AbstractEntrySet):
         to_date: date = MAX_DATE,
     ) -> None:
         super().__init__(configuration, "MIXED", asset, from_date, to_date)
+        # Gain/loss entries belong only to this set, so it indexes them even though its type is MIXED
+        self._assign_entry_indexes = True
         self.__accounting_method = AbstractAccountingMethod.type_check("accounting_method", accounting_method)
-        self.__taxable_events_to_fraction: Dict[GainLoss, int] = {}
-        self.__acquired_lots_to_fraction: Dict[GainLoss, int] = {}
+        # Per-gain/loss fields are kept in EntryTables (gain/loss entries are indexed by this set). Per-transaction fields are kept in dicts:
+        # taxable events are indexed by different sets depending on their type (so their indexes overlap) and acquired lots need not be indexed.
+        self.__taxable_events_to_fraction: EntryTable[GainLoss, int] = EntryTable()
+        self.__acquired_lots_to_fraction: EntryTable[GainLoss, int] = EntryTable()
         self.__taxable_events_to_number_of_fractions: Dict[AbstractTransaction, int] = {}
         self.__acquired_lots_to_number_of_fractions: Dict[InTransaction, int] = {}
         self.__transaction_type_2_count: Dict[TransactionType, int] = {transaction_type: 0 for transaction_type in TransactionType}
+        # Number of entries (from the beginning of _entry_list) the fields above have been computed on
+        self.__fraction_entry_count: int = 0
+        self.__fraction_checkpoint: Optional[FractionCheckpoint] = None
 
     def add_entry(self, entry: AbstractEntry) -> None:
         GainLoss.type_check("entry", entry)
         super().add_entry(entry)
 
+    def add_entries(self, entries: Sequence[AbstractEntry]) -> None:
+        entry: AbstractEntry
+        for entry in entries:
+            GainLoss.type_check("entry", entry)
+        super().add_entries(entries)
+
+    # Used when resuming from a checkpoint: the fractions refer to the entries already in the set (entries added later must be later than them).
+    def set_fraction_checkpoint(self, fraction_checkpoint: FractionCheckpoint) -> None:
+        if len(fraction_checkpoint.taxable_event_fractions) != self.count or len(fraction_checkpoint.acquired_lot_fractions) != self.count:
+            raise RP2ValueError(f"Fraction checkpoint doesn't match the {self.count} entries of the set")
+        self.__fraction_checkpoint = fraction_checkpoint
+
     def get_transaction_type_count(self, transaction_type: TransactionType) -> int:
         TransactionType.type_check("transaction_type", transaction_type)
         self._check_sort()
@@ -71,6 +106,23 @@ class GainLossSet(AbstractEntrySet):
         self._check_sort()
         return self.__acquired_lots_to_fraction[entry]
 
+    # Taxable event and acquired lot fractions of each entry of the set, in iteration order: the entries come from the set itself, so they're not
+    # checked one by one as in the getters above. The acquired lot fraction of entries without acquired lot is None. Used to store checkpoints.
+    def get_fractions(self) -> List[Tuple[GainLoss, int, Optional[int]]]:
+        self._check_sort()
+        result: List[Tuple[GainLoss, int, Optional[int]]] = []
+        entry: AbstractEntry
+        for entry in self:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            result.append(
+                (
+                    gain_loss,
+                    self.__taxable_events_to_fraction[gain_loss],
+                    self.__acquired_lots_to_fraction[gain_loss] if gain_loss.acquired_lot is not None else None,
+                )
+            )
+        return result
+
     def get_taxable_event_number_of_fractions(self, transaction: AbstractTransaction) -> int:
         AbstractTransaction.type_check("transaction", transaction)
         if transaction not in self.__taxable_events_to_number_of_fractions:
@@ -89,45 +141,126 @@ class GainLossSet(AbstractEntrySet):
         GainLoss.type_check("entry", entry)
         super()._validate_entry(entry)
 
-    def _sort_entries(self) -> None:  # pylint: disable=too-many-branches
+    def _sort_entries(self) -> None:
         LOGGER.debug("Sort Gain-Loss Set:")
         super()._sort_entries()
-        entry: AbstractEntry
-        gain_loss: Optional[GainLoss] = None
+        self.__compute_fractions(self._get_time_window_end())
+
+    # Fractions and counts depend only on to_date (they always start from the first entry): views with a different to_date recompute them only
+    # if their window ends at a different entry.
+    def _update_time_window(self) -> None:
+        end: int = self._get_time_window_end()
+        if end != self.__fraction_entry_count:
+            LOGGER.debug("Update Gain-Loss Set time window:")
+            self.__compute_fractions(end)
+
+    def __compute_fractions(self, end: int) -> None:
+        start: int = 0
+        checkpoint_amounts: Dict[InTransaction, RP2Decimal] = {}
+        if self.__fraction_checkpoint is not None and end >= len(self.__fraction_checkpoint.taxable_event_fractions):
+            start = len(self.__fraction_checkpoint.taxable_event_fractions)
+            checkpoint_amounts = self.__fraction_checkpoint.acquired_lot_2_amount
+        # We're not using the iterator to avoid infinite recursion (we're looping over _entry_list directly): entries are considered up to
+        # to_date (end), so that number of fractions is not affected by lots outside the time filter
+        gain_losses: List[GainLoss] = cast(List[GainLoss], self._entry_list[start:end])
+        gain_loss: GainLoss
+
+        if self.configuration.fixed_point:
+            # Amounts are summed and compared as fixed-point values (see fixed_point). If some amount has none, or if the amounts are invalid,
+            # fractions are computed on RP2Decimal amounts (so that errors report them).
+            fixed_point_crypto_amounts: List[Optional[int]] = [gain_loss.fixed_point_crypto_amount for gain_loss in gain_losses]
+            fixed_point_taxable_event_amounts: List[Optional[int]] = [gain_loss.taxable_event.fixed_point_crypto_balance_change for gain_loss in gain_losses]
+            fixed_point_acquired_lot_amounts: List[Optional[int]] = [
+                gain_loss.acquired_lot.fixed_point_crypto_in if gain_loss.acquired_lot else 0 for gain_loss in gain_losses
+            ]
+            fixed_point_checkpoint_amounts: Dict[InTransaction, Optional[int]] = {
+                acquired_lot: to_fixed_point(amount) for acquired_lot, amount in checkpoint_amounts.items()
+            }
+            if (
+                None not in fixed_point_crypto_amounts
+                and None not in fixed_point_taxable_event_amounts
+                and None not in fixed_point_acquired_lot_amounts
+                and None not in fixed_point_checkpoint_amounts.values()
+            ):
+                try:
+                    self.__compute_fractions_from_amounts(
+                        start,
+                        end,
+                        gain_losses,
+                        cast(List[int], fixed_point_crypto_amounts),
+                        cast(List[int], fixed_point_taxable_event_amounts),
+                        cast(List[int], fixed_point_acquired_lot_amounts),
+                        cast(Dict[InTransaction, int], fixed_point_checkpoint_amounts),
+                        0,
+                    )
+                    return
+                except RP2ValueError:
+                    pass
+
+        self.__compute_fractions_from_amounts(
+            start,
+            end,
+            gain_losses,
+            [gain_loss.crypto_amount for gain_loss in gain_losses],
+            [gain_loss.taxable_event.crypto_balance_change for gain_loss in gain_losses],
+            [gain_loss.acquired_lot.crypto_balance_change if gain_loss.acquired_lot else ZERO for gain_loss in gain_losses],
+            checkpoint_amounts,
+            ZERO,
+        )
+
+    # Computes fractions and counts of the first end entries, restoring the first start ones from the checkpoint: gain_losses are the entries from
+    # start to end and the amount lists are parallel to it. Amounts are either RP2Decimal amounts or their fixed-point values (in which case debug
+    # logs show fixed-point values). Acquired lot amounts of entries without acquired lot are ignored.
+    def __compute_fractions_from_amounts(  # pylint: disable=too-many-branches
+        self,
+        start: int,
+        end: int,
+        gain_losses: List[GainLoss],
+        crypto_amounts: List[_Amount],
+        taxable_event_amounts: List[_Amount],
+        acquired_lot_amounts: List[_Amount],
+        checkpoint_amounts: Dict[InTransaction, _Amount],
+        zero: _Amount,
+    ) -> None:
         # Taxable events are always monotonic over time (sorted by ascending date), so we just need scalars to keep
         # track of amount and fraction (see also acquired-lot comment below). On the other hand acquired lots are not always
         # monotonic over time (they can be in any order, depending on the accounting method), so we need dictionaries
         # to keep track of amount and fraction for each lot.
-        current_taxable_event_amount: RP2Decimal = ZERO
+        current_taxable_event_amount: _Amount = zero
         current_taxable_event_fraction: int = 0
-        current_acquired_lot_amount: Dict[InTransaction, RP2Decimal] = {}
+        current_acquired_lot_amount: Dict[InTransaction, _Amount] = {}
         current_acquired_lot_fraction: Dict[InTransaction, int] = {}
 
         last_gain_loss_with_acquired_lot: Optional[GainLoss] = None
 
         # Reset fields that are recomputed at sort time
-        self.__taxable_events_to_fraction = {}
+        self.__taxable_events_to_fraction = EntryTable(end)
         self.__taxable_events_to_number_of_fractions = {}
-        self.__acquired_lots_to_fraction = {}
+        self.__acquired_lots_to_fraction = EntryTable(end)
         self.__acquired_lots_to_number_of_fractions = {}
         self.__transaction_type_2_count = {transaction_type: 0 for transaction_type in TransactionType}
+        self.__fraction_entry_count = end
 
-        for entry in self._entry_list:
-            gain_loss = cast(GainLoss, entry)
+        if start > 0 and self.__fraction_checkpoint is not None:
+            last_gain_loss_with_acquired_lot = self.__restore_fractions(
+                self.__fraction_checkpoint, checkpoint_amounts, current_acquired_lot_amount, current_acquired_lot_fraction
+            )
 
-            # We're not using the iterator to avoid infinite recursion (we're looping over
-            # _entry_list directly), so we need to check time filters manually: stop after
-            # to_date so that number of fractions is not affected by lots outside the time filter
-            if gain_loss.timestamp.date() > self.to_date:
-                break
+        index: int
+        gain_loss: GainLoss
+        for index, gain_loss in enumerate(gain_losses):
+            crypto_amount: _Amount = crypto_amounts[index]
+            taxable_event_amount: _Amount = taxable_event_amounts[index]
 
             count: int = self.__transaction_type_2_count[gain_loss.taxable_event.transaction_type]
             self.__transaction_type_2_count[gain_loss.taxable_event.transaction_type] = count + 1
 
             if gain_loss.acquired_lot:
-                # Ensure acquired_lot timestamp and its ancestor's validate against accounting method rules.
+                # Ensure acquired_lot timestamp and its ancestor's validate against accounting method rules. In per-wallet mode consecutive
+                # entries can come from different pools, so there is no ordering of acquired lots across entries to validate.
                 if (
-                    last_gain_loss_with_acquired_lot
+                    not self.configuration.per_wallet
+                    and last_gain_loss_with_acquired_lot
                     and last_gain_loss_with_acquired_lot.acquired_lot
                     and not self.__accounting_method.validate_acquired_lot_ancestor_timestamp(
                         gain_loss.acquired_lot, last_gain_loss_with_acquired_lot.acquired_lot
@@ -140,9 +273,9 @@ class GainLossSet(AbstractEntrySet):
                     )
                 last_gain_loss_with_acquired_lot = gain_loss
 
-            current_taxable_event_amount += gain_loss.crypto_amount
+            current_taxable_event_amount += crypto_amount
             self.__taxable_events_to_fraction[gain_loss] = current_taxable_event_fraction
-            if current_taxable_event_amount == gain_loss.taxable_event.crypto_balance_change:
+            if current_taxable_event_amount == taxable_event_amount:
                 # Expected amount reached: reset both fraction and amount
                 if gain_loss.taxable_event in self.__taxable_events_to_number_of_fractions:
                     raise RP2ValueError(f"Taxable event crypto amount already exhausted for {gain_loss.taxable_event}")
@@ -155,30 +288,29 @@ class GainLossSet(AbstractEntrySet):
                     current_taxable_event_amount,
                 )
                 current_taxable_event_fraction = 0
-                current_taxable_event_amount = ZERO
-            elif current_taxable_event_amount < gain_loss.taxable_event.crypto_balance_change:
+                current_taxable_event_amount = zero
+            elif current_taxable_event_amount < taxable_event_amount:
                 LOGGER.debug(
                     "%s (%d - %d): current amount < taxable event (%.16f < %.16f)",
                     gain_loss.internal_id,
                     current_acquired_lot_fraction[gain_loss.acquired_lot] if gain_loss.acquired_lot in current_acquired_lot_fraction else 0,
                     current_taxable_event_fraction,
                     current_taxable_event_amount,
-                    gain_loss.taxable_event.crypto_balance_change,
+                    taxable_event_amount,
                 )
                 current_taxable_event_fraction += 1
             else:
                 raise RP2ValueError(
                     f"Current taxable event amount ({current_taxable_event_amount})"
-                    f" exceeded crypto balance change of taxable event ({gain_loss.taxable_event.crypto_balance_change})"
+                    f" exceeded crypto balance change of taxable event ({taxable_event_amount})"
                     f". {gain_loss}"
                 )
 
             if gain_loss.acquired_lot:
-                current_acquired_lot_amount[gain_loss.acquired_lot] = (
-                    current_acquired_lot_amount.setdefault(gain_loss.acquired_lot, ZERO) + gain_loss.crypto_amount
-                )
+                acquired_lot_amount: _Amount = acquired_lot_amounts[index]
+                current_acquired_lot_amount[gain_loss.acquired_lot] = current_acquired_lot_amount.setdefault(gain_loss.acquired_lot, zero) + crypto_amount
                 self.__acquired_lots_to_fraction[gain_loss] = current_acquired_lot_fraction.setdefault(gain_loss.acquired_lot, 0)
-                if current_acquired_lot_amount[gain_loss.acquired_lot] == gain_loss.acquired_lot.crypto_balance_change:
+                if current_acquired_lot_amount[gain_loss.acquired_lot] == acquired_lot_amount:
                     # Expected amount reached: delete both fraction and amount from "current" dictionaries
                     if gain_loss.acquired_lot in self.__acquired_lots_to_number_of_fractions:
                         raise RP2ValueError(f"Acquired lot crypto amount already exhausted for {gain_loss.acquired_lot}")
@@ -192,20 +324,20 @@ class GainLossSet(AbstractEntrySet):
                     )
                     del current_acquired_lot_amount[gain_loss.acquired_lot]
                     del current_acquired_lot_fraction[gain_loss.acquired_lot]
-                elif current_acquired_lot_amount[gain_loss.acquired_lot] < gain_loss.acquired_lot.crypto_balance_change:
+                elif current_acquired_lot_amount[gain_loss.acquired_lot] < acquired_lot_amount:
                     LOGGER.debug(
                         "%s (%d - %d): current amount < acquired lot amount (%.16f < %.16f)",
                         gain_loss.internal_id,
                         current_acquired_lot_fraction[gain_loss.acquired_lot],
                         current_taxable_event_fraction,
                         current_acquired_lot_amount[gain_loss.acquired_lot],
-                        gain_loss.acquired_lot.crypto_balance_change,
+                        acquired_lot_amount,
                     )
                     current_acquired_lot_fraction[gain_loss.acquired_lot] = current_acquired_lot_fraction[gain_loss.acquired_lot] + 1
                 else:
                     raise RP2ValueError(
                         f"Current acquired lot amount ({current_acquired_lot_amount[gain_loss.acquired_lot]}) "
-                        f"exceeded crypto balance change of acquired lot ({gain_loss.acquired_lot.crypto_balance_change})"
+                        f"exceeded crypto balance change of acquired lot ({acquired_lot_amount})"
                         f". {gain_loss}"
                     )
 
@@ -213,7 +345,7 @@ class GainLossSet(AbstractEntrySet):
 
         # Taxable event: update fractions for last non-exhausted transaction (if any)
         if last_gain_loss_with_acquired_lot:
-            if current_taxable_event_amount > ZERO:
+            if current_taxable_event_amount > zero:
                 if last_gain_loss_with_acquired_lot.taxable_event in self.__taxable_events_to_number_of_fractions:
                     raise RP2ValueError(f"Taxable event crypto amount already exhausted for {last_gain_loss_with_acquired_lot.taxable_event}")
                 self.__taxable_events_to_number_of_fractions[last_gain_loss_with_acquired_lot.taxable_event] = current_taxable_event_fraction
@@ -238,6 +370,41 @@ class GainLossSet(AbstractEntrySet):
                     current_acquired_lot_fraction[acquired_lot],
                 )
 
+    # Restores the fractions of the entries covered by the checkpoint (they were validated when the checkpoint was created), leaving the amounts
+    # (from checkpoint_amounts, which has the same keys as acquired_lot_2_amount) and fractions of partially disposed acquired lots in
+    # current_acquired_lot_amount and current_acquired_lot_fraction, like __compute_fractions() would. Returns the last entry with an acquired lot.
+    def __restore_fractions(
+        self,
+        fraction_checkpoint: FractionCheckpoint,
+        checkpoint_amounts: Dict[InTransaction, _Amount],
+        current_acquired_lot_amount: Dict[InTransaction, _Amount],
+        current_acquired_lot_fraction: Dict[InTransaction, int],
+    ) -> Optional[GainLoss]:
+        last_gain_loss_with_acquired_lot: Optional[GainLoss] = None
+        index: int
+        entry: AbstractEntry
+        for index, entry in enumerate(self._entry_list[: len(fraction_checkpoint.taxable_event_fractions)]):
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            self.__transaction_type_2_count[gain_loss.taxable_event.transaction_type] += 1
+            taxable_event_fraction: int = fraction_checkpoint.taxable_event_fractions[index]
+            self.__taxable_events_to_fraction[gain_loss] = taxable_event_fraction
+            # The fractions of a taxable event are consecutive entries and they are all covered by the checkpoint: the last one sets the number
+            self.__taxable_events_to_number_of_fractions[gain_loss.taxable_event] = taxable_event_fraction + 1
+            if gain_loss.acquired_lot:
+                acquired_lot_fraction: int = fraction_checkpoint.acquired_lot_fractions[index]
+                self.__acquired_lots_to_fraction[gain_loss] = acquired_lot_fraction
+                current_acquired_lot_fraction[gain_loss.acquired_lot] = acquired_lot_fraction + 1
+                last_gain_loss_with_acquired_lot = gain_loss
+
+        acquired_lot: InTransaction
+        for acquired_lot in list(current_acquired_lot_fraction):
+            if acquired_lot in checkpoint_amounts:
+                current_acquired_lot_amount[acquired_lot] = checkpoint_amounts[acquired_lot]
+            else:
+                # Exhausted
+                self.__acquired_lots_to_number_of_fractions[acquired_lot] = current_acquired_lot_fraction.pop(acquired_lot)
+        return last_gain_loss_with_acquired_lot
+
     def __str__(self) -> str:
         output: List[str] = []
         output.append(f"{type(self).__name__}:")
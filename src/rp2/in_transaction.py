@@ -12,18 +12,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime
 from typing import Callable, List, Optional
 
 from rp2.abstract_entry import AbstractEntry
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.configuration import Configuration
 from rp2.entry_types import TransactionType
+from rp2.fixed_point import to_fixed_point
 from rp2.logger import LOGGER
 from rp2.rp2_decimal import FIAT_DECIMAL_MASK, ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
 
 
 class InTransaction(AbstractTransaction):
+    __slots__ = (
+        "__exchange",
+        "__holder",
+        "__crypto_in",
+        "__crypto_fee",
+        "__fiat_fee",
+        "__fiat_in_no_fee",
+        "__fiat_in_with_fee",
+        "__fixed_point_crypto_in",
+        "__fixed_point_crypto_fee",
+    )
+
     @classmethod
     def type_check(cls, name: str, instance: AbstractEntry) -> "InTransaction":
         Configuration.type_check_parameter_name(name)
@@ -51,13 +65,64 @@ class InTransaction(AbstractTransaction):
     ) -> None:
         super().__init__(configuration, timestamp, asset, transaction_type, spot_price, internal_id, unique_id, notes)
 
-        self.__exchange: str = configuration.type_check_exchange("exchange", exchange)
-        self.__holder: str = configuration.type_check_holder("holder", holder)
-        self.__crypto_in: RP2Decimal = configuration.type_check_positive_decimal("crypto_in", crypto_in, non_zero=True)
-        self.__crypto_fee: RP2Decimal = configuration.type_check_positive_decimal("crypto_fee", crypto_fee) if crypto_fee else ZERO
-        self.__fiat_fee: RP2Decimal = configuration.type_check_positive_decimal("fiat_fee", fiat_fee) if fiat_fee else ZERO
+        self.__init_in_transaction(
+            configuration.type_check_exchange("exchange", exchange),
+            configuration.type_check_holder("holder", holder),
+            configuration.type_check_positive_decimal("crypto_in", crypto_in, non_zero=True),
+            configuration.type_check_positive_decimal("crypto_fee", crypto_fee) if crypto_fee else crypto_fee,
+            configuration.type_check_positive_decimal("fiat_in_no_fee", fiat_in_no_fee, non_zero=True) if fiat_in_no_fee is not None else None,
+            configuration.type_check_positive_decimal("fiat_in_with_fee", fiat_in_with_fee, non_zero=True) if fiat_in_with_fee is not None else None,
+            configuration.type_check_positive_decimal("fiat_fee", fiat_fee) if fiat_fee else fiat_fee,
+        )
+
+    # Trusted constructor: the arguments have already been checked and converted by the caller (timestamp and transaction_type are parsed,
+    # unique_id and notes are strings), so only the checks that involve more than one argument are performed. Used by the parser, which checks
+    # the arguments of a whole table column by column (see ods_parser).
+    @classmethod
+    def _create_unchecked(
+        cls,
+        configuration: Configuration,
+        timestamp: datetime,
+        asset: str,
+        exchange: str,
+        holder: str,
+        transaction_type: TransactionType,
+        spot_price: RP2Decimal,
+        crypto_in: RP2Decimal,
+        crypto_fee: Optional[RP2Decimal] = None,
+        fiat_in_no_fee: Optional[RP2Decimal] = None,
+        fiat_in_with_fee: Optional[RP2Decimal] = None,
+        fiat_fee: Optional[RP2Decimal] = None,
+        internal_id: Optional[int] = None,
+        unique_id: str = "",
+        notes: str = "",
+    ) -> "InTransaction":
+        result: InTransaction = cls.__new__(cls)
+        result._init_transaction_unchecked(configuration, timestamp, asset, transaction_type, spot_price, internal_id, unique_id, notes)
+        result.__init_in_transaction(exchange, holder, crypto_in, crypto_fee, fiat_in_no_fee, fiat_in_with_fee, fiat_fee)
+        return result
+
+    def __init_in_transaction(
+        self,
+        exchange: str,
+        holder: str,
+        crypto_in: RP2Decimal,
+        crypto_fee: Optional[RP2Decimal],
+        fiat_in_no_fee: Optional[RP2Decimal],
+        fiat_in_with_fee: Optional[RP2Decimal],
+        fiat_fee: Optional[RP2Decimal],
+    ) -> None:
+        self.__exchange: str = exchange
+        self.__holder: str = holder
+        self.__crypto_in: RP2Decimal = crypto_in
+        self.__crypto_fee: RP2Decimal = crypto_fee if crypto_fee else ZERO
+        self.__fiat_fee: RP2Decimal = fiat_fee if fiat_fee else ZERO
+        # Fixed-point values of the crypto amounts (see fixed_point)
+        is_fixed_point: bool = self.configuration.fixed_point
+        self.__fixed_point_crypto_in: Optional[int] = to_fixed_point(self.__crypto_in) if is_fixed_point else None
+        self.__fixed_point_crypto_fee: Optional[int] = to_fixed_point(self.__crypto_fee) if is_fixed_point else None
 
-        if spot_price == ZERO:
+        if self.spot_price == ZERO:
             raise RP2ValueError(f"{self.asset} {type(self).__name__} ({self.timestamp}, id {self.internal_id}): parameter 'spot_price' cannot be 0")
 
         # If fee is paid in crypto then convert it to fiat (it's needed for tax computation), if fee is paid in fiat, then crypto_fee = 0
@@ -71,16 +136,8 @@ class InTransaction(AbstractTransaction):
 
         # Fiat in with/without fee are optional. They can be derived from crypto in, spot price and fiat fee, however some exchanges
         # provide them anyway. If they are provided use them as given by the exchange, if not compute them.
-        self.__fiat_in_no_fee: RP2Decimal
-        self.__fiat_in_with_fee: RP2Decimal
-        if fiat_in_no_fee is None:
-            self.__fiat_in_no_fee = self.__crypto_in * self.spot_price
-        else:
-            self.__fiat_in_no_fee = configuration.type_check_positive_decimal("fiat_in_no_fee", fiat_in_no_fee, non_zero=True)
-        if fiat_in_with_fee is None:
-            self.__fiat_in_with_fee = self.__fiat_in_no_fee + self.__fiat_fee
-        else:
-            self.__fiat_in_with_fee = configuration.type_check_positive_decimal("fiat_in_with_fee", fiat_in_with_fee, non_zero=True)
+        self.__fiat_in_no_fee: RP2Decimal = fiat_in_no_fee if fiat_in_no_fee is not None else self.__crypto_in * self.spot_price
+        self.__fiat_in_with_fee: RP2Decimal = fiat_in_with_fee if fiat_in_with_fee is not None else self.__fiat_in_no_fee + self.__fiat_fee
 
         if (
             self.transaction_type != TransactionType.BUY
@@ -92,8 +149,10 @@ class InTransaction(AbstractTransaction):
                 f"{self.asset} {type(self).__name__} ({self.timestamp}, id {self.internal_id}): invalid transaction type {self.transaction_type}"
             )
 
-        # If the values provided by the exchange doesn't match the computed one, log a warning.
-        if not RP2Decimal.is_equal_within_precision(self.__crypto_in * self.spot_price, self.__fiat_in_no_fee, FIAT_DECIMAL_MASK):
+        # If the values provided by the exchange doesn't match the computed one, log a warning (computed values always match).
+        if fiat_in_no_fee is not None and not RP2Decimal.is_equal_within_precision(
+            self.__crypto_in * self.spot_price, self.__fiat_in_no_fee, FIAT_DECIMAL_MASK
+        ):
             LOGGER.warning(
                 "%s %s (%s, id %s): crypto_in * spot_price != fiat_in_no_fee: %f != %f",
                 self.asset,
@@ -103,7 +162,9 @@ class InTransaction(AbstractTransaction):
                 self.__crypto_in * self.spot_price,
                 self.__fiat_in_no_fee,
             )
-        if not RP2Decimal.is_equal_within_precision(self.__fiat_in_with_fee, self.__fiat_in_no_fee + self.__fiat_fee, FIAT_DECIMAL_MASK):
+        if fiat_in_with_fee is not None and not RP2Decimal.is_equal_within_precision(
+            self.__fiat_in_with_fee, self.__fiat_in_no_fee + self.__fiat_fee, FIAT_DECIMAL_MASK
+        ):
             LOGGER.warning(
                 "%s %s (%s, id %s): fiat_in_with_fee != fiat_in_no_fee + fiat_fee: %f != %f",
                 self.asset,
@@ -158,6 +219,14 @@ class InTransaction(AbstractTransaction):
     def crypto_fee(self) -> RP2Decimal:
         return self.__crypto_fee
 
+    @property
+    def fixed_point_crypto_in(self) -> Optional[int]:
+        return self.__fixed_point_crypto_in
+
+    @property
+    def fixed_point_crypto_fee(self) -> Optional[int]:
+        return self.__fixed_point_crypto_fee
+
     @property
     def fiat_in_no_fee(self) -> RP2Decimal:
         return self.__fiat_in_no_fee
@@ -195,6 +264,10 @@ class InTransaction(AbstractTransaction):
     def crypto_balance_change(self) -> RP2Decimal:
         return self.crypto_in
 
+    @property
+    def fixed_point_crypto_balance_change(self) -> Optional[int]:
+        return self.__fixed_point_crypto_in
+
     @property
     def fiat_balance_change(self) -> RP2Decimal:
         return self.fiat_in_with_fee
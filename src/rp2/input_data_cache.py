@@ -0,0 +1,154 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import pickle  # nosec
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Type, TypeVar
+
+from rp2.configuration import Configuration
+from rp2.input_data import InputData
+from rp2.logger import LOGGER
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.tax_checkpoint import TaxCheckpoint
+
+# Increase this whenever the parser or the pickled classes (transactions, entry sets, InputData, etc.) change in ways that make old cache
+# entries invalid.
+_CACHE_FORMAT_VERSION: int = 9
+_CACHE_FILE_SUFFIX: str = ".input_data"
+_CHECKPOINT_FILE_SUFFIX: str = ".checkpoint"
+
+DEFAULT_CACHE_SIZE: int = 256 * 1024 * 1024
+
+_EntryType = TypeVar("_EntryType", InputData, TaxCheckpoint)
+
+
+# Content-addressed, size-bounded on-disk cache of parsed InputData. The key of an entry is a hash of the raw XML of the asset sheet, the
+# asset name and the configuration (headers, assets, exchanges, holders, dates, country), so any change to the inputs of the parser results
+# in a different key and stale entries are never read (they're eventually evicted). Entries are pickled InputData objects: when the cache
+# grows past max_size, the least recently used entries (by file modification time, which is refreshed on each hit) are deleted.
+# The cache also contains tax computation checkpoints (see tax_checkpoint): their key doesn't depend on the asset sheet, because they are meant
+# to be resumed after the sheet changes (the checkpoint itself detects changes that prevent resuming it).
+# The cache is opt-in and its directory is created accessible only to the current user: entries are loaded with pickle, so the cache directory
+# must be trusted (which is why bandit's pickle warnings are silenced below).
+class InputDataCache:
+    @classmethod
+    def type_check(cls, name: str, instance: "InputDataCache") -> "InputDataCache":
+        Configuration.type_check_parameter_name(name)
+        if not isinstance(instance, cls):
+            raise RP2TypeError(f"Parameter '{name}' is not of type {cls.__name__}: {instance}")
+        return instance
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.__cache_dir: Path = Path(Configuration.type_check_string("cache_dir", cache_dir))
+        self.__max_size: int = Configuration.type_check_positive_int("max_size", max_size)
+        if self.__cache_dir.exists() and not self.__cache_dir.is_dir():
+            raise RP2ValueError(f"Error: cache directory {cache_dir} exists but it's not a directory")
+        self.__cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    @property
+    def cache_dir(self) -> str:
+        return str(self.__cache_dir)
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @staticmethod
+    def get_key(configuration: Configuration, asset: str, sheet_digest: str) -> str:
+        Configuration.type_check("configuration", configuration)
+        Configuration.type_check_string("asset", asset)
+        Configuration.type_check_string("sheet_digest", sheet_digest)
+        key_hash: "hashlib._Hash" = hashlib.sha256()
+        # Transactions parsed in fixed-point mode also contain the fixed-point values of their amounts (see fixed_point)
+        key_hash.update(f"{_CACHE_FORMAT_VERSION}\n{asset}\n{sheet_digest}\n{repr(configuration)}\n{configuration.fixed_point}".encode("utf-8"))
+        return key_hash.hexdigest()
+
+    @staticmethod
+    def get_checkpoint_key(configuration: Configuration, asset: str, accounting_method: str) -> str:
+        Configuration.type_check("configuration", configuration)
+        Configuration.type_check_string("asset", asset)
+        Configuration.type_check_string("accounting_method", accounting_method)
+        key_hash: "hashlib._Hash" = hashlib.sha256()
+        key_hash.update(f"{_CACHE_FORMAT_VERSION}\n{asset}\n{accounting_method}\n{repr(configuration)}".encode("utf-8"))
+        return key_hash.hexdigest()
+
+    def load(self, key: str) -> Optional[InputData]:
+        return self.__load_entry(self.__get_entry_path(key, _CACHE_FILE_SUFFIX), InputData)
+
+    def store(self, key: str, input_data: InputData) -> None:
+        InputData.type_check("input_data", input_data)
+        self.__store_entry(self.__get_entry_path(key, _CACHE_FILE_SUFFIX), input_data)
+
+    def load_checkpoint(self, key: str) -> Optional[TaxCheckpoint]:
+        return self.__load_entry(self.__get_entry_path(key, _CHECKPOINT_FILE_SUFFIX), TaxCheckpoint)
+
+    def store_checkpoint(self, key: str, checkpoint: TaxCheckpoint) -> None:
+        TaxCheckpoint.type_check("checkpoint", checkpoint)
+        self.__store_entry(self.__get_entry_path(key, _CHECKPOINT_FILE_SUFFIX), checkpoint)
+
+    def __load_entry(self, entry_path: Path, entry_class: Type[_EntryType]) -> Optional[_EntryType]:
+        try:
+            with open(entry_path, "rb") as entry_file:
+                result: object = pickle.load(entry_file)  # nosec
+            if not isinstance(result, entry_class):
+                raise RP2TypeError(f"Cache entry is not of type {entry_class.__name__}")
+        except FileNotFoundError:
+            return None
+        except Exception:  # pylint: disable=broad-except
+            # Corrupted or incompatible entry: treat it as a miss (it will be overwritten)
+            LOGGER.debug("Discarding unreadable cache entry %s", entry_path)
+            return None
+        # Refresh the modification time: it's used for LRU eviction
+        os.utime(entry_path)
+        return result
+
+    def __store_entry(self, entry_path: Path, entry: object) -> None:
+        # Write to a temporary file and then rename it, so that concurrent runs (or threads) never see a partially written entry
+        temporary_path: Path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporary_path, "wb") as entry_file:
+            pickle.dump(entry, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, entry_path)
+        self.__evict()
+
+    def __get_entry_path(self, key: str, suffix: str) -> Path:
+        return self.__cache_dir / Path(f"{Configuration.type_check_string('key', key)}{suffix}")
+
+    def __evict(self) -> None:
+        entry_paths: List[Path] = list(self.__cache_dir.glob(f"*{_CACHE_FILE_SUFFIX}")) + list(self.__cache_dir.glob(f"*{_CHECKPOINT_FILE_SUFFIX}"))
+        entry_path_and_stats: List[Tuple[Path, os.stat_result]] = []
+        for entry_path in entry_paths:
+            try:
+                entry_path_and_stats.append((entry_path, entry_path.stat()))
+            except FileNotFoundError:
+                # Evicted by a concurrent run
+                continue
+        total_size: int = sum(stat.st_size for _, stat in entry_path_and_stats)
+        # Least recently used first
+        entry_path_and_stats.sort(key=_modification_time_sort_key)
+        for entry_path, stat in entry_path_and_stats:
+            if total_size <= self.__max_size:
+                break
+            LOGGER.debug("Evicting cache entry %s", entry_path)
+            try:
+                entry_path.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= stat.st_size
+
+
+def _modification_time_sort_key(entry_path_and_stat: Tuple[Path, os.stat_result]) -> float:
+    return entry_path_and_stat[1].st_mtime
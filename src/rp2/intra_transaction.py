@@ -12,16 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime
 from typing import Callable, List, Optional
 
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.configuration import Configuration
+from rp2.entry_types import TransactionType
+from rp2.fixed_point import to_fixed_point
 from rp2.logger import LOGGER
 from rp2.rp2_decimal import ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
 
 
 class IntraTransaction(AbstractTransaction):
+    __slots__ = (
+        "__from_exchange",
+        "__from_holder",
+        "__to_exchange",
+        "__to_holder",
+        "__crypto_sent",
+        "__crypto_received",
+        "__crypto_fee",
+        "__fiat_fee",
+        "__fixed_point_crypto_sent",
+        "__fixed_point_crypto_received",
+        "__fixed_point_crypto_fee",
+    )
+
     def __init__(
         self,
         configuration: Configuration,
@@ -39,26 +56,93 @@ class IntraTransaction(AbstractTransaction):
         notes: Optional[str] = None,
     ) -> None:
         Configuration.type_check("configuration", configuration)
-        self.__crypto_sent: RP2Decimal = configuration.type_check_positive_decimal("crypto_sent", crypto_sent, non_zero=True)
-        self.__crypto_received: RP2Decimal = configuration.type_check_positive_decimal("crypto_received", crypto_received)
+        crypto_sent = configuration.type_check_positive_decimal("crypto_sent", crypto_sent, non_zero=True)
+        crypto_received = configuration.type_check_positive_decimal("crypto_received", crypto_received)
+        super().__init__(
+            configuration,
+            timestamp,
+            asset,
+            "MOVE",
+            self._get_spot_price(timestamp, asset, spot_price, crypto_sent, crypto_received, unique_id),
+            internal_id,
+            unique_id,
+            notes,
+        )
+
+        self.__init_intra_transaction(
+            configuration.type_check_exchange("from_exchange", from_exchange),
+            configuration.type_check_holder("from_holder", from_holder),
+            configuration.type_check_exchange("to_exchange", to_exchange),
+            configuration.type_check_holder("to_holder", to_holder),
+            crypto_sent,
+            crypto_received,
+        )
+
+    # Trusted constructor: see InTransaction._create_unchecked().
+    @classmethod
+    def _create_unchecked(
+        cls,
+        configuration: Configuration,
+        timestamp: datetime,
+        asset: str,
+        from_exchange: str,
+        from_holder: str,
+        to_exchange: str,
+        to_holder: str,
+        spot_price: Optional[RP2Decimal],
+        crypto_sent: RP2Decimal,
+        crypto_received: RP2Decimal,
+        internal_id: Optional[int] = None,
+        unique_id: str = "",
+        notes: str = "",
+    ) -> "IntraTransaction":
+        result: IntraTransaction = cls.__new__(cls)
+        result._init_transaction_unchecked(
+            configuration,
+            timestamp,
+            asset,
+            TransactionType.MOVE,
+            cls._get_spot_price(timestamp, asset, spot_price, crypto_sent, crypto_received, unique_id),
+            internal_id,
+            unique_id,
+            notes,
+        )
+        result.__init_intra_transaction(from_exchange, from_holder, to_exchange, to_holder, crypto_sent, crypto_received)
+        return result
+
+    # Sometimes, when fee is 0 in IntraTransactions, exchanges don't provide the spot_price:
+    # - if the fee is 0, this is OK because spot price isn't needed (in this case spot price is assigned 0).
+    # - if the fee is 0, raise an exception
+    @staticmethod
+    def _get_spot_price(
+        timestamp: object, asset: str, spot_price: Optional[RP2Decimal], crypto_sent: RP2Decimal, crypto_received: RP2Decimal, unique_id: Optional[str]
+    ) -> RP2Decimal:
+        if spot_price is not None and not (isinstance(spot_price, RP2Decimal) and spot_price == ZERO):
+            return spot_price
+        crypto_fee: RP2Decimal = crypto_sent - crypto_received
+        if crypto_fee != ZERO:
+            raise RP2ValueError(f"crypto_fee is non-zero ({crypto_fee}) but spot_price is empty or zero: {timestamp} {asset} {crypto_sent} {unique_id} ")
+        return ZERO
+
+    def __init_intra_transaction(
+        self, from_exchange: str, from_holder: str, to_exchange: str, to_holder: str, crypto_sent: RP2Decimal, crypto_received: RP2Decimal
+    ) -> None:
+        self.__from_exchange: str = from_exchange
+        self.__from_holder: str = from_holder
+        self.__to_exchange: str = to_exchange
+        self.__to_holder: str = to_holder
+        self.__crypto_sent: RP2Decimal = crypto_sent
+        self.__crypto_received: RP2Decimal = crypto_received
         self.__crypto_fee: RP2Decimal = self.__crypto_sent - self.__crypto_received
-        if spot_price is None or (isinstance(spot_price, RP2Decimal) and spot_price == ZERO):
-            # Sometimes, when fee is 0 in IntraTransactions, exchanges don't provide the spot_price:
-            # - if the fee is 0, this is OK because spot price isn't needed (in this case spot price is assigned 0).
-            # - if the fee is 0, raise an exception
-            if self.__crypto_fee == ZERO:
-                spot_price = ZERO
-            else:
-                raise RP2ValueError(
-                    f"crypto_fee is non-zero ({self.__crypto_fee}) but spot_price is empty or zero: {timestamp} {asset} {crypto_sent} {unique_id} "
-                )
-        super().__init__(configuration, timestamp, asset, "MOVE", spot_price, internal_id, unique_id, notes)
-
-        self.__from_exchange: str = configuration.type_check_exchange("from_exchange", from_exchange)
-        self.__from_holder: str = configuration.type_check_holder("from_holder", from_holder)
-        self.__to_exchange: str = configuration.type_check_exchange("to_exchange", to_exchange)
-        self.__to_holder: str = configuration.type_check_holder("to_holder", to_holder)
-        self.__fiat_fee: RP2Decimal
+        # Fixed-point values of the crypto amounts (see fixed_point)
+        self.__fixed_point_crypto_sent: Optional[int] = None
+        self.__fixed_point_crypto_received: Optional[int] = None
+        self.__fixed_point_crypto_fee: Optional[int] = None
+        if self.configuration.fixed_point:
+            self.__fixed_point_crypto_sent = to_fixed_point(self.__crypto_sent)
+            self.__fixed_point_crypto_received = to_fixed_point(self.__crypto_received)
+            if self.__fixed_point_crypto_sent is not None and self.__fixed_point_crypto_received is not None:
+                self.__fixed_point_crypto_fee = self.__fixed_point_crypto_sent - self.__fixed_point_crypto_received
 
         if self.__from_exchange == self.__to_exchange and self.__from_holder == self.__to_holder:
             LOGGER.warning(
@@ -71,7 +155,7 @@ class IntraTransaction(AbstractTransaction):
         if self.__crypto_sent < self.__crypto_received:
             raise RP2ValueError(f"{self.asset} {type(self).__name__} ({self.timestamp}, id {self.internal_id}): crypto sent < crypto received")
 
-        self.__fiat_fee = self.__crypto_fee * self.spot_price
+        self.__fiat_fee: RP2Decimal = self.__crypto_fee * self.spot_price
 
     def to_string(self, indent: int = 0, repr_format: bool = True, extra_data: Optional[List[str]] = None) -> str:
         self.configuration.type_check_positive_int("indent", indent)
@@ -131,6 +215,18 @@ class IntraTransaction(AbstractTransaction):
     def crypto_fee(self) -> RP2Decimal:
         return self.__crypto_fee
 
+    @property
+    def fixed_point_crypto_sent(self) -> Optional[int]:
+        return self.__fixed_point_crypto_sent
+
+    @property
+    def fixed_point_crypto_received(self) -> Optional[int]:
+        return self.__fixed_point_crypto_received
+
+    @property
+    def fixed_point_crypto_fee(self) -> Optional[int]:
+        return self.__fixed_point_crypto_fee
+
     @property
     def fiat_fee(self) -> RP2Decimal:
         return self.__fiat_fee
@@ -155,6 +251,10 @@ class IntraTransaction(AbstractTransaction):
     def crypto_balance_change(self) -> RP2Decimal:
         return self.crypto_fee
 
+    @property
+    def fixed_point_crypto_balance_change(self) -> Optional[int]:
+        return self.__fixed_point_crypto_fee
+
     @property
     def fiat_balance_change(self) -> RP2Decimal:
         return self.fiat_fee
@@ -0,0 +1,427 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, cast
+
+from rp2.abstract_accounting_method import (
+    AbstractAccountingMethod,
+    AbstractLotPairingMethod,
+)
+from rp2.abstract_entry import AbstractEntry
+from rp2.balance import Account, BalanceSet
+from rp2.computed_data import ComputedData
+from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
+from rp2.entry_table import EntryTable
+from rp2.entry_types import TransactionType
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.logger import LOGGER
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.transaction_set import TransactionSet
+
+LOT_SNAPSHOT_FILE_NAME: str = "opening_lots.csv"
+
+# Prefix of the notes of the in-transactions created from opening lots (see apply_lot_snapshot())
+_OPENING_LOT_NOTES_PREFIX: str = "Opening lot as of "
+
+_HEADER: List[str] = [
+    "Accounting Method",
+    "Cutoff Date",
+    "Asset",
+    "Timestamp",
+    "Exchange",
+    "Holder",
+    "Transaction Type",
+    "Spot Price",
+    "Crypto Amount",
+    "Fiat In No Fee",
+    "Fiat Fee",
+    "Fiat Cost Basis",
+    "Unique Id",
+    "Notes",
+]
+
+
+# Acquired lot that is still open (not fully disposed of) at the cutoff date of a snapshot. Amounts are the ones of the remaining part of the
+# lot held in one account: crypto_amount is what's left of it in that account, fiat amounts are prorated, so the cost basis per unit
+# (fiat_cost_basis / crypto_amount) is the same as the one of the original lot. Exchange and holder are the account that holds it at the cutoff
+# date (see create_lot_snapshot()), the other fields are the ones of the original lot.
+class OpeningLot(NamedTuple):
+    asset: str
+    timestamp: datetime
+    exchange: str
+    holder: str
+    transaction_type: str
+    spot_price: RP2Decimal
+    crypto_amount: RP2Decimal
+    fiat_in_no_fee: RP2Decimal
+    fiat_fee: RP2Decimal
+    fiat_cost_basis: RP2Decimal
+    unique_id: Optional[str]
+    notes: Optional[str]
+
+
+# Open acquired lots of each asset at the end of the cutoff date, as computed by a lot-pairing accounting method: a later run can use them as
+# acquired lots in place of all the transactions that occurred on or before the cutoff date (see apply_lot_snapshot()), so that old rows can
+# be removed from the input. Gain/loss entries of taxable events after the cutoff date are the same as the ones computed from the full input,
+# as long as the same accounting method is used.
+class LotSnapshot:
+    __slots__ = ("__accounting_method", "__cutoff_date", "__asset_2_opening_lots")
+
+    @classmethod
+    def type_check(cls, name: str, instance: "LotSnapshot") -> "LotSnapshot":
+        Configuration.type_check_parameter_name(name)
+        if not isinstance(instance, cls):
+            raise RP2TypeError(f"Parameter '{name}' is not of type {cls.__name__}: {instance}")
+        return instance
+
+    def __init__(self, accounting_method: str, cutoff_date: date, asset_2_opening_lots: Dict[str, List[OpeningLot]]) -> None:
+        self.__accounting_method: str = Configuration.type_check_string("accounting_method", accounting_method)
+        if not isinstance(cutoff_date, date):
+            raise RP2TypeError(f"Parameter 'cutoff_date' is not of type date: {cutoff_date}")
+        self.__cutoff_date: date = cutoff_date
+        if not isinstance(asset_2_opening_lots, Dict):
+            raise RP2TypeError(f"Parameter 'asset_2_opening_lots' is not a Dict: {asset_2_opening_lots}")
+        self.__asset_2_opening_lots: Dict[str, List[OpeningLot]] = asset_2_opening_lots
+
+    @property
+    def accounting_method(self) -> str:
+        return self.__accounting_method
+
+    @property
+    def cutoff_date(self) -> date:
+        return self.__cutoff_date
+
+    @property
+    def assets(self) -> List[str]:
+        return list(self.__asset_2_opening_lots)
+
+    # Opening lots of the asset in chronological order (empty if the asset had no open lots at the cutoff date)
+    def get_opening_lots(self, asset: str) -> List[OpeningLot]:
+        return self.__asset_2_opening_lots.get(asset, [])
+
+
+# Creates the snapshot of the open acquired lots at the end of cutoff_date from the computed data of each asset. The remaining amount of each
+# lot is its crypto in minus the crypto disposed of from it by taxable events that occurred on or before the cutoff date. Lot pairing isn't
+# per account, so the remaining amounts are then assigned to the accounts that hold the crypto at the cutoff date (see
+# _assign_open_lots_to_accounts()). Only lot-pairing methods have lots to snapshot and in per-wallet mode lots move between accounts, which
+# isn't reflected in the computed data: pooled-cost methods and per-wallet mode are both rejected.
+def create_lot_snapshot(
+    configuration: Configuration, accounting_method: AbstractAccountingMethod, asset_to_computed_data: Dict[str, ComputedData], cutoff_date: date
+) -> LotSnapshot:
+    Configuration.type_check("configuration", configuration)
+    AbstractLotPairingMethod.type_check("accounting_method", accounting_method)
+    if not isinstance(asset_to_computed_data, Dict):
+        raise RP2TypeError(f"Parameter 'asset_to_computed_data' is not a Dict: {asset_to_computed_data}")
+    if not isinstance(cutoff_date, date):
+        raise RP2TypeError(f"Parameter 'cutoff_date' is not of type date: {cutoff_date}")
+    if configuration.per_wallet:
+        raise RP2ValueError("Opening lot snapshots are not supported in per-wallet mode")
+    if cutoff_date > configuration.to_date:
+        # Input readers may drop transactions that occurred after to_date (the ODS parser does), so they can't be snapshotted
+        raise RP2ValueError(f"Opening lot snapshot cutoff date ({cutoff_date}) is later than to_date ({configuration.to_date})")
+
+    asset_2_opening_lots: Dict[str, List[OpeningLot]] = {}
+    asset: str
+    computed_data: ComputedData
+    for asset, computed_data in asset_to_computed_data.items():
+        ComputedData.type_check("computed_data", computed_data)
+        in_transaction_set: TransactionSet = computed_data.unfiltered_in_transaction_set
+        in_lot_2_disposed_amounts: EntryTable[InTransaction, List[RP2Decimal]] = EntryTable(in_transaction_set.count)
+        entry: AbstractEntry
+        for entry in computed_data.unfiltered_gain_loss_set:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            if gain_loss.taxable_event.timestamp.date() > cutoff_date:
+                break
+            if gain_loss.acquired_lot is None:
+                continue
+            if gain_loss.acquired_lot.timestamp.date() > cutoff_date:
+                raise RP2ValueError(
+                    f"{asset}: taxable event {gain_loss.taxable_event.internal_id} occurred on or before the cutoff date ({cutoff_date}), "
+                    f"but it's paired with acquired lot {gain_loss.acquired_lot.internal_id}, which occurred after it"
+                )
+            if gain_loss.acquired_lot not in in_lot_2_disposed_amounts:
+                in_lot_2_disposed_amounts[gain_loss.acquired_lot] = []
+            in_lot_2_disposed_amounts[gain_loss.acquired_lot].append(gain_loss.crypto_amount)
+
+        open_lots: List[Tuple[InTransaction, RP2Decimal]] = []
+        for entry in in_transaction_set:
+            if entry.timestamp.date() > cutoff_date:
+                break
+            in_transaction: InTransaction = cast(InTransaction, entry)
+            remaining_amount: RP2Decimal = in_transaction.crypto_in - RP2Decimal.exact_sum(in_lot_2_disposed_amounts.get(in_transaction, []))
+            if remaining_amount > ZERO:
+                open_lots.append((in_transaction, remaining_amount))
+
+        # Balances of the accounts at the cutoff date, from all the transactions that occurred on or before it
+        balance_set: BalanceSet = BalanceSet(
+            configuration,
+            InputData(
+                asset,
+                in_transaction_set,
+                computed_data.unfiltered_out_transaction_set,
+                computed_data.unfiltered_intra_transaction_set,
+            ),
+            cutoff_date,
+        )
+        account_2_balance: Dict[Account, RP2Decimal] = {}
+        for balance in balance_set:
+            account_2_balance[Account(balance.exchange, balance.holder)] = balance.final_balance
+
+        opening_lots: List[OpeningLot] = []
+        account: Account
+        crypto_amount: RP2Decimal
+        for in_transaction, account, crypto_amount in _assign_open_lots_to_accounts(asset, cutoff_date, open_lots, account_2_balance):
+            opening_lots.append(
+                OpeningLot(
+                    asset=asset,
+                    timestamp=in_transaction.timestamp,
+                    exchange=account.exchange,
+                    holder=account.holder,
+                    transaction_type=in_transaction.transaction_type.value,
+                    spot_price=in_transaction.spot_price,
+                    crypto_amount=crypto_amount,
+                    fiat_in_no_fee=(in_transaction.fiat_in_no_fee * crypto_amount) / in_transaction.crypto_in,
+                    fiat_fee=(in_transaction.fiat_fee * crypto_amount) / in_transaction.crypto_in,
+                    fiat_cost_basis=(in_transaction.fiat_in_with_fee * crypto_amount) / in_transaction.crypto_in,
+                    unique_id=in_transaction.unique_id,
+                    notes=in_transaction.notes,
+                )
+            )
+        asset_2_opening_lots[asset] = opening_lots
+
+    return LotSnapshot(accounting_method.name, cutoff_date, asset_2_opening_lots)
+
+
+# Outside per-wallet mode a taxable event can dispose of a lot acquired in another account and intra-transactions move crypto between
+# accounts, so the open lots (in chronological order, with their remaining amount) aren't necessarily held by the accounts they were acquired
+# in: account_2_balance has what each account holds at the cutoff date. Each lot is assigned to the account it was acquired in, as far as its
+# balance allows, then what's left of the lots goes to the accounts that still hold crypto, in the order of account_2_balance. Returns the
+# (lot, account, amount) parts in chronological order of the lots: a lot held by more than one account has one part per account.
+def _assign_open_lots_to_accounts(
+    asset: str, cutoff_date: date, open_lots: List[Tuple[InTransaction, RP2Decimal]], account_2_balance: Dict[Account, RP2Decimal]
+) -> List[Tuple[InTransaction, Account, RP2Decimal]]:
+    account_2_available_amount: Dict[Account, RP2Decimal] = dict(account_2_balance)
+    lot_parts: List[List[Tuple[Account, RP2Decimal]]] = []
+    unassigned_amounts: List[RP2Decimal] = []
+    in_transaction: InTransaction
+    remaining_amount: RP2Decimal
+    account: Account
+    amount: RP2Decimal
+    parts: List[Tuple[Account, RP2Decimal]]
+    for in_transaction, remaining_amount in open_lots:
+        account = Account(in_transaction.exchange, in_transaction.holder)
+        available_amount: RP2Decimal = account_2_available_amount.get(account, ZERO)
+        amount = remaining_amount if remaining_amount <= available_amount else max(available_amount, ZERO)
+        parts = []
+        if amount > ZERO:
+            parts.append((account, amount))
+            account_2_available_amount[account] = available_amount - amount
+        lot_parts.append(parts)
+        unassigned_amounts.append(remaining_amount - amount)
+
+    result: List[Tuple[InTransaction, Account, RP2Decimal]] = []
+    accounts: List[Account] = list(account_2_available_amount)
+    account_position: int = 0
+    unassigned_amount: RP2Decimal
+    for (in_transaction, _), parts, unassigned_amount in zip(open_lots, lot_parts, unassigned_amounts):
+        while unassigned_amount > ZERO:
+            if account_position == len(accounts):
+                raise RP2ValueError(
+                    f"{asset}: account balances on {cutoff_date} don't cover the open acquired lots: {unassigned_amount} of lot "
+                    f"{in_transaction.internal_id} is not held by any account"
+                )
+            other_account: Account = accounts[account_position]
+            other_available_amount: RP2Decimal = account_2_available_amount[other_account]
+            if other_available_amount <= ZERO:
+                account_position += 1
+                continue
+            other_amount: RP2Decimal = unassigned_amount if unassigned_amount <= other_available_amount else other_available_amount
+            parts.append((other_account, other_amount))
+            account_2_available_amount[other_account] = other_available_amount - other_amount
+            unassigned_amount -= other_amount
+        for account, amount in parts:
+            result.append((in_transaction, account, amount))
+
+    return result
+
+
+# Writes the snapshot to a CSV file (one row per opening lot, amounts at full precision) and returns its path.
+def write_lot_snapshot(lot_snapshot: LotSnapshot, output_dir_path: str, output_file_prefix: str) -> Path:
+    LotSnapshot.type_check("lot_snapshot", lot_snapshot)
+    Configuration.type_check_string("output_dir_path", output_dir_path)
+    Configuration.type_check_string("output_file_prefix", output_file_prefix)
+
+    output_file_path: Path = Path(output_dir_path) / Path(f"{output_file_prefix}{lot_snapshot.accounting_method}_{LOT_SNAPSHOT_FILE_NAME}")
+    with open(output_file_path, "w", encoding="utf-8", newline="") as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(_HEADER)
+        asset: str
+        for asset in lot_snapshot.assets:
+            opening_lot: OpeningLot
+            for opening_lot in lot_snapshot.get_opening_lots(asset):
+                row: List[str] = [
+                    lot_snapshot.accounting_method,
+                    lot_snapshot.cutoff_date.isoformat(),
+                    opening_lot.asset,
+                    opening_lot.timestamp.isoformat(),
+                    opening_lot.exchange,
+                    opening_lot.holder,
+                    opening_lot.transaction_type,
+                    str(opening_lot.spot_price),
+                    str(opening_lot.crypto_amount),
+                    str(opening_lot.fiat_in_no_fee),
+                    str(opening_lot.fiat_fee),
+                    str(opening_lot.fiat_cost_basis),
+                    opening_lot.unique_id or "",
+                    opening_lot.notes or "",
+                ]
+                writer.writerow(row)
+
+    return output_file_path
+
+
+# Reads a snapshot written by write_lot_snapshot(). All rows must have the same accounting method and cutoff date.
+def read_lot_snapshot(input_file_path: str) -> LotSnapshot:
+    Configuration.type_check_string("input_file_path", input_file_path)
+    accounting_method: Optional[str] = None
+    cutoff_date: Optional[date] = None
+    asset_2_opening_lots: Dict[str, List[OpeningLot]] = {}
+    with open(input_file_path, encoding="utf-8", newline="") as input_file:
+        reader = csv.reader(input_file)
+        header: Optional[List[str]] = next(reader, None)
+        if header != _HEADER:
+            raise RP2ValueError(f"{input_file_path}: invalid opening lot snapshot header: {header}")
+        row: List[str]
+        for row in reader:
+            if len(row) != len(_HEADER):
+                raise RP2ValueError(f"{input_file_path} (line {reader.line_num}): expected {len(_HEADER)} values, found {len(row)}: {row}")
+            row_cutoff_date: date = date.fromisoformat(row[1])
+            if accounting_method is None:
+                accounting_method = row[0]
+                cutoff_date = row_cutoff_date
+            elif row[0] != accounting_method or row_cutoff_date != cutoff_date:
+                raise RP2ValueError(
+                    f"{input_file_path} (line {reader.line_num}): accounting method and cutoff date differ from the ones of the first lot "
+                    f"({accounting_method}, {cutoff_date}): {row}"
+                )
+            asset_2_opening_lots.setdefault(row[2], []).append(
+                OpeningLot(
+                    asset=row[2],
+                    timestamp=Configuration.type_check_timestamp_from_string("timestamp", row[3]),
+                    exchange=row[4],
+                    holder=row[5],
+                    transaction_type=row[6],
+                    spot_price=RP2Decimal(row[7]),
+                    crypto_amount=RP2Decimal(row[8]),
+                    fiat_in_no_fee=RP2Decimal(row[9]),
+                    fiat_fee=RP2Decimal(row[10]),
+                    fiat_cost_basis=RP2Decimal(row[11]),
+                    unique_id=row[12] or None,
+                    notes=row[13] or None,
+                )
+            )
+    if accounting_method is None or cutoff_date is None:
+        raise RP2ValueError(f"{input_file_path}: opening lot snapshot is empty")
+
+    return LotSnapshot(accounting_method, cutoff_date, asset_2_opening_lots)
+
+
+# Returns the input data of the asset with the opening lots of the snapshot in place of all the transactions that occurred on or before the
+# cutoff date. Opening lots become in-transactions with the timestamp, account and cost basis per unit of the original lots. Their internal ids
+# follow the largest one of the input, so they don't clash with row numbers. Earn-typed lots are turned into buys: their income was taxed when
+# they were acquired, which is before the cutoff date. Notes get the opening lot prefix, unless the lot comes from an earlier snapshot and
+# already has it. The remaining transactions are added to the sets of the result.
+def apply_lot_snapshot(configuration: Configuration, input_data: InputData, lot_snapshot: LotSnapshot) -> InputData:
+    Configuration.type_check("configuration", configuration)
+    InputData.type_check("input_data", input_data)
+    LotSnapshot.type_check("lot_snapshot", lot_snapshot)
+
+    asset: str = input_data.asset
+    cutoff_date: date = lot_snapshot.cutoff_date
+    next_internal_id: int = 1 + max(
+        (
+            int(entry.internal_id)
+            for transaction_set in [
+                input_data.unfiltered_in_transaction_set,
+                input_data.unfiltered_out_transaction_set,
+                input_data.unfiltered_intra_transaction_set,
+            ]
+            for entry in transaction_set
+        ),
+        default=0,
+    )
+
+    in_transaction_set: TransactionSet = TransactionSet(configuration, "IN", asset, MIN_DATE, MAX_DATE)
+    opening_lot: OpeningLot
+    for opening_lot in lot_snapshot.get_opening_lots(asset):
+        transaction_type: TransactionType = TransactionType.type_check_from_string("transaction_type", opening_lot.transaction_type)
+        in_transaction_set.add_entry(
+            InTransaction(
+                configuration,
+                opening_lot.timestamp.isoformat(),
+                asset,
+                opening_lot.exchange,
+                opening_lot.holder,
+                TransactionType.BUY.value if transaction_type.is_earn_type() else opening_lot.transaction_type,
+                opening_lot.spot_price,
+                opening_lot.crypto_amount,
+                fiat_in_no_fee=opening_lot.fiat_in_no_fee,
+                fiat_in_with_fee=opening_lot.fiat_cost_basis,
+                fiat_fee=opening_lot.fiat_fee,
+                internal_id=next_internal_id,
+                unique_id=opening_lot.unique_id,
+                notes=_get_opening_lot_notes(opening_lot, cutoff_date),
+            )
+        )
+        next_internal_id += 1
+    out_transaction_set: TransactionSet = TransactionSet(configuration, "OUT", asset, MIN_DATE, MAX_DATE)
+    intra_transaction_set: TransactionSet = TransactionSet(configuration, "INTRA", asset, MIN_DATE, MAX_DATE)
+    replaced_count: int = (
+        _add_entries_after_cutoff_date(input_data.unfiltered_in_transaction_set, in_transaction_set, cutoff_date)
+        + _add_entries_after_cutoff_date(input_data.unfiltered_out_transaction_set, out_transaction_set, cutoff_date)
+        + _add_entries_after_cutoff_date(input_data.unfiltered_intra_transaction_set, intra_transaction_set, cutoff_date)
+    )
+
+    LOGGER.info(
+        "%s: Replaced %d transactions that occurred on or before %s with %d opening lots",
+        asset,
+        replaced_count,
+        cutoff_date,
+        len(lot_snapshot.get_opening_lots(asset)),
+    )
+    return InputData(asset, in_transaction_set, out_transaction_set, intra_transaction_set, configuration.from_date, configuration.to_date)
+
+
+def _get_opening_lot_notes(opening_lot: OpeningLot, cutoff_date: date) -> str:
+    if opening_lot.notes and opening_lot.notes.startswith(_OPENING_LOT_NOTES_PREFIX):
+        return opening_lot.notes
+    return f"{_OPENING_LOT_NOTES_PREFIX}{cutoff_date}" + (f": {opening_lot.notes}" if opening_lot.notes else "")
+
+
+# Adds the entries of from_transaction_set that occurred after the cutoff date to to_transaction_set. Returns the number of entries left out.
+def _add_entries_after_cutoff_date(from_transaction_set: TransactionSet, to_transaction_set: TransactionSet, cutoff_date: date) -> int:
+    result: int = 0
+    entry: AbstractEntry
+    for entry in from_transaction_set:
+        if entry.timestamp.date() <= cutoff_date:
+            result += 1
+            continue
+        to_transaction_set.add_entry(entry)
+    return result
@@ -0,0 +1,90 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List
+
+from rp2.rp2_error import RP2ValueError
+
+# Value of empty slots
+EMPTY: int = -1
+
+
+# Fixed-size array of non-negative integers (or EMPTY) supporting point updates and range maximum queries in O(log n). Accounting methods use it to
+# select acquired lots: slot i is acquired lot i (in chronological order), its value is the priority of the lot (EMPTY if the lot is exhausted)
+# and the lot to use for a taxable event is the one with the highest priority among the lots acquired before the taxable event (a prefix of the
+# array). It's an iterative, bottom-up segment tree: node i has children 2i and 2i + 1 and leaves are stored at [size, 2 * size).
+class MaxSegmentTree:
+    __slots__ = ("__size", "__nodes")
+
+    def __init__(self, values: List[int]) -> None:
+        for value in values:
+            if value < EMPTY:
+                raise RP2ValueError(f"Invalid value {value}: values must be non-negative (or EMPTY)")
+        self.__size: int = len(values)
+        self.__nodes: List[int] = [EMPTY] * self.__size + values
+        nodes: List[int] = self.__nodes
+        index: int
+        for index in range(self.__size - 1, 0, -1):
+            left: int = nodes[2 * index]
+            right: int = nodes[2 * index + 1]
+            nodes[index] = left if left > right else right
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __check_index(self, index: int) -> None:
+        if not 0 <= index < self.__size:
+            raise RP2ValueError(f"Index {index} out of range [0, {self.__size})")
+
+    def get_value(self, index: int) -> int:
+        self.__check_index(index)
+        return self.__nodes[self.__size + index]
+
+    def set_value(self, index: int, value: int) -> None:
+        self.__check_index(index)
+        if value < EMPTY:
+            raise RP2ValueError(f"Invalid value {value}: values must be non-negative (or EMPTY)")
+        nodes: List[int] = self.__nodes
+        index += self.__size
+        nodes[index] = value
+        while index > 1:
+            index //= 2
+            left: int = nodes[2 * index]
+            right: int = nodes[2 * index + 1]
+            nodes[index] = left if left > right else right
+
+    def clear_value(self, index: int) -> None:
+        self.set_value(index, EMPTY)
+
+    # Maximum value in [start, end) (EMPTY if all the slots in the range are empty)
+    def get_max(self, start: int, end: int) -> int:
+        if not 0 <= start <= end <= self.__size:
+            raise RP2ValueError(f"Invalid range [{start}, {end}) for size {self.__size}")
+        nodes: List[int] = self.__nodes
+        result: int = EMPTY
+        start += self.__size
+        end += self.__size
+        while start < end:
+            if start & 1:
+                if nodes[start] > result:
+                    result = nodes[start]
+                start += 1
+            if end & 1:
+                end -= 1
+                if nodes[end] > result:
+                    result = nodes[end]
+            start //= 2
+            end //= 2
+        return result
@@ -0,0 +1,79 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from rp2.computed_data import ComputedData, YearlyGainLoss
+from rp2.configuration import Configuration
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2TypeError
+
+METHOD_COMPARISON_FILE_NAME: str = "method_comparison.csv"
+_TOTAL: str = "Total"
+
+
+class _MethodComparisonId(NamedTuple):
+    year: int
+    asset: str
+    capital_gains_type: str
+
+
+# Side-by-side summary of the yearly gain/loss of each accounting method (in the order of method_2_asset_to_computed_data): one row per year,
+# asset and capital gains type, followed by the total of each year across assets, and one column per accounting method. Returns the path of
+# the CSV file.
+def generate_method_comparison(
+    method_2_asset_to_computed_data: Dict[str, Dict[str, ComputedData]],
+    output_dir_path: str,
+    output_file_prefix: str,
+) -> Path:
+    Configuration.type_check_string("output_dir_path", output_dir_path)
+    Configuration.type_check_string("output_file_prefix", output_file_prefix)
+    if not isinstance(method_2_asset_to_computed_data, Dict):
+        raise RP2TypeError(f"Parameter 'method_2_asset_to_computed_data' is not a Dict: {method_2_asset_to_computed_data}")
+
+    methods: List[str] = list(method_2_asset_to_computed_data)
+    key_2_gain_losses: Dict[_MethodComparisonId, Dict[str, List[RP2Decimal]]] = {}
+    method: str
+    asset_to_computed_data: Dict[str, ComputedData]
+    key: _MethodComparisonId
+    for method, asset_to_computed_data in method_2_asset_to_computed_data.items():
+        for computed_data in asset_to_computed_data.values():
+            yearly_gain_loss: YearlyGainLoss
+            for yearly_gain_loss in computed_data.yearly_gain_loss_list:
+                capital_gains_type: str = "LONG" if yearly_gain_loss.is_long_term_capital_gains else "SHORT"
+                for key in [
+                    _MethodComparisonId(yearly_gain_loss.year, yearly_gain_loss.asset, capital_gains_type),
+                    _MethodComparisonId(yearly_gain_loss.year, _TOTAL, ""),
+                ]:
+                    key_2_gain_losses.setdefault(key, {}).setdefault(method, []).append(yearly_gain_loss.fiat_gain_loss)
+
+    output_file_path: Path = Path(output_dir_path) / Path(f"{output_file_prefix}{METHOD_COMPARISON_FILE_NAME}")
+    with open(output_file_path, "w", encoding="utf-8", newline="") as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(["Year", "Asset", "Capital Gains Type"] + [f"{method.upper()} Gain/Loss" for method in methods])
+        for key in sorted(key_2_gain_losses, key=_method_comparison_sort_criteria):
+            method_2_gain_losses: Dict[str, List[RP2Decimal]] = key_2_gain_losses[key]
+            writer.writerow(
+                [str(key.year), key.asset, key.capital_gains_type]
+                + [f"{RP2Decimal.exact_sum(method_2_gain_losses.get(method, [ZERO])):.2f}" for method in methods]
+            )
+
+    return output_file_path
+
+
+# Years in ascending order, the total of each year after its assets
+def _method_comparison_sort_criteria(key: _MethodComparisonId) -> Tuple[int, bool, str, str]:
+    return (key.year, key.asset == _TOTAL, key.asset, key.capital_gains_type)
@@ -13,151 +13,360 @@
 # limitations under the License.
 
 import inspect
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
 from functools import lru_cache
+from itertools import groupby
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-
-import ezodf
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Type
 
+from rp2.abstract_input_reader import AbstractInputReader
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
+from rp2.csv_reader import CSVReader
 from rp2.entry_types import EntrySetType, TransactionType
 from rp2.in_transaction import InTransaction
 from rp2.input_data import InputData
+from rp2.input_data_cache import InputDataCache
 from rp2.intra_transaction import IntraTransaction
 from rp2.logger import LOGGER
+from rp2.ods_reader import ODSReader
 from rp2.out_transaction import OutTransaction
-from rp2.rp2_decimal import ZERO, RP2Decimal
-from rp2.rp2_error import RP2Error, RP2ValueError
+from rp2.rp2_decimal import CRYPTO_DECIMALS, ZERO, RP2Decimal
+from rp2.rp2_error import RP2Error, RP2TypeError, RP2ValueError
+from rp2.timestamp_parser import TimestampParser
 from rp2.transaction_set import TransactionSet
 
 _TABLE_END: str = "TABLE END"
+_TABLE_BEGIN_TYPES: Set[EntrySetType] = {EntrySetType.IN, EntrySetType.OUT, EntrySetType.INTRA}
+
+# Maximum number of transaction lines whose transactions are created together (see _TransactionFactory.create_transactions()): rows are
+# buffered only up to this number, so memory usage still doesn't depend on the size of the sheet.
+_TRANSACTION_ROW_BATCH_SIZE: int = 1024
+
+# Numeric constructor arguments that must be non-zero, when defined (all numeric arguments must be positive). Arguments that must be non-zero
+# only for some transaction types (e.g. the crypto_fee of fee-typed OutTransactions) are checked by the transaction constructors.
+_NON_ZERO_ARGUMENTS: Set[str] = {"crypto_in", "fiat_in_no_fee", "fiat_in_with_fee", "crypto_out_with_fee", "fiat_out_no_fee", "crypto_sent"}
+
 
+# Raw record of a transaction line whose transaction hasn't been created yet (see _parse_sheet)
+class _TransactionRow(NamedTuple):
+    table_type: EntrySetType
+    asset: str
+    internal_id: int
+    artificial_internal_id: int
+    row_values: List[Any]
 
-def open_ods(configuration: Configuration, input_file_path: str) -> Any:
+
+def open_ods(configuration: Configuration, input_file_path: str) -> ODSReader:
     Configuration.type_check("configuration", configuration)
     configuration.type_check_string("input_file_path", input_file_path)
 
     if not Path(input_file_path).exists():
         raise RP2ValueError(f"Error: {input_file_path} does not exist")
 
-    return ezodf.opendoc(input_file_path)
+    return ODSReader(input_file_path)
 
 
-def parse_ods(configuration: Configuration, asset: str, input_file_handle: Any) -> InputData:  # pylint: disable=too-many-branches
+# Opens a CSV / TSV file (containing the transactions of one asset) or a directory of such files (one per asset): the result can be passed
+# to parse_ods() like the result of open_ods().
+def open_csv(configuration: Configuration, input_file_path: str) -> CSVReader:
+    Configuration.type_check("configuration", configuration)
+    configuration.type_check_string("input_file_path", input_file_path)
+
+    if not Path(input_file_path).exists():
+        raise RP2ValueError(f"Error: {input_file_path} does not exist")
+
+    return CSVReader(input_file_path)
+
+
+# If a cache is passed, sheets that haven't changed since a previous run (with the same configuration) are loaded from the cache instead of
+# being parsed.
+def parse_ods(configuration: Configuration, asset: str, input_file_handle: AbstractInputReader, cache: Optional[InputDataCache] = None) -> InputData:
 
     Configuration.type_check("configuration", configuration)
     configuration.type_check_asset("asset", asset)
+    AbstractInputReader.type_check("input_file_handle", input_file_handle)
+
+    if not input_file_handle.has_sheet(asset):
+        raise RP2ValueError(f"Error: sheet {asset} does not exist in {Path(input_file_handle.input_file_path).resolve()}")
+
+    if cache is None:
+        return _parse_sheet(configuration, asset, input_file_handle, [asset], is_ledger=False)[asset]
+
+    InputDataCache.type_check("cache", cache)
+    cache_key: str = InputDataCache.get_key(configuration, asset, input_file_handle.get_sheet_digest(asset))
+    result: Optional[InputData] = cache.load(cache_key)
+    if result is not None:
+        LOGGER.debug("%s: Loaded input data from cache", asset)
+        return result
+    result = _parse_sheet(configuration, asset, input_file_handle, [asset], is_ledger=False)[asset]
+    cache.store(cache_key, result)
+    return result
 
-    if asset not in input_file_handle.sheets.names():
-        raise RP2ValueError(f"Error: sheet {asset} does not exist in {Path(input_file_handle.docname).resolve()}")
-    input_sheet: Any = input_file_handle.sheets[asset]
 
-    unfiltered_transaction_sets: Dict[EntrySetType, TransactionSet] = {}
+# Parse a ledger, i.e. a sheet whose IN / OUT / INTRA tables contain transactions of multiple assets (identified by the asset column). The
+# sheet is read only once: its rows are partitioned by asset and the input data of all the given assets is returned (sorted by asset).
+# Rows of other assets are skipped. If a cache is passed, it's used only if it contains the input data of all the given assets.
+def parse_ledger(
+    configuration: Configuration,
+    ledger_name: str,
+    assets: List[str],
+    input_file_handle: AbstractInputReader,
+    cache: Optional[InputDataCache] = None,
+) -> Dict[str, InputData]:
+
+    Configuration.type_check("configuration", configuration)
+    configuration.type_check_string("ledger_name", ledger_name)
+    if not isinstance(assets, list):
+        raise RP2TypeError(f"Parameter 'assets' is not a list: {assets}")
+    asset: str
+    for asset in assets:
+        configuration.type_check_asset("asset", asset)
+    AbstractInputReader.type_check("input_file_handle", input_file_handle)
+
+    if not input_file_handle.has_sheet(ledger_name):
+        raise RP2ValueError(f"Error: sheet {ledger_name} does not exist in {Path(input_file_handle.input_file_path).resolve()}")
+
+    result: Dict[str, InputData]
+    if cache is None:
+        return _parse_sheet(configuration, ledger_name, input_file_handle, sorted(assets), is_ledger=True)
+
+    InputDataCache.type_check("cache", cache)
+    # The digest is qualified with the ledger name, so that ledger entries never collide with single-asset sheet entries
+    sheet_digest: str = f"{ledger_name}:{input_file_handle.get_sheet_digest(ledger_name)}"
+    asset_2_cache_key: Dict[str, str] = {asset: InputDataCache.get_key(configuration, asset, sheet_digest) for asset in sorted(assets)}
+    result = {}
+    for asset, cache_key in asset_2_cache_key.items():
+        input_data: Optional[InputData] = cache.load(cache_key)
+        if input_data is None:
+            break
+        result[asset] = input_data
+    else:
+        LOGGER.debug("%s: Loaded input data from cache", ledger_name)
+        return result
+    result = _parse_sheet(configuration, ledger_name, input_file_handle, sorted(assets), is_ledger=True)
+    for asset, cache_key in asset_2_cache_key.items():
+        cache.store(cache_key, result[asset])
+    return result
 
-    unfiltered_transaction_sets[EntrySetType.IN] = TransactionSet(configuration, "IN", asset, MIN_DATE, MAX_DATE)
-    unfiltered_transaction_sets[EntrySetType.OUT] = TransactionSet(configuration, "OUT", asset, MIN_DATE, MAX_DATE)
-    unfiltered_transaction_sets[EntrySetType.INTRA] = TransactionSet(configuration, "INTRA", asset, MIN_DATE, MAX_DATE)
 
-    artificial_transaction_list: List[AbstractTransaction] = []
+def _create_transaction_sets(configuration: Configuration, asset: str) -> Dict[EntrySetType, TransactionSet]:
+    return {
+        EntrySetType.IN: TransactionSet(configuration, "IN", asset, MIN_DATE, MAX_DATE),
+        EntrySetType.OUT: TransactionSet(configuration, "OUT", asset, MIN_DATE, MAX_DATE),
+        EntrySetType.INTRA: TransactionSet(configuration, "INTRA", asset, MIN_DATE, MAX_DATE),
+    }
+
+
+# Parse a sheet and return the input data of the given assets. If is_ledger is False, the sheet contains only transactions of the asset
+# it's named after (assets contains only that asset); otherwise the sheet is a ledger containing transactions of multiple assets, which are
+# partitioned by the value of their asset column.
+def _parse_sheet(  # pylint: disable=too-many-branches
+    configuration: Configuration, sheet_name: str, input_file_handle: AbstractInputReader, assets: List[str], is_ledger: bool
+) -> Dict[str, InputData]:
+
+    asset: str
+    asset_2_unfiltered_transaction_sets: Dict[str, Dict[EntrySetType, TransactionSet]] = {
+        asset: _create_transaction_sets(configuration, asset) for asset in assets
+    }
+    asset_2_artificial_transaction_list: Dict[str, List[AbstractTransaction]] = {asset: [] for asset in assets}
+    # Position of the asset column in each table (used to partition ledger rows)
+    entry_set_type_2_asset_column: Dict[EntrySetType, int] = {
+        EntrySetType.IN: configuration.get_in_table_column_position("asset"),
+        EntrySetType.OUT: configuration.get_out_table_column_position("asset"),
+        EntrySetType.INTRA: configuration.get_intra_table_column_position("asset"),
+    }
+    # Transaction factories are created once per sheet, rather than looking up table layout and transaction class on each row
+    entry_set_type_2_transaction_factory: Dict[EntrySetType, _TransactionFactory] = {
+        entry_set_type: _TransactionFactory(configuration, entry_set_type) for entry_set_type in _TABLE_BEGIN_TYPES
+    }
+    # When to_date is set, transaction lines that occurred after it are kept as raw rows instead of being turned into transactions: the tax
+    # engine, balances and reports never read past to_date (their results only depend on earlier transactions), so these rows are
+    # materialized only if an asset would otherwise be left with no IN transactions (see below). Their cells are still checked.
+    to_date: Optional[date] = configuration.to_date if configuration.to_date < MAX_DATE else None
+    asset_2_deferred_rows: Dict[str, List[_TransactionRow]] = {asset: [] for asset in assets}
+    # Transaction lines of the current table whose transactions haven't been created yet: they are created in batches (see
+    # _TransactionFactory.create_transactions()).
+    pending_rows: List[_TransactionRow] = []
+    # Table types for which at least one transaction line was found
+    non_empty_table_types: Set[EntrySetType] = set()
 
     current_table_type: Optional[EntrySetType] = None
     current_table_row_count: int = 0
     i: int = 0
-    row: Any = None
+    row_values: List[Any]
     # Used for artificial transactions only: e.g. the fee-only transaction that is created artificially to model crypto fee of in-transactions.
     # Artificial internal ids are negative.
     artificial_internal_id = 0
-    for i, row in enumerate(input_sheet.rows()):
+    # Rows are streamed from the input file one at a time (see AbstractInputReader), so memory usage doesn't depend on the size of the sheet.
+    for i, row_values in enumerate(input_file_handle.rows(sheet_name)):
         artificial_internal_id -= 1
-        cell0_value: str = row[0].value
-        # The numeric elements of the row_values list are used to initialize RP2Decimal instances. In theory we could collect string representations
-        # from numeric strings using the plaintext() method of Cell, but this doesn't work well because of an ezodf limitation: such strings are
-        # affected by the format of their cell (so they may be less precise than their real value, depending on cell format), so as a workaround
-        # we read the value attribute which returns a float. In theory this could cause precision loss, but in reality most of the input data from
-        # wallets / exchanges is very low-precision, so using a float is almost always adequate. The only exception would be if a wallet / exchange
-        # input data had numbers with more than CRYPTO_DECIMALS (defined in rp2_decimal.py) decimal digits, which is quite uncommon: in this case
-        # RP2 would still work, but it would have a little precision loss on these high-precision numbers. Also read the comments in
-        # _process_constructor_argument_pack().
-        row_values: List[Any] = [cell.value for cell in row]
-        LOGGER.debug("parsing row: %s", row_values)
+        cell0_value: str = row_values[0]
+        # Parse the first cell only once: it's either a table-begin keyword (in which case this is its type) or not (None)
+        cell0_table_type: Optional[EntrySetType] = _get_table_begin_type(cell0_value)
+        # The numeric elements of the row_values list are either exact Decimal values (read from the office:value attribute of numeric cells
+        # by ODSReader) or strings (CSVReader), so they are turned into RP2Decimal instances without any precision loss. Also read the
+        # comments in _process_numeric_arguments().
 
         if current_table_type is not None:
             # Inside a table
-            if _is_table_begin(cell0_value):
+            if cell0_table_type is not None:
                 # Found a nested table begin
-                raise RP2ValueError(f'{asset}({i + 1}): Found "{cell0_value}" keyword while parsing table {current_table_type}')
+                raise RP2ValueError(f'{sheet_name}({i + 1}): Found "{cell0_value}" keyword while parsing table {current_table_type}')
             if _is_empty(cell0_value):
                 # Found an empty cell inside a table
-                raise RP2ValueError(f"{asset}({i + 1}): Found an empty cell while parsing table {current_table_type}")
+                raise RP2ValueError(f"{sheet_name}({i + 1}): Found an empty cell while parsing table {current_table_type}")
 
         else:
             # Outside a table
             if _is_table_end(cell0_value):
                 # Found a spurious table end
-                raise RP2ValueError(f"{asset}({i + 1}): Found end-table keyword without having found a table-begin keyword first")
-            if not _is_empty(cell0_value) and not _is_table_begin(cell0_value):
+                raise RP2ValueError(f"{sheet_name}({i + 1}): Found end-table keyword without having found a table-begin keyword first")
+            if not _is_empty(cell0_value) and cell0_table_type is None:
                 # Found a non-empty and non-table-begin cell outside a table
-                raise RP2ValueError(f'{asset}({i + 1}): Found an invalid cell "{cell0_value}" while looking for a table-begin token')
+                raise RP2ValueError(f'{sheet_name}({i + 1}): Found an invalid cell "{cell0_value}" while looking for a table-begin token')
 
-        if _is_table_begin(cell0_value):
+        if cell0_table_type is not None:
             # New table start
             current_table_row_count = 0
-            current_table_type = _get_entry_set_type(cell0_value)
-            if current_table_type and not unfiltered_transaction_sets[current_table_type].is_empty():
+            current_table_type = cell0_table_type
+            if current_table_type in non_empty_table_types:
                 # Found an already-processed table type
-                raise RP2ValueError(f"{asset}({i + 1}): Found more than one {cell0_value} symbol")
+                raise RP2ValueError(f"{sheet_name}({i + 1}): Found more than one {cell0_value} symbol")
         elif _is_table_end(cell0_value):
             # Table end
+            _create_and_process_transactions(
+                configuration, entry_set_type_2_transaction_factory, pending_rows, asset_2_unfiltered_transaction_sets, asset_2_artificial_transaction_list
+            )
+            pending_rows.clear()
             current_table_type = None
         elif current_table_type is not None and current_table_row_count == 1:
             # Header line: make sure it's not transaction data
-            try:
-                _create_transaction(configuration, current_table_type, i + 1, row_values)
-            except Exception:  # pylint: disable=broad-except  # nosec
-                # Couldn't create transaction as expected: this is a table header
-                # TODO: this could still be a transaction but with some bad fields that would  # pylint: disable=fixme
-                # cause an exception. In this case this logic would incorrectly assume it's a
-                # header. Can we do better in this case? Some heuristics testing field by
-                # field might help.
-                pass
-            else:
-                raise RP2ValueError(f"{asset}({i + 1}): Found data with no header")
+            if entry_set_type_2_transaction_factory[current_table_type].is_transaction_data(row_values):
+                raise RP2ValueError(f"{sheet_name}({i + 1}): Found data with no header")
         elif current_table_type is not None and current_table_row_count > 1:
             # Transaction line
-            _create_and_process_transaction(
-                configuration, row_values, current_table_type, i + 1, artificial_internal_id, unfiltered_transaction_sets, artificial_transaction_list
-            )
+            non_empty_table_types.add(current_table_type)
+            asset = sheet_name
+            if is_ledger:
+                asset_column: int = entry_set_type_2_asset_column[current_table_type]
+                if asset_column >= len(row_values) or row_values[asset_column] is None:
+                    raise RP2ValueError(f"{sheet_name}({i + 1}): Found a transaction with no asset")
+                asset = configuration.type_check_asset("asset", row_values[asset_column])
+                if asset not in asset_2_unfiltered_transaction_sets:
+                    # Transaction of an asset that wasn't requested: skip it
+                    current_table_row_count += 1
+                    continue
+            transaction_row: _TransactionRow = _TransactionRow(current_table_type, asset, i + 1, artificial_internal_id, row_values)
+            if to_date is not None and entry_set_type_2_transaction_factory[current_table_type].is_after(row_values, to_date):
+                asset_2_deferred_rows[asset].append(transaction_row)
+            else:
+                pending_rows.append(transaction_row)
+                if len(pending_rows) >= _TRANSACTION_ROW_BATCH_SIZE:
+                    _create_and_process_transactions(
+                        configuration,
+                        entry_set_type_2_transaction_factory,
+                        pending_rows,
+                        asset_2_unfiltered_transaction_sets,
+                        asset_2_artificial_transaction_list,
+                    )
+                    pending_rows.clear()
         current_table_row_count += 1
 
     if current_table_type is not None:
+        # Transaction lines are reported before the missing table end (as if they had been processed one at a time)
+        _create_and_process_transactions(
+            configuration, entry_set_type_2_transaction_factory, pending_rows, asset_2_unfiltered_transaction_sets, asset_2_artificial_transaction_list
+        )
         raise RP2ValueError(f"TABLE END not found for {current_table_type} table")
-    if unfiltered_transaction_sets[EntrySetType.IN].is_empty():
-        raise RP2ValueError(f"{asset}: IN table not found or empty")
-
-    for transaction in artificial_transaction_list:
-        if isinstance(transaction, InTransaction):
-            unfiltered_transaction_sets[EntrySetType.IN].add_entry(transaction)
-        elif isinstance(transaction, OutTransaction):
-            unfiltered_transaction_sets[EntrySetType.OUT].add_entry(transaction)
-        elif isinstance(transaction, IntraTransaction):
-            unfiltered_transaction_sets[EntrySetType.INTRA].add_entry(transaction)
-        else:
-            raise RP2ValueError(f"Internal error: invalid transaction class: {transaction}")
-
-    return InputData(
-        asset,
-        unfiltered_transaction_sets[EntrySetType.IN],
-        unfiltered_transaction_sets[EntrySetType.OUT],
-        unfiltered_transaction_sets[EntrySetType.INTRA],
-        configuration.from_date,
-        configuration.to_date,
+
+    result: Dict[str, InputData] = {}
+    for asset in assets:
+        unfiltered_transaction_sets: Dict[EntrySetType, TransactionSet] = asset_2_unfiltered_transaction_sets[asset]
+        deferred_rows: List[_TransactionRow] = asset_2_deferred_rows[asset]
+        table_type: EntrySetType
+        table_rows: Iterator[_TransactionRow]
+        if deferred_rows and unfiltered_transaction_sets[EntrySetType.IN].is_empty():
+            # All IN transactions occurred after to_date: fall back to creating all transactions, so that the input data is the same as
+            # without deferral (InputData requires a non-empty IN set). Deferred rows are in sheet order, so rows of the same table are
+            # contiguous.
+            for _, table_rows in groupby(deferred_rows, key=_get_table_type):
+                _create_and_process_transactions(
+                    configuration,
+                    entry_set_type_2_transaction_factory,
+                    list(table_rows),
+                    asset_2_unfiltered_transaction_sets,
+                    asset_2_artificial_transaction_list,
+                )
+        elif deferred_rows:
+            # The transactions aren't needed, but their rows are checked like the other ones, so that to_date doesn't change input validation
+            for table_type, table_rows in groupby(deferred_rows, key=_get_table_type):
+                deferred_table_rows: List[_TransactionRow] = list(table_rows)
+                entry_set_type_2_transaction_factory[table_type].check_transactions(
+                    [transaction_row.internal_id for transaction_row in deferred_table_rows],
+                    [transaction_row.row_values for transaction_row in deferred_table_rows],
+                )
+            LOGGER.debug("%s: Skipped %d transactions that occurred after %s", asset, len(deferred_rows), to_date)
+        if unfiltered_transaction_sets[EntrySetType.IN].is_empty():
+            raise RP2ValueError(f"{asset}: IN table not found or empty")
+
+        for transaction in asset_2_artificial_transaction_list[asset]:
+            if isinstance(transaction, InTransaction):
+                unfiltered_transaction_sets[EntrySetType.IN].add_entry(transaction)
+            elif isinstance(transaction, OutTransaction):
+                unfiltered_transaction_sets[EntrySetType.OUT].add_entry(transaction)
+            elif isinstance(transaction, IntraTransaction):
+                unfiltered_transaction_sets[EntrySetType.INTRA].add_entry(transaction)
+            else:
+                raise RP2ValueError(f"Internal error: invalid transaction class: {transaction}")
+
+        result[asset] = InputData(
+            asset,
+            unfiltered_transaction_sets[EntrySetType.IN],
+            unfiltered_transaction_sets[EntrySetType.OUT],
+            unfiltered_transaction_sets[EntrySetType.INTRA],
+            configuration.from_date,
+            configuration.to_date,
+        )
+
+    return result
+
+
+def _get_table_type(transaction_row: _TransactionRow) -> EntrySetType:
+    return transaction_row.table_type
+
+
+# Creates the transactions of the given rows (which belong to the same table) and adds them to the transaction sets of their asset.
+def _create_and_process_transactions(
+    configuration: Configuration,
+    entry_set_type_2_transaction_factory: Dict[EntrySetType, "_TransactionFactory"],
+    transaction_rows: List[_TransactionRow],
+    asset_2_unfiltered_transaction_sets: Dict[str, Dict[EntrySetType, TransactionSet]],
+    asset_2_artificial_transaction_list: Dict[str, List[AbstractTransaction]],
+) -> None:
+    if not transaction_rows:
+        return
+    transactions: List[AbstractTransaction] = entry_set_type_2_transaction_factory[transaction_rows[0].table_type].create_transactions(
+        [transaction_row.internal_id for transaction_row in transaction_rows], [transaction_row.row_values for transaction_row in transaction_rows]
     )
+    transaction_row: _TransactionRow
+    transaction: AbstractTransaction
+    for transaction_row, transaction in zip(transaction_rows, transactions):
+        _process_transaction(
+            configuration,
+            transaction,
+            transaction_row.table_type,
+            transaction_row.internal_id,
+            transaction_row.artificial_internal_id,
+            asset_2_unfiltered_transaction_sets[transaction_row.asset],
+            asset_2_artificial_transaction_list[transaction_row.asset],
+        )
 
 
-def _create_and_process_transaction(
+def _process_transaction(
     configuration: Configuration,
-    row_values: List[Any],
+    transaction: AbstractTransaction,
     current_table_type: EntrySetType,
     internal_id: int,
     artificial_internal_id: int,
@@ -165,8 +374,6 @@ def _create_and_process_transaction(
     artificial_transaction_list: List[AbstractTransaction],
 ) -> None:
 
-    transaction: AbstractTransaction = _create_transaction(configuration, current_table_type, internal_id, row_values)
-
     if isinstance(transaction, InTransaction) and transaction.is_crypto_fee_defined:
         # If an InTransaction has crypto fee defined it is split into two transactions:
         # - InTransaction with crypto_fee set to 0, but fiat_fee left as-is (the fiat-converted value of crypto_fee),
@@ -175,7 +382,7 @@ def _create_and_process_transaction(
         # fields are updated with a description of the above.
         notes: str = f"{transaction.notes}; " if transaction.notes else ""
         notes = (
-            f"{notes}This transaction has a crypto fee of {transaction.crypto_fee} {transaction.asset}, "
+            f"{notes}This transaction has a crypto fee of {transaction.crypto_fee:.11f} {transaction.asset}, "
             "which is modeled with an artificial, fee-only out-transaction (look for it among out-transactions)"
         )
 
@@ -212,7 +419,7 @@ def _create_and_process_transaction(
                 internal_id=artificial_internal_id,
                 unique_id=transaction.unique_id,
                 notes=(
-                    f"Artificial transaction modeling the crypto fee of {transaction.crypto_fee} {transaction.asset} "
+                    f"Artificial transaction modeling the crypto fee of {transaction.crypto_fee:.11f} {transaction.asset} "
                     f"of the in-transaction that occurred on {transaction.timestamp} (look for it among in-transactions)"
                 ),
             )
@@ -221,10 +428,11 @@ def _create_and_process_transaction(
         unfiltered_transaction_sets[current_table_type].add_entry(transaction)
 
 
-# Returns all numeric parameters of the constructor: used in construction of __init__ argument pack to parse such parameters as decimals
+# Returns all numeric parameters of the constructor, mapped to whether they are optional: used in construction of __init__ argument pack to
+# parse such parameters as decimals
 @lru_cache(maxsize=None, typed=False)
-def _get_decimal_constructor_argument_names(class_name: str) -> List[str]:
-    result: List[str] = []
+def _get_decimal_constructor_argument_names(class_name: str) -> Dict[str, bool]:
+    result: Dict[str, bool] = {}
     class_to_inspect: Any
     if class_name not in globals():
         raise Exception(f"Internal error: couldn't find class {class_name}")
@@ -234,83 +442,214 @@ def _get_decimal_constructor_argument_names(class_name: str) -> List[str]:
     arg_spec = inspect.getfullargspec(class_to_inspect.__init__)
     for parameter_name, parameter_type in arg_spec.annotations.items():
         if parameter_type in [RP2Decimal, Optional[RP2Decimal]]:
-            result.append(parameter_name)
+            result[parameter_name] = parameter_type != RP2Decimal
     return result
 
 
-# Add configuration and internal_id to argument pack and turn floats to strings to maximize decimal precision. See comment inside the function.
-def _process_constructor_argument_pack(
-    configuration: Configuration,
-    argument_pack: Dict[str, Any],
-    internal_id: int,
-    class_name: str,
-) -> Dict[str, Any]:
-    argument_pack.update({"configuration": configuration, "internal_id": internal_id})
-    numeric_parameters: List[str] = _get_decimal_constructor_argument_names(class_name)
+# Turn the numeric values of the argument pack into RP2Decimal. See comment inside the function.
+def _process_numeric_arguments(argument_pack: Dict[str, Any], numeric_parameters: Dict[str, bool]) -> None:
     for numeric_parameter in numeric_parameters:
         if numeric_parameter in argument_pack:
             try:
                 value = argument_pack[numeric_parameter]
+                if value is None:
+                    continue
+                if isinstance(value, Decimal):
+                    # The reader returns numeric cells as exact Decimal values (parsed from the office:value string attribute), so they can be
+                    # turned into RP2Decimal directly, with no float formatting / parsing and no precision loss.
+                    argument_pack[numeric_parameter] = RP2Decimal(value)
+                    continue
                 if value == "__unknown":
                     # If value is __unknown, this transaction has been generated by DaLI and it is unresolved
-                    del argument_pack["configuration"]
                     raise Exception(
                         f"Encountered an unresolved DaLI transaction (read DaLI's documentation / FAQ to learn how to resolve this issue): {argument_pack}"
                     )
-
-                # It would be ideal to pass a string directly to the RP2Decimal constructor for maximum precision, but due to ezodf limitations we
-                # cannot get the string representation directly from the spreadsheet (see the comment on cell format inside parse_ods() for more
-                # detail), so at parse time we have to get the float value from the cell. Here we convert the float to string, which allows us to
-                # initialize a maximum-precision RP2Decimal (11 decimal digits is enough precision for millisats).
-                argument_pack[numeric_parameter] = RP2Decimal(f"{value:.11f}") if value is not None else None
+                if not isinstance(value, str):
+                    raise ValueError(f"Non-numeric value: {value}")
+                # Text input (e.g. CSV) has no cell types: numeric values are strings
+                try:
+                    argument_pack[numeric_parameter] = RP2Decimal(value)
+                except InvalidOperation as exc:
+                    raise ValueError(f"Non-numeric value: {value}") from exc
             except (ValueError, RP2Error) as exc:
                 raise RP2ValueError(f"Argument '{numeric_parameter}' has non-numeric value: {value}") from exc
 
-    return argument_pack
-
 
-def _create_transaction(
-    configuration: Configuration,
-    entry_set_type: EntrySetType,
-    internal_id: int,
-    row_values: List[Any],
-) -> AbstractTransaction:
-    transaction: AbstractTransaction
-    EntrySetType.type_check("entry_set_type", entry_set_type)
-    configuration.type_check_internal_id("internal_id", internal_id)
-    if entry_set_type == EntrySetType.IN:
-        argument_pack: Dict[str, Any] = configuration.get_in_table_constructor_argument_pack(row_values)
-        argument_pack = _process_constructor_argument_pack(configuration, argument_pack, internal_id, "InTransaction")
-        transaction = InTransaction(**argument_pack)
-    elif entry_set_type == EntrySetType.OUT:
-        argument_pack = configuration.get_out_table_constructor_argument_pack(row_values)
-        argument_pack = _process_constructor_argument_pack(configuration, argument_pack, internal_id, "OutTransaction")
-        transaction = OutTransaction(**argument_pack)
-    elif entry_set_type == EntrySetType.INTRA:
-        argument_pack = configuration.get_intra_table_constructor_argument_pack(row_values)
-        argument_pack = _process_constructor_argument_pack(configuration, argument_pack, internal_id, "IntraTransaction")
-        transaction = IntraTransaction(**argument_pack)
-    return transaction
+# Creates the transactions of one table type. The table layout (row extractor), the transaction class and its numeric arguments are looked
+# up once, when the factory is created, instead of once per row.
+class _TransactionFactory:
+    def __init__(self, configuration: Configuration, entry_set_type: EntrySetType) -> None:
+        self.__configuration: Configuration = configuration
+        self.__transaction_class: Type[AbstractTransaction]
+        self.__create_unchecked: Callable[..., AbstractTransaction]
+        self.__get_argument_pack: Callable[[List[Any]], Dict[str, Any]]
+        self.__get_argument_columns: Callable[[List[List[Any]]], Dict[str, List[Any]]]
+        self.__timestamp_column: int
+        # Timestamps of the table's timestamp column: the parser infers their format (see TimestampParser)
+        self.__timestamp_parser: TimestampParser = TimestampParser()
+        # pylint: disable=protected-access
+        if entry_set_type == EntrySetType.IN:
+            self.__transaction_class = InTransaction
+            self.__create_unchecked = InTransaction._create_unchecked
+            self.__get_argument_pack = configuration.get_in_table_constructor_argument_pack
+            self.__get_argument_columns = configuration.get_in_table_constructor_argument_columns
+            self.__timestamp_column = configuration.get_in_table_column_position("timestamp")
+        elif entry_set_type == EntrySetType.OUT:
+            self.__transaction_class = OutTransaction
+            self.__create_unchecked = OutTransaction._create_unchecked
+            self.__get_argument_pack = configuration.get_out_table_constructor_argument_pack
+            self.__get_argument_columns = configuration.get_out_table_constructor_argument_columns
+            self.__timestamp_column = configuration.get_out_table_column_position("timestamp")
+        elif entry_set_type == EntrySetType.INTRA:
+            self.__transaction_class = IntraTransaction
+            self.__create_unchecked = IntraTransaction._create_unchecked
+            self.__get_argument_pack = configuration.get_intra_table_constructor_argument_pack
+            self.__get_argument_columns = configuration.get_intra_table_constructor_argument_columns
+            self.__timestamp_column = configuration.get_intra_table_column_position("timestamp")
+        else:
+            raise RP2ValueError(f"Internal error: invalid table type: {entry_set_type}")
+        self.__numeric_parameters: Dict[str, bool] = _get_decimal_constructor_argument_names(self.__transaction_class.__name__)
+        # Checks of the arguments that can only have a value among the ones in the configuration
+        self.__known_value_checks: Dict[str, Callable[[str, str], str]] = {
+            "asset": configuration.type_check_asset,
+            "exchange": configuration.type_check_exchange,
+            "holder": configuration.type_check_holder,
+            "from_exchange": configuration.type_check_exchange,
+            "from_holder": configuration.type_check_holder,
+            "to_exchange": configuration.type_check_exchange,
+            "to_holder": configuration.type_check_holder,
+        }
+
+    # Used on the row that follows a table-begin keyword, which is expected to be the table header: the row is considered transaction data if
+    # its timestamp and numeric cells are valid (header cells contain column names). This only checks the cells: no transaction is created.
+    def is_transaction_data(self, row_values: List[Any]) -> bool:
+        try:
+            argument_pack: Dict[str, Any] = self.__get_argument_pack(row_values)
+            Configuration.type_check_timestamp_from_string("timestamp", argument_pack["timestamp"], self.__timestamp_parser)
+            _process_numeric_arguments(argument_pack, self.__numeric_parameters)
+        except RP2Error:
+            return False
+        return True
+
+    # Only the timestamp cell is parsed. Rows whose timestamp can't be parsed return False: their transaction is then created as usual, which
+    # reports the error.
+    def is_after(self, row_values: List[Any], to_date: date) -> bool:
+        if self.__timestamp_column >= len(row_values):
+            return False
+        try:
+            timestamp: datetime = Configuration.type_check_timestamp_from_string("timestamp", row_values[self.__timestamp_column], self.__timestamp_parser)
+        except RP2Error:
+            return False
+        return timestamp.date() > to_date
+
+    def create_transaction(self, internal_id: int, row_values: List[Any]) -> AbstractTransaction:
+        argument_pack: Dict[str, Any] = self.__get_argument_pack(row_values)
+        argument_pack["internal_id"] = internal_id
+        _process_numeric_arguments(argument_pack, self.__numeric_parameters)
+        argument_pack["configuration"] = self.__configuration
+        return self.__transaction_class(**argument_pack)
+
+    # Creates the transactions of the given rows. The arguments are checked column by column (e.g. the values of the exchange column are
+    # checked once per distinct value) and the transactions are created with the trusted constructor, which only performs the checks that
+    # involve more than one argument. If a value doesn't pass the column checks, the transactions are created one by one with the regular
+    # constructor instead: this way the error that is reported is the same as the one of the first invalid row.
+    def create_transactions(self, internal_ids: List[int], rows: List[List[Any]]) -> List[AbstractTransaction]:
+        columns: Optional[Dict[str, List[Any]]] = None
+        try:
+            columns = self.__check_columns(rows)
+        except RP2Error:
+            pass
+        if columns is None:
+            result: List[AbstractTransaction] = []
+            for internal_id, row_values in zip(internal_ids, rows):
+                LOGGER.debug("parsing row: %s", row_values)
+                result.append(self.create_transaction(internal_id, row_values))
+            return result
+
+        argument_names: List[str] = list(columns)
+        create_unchecked: Callable[..., AbstractTransaction] = self.__create_unchecked
+        configuration: Configuration = self.__configuration
+        return [
+            create_unchecked(configuration=configuration, internal_id=internal_id, **dict(zip(argument_names, argument_values)))
+            for internal_id, argument_values in zip(internal_ids, zip(*columns.values()))
+        ]
+
+    # Checks the arguments of the given rows like create_transactions(), without creating the transactions: the column checks only, unless a value
+    # doesn't pass them, in which case the transactions are created one by one to report the error of the first invalid row.
+    def check_transactions(self, internal_ids: List[int], rows: List[List[Any]]) -> None:
+        try:
+            self.__check_columns(rows)
+        except RP2Error:
+            for internal_id, row_values in zip(internal_ids, rows):
+                LOGGER.debug("parsing row: %s", row_values)
+                self.create_transaction(internal_id, row_values)
+            raise
+
+    # Returns the checked (and converted) arguments of the given rows, column by column: the checks are the same as the ones of the transaction
+    # constructors (see the arguments of the trusted constructors).
+    def __check_columns(self, rows: List[List[Any]]) -> Dict[str, List[Any]]:
+        configuration: Configuration = self.__configuration
+        timestamp_parser: TimestampParser = self.__timestamp_parser
+        result: Dict[str, List[Any]] = {}
+        argument_name: str
+        column: List[Any]
+        for argument_name, column in self.__get_argument_columns(rows).items():
+            if argument_name == "timestamp":
+                result[argument_name] = [configuration.type_check_timestamp_from_string(argument_name, value, timestamp_parser) for value in column]
+            elif argument_name == "transaction_type":
+                value_2_transaction_type: Dict[str, TransactionType] = {
+                    value: TransactionType.type_check_from_string(argument_name, value) for value in dict.fromkeys(column)
+                }
+                result[argument_name] = [value_2_transaction_type[value] for value in column]
+            elif argument_name in self.__known_value_checks:
+                known_value_check: Callable[[str, str], str] = self.__known_value_checks[argument_name]
+                for value in dict.fromkeys(column):
+                    known_value_check(argument_name, value)
+                result[argument_name] = column
+            elif argument_name in self.__numeric_parameters:
+                result[argument_name] = self.__check_numeric_column(argument_name, column)
+            elif argument_name == "unique_id":
+                result[argument_name] = [configuration.type_check_string_or_integer(argument_name, value) if value is not None else "" for value in column]
+            elif argument_name == "notes":
+                result[argument_name] = [configuration.type_check_string(argument_name, value) if value else "" for value in column]
+            else:
+                raise RP2ValueError(f"Internal error: unknown {self.__transaction_class.__name__} argument: {argument_name}")
+        return result
+
+    # Numeric values that are far enough from zero are positive (and non-zero) without comparing them to ZERO: the other ones (negative, close to
+    # zero or not finite) are checked with type_check_positive_decimal().
+    def __check_numeric_column(self, argument_name: str, column: List[Any]) -> List[Optional[RP2Decimal]]:
+        is_optional: bool = self.__numeric_parameters[argument_name]
+        non_zero: bool = argument_name in _NON_ZERO_ARGUMENTS
+        result: List[Optional[RP2Decimal]] = []
+        value: Any
+        for value in column:
+            if value is None and is_optional:
+                result.append(None)
+                continue
+            if not isinstance(value, (Decimal, str)):
+                raise RP2ValueError(f"Argument '{argument_name}' has non-numeric value: {value}")
+            try:
+                decimal_value: RP2Decimal = RP2Decimal(value)
+            except InvalidOperation as exc:
+                raise RP2ValueError(f"Argument '{argument_name}' has non-numeric value: {value}") from exc
+            if (
+                not decimal_value.is_finite()
+                or decimal_value.is_signed()
+                or (non_zero and (not decimal_value or decimal_value.adjusted() < 1 - CRYPTO_DECIMALS))
+            ):
+                self.__configuration.type_check_positive_decimal(argument_name, decimal_value, non_zero=non_zero)
+            result.append(decimal_value)
+        return result
 
 
 def _get_entry_set_type(cell_value: str) -> Optional[EntrySetType]:
     return EntrySetType.get_entry_set_type_from_string(cell_value)
 
 
-def _is_table_in(cell_value: str) -> bool:
-    return _get_entry_set_type(cell_value) == EntrySetType.IN
-
-
-def _is_table_out(cell_value: str) -> bool:
-    return _get_entry_set_type(cell_value) == EntrySetType.OUT
-
-
-def _is_table_intra(cell_value: str) -> bool:
-    return _get_entry_set_type(cell_value) == EntrySetType.INTRA
-
-
-def _is_table_begin(cell_value: str) -> bool:
-    return _is_table_in(cell_value) or _is_table_out(cell_value) or _is_table_intra(cell_value)
+def _get_table_begin_type(cell_value: str) -> Optional[EntrySetType]:
+    result: Optional[EntrySetType] = _get_entry_set_type(cell_value)
+    return result if result in _TABLE_BEGIN_TYPES else None
 
 
 def _is_table_end(cell_value: str) -> bool:
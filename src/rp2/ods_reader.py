@@ -0,0 +1,278 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import re
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Pattern, Tuple, cast
+from xml.etree.ElementTree import Element, XMLPullParser  # nosec
+from xml.sax.saxutils import unescape  # nosec
+from zipfile import BadZipFile, ZipFile
+
+from rp2.abstract_input_reader import AbstractInputReader
+from rp2.rp2_error import RP2ValueError
+
+_CONTENT_FILE: str = "content.xml"
+_CHUNK_SIZE: int = 1024 * 1024
+
+_OFFICE_NAMESPACE: str = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+_TABLE_NAMESPACE: str = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+_TEXT_NAMESPACE: str = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+_TABLE_TAG: str = f"{{{_TABLE_NAMESPACE}}}table"
+_ROW_TAG: str = f"{{{_TABLE_NAMESPACE}}}table-row"
+_CELL_TAG: str = f"{{{_TABLE_NAMESPACE}}}table-cell"
+_COVERED_CELL_TAG: str = f"{{{_TABLE_NAMESPACE}}}covered-table-cell"
+_ROWS_REPEATED_ATTRIBUTE: str = f"{{{_TABLE_NAMESPACE}}}number-rows-repeated"
+_COLUMNS_REPEATED_ATTRIBUTE: str = f"{{{_TABLE_NAMESPACE}}}number-columns-repeated"
+_VALUE_TYPE_ATTRIBUTE: str = f"{{{_OFFICE_NAMESPACE}}}value-type"
+_PARAGRAPH_TAGS: Tuple[str, str] = (f"{{{_TEXT_NAMESPACE}}}p", f"{{{_TEXT_NAMESPACE}}}h")
+_SPACE_TAG: str = f"{{{_TEXT_NAMESPACE}}}s"
+_SPACE_COUNT_ATTRIBUTE: str = f"{{{_TEXT_NAMESPACE}}}c"
+_TAB_TAG: str = f"{{{_TEXT_NAMESPACE}}}tab"
+_LINE_BREAK_TAG: str = f"{{{_TEXT_NAMESPACE}}}line-break"
+
+_NUMERIC_VALUE_TYPES = frozenset(["float", "percentage", "currency"])
+_VALUE_TYPE_TO_ATTRIBUTE: Dict[str, str] = {
+    "float": f"{{{_OFFICE_NAMESPACE}}}value",
+    "percentage": f"{{{_OFFICE_NAMESPACE}}}value",
+    "currency": f"{{{_OFFICE_NAMESPACE}}}value",
+    "date": f"{{{_OFFICE_NAMESPACE}}}date-value",
+    "time": f"{{{_OFFICE_NAMESPACE}}}time-value",
+    "boolean": f"{{{_OFFICE_NAMESPACE}}}boolean-value",
+}
+
+# Matches the declaration of the prefix of the table namespace (normally "table") in the root element of content.xml.
+_TABLE_NAMESPACE_DECLARATION_PATTERN: Pattern[bytes] = re.compile(rb'xmlns:([A-Za-z_][\w.-]*)="' + re.escape(_TABLE_NAMESPACE.encode("utf-8")) + rb'"')
+# Repetitions of rows or cells that are greater or equal to this value are collapsed into one (same as ezodf's default "all_less_maxcount"
+# table expansion strategy).
+_MAX_REPETITIONS: int = 32
+# Longest byte sequence that can be left unmatched at the end of a chunk (the rest of a table start tag may be in the next chunk).
+_MAX_TABLE_START_TAG_LENGTH: int = 4096
+
+
+# Streaming ODS reader: it reads content.xml directly from the ODS zip file and yields one row at a time, so memory usage scales
+# with the size of a row rather than the size of the spreadsheet (ezodf builds the DOM of the entire document instead). At construction
+# time the reader scans the raw XML once to find the byte offset of each sheet: reading the rows of a sheet decompresses content.xml
+# again but only parses the XML of that sheet.
+# Row values follow the same conventions as ezodf's Cell.value (None for empty cells, the text for string cells and the raw attribute
+# string for date/time cells), except for numeric cells, which are returned as exact Decimal values instead of floats.
+class ODSReader(AbstractInputReader):
+    def __init__(self, input_file_path: str) -> None:
+        if not Path(input_file_path).exists():
+            raise RP2ValueError(f"Error: {input_file_path} does not exist")
+        self.__input_file_path: str = input_file_path
+        # Content of content.xml preceding the first sheet: it contains the root element with all namespace declarations and it's fed to
+        # the XML parser before jumping to the sheet being read.
+        self.__prefix: bytes = b""
+        self.__sheet_name_2_offset: Dict[str, int] = {}
+        self.__sheet_name_2_hash: Dict[str, "hashlib._Hash"] = {}
+        self.__sheet_name_2_digest: Dict[str, str] = {}
+        self.__sheet_names: List[str] = []
+        self.__index_sheets()
+
+    @property
+    def input_file_path(self) -> str:
+        return self.__input_file_path
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.__sheet_names)
+
+    def has_sheet(self, sheet_name: str) -> bool:
+        return sheet_name in self.__sheet_name_2_offset
+
+    # The digest covers the raw XML of the sheet.
+    def get_sheet_digest(self, sheet_name: str) -> str:
+        if sheet_name not in self.__sheet_name_2_digest:
+            raise RP2ValueError(f"Error: sheet {sheet_name} does not exist in {Path(self.__input_file_path).resolve()}")
+        return self.__sheet_name_2_digest[sheet_name]
+
+    def __open_content(self) -> Tuple[ZipFile, IO[bytes]]:
+        try:
+            zip_file: ZipFile = ZipFile(self.__input_file_path)
+        except BadZipFile as exc:
+            raise RP2ValueError(f"Error: {self.__input_file_path} is not a valid ODS file") from exc
+        try:
+            return (zip_file, zip_file.open(_CONTENT_FILE))
+        except KeyError as exc:
+            zip_file.close()
+            raise RP2ValueError(f"Error: {self.__input_file_path} is not a valid ODS file (no {_CONTENT_FILE} found)") from exc
+
+    # Sheet offsets and digests are computed in the same pass: the digest of a sheet covers the raw bytes from its start tag to the start tag
+    # of the next sheet (or to the end of content.xml for the last one).
+    def __index_sheets(self) -> None:
+        zip_file, content = self.__open_content()
+        with zip_file, content:
+            buffer: bytes = b""
+            buffer_offset: int = 0
+            sheet_hash: Optional["hashlib._Hash"] = None
+            table_start_tag_pattern: Optional[Pattern[bytes]] = None
+            table_name_pattern: Optional[Pattern[bytes]] = None
+            while True:
+                chunk: bytes = content.read(_CHUNK_SIZE)
+                buffer += chunk
+                if table_start_tag_pattern is None or table_name_pattern is None:
+                    # Sheets can be found only after the prefix of the table namespace is known (it's declared before any sheet)
+                    declaration_match: Optional["re.Match[bytes]"] = _TABLE_NAMESPACE_DECLARATION_PATTERN.search(buffer)
+                    if declaration_match is None:
+                        if not chunk:
+                            raise RP2ValueError(f"Error: {self.__input_file_path} is not a valid ODS file (no table namespace declaration found)")
+                        continue
+                    table_start_tag_pattern, table_name_pattern = _get_table_patterns(declaration_match.group(1))
+                search_end: int = 0
+                hashed_until: int = 0
+                for match in table_start_tag_pattern.finditer(buffer):
+                    offset: int = buffer_offset + match.start()
+                    if not self.__sheet_names:
+                        # The prefix accumulated so far ends at buffer_offset
+                        self.__prefix += buffer[: match.start()]
+                    if sheet_hash is not None:
+                        sheet_hash.update(buffer[hashed_until : match.start()])
+                    sheet_hash = None
+                    hashed_until = match.start()
+                    name_match: Optional["re.Match[bytes]"] = table_name_pattern.search(match.group(0))
+                    if name_match:
+                        name: str = unescape(name_match.group(1).decode("utf-8"), {"&quot;": '"', "&apos;": "'"})
+                        sheet_hash = hashlib.sha256()
+                        self.__sheet_name_2_offset.setdefault(name, offset)
+                        self.__sheet_name_2_hash.setdefault(name, sheet_hash)
+                        self.__sheet_names.append(name)
+                    search_end = match.end()
+                if not chunk:
+                    # End of file: the rest of the buffer belongs to the last sheet
+                    if sheet_hash is not None:
+                        sheet_hash.update(buffer[hashed_until:])
+                    break
+                # Keep the tail of the buffer that may contain the beginning of a table start tag split across chunks.
+                keep_from: int = max(search_end, len(buffer) - _MAX_TABLE_START_TAG_LENGTH)
+                if not self.__sheet_names:
+                    # Still looking for the first sheet: accumulate the prefix
+                    self.__prefix += buffer[:keep_from]
+                if sheet_hash is not None:
+                    sheet_hash.update(buffer[hashed_until:keep_from])
+                buffer_offset += keep_from
+                buffer = buffer[keep_from:]
+        self.__sheet_name_2_digest = {name: sheet_hash.hexdigest() for name, sheet_hash in self.__sheet_name_2_hash.items()}
+        self.__sheet_name_2_hash.clear()
+
+    # Repeated rows and cells are normalized like ezodf does by default, so that row indices and row lengths are the same as in previous RP2
+    # versions: repetitions shorter than _MAX_REPETITIONS are expanded, longer ones (e.g. the ~1M filler rows and ~1K filler columns that
+    # spreadsheet applications append at the end of a sheet) appear only once.
+    def rows(self, sheet_name: str) -> Iterator[List[Any]]:
+        if sheet_name not in self.__sheet_name_2_offset:
+            raise RP2ValueError(f"Error: sheet {sheet_name} does not exist in {Path(self.__input_file_path).resolve()}")
+        sheet_offset: int = self.__sheet_name_2_offset[sheet_name]
+
+        parser: "XMLPullParser[Element]" = XMLPullParser(events=("start", "end"))
+        parser.feed(self.__prefix)
+        element_stack: List[Element] = []
+        table_depth: int = 0
+        row_length: int = 0
+
+        zip_file, content = self.__open_content()
+        with zip_file, content:
+            skipped: int = 0
+            while True:
+                chunk: bytes = content.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if skipped < sheet_offset:
+                    # Skip everything preceding the sheet (decompression only, no XML parsing)
+                    if skipped + len(chunk) <= sheet_offset:
+                        skipped += len(chunk)
+                        continue
+                    chunk = chunk[sheet_offset - skipped :]
+                    skipped = sheet_offset
+                parser.feed(chunk)
+                parser_event: Tuple[str, Element]
+                for parser_event in cast(Iterator[Tuple[str, Element]], parser.read_events()):
+                    # Only start and end events are requested: both carry the element
+                    event, element = parser_event
+                    if event == "start":
+                        element_stack.append(element)
+                        if element.tag == _TABLE_TAG:
+                            table_depth += 1
+                        continue
+                    element_stack.pop()
+                    if element.tag == _TABLE_TAG:
+                        table_depth -= 1
+                        if table_depth == 0:
+                            # End of sheet
+                            return
+                    elif element.tag == _ROW_TAG and table_depth == 1:
+                        row_values: List[Any] = _get_row_values(element)
+                        row_length = max(row_length, len(row_values))
+                        if len(row_values) < row_length:
+                            row_values.extend([None] * (row_length - len(row_values)))
+                        for _ in range(_get_repetitions(element, _ROWS_REPEATED_ATTRIBUTE)):
+                            yield list(row_values)
+                        # Free the memory of the row just processed (and of any other completed sibling)
+                        del element_stack[-1][:]
+
+
+# Patterns matching the start tag of a sheet (but not of its rows, columns, etc.) and its name attribute in the raw content.xml stream, given
+# the prefix of the table namespace.
+def _get_table_patterns(table_prefix: bytes) -> Tuple[Pattern[bytes], Pattern[bytes]]:
+    escaped_prefix: bytes = re.escape(table_prefix)
+    return (re.compile(rb"<" + escaped_prefix + rb":table[\s>][^>]*>"), re.compile(rb"\s" + escaped_prefix + rb':name="([^"]*)"'))
+
+
+def _get_repetitions(element: Element, attribute: str) -> int:
+    repetitions: int = int(element.get(attribute, "1"))
+    return repetitions if repetitions < _MAX_REPETITIONS else 1
+
+
+def _get_row_values(row: Element) -> List[Any]:
+    result: List[Any] = []
+    for cell in row:
+        if cell.tag in (_CELL_TAG, _COVERED_CELL_TAG):
+            value: Any = _get_cell_value(cell)
+            for _ in range(_get_repetitions(cell, _COLUMNS_REPEATED_ATTRIBUTE)):
+                result.append(value)
+    return result
+
+
+def _get_cell_value(cell: Element) -> Any:
+    value_type: Optional[str] = cell.get(_VALUE_TYPE_ATTRIBUTE)
+    if value_type is None:
+        return None
+    if value_type == "string":
+        return "\n".join(_get_text(paragraph) for paragraph in cell if paragraph.tag in _PARAGRAPH_TAGS)
+    value: Optional[str] = cell.get(_VALUE_TYPE_TO_ATTRIBUTE.get(value_type, ""))
+    if value is None:
+        return None
+    if value_type in _NUMERIC_VALUE_TYPES:
+        # The office:value attribute is the exact decimal representation of the number: parsing it directly avoids the precision loss of
+        # a float round-trip.
+        return Decimal(value)
+    if value_type == "boolean":
+        return value == "true"
+    return value
+
+
+def _get_text(element: Element) -> str:
+    result: List[str] = [element.text or ""]
+    for child in element:
+        if child.tag == _SPACE_TAG:
+            result.append(" " * int(child.get(_SPACE_COUNT_ATTRIBUTE, "1")))
+        elif child.tag == _TAB_TAG:
+            result.append("\t")
+        elif child.tag == _LINE_BREAK_TAG:
+            result.append("\n")
+        else:
+            result.append(_get_text(child))
+        result.append(child.tail or "")
+    return "".join(result)
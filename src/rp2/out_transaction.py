@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime
 from typing import Callable, List, Optional
 
 from rp2.abstract_transaction import AbstractTransaction
 from rp2.configuration import Configuration
 from rp2.entry_types import TransactionType
+from rp2.fixed_point import to_fixed_point
 from rp2.logger import LOGGER
 from rp2.rp2_decimal import FIAT_DECIMAL_MASK, ZERO, RP2Decimal
 from rp2.rp2_error import RP2TypeError, RP2ValueError
@@ -24,6 +26,20 @@ from rp2.rp2_error import RP2TypeError, RP2ValueError
 
 # pylint: disable=too-many-branches
 class OutTransaction(AbstractTransaction):
+    __slots__ = (
+        "__exchange",
+        "__holder",
+        "__crypto_out_no_fee",
+        "__crypto_fee",
+        "__crypto_out_with_fee",
+        "__fiat_out_no_fee",
+        "__fiat_fee",
+        "__fiat_out_with_fee",
+        "__fixed_point_crypto_out_no_fee",
+        "__fixed_point_crypto_fee",
+        "__fixed_point_crypto_out_with_fee",
+    )
+
     def __init__(
         self,
         configuration: Configuration,
@@ -44,52 +60,93 @@ class OutTransaction(AbstractTransaction):
     ) -> None:
         super().__init__(configuration, timestamp, asset, transaction_type, spot_price, internal_id, unique_id, notes)
 
-        self.__exchange: str = configuration.type_check_exchange("exchange", exchange)
-        self.__holder: str = configuration.type_check_holder("holder", holder)
-        self.__crypto_out_no_fee: RP2Decimal
-        self.__crypto_fee: RP2Decimal
-        self.__fiat_out_with_fee: RP2Decimal
-        self.__fiat_out_no_fee: RP2Decimal
+        self.__init_out_transaction(
+            configuration.type_check_exchange("exchange", exchange),
+            configuration.type_check_holder("holder", holder),
+            configuration.type_check_positive_decimal("crypto_out_no_fee", crypto_out_no_fee),
+            configuration.type_check_positive_decimal("crypto_fee", crypto_fee),
+            configuration.type_check_positive_decimal("crypto_out_with_fee", crypto_out_with_fee, non_zero=True) if crypto_out_with_fee is not None else None,
+            configuration.type_check_positive_decimal("fiat_out_no_fee", fiat_out_no_fee, non_zero=True) if fiat_out_no_fee is not None else None,
+            configuration.type_check_positive_decimal("fiat_fee", fiat_fee) if fiat_fee is not None else None,
+        )
+
+    # Trusted constructor: see InTransaction._create_unchecked().
+    @classmethod
+    def _create_unchecked(
+        cls,
+        configuration: Configuration,
+        timestamp: datetime,
+        asset: str,
+        exchange: str,
+        holder: str,
+        transaction_type: TransactionType,
+        spot_price: RP2Decimal,
+        crypto_out_no_fee: RP2Decimal,
+        crypto_fee: RP2Decimal,
+        crypto_out_with_fee: Optional[RP2Decimal] = None,
+        fiat_out_no_fee: Optional[RP2Decimal] = None,
+        fiat_fee: Optional[RP2Decimal] = None,
+        internal_id: Optional[int] = None,
+        unique_id: str = "",
+        notes: str = "",
+    ) -> "OutTransaction":
+        result: OutTransaction = cls.__new__(cls)
+        result._init_transaction_unchecked(configuration, timestamp, asset, transaction_type, spot_price, internal_id, unique_id, notes)
+        result.__init_out_transaction(exchange, holder, crypto_out_no_fee, crypto_fee, crypto_out_with_fee, fiat_out_no_fee, fiat_fee)
+        return result
+
+    def __init_out_transaction(
+        self,
+        exchange: str,
+        holder: str,
+        crypto_out_no_fee: RP2Decimal,
+        crypto_fee: RP2Decimal,
+        crypto_out_with_fee: Optional[RP2Decimal],
+        fiat_out_no_fee: Optional[RP2Decimal],
+        fiat_fee: Optional[RP2Decimal],
+    ) -> None:
+        self.__exchange: str = exchange
+        self.__holder: str = holder
+        self.__crypto_out_no_fee: RP2Decimal = crypto_out_no_fee
+        self.__crypto_fee: RP2Decimal = crypto_fee
 
         if self.transaction_type == TransactionType.FEE:
-            self.__crypto_out_no_fee = configuration.type_check_positive_decimal("crypto_out_no_fee", crypto_out_no_fee)
             if self.__crypto_out_no_fee != ZERO:
                 raise RP2ValueError(
                     f"{self.asset} {type(self).__name__} ({self.timestamp}, id {self.internal_id}): fee-typed transaction has non-zero 'crypto_out_no_fee'"
                 )
-            self.__crypto_fee = configuration.type_check_positive_decimal("crypto_fee", crypto_fee, non_zero=True)
+            if self.__crypto_fee == ZERO:
+                raise RP2ValueError("Parameter 'crypto_fee' has zero value")
         else:
-            if spot_price == ZERO:
+            if self.spot_price == ZERO:
                 raise RP2ValueError(f"{self.asset} {type(self).__name__} ({self.timestamp}, id {self.internal_id}): parameter 'spot_price' cannot be 0")
-            self.__crypto_out_no_fee = configuration.type_check_positive_decimal("crypto_out_no_fee", crypto_out_no_fee, non_zero=True)
-            self.__crypto_fee = configuration.type_check_positive_decimal("crypto_fee", crypto_fee)
+            if self.__crypto_out_no_fee == ZERO:
+                raise RP2ValueError("Parameter 'crypto_out_no_fee' has zero value")
 
         # Crypto out with fee is optional. It can be derived from crypto out (no fee) and crypto fee, however some exchanges
         # provide it anyway. If it is provided use it as given by the exchange, if not compute it.
-        if crypto_out_with_fee is None:
-            self.__crypto_out_with_fee = self.__crypto_out_no_fee + self.crypto_fee
-        else:
-            self.__crypto_out_with_fee = configuration.type_check_positive_decimal("crypto_out_with_fee", crypto_out_with_fee, non_zero=True)
+        self.__crypto_out_with_fee: RP2Decimal = crypto_out_with_fee if crypto_out_with_fee is not None else self.__crypto_out_no_fee + self.__crypto_fee
+        # Fixed-point values of the crypto amounts (see fixed_point)
+        is_fixed_point: bool = self.configuration.fixed_point
+        self.__fixed_point_crypto_out_no_fee: Optional[int] = to_fixed_point(self.__crypto_out_no_fee) if is_fixed_point else None
+        self.__fixed_point_crypto_fee: Optional[int] = to_fixed_point(self.__crypto_fee) if is_fixed_point else None
+        self.__fixed_point_crypto_out_with_fee: Optional[int] = to_fixed_point(self.__crypto_out_with_fee) if is_fixed_point else None
 
         # Fiat out without fee and fiat fee are optional. They can be derived from crypto out (no fee), spot price and crypto fee,
         # however some exchanges provide them anyway. If they are provided use them as given by the exchange, if not compute them.
-        if fiat_out_no_fee is None:
-            self.__fiat_out_no_fee = self.__crypto_out_no_fee * self.spot_price
-        else:
-            self.__fiat_out_no_fee = configuration.type_check_positive_decimal("fiat_out_no_fee", fiat_out_no_fee, non_zero=True)
-        if fiat_fee is None:
-            self.__fiat_fee = self.__crypto_fee * self.spot_price
-        else:
-            self.__fiat_fee = configuration.type_check_positive_decimal("fiat_fee", fiat_fee)
-        self.__fiat_out_with_fee = self.__fiat_out_no_fee + self.__fiat_fee
+        self.__fiat_out_no_fee: RP2Decimal = fiat_out_no_fee if fiat_out_no_fee is not None else self.__crypto_out_no_fee * self.spot_price
+        self.__fiat_fee: RP2Decimal = fiat_fee if fiat_fee is not None else self.__crypto_fee * self.spot_price
+        self.__fiat_out_with_fee: RP2Decimal = self.__fiat_out_no_fee + self.__fiat_fee
 
         if self.transaction_type not in (TransactionType.DONATE, TransactionType.FEE, TransactionType.GIFT, TransactionType.SELL):
             raise RP2ValueError(
                 f"{self.asset} {type(self).__name__} ({self.timestamp}, id {self.internal_id}): invalid transaction type {self.transaction_type}"
             )
 
-        # If the values provided by the exchange doesn't match the computed one, log a warning.
-        if not RP2Decimal.is_equal_within_precision(self.__crypto_out_with_fee, self.__crypto_out_no_fee + self.__crypto_fee, FIAT_DECIMAL_MASK):
+        # If the values provided by the exchange doesn't match the computed one, log a warning (computed values always match).
+        if crypto_out_with_fee is not None and not RP2Decimal.is_equal_within_precision(
+            self.__crypto_out_with_fee, self.__crypto_out_no_fee + self.__crypto_fee, FIAT_DECIMAL_MASK
+        ):
             LOGGER.warning(
                 "%s %s (%s, id %s): crypto_out_with_fee != crypto_out_no_fee + crypto_fee: %f != %f",
                 self.asset,
@@ -100,7 +157,7 @@ class OutTransaction(AbstractTransaction):
                 self.__crypto_out_no_fee + self.__crypto_fee,
             )
 
-        if not RP2Decimal.is_equal_within_precision(self.__crypto_fee * self.spot_price, self.__fiat_fee, FIAT_DECIMAL_MASK):
+        if fiat_fee is not None and not RP2Decimal.is_equal_within_precision(self.__crypto_fee * self.spot_price, self.__fiat_fee, FIAT_DECIMAL_MASK):
             LOGGER.warning(
                 "%s %s (%s, id %s): crypto_fee * spot_price != fiat_fee: %f != %f",
                 self.asset,
@@ -111,7 +168,9 @@ class OutTransaction(AbstractTransaction):
                 self.__fiat_fee,
             )
 
-        if not RP2Decimal.is_equal_within_precision(self.__crypto_out_no_fee * self.spot_price, self.__fiat_out_no_fee, FIAT_DECIMAL_MASK):
+        if fiat_out_no_fee is not None and not RP2Decimal.is_equal_within_precision(
+            self.__crypto_out_no_fee * self.spot_price, self.__fiat_out_no_fee, FIAT_DECIMAL_MASK
+        ):
             LOGGER.warning(
                 "%s %s (%s, id %s): crypto_out_no_fee * spot_price != fiat_out_no_fee: %f != %f",
                 self.asset,
@@ -168,6 +227,14 @@ class OutTransaction(AbstractTransaction):
     def crypto_fee(self) -> RP2Decimal:
         return self.__crypto_fee
 
+    @property
+    def fixed_point_crypto_out_no_fee(self) -> Optional[int]:
+        return self.__fixed_point_crypto_out_no_fee
+
+    @property
+    def fixed_point_crypto_fee(self) -> Optional[int]:
+        return self.__fixed_point_crypto_fee
+
     @property
     def fiat_out_no_fee(self) -> RP2Decimal:
         return self.__fiat_out_no_fee
@@ -207,6 +274,10 @@ class OutTransaction(AbstractTransaction):
     def crypto_balance_change(self) -> RP2Decimal:
         return self.crypto_out_with_fee
 
+    @property
+    def fixed_point_crypto_balance_change(self) -> Optional[int]:
+        return self.__fixed_point_crypto_out_with_fee
+
     @property
     def fiat_balance_change(self) -> RP2Decimal:
         return self.fiat_out_with_fee
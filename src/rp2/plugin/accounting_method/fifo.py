@@ -12,29 +12,56 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Iterator, Optional
+from typing import Iterator, List, Optional
 
 from rp2.abstract_accounting_method import (
-    AbstractAccountingMethod,
+    AbstractLotPairingMethod,
     AcquiredLotsExhaustedException,
+    BatchPairing,
     TaxableEventAndAcquiredLot,
     TaxableEventsExhaustedException,
 )
 from rp2.abstract_transaction import AbstractTransaction
+from rp2.batch_fifo import pair_fifo_in_batch
 from rp2.in_transaction import InTransaction
-from rp2.rp2_decimal import RP2Decimal
+from rp2.rp2_decimal import ZERO, RP2Decimal
 
 
 # FIFO accounting method. See https://www.investopedia.com/terms/f/fifo.asp.
-class AccountingMethod(AbstractAccountingMethod):
+class AccountingMethod(AbstractLotPairingMethod):
 
     __taxable_event_iterator: Iterator[AbstractTransaction]
     __acquired_lot_iterator: Iterator[InTransaction]
+    # Lot to use before the ones in the acquired lot iterator, with its amount left (only when resuming from a checkpoint)
+    __partial_acquired_lot: Optional[InTransaction]
+    __partial_acquired_lot_amount: RP2Decimal
 
     # Iterators yield transactions in ascending chronological order
     def initialize(self, taxable_event_iterator: Iterator[AbstractTransaction], acquired_lot_iterator: Iterator[InTransaction]) -> None:
         self.__taxable_event_iterator = taxable_event_iterator
         self.__acquired_lot_iterator = acquired_lot_iterator
+        self.__partial_acquired_lot = None
+        self.__partial_acquired_lot_amount = ZERO
+
+    # Lots are disposed of in chronological order: the exhausted lots are skipped and the first lot left may be partially disposed of (the lots
+    # after it haven't been used yet).
+    def initialize_from_checkpoint(
+        self,
+        taxable_event_iterator: Iterator[AbstractTransaction],
+        acquired_lot_iterator: Iterator[InTransaction],
+        acquired_lot_amounts: List[RP2Decimal],
+    ) -> None:
+        self.initialize(taxable_event_iterator, acquired_lot_iterator)
+        amount: RP2Decimal
+        for amount in acquired_lot_amounts:
+            acquired_lot: InTransaction = next(acquired_lot_iterator)
+            if amount > ZERO:
+                self.__partial_acquired_lot = acquired_lot
+                self.__partial_acquired_lot_amount = amount
+                break
+
+    def pair_in_batch(self, taxable_events: List[AbstractTransaction], acquired_lots: List[InTransaction]) -> Optional[BatchPairing]:
+        return pair_fifo_in_batch(taxable_events, acquired_lots)
 
     def get_next_taxable_event_and_amount(
         self,
@@ -57,16 +84,28 @@ class AccountingMethod(AbstractAccountingMethod):
     def get_acquired_lot_for_taxable_event(
         self, taxable_event: AbstractTransaction, acquired_lot: Optional[InTransaction], taxable_event_amount: RP2Decimal, acquired_lot_amount: RP2Decimal
     ) -> TaxableEventAndAcquiredLot:
-        try:
-            new_acquired_lot: InTransaction = next(self.__acquired_lot_iterator)
-        except StopIteration:
-            raise AcquiredLotsExhaustedException() from None
+        new_acquired_lot: InTransaction
+        new_acquired_lot_amount: RP2Decimal
+        if self.__partial_acquired_lot is not None:
+            new_acquired_lot = self.__partial_acquired_lot
+            new_acquired_lot_amount = self.__partial_acquired_lot_amount
+            self.__partial_acquired_lot = None
+        else:
+            try:
+                new_acquired_lot = next(self.__acquired_lot_iterator)
+            except StopIteration:
+                raise AcquiredLotsExhaustedException() from None
+            new_acquired_lot_amount = new_acquired_lot.crypto_in
         return TaxableEventAndAcquiredLot(
             taxable_event=taxable_event,
             acquired_lot=new_acquired_lot,
             taxable_event_amount=taxable_event_amount - acquired_lot_amount,
-            acquired_lot_amount=new_acquired_lot.crypto_in,
+            acquired_lot_amount=new_acquired_lot_amount,
         )
 
     def validate_acquired_lot_ancestor_timestamp(self, acquired_lot: InTransaction, acquired_lot_parent: InTransaction) -> bool:
         return acquired_lot.timestamp >= acquired_lot_parent.timestamp
+
+    # The earliest available acquired lot is selected
+    def get_acquired_lot_priorities(self, acquired_lot_list: List[InTransaction]) -> List[int]:
+        return list(range(len(acquired_lot_list) - 1, -1, -1))
@@ -0,0 +1,39 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List, Tuple
+
+from rp2.abstract_specific_id import AbstractSpecificId
+from rp2.in_transaction import InTransaction
+from rp2.rp2_decimal import RP2Decimal
+
+
+# HIFO (highest in, first out) plugin: each taxable event is paired with the available acquired lot that has the highest cost basis per unit
+# (fiat in with fee / crypto in) among the lots acquired at or before it, which minimizes the realized gain. Lots with the same cost basis per
+# unit are used in chronological order. Like LIFO, the date acquired must be before or on the date sold.
+class AccountingMethod(AbstractSpecificId):
+    def _get_acquired_lot_priorities(self, acquired_lot_list: List[InTransaction]) -> List[int]:
+        # Sort by cost basis per unit (ascending) and then by reversed chronological order, so that the highest priority goes to the lot with
+        # the highest cost basis per unit and, among lots with the same one, to the earliest lot
+        sort_keys: List[Tuple[RP2Decimal, int]] = [
+            (acquired_lot.fiat_in_with_fee / acquired_lot.crypto_in, -index) for index, acquired_lot in enumerate(acquired_lot_list)
+        ]
+        result: List[int] = [0] * len(acquired_lot_list)
+        for priority, index in enumerate(sorted(range(len(acquired_lot_list)), key=sort_keys.__getitem__)):
+            result[index] = priority
+        return result
+
+    def validate_acquired_lot_ancestor_timestamp(self, acquired_lot: InTransaction, acquired_lot_parent: InTransaction) -> bool:
+        # In HIFO the acquired_lot chain can have non-monotonic timestamps, so no validation is possible. Returning True means the validation never fails.
+        return True
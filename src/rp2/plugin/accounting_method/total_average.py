@@ -0,0 +1,92 @@
+# Copyright 2021 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rp2.abstract_accounting_method import AcquiredLotsExhaustedException
+from rp2.abstract_pooled_cost_method import (
+    AbstractPooledCostMethod,
+    TaxableEventAndCostBasis,
+)
+from rp2.abstract_transaction import AbstractTransaction
+from rp2.in_transaction import InTransaction
+from rp2.rp2_decimal import ZERO, RP2Decimal
+
+
+# Total average plugin (pooled cost, computed yearly, as in the Japanese "sou-heikin-hou" method). All acquired lots (including earn-typed
+# ones, at their fiat value) go into a single pool. The cost basis of crypto disposed of in a year is the average cost of
+# the pool in that year: (cost of the pool at the start of the year + cost of the lots acquired during the year) / (quantity in the pool at the
+# start of the year + quantity acquired during the year). At the end of the year the remaining quantity is carried over to the next year at the
+# average cost. Taxable events are processed in one pass and lot-to-event pairings are never created: the extra state is the yearly acquisition
+# totals plus a few scalars.
+class AccountingMethod(AbstractPooledCostMethod):
+    def compute_cost_bases(self, taxable_events: Iterable[AbstractTransaction], acquired_lots: Iterable[InTransaction]) -> Iterator[TaxableEventAndCostBasis]:
+        # First pass on acquired lots: total quantity and cost of the lots acquired in each year
+        year_2_acquired_quantity_and_cost: Dict[int, Tuple[RP2Decimal, RP2Decimal]] = {}
+        acquired_lot: InTransaction
+        for acquired_lot in acquired_lots:
+            quantity, cost = year_2_acquired_quantity_and_cost.get(acquired_lot.timestamp.year, (ZERO, ZERO))
+            year_2_acquired_quantity_and_cost[acquired_lot.timestamp.year] = (quantity + acquired_lot.crypto_in, cost + acquired_lot.fiat_in_with_fee)
+        years: List[int] = sorted(year_2_acquired_quantity_and_cost)
+
+        # Pool at the start of the current year
+        pool_quantity: RP2Decimal = ZERO
+        pool_cost: RP2Decimal = ZERO
+        current_year: Optional[int] = None
+        average_cost: RP2Decimal = ZERO
+        disposed_quantity: RP2Decimal = ZERO
+        # Quantity held at the time of the current taxable event: acquired lots are merged with taxable events (a second pass on acquired lots)
+        # to detect taxable events disposing of crypto that hasn't been acquired yet.
+        held_quantity: RP2Decimal = ZERO
+        acquired_lot_iterator: Iterator[InTransaction] = iter(acquired_lots)
+        next_acquired_lot: Optional[InTransaction] = next(acquired_lot_iterator, None)
+
+        taxable_event: AbstractTransaction
+        for taxable_event in taxable_events:
+            while next_acquired_lot is not None and next_acquired_lot.timestamp <= taxable_event.timestamp:
+                held_quantity += next_acquired_lot.crypto_in
+                next_acquired_lot = next(acquired_lot_iterator, None)
+
+            if taxable_event.transaction_type.is_earn_type():
+                # Earn-typed taxable events have zero cost basis (the earned crypto goes into the pool as an acquired lot)
+                yield TaxableEventAndCostBasis(taxable_event, ZERO)
+                continue
+
+            year: int = taxable_event.timestamp.year
+            if year != current_year:
+                if current_year is not None:
+                    # Carry over what's left of the pool at the average cost of the year
+                    pool_quantity = pool_quantity + year_2_acquired_quantity_and_cost.get(current_year, (ZERO, ZERO))[0] - disposed_quantity
+                    pool_cost = pool_quantity * average_cost
+                # Years without taxable events are folded into the pool at their own average cost: their acquisitions are added to it at cost, so
+                # the pool carried over from them has the average cost of that year (pool cost + acquisition cost) / (pool quantity + acquired
+                # quantity). This is the intended JP behavior: the total average is computed for each year, whether or not anything was disposed
+                # of in it, and the year-end balance is carried over at that average. The acquisitions of a year without disposals are therefore
+                # not averaged with those of the next year in which something is disposed of.
+                for skipped_year in years:
+                    if (current_year is None or skipped_year > current_year) and skipped_year < year:
+                        quantity, cost = year_2_acquired_quantity_and_cost[skipped_year]
+                        pool_quantity += quantity
+                        pool_cost += cost
+                quantity, cost = year_2_acquired_quantity_and_cost.get(year, (ZERO, ZERO))
+                average_cost = (pool_cost + cost) / (pool_quantity + quantity) if pool_quantity + quantity > ZERO else ZERO
+                disposed_quantity = ZERO
+                current_year = year
+
+            amount: RP2Decimal = taxable_event.crypto_balance_change
+            if amount > held_quantity:
+                raise AcquiredLotsExhaustedException()
+            held_quantity -= amount
+            disposed_quantity += amount
+            yield TaxableEventAndCostBasis(taxable_event, amount * average_cost)
@@ -811,6 +811,10 @@ class Generator(AbstractODSGenerator):
             else:
                 acquired_lot_style = f"acquired_lot{acquired_lot_style_modifier}{border_suffix}"
                 for i in range(12, 19):
+                    if i == 16 and gain_loss.pooled_fiat_cost_basis is not None:
+                        # Pooled-cost accounting methods have no acquired lot, but they still have a cost basis
+                        self._fill_cell(sheet, row_index, i, gain_loss.fiat_cost_basis, visual_style=highlighted_style, data_style="fiat")
+                        continue
                     self._fill_cell(sheet, row_index, i, "", visual_style=f"{acquired_lot_style}")
 
             row_index += 1
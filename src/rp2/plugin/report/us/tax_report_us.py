@@ -188,7 +188,10 @@ class Generator(AbstractODSGenerator):
                 self._fill_cell(sheet, row_index, 11, gain_loss.acquired_lot.unique_id, visual_style=acquired_lot_note_vs)
             else:
                 self._fill_cell(sheet, row_index, 2, "", visual_style=transparent_vs)
-                self._fill_cell(sheet, row_index, 5, "", visual_style=transparent_vs)
+                if gain_loss.pooled_fiat_cost_basis is not None:
+                    self._fill_cell(sheet, row_index, 5, gain_loss.fiat_cost_basis, visual_style=acquired_lot_note_vs, data_style="fiat")
+                else:
+                    self._fill_cell(sheet, row_index, 5, "", visual_style=transparent_vs)
                 self._fill_cell(sheet, row_index, 10, "", visual_style=transparent_vs)
                 self._fill_cell(sheet, row_index, 11, "", visual_style=transparent_vs)
 
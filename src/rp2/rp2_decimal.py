@@ -12,7 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from decimal import Decimal, FloatOperation, getcontext
+from decimal import (
+    MAX_EMAX,
+    MAX_PREC,
+    MIN_EMIN,
+    Context,
+    Decimal,
+    DivisionByZero,
+    FloatOperation,
+    InvalidOperation,
+    Overflow,
+    setcontext,
+)
+from typing import Iterable, List
 
 from rp2.rp2_error import RP2TypeError
 
@@ -22,22 +34,80 @@ CRYPTO_DECIMAL_MASK: Decimal = Decimal("1." + "0" * int(CRYPTO_DECIMALS))
 FIAT_DECIMALS: int = 2
 FIAT_DECIMAL_MASK: Decimal = Decimal("1." + "0" * int(FIAT_DECIMALS))
 
+# Decimal context of all RP2Decimal arithmetic: arbitrarily high precision (quintillion + CRYPTO_DECIMALS digits) and float operations are
+# trapped (in addition to the default traps). Decimal contexts are thread-local, so RP2Decimal operators don't use the current context: they
+# pass this one explicitly, which makes results independent of the thread they're computed in. The context is never modified after creation
+# (except for its flags, which rp2 doesn't read), so it can be shared by all threads.
+RP2_DECIMAL_CONTEXT: Context = Context(
+    prec=CRYPTO_DECIMALS + 18,
+    traps=[DivisionByZero, FloatOperation, InvalidOperation, Overflow],
+)
+
+# Context with unbounded precision and exponent range: addition in this context never rounds (libmpdec aligns the integer coefficients of the
+# operands and adds them), so it's used to compute exact sums, which are rounded to RP2_DECIMAL_CONTEXT only once at the end.
+_EXACT_CONTEXT: Context = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN, traps=[FloatOperation, InvalidOperation])
+
+_DECIMAL_ZERO: Decimal = Decimal(0)
+
+# Methods of RP2_DECIMAL_CONTEXT used by RP2Decimal operators, bound once (they are called for every operation)
+_context_add = RP2_DECIMAL_CONTEXT.add
+_context_subtract = RP2_DECIMAL_CONTEXT.subtract
+_context_multiply = RP2_DECIMAL_CONTEXT.multiply
+_context_divide = RP2_DECIMAL_CONTEXT.divide
+_context_divide_int = RP2_DECIMAL_CONTEXT.divide_int
+_context_power = RP2_DECIMAL_CONTEXT.power
+_context_remainder = RP2_DECIMAL_CONTEXT.remainder
+_context_plus = RP2_DECIMAL_CONTEXT.plus
+_exact_add = _EXACT_CONTEXT.add
+
+
+# Installs a copy of RP2_DECIMAL_CONTEXT as the current context of the calling thread, so that Decimal operations that don't go through
+# RP2Decimal operators (e.g. formatting, or Decimal methods called on RP2Decimal instances) also use it. This is done at import time for the
+# importing thread and it must be done at the start of any other thread or worker process that uses RP2Decimal (see rp2_main).
+def install_decimal_context() -> None:
+    setcontext(RP2_DECIMAL_CONTEXT.copy())
 
-class RP2Decimal(Decimal):
 
-    # RP2Decimal initialization code. In Python there is no static constructor: the closest alternative is to add static initialization code
-    # directly inside the class. Use arbitrarily high precision (quintillion + CRYPTO_DECIMALS digits)
-    getcontext().prec = CRYPTO_DECIMALS + 18
-    getcontext().traps[FloatOperation] = True
+install_decimal_context()
 
+
+class RP2Decimal(Decimal):
     @classmethod
     def is_equal_within_precision(cls, first: "RP2Decimal", second: "RP2Decimal", precision_mask: Decimal) -> bool:
-        return (first - second).quantize(precision_mask) == ZERO
+        return (first - second).quantize(precision_mask, context=RP2_DECIMAL_CONTEXT) == ZERO
+
+    # Batched summation: the sum of the values is computed exactly (no intermediate rounding and no intermediate RP2Decimal instances) and it's
+    # rounded to the RP2Decimal context only once. The result is the same as adding the values one by one with RP2Decimal operators, unless
+    # partial sums need more than the context precision (in which case the batched result is the more accurate one).
+    @classmethod
+    def exact_sum(cls, values: Iterable[Decimal]) -> "RP2Decimal":
+        total: Decimal = _DECIMAL_ZERO
+        value: Decimal
+        for value in values:
+            if not isinstance(value, Decimal):
+                raise RP2TypeError(f"Operand has non-Decimal value {repr(value)}")
+            total = _exact_add(total, value)
+        return RP2Decimal(_context_plus(total))
+
+    # Prefix-sum variant of exact_sum(): the result contains the running sum of the values at each position (each one computed exactly and
+    # rounded once), e.g. [1, 2, 3] -> [1, 3, 6].
+    @classmethod
+    def exact_prefix_sums(cls, values: Iterable[Decimal]) -> List["RP2Decimal"]:
+        result: List[RP2Decimal] = []
+        append = result.append
+        total: Decimal = _DECIMAL_ZERO
+        value: Decimal
+        for value in values:
+            if not isinstance(value, Decimal):
+                raise RP2TypeError(f"Operand has non-Decimal value {repr(value)}")
+            total = _exact_add(total, value)
+            append(RP2Decimal(_context_plus(total)))
+        return result
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return (self - other).quantize(CRYPTO_DECIMAL_MASK).__eq__(ZERO)
+        return (self - other).quantize(CRYPTO_DECIMAL_MASK, context=RP2_DECIMAL_CONTEXT).__eq__(ZERO)
 
     def __ne__(self, other: object) -> bool:
         return not self.__eq__(other)
@@ -45,12 +115,12 @@ class RP2Decimal(Decimal):
     def __ge__(self, other: object) -> bool:
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return (self - other).quantize(CRYPTO_DECIMAL_MASK).__ge__(ZERO)
+        return (self - other).quantize(CRYPTO_DECIMAL_MASK, context=RP2_DECIMAL_CONTEXT).__ge__(ZERO)
 
     def __gt__(self, other: object) -> bool:
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return (self - other).quantize(CRYPTO_DECIMAL_MASK).__gt__(ZERO)
+        return (self - other).quantize(CRYPTO_DECIMAL_MASK, context=RP2_DECIMAL_CONTEXT).__gt__(ZERO)
 
     def __le__(self, other: object) -> bool:
         return not self.__gt__(other)
@@ -61,70 +131,70 @@ class RP2Decimal(Decimal):
     def __add__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__add__(self, other))
+        return RP2Decimal(_context_add(self, other))
 
     def __sub__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__sub__(self, other))
+        return RP2Decimal(_context_subtract(self, other))
 
     def __mul__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__mul__(self, other))
+        return RP2Decimal(_context_multiply(self, other))
 
     def __truediv__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__truediv__(self, other))
+        return RP2Decimal(_context_divide(self, other))
 
     def __floordiv__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__floordiv__(self, other))
+        return RP2Decimal(_context_divide_int(self, other))
 
     def __pow__(self, other: object, modulo: object = None) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
         if modulo is not None and not isinstance(modulo, Decimal):
             raise RP2TypeError(f"Modulo has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__pow__(self, other, modulo))
+        return RP2Decimal(_context_power(self, other, modulo))
 
     def __mod__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__mod__(self, other))
+        return RP2Decimal(_context_remainder(self, other))
 
     # Reflected operand overrides
     def __radd__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__radd__(self, other))
+        return RP2Decimal(_context_add(other, self))
 
     def __rsub__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__rsub__(self, other))
+        return RP2Decimal(_context_subtract(other, self))
 
     def __rmul__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__rmul__(self, other))
+        return RP2Decimal(_context_multiply(other, self))
 
     def __rtruediv__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__rtruediv__(self, other))
+        return RP2Decimal(_context_divide(other, self))
 
     def __rfloordiv__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__rfloordiv__(self, other))
+        return RP2Decimal(_context_divide_int(other, self))
 
     def __rmod__(self, other: object) -> "RP2Decimal":
         if not isinstance(other, Decimal):
             raise RP2TypeError(f"Operand has non-Decimal value {repr(other)}")
-        return RP2Decimal(Decimal.__rmod__(self, other))
+        return RP2Decimal(_context_remainder(other, self))
 
 
 ZERO: RP2Decimal = RP2Decimal("0")
@@ -12,32 +12,50 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import cProfile
 import os
 import sys
 from argparse import SUPPRESS, ArgumentParser, Namespace, RawTextHelpFormatter
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import date
 from importlib import import_module
 from pathlib import Path
 from pkgutil import iter_modules
 from types import ModuleType
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from rp2.abstract_accounting_method import AbstractAccountingMethod
 from rp2.abstract_country import AbstractCountry
+from rp2.abstract_input_reader import AbstractInputReader
 from rp2.abstract_report_generator import AbstractReportGenerator
 from rp2.computed_data import ComputedData
 from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
+from rp2.csv_reader import CSV_EXTENSION, TSV_EXTENSION
 from rp2.input_data import InputData
+from rp2.input_data_cache import DEFAULT_CACHE_SIZE, InputDataCache
 from rp2.logger import LOG_FILE, LOGGER
-from rp2.ods_parser import open_ods, parse_ods
-from rp2.tax_engine import compute_tax
+from rp2.lot_snapshot import (
+    LotSnapshot,
+    apply_lot_snapshot,
+    create_lot_snapshot,
+    read_lot_snapshot,
+    write_lot_snapshot,
+)
+from rp2.method_comparison import generate_method_comparison
+from rp2.ods_parser import open_csv, open_ods, parse_ledger, parse_ods
+from rp2.rp2_decimal import install_decimal_context
+from rp2.rp2_error import RP2ValueError
+from rp2.tax_engine import compute_tax, create_unfiltered_taxable_event_set
+from rp2.transaction_set import TransactionSet
 
 _VERSION: str = "1.0.5"
 
 _ACCOUNTING_METHOD_PACKAGE = "rp2.plugin.accounting_method"
 _REPORT_GENERATOR_PACKAGE = "rp2.plugin.report"
 
+_ODS_EXTENSION: str = ".ods"
+
 
 def rp2_main(country: AbstractCountry) -> None:
     if "RP2_ENABLE_PROFILER" in os.environ:
@@ -60,18 +78,44 @@ def _rp2_main_internal(country: AbstractCountry) -> None:
 
     _setup_paths(parser=parser, configuration_file=args.configuration_file, input_file=args.input_file, output_dir=args.output_dir)
 
+    if args.jobs < 1:
+        print(f"Number of jobs must be at least 1: {args.jobs}")
+        parser.print_help()
+        sys.exit(1)
+
+    if args.cache_size < 1:
+        print(f"Cache size must be at least 1 MB: {args.cache_size}")
+        parser.print_help()
+        sys.exit(1)
+
+    # Comma-separated methods are computed in the same run (duplicates are ignored)
+    method_names: List[str] = accounting_methods if args.all_methods else list(dict.fromkeys(args.method.split(",")))
+    method_name: str
+    for method_name in method_names:
+        if method_name not in accounting_methods:
+            print(f"Unknown accounting method '{method_name}': supported values are {', '.join(accounting_methods)}")
+            parser.print_help()
+            sys.exit(1)
+
     try:
         LOGGER.info("Country: %s", country.country_iso_code)
 
-        accounting_method_module: ModuleType = import_module(f"{_ACCOUNTING_METHOD_PACKAGE}.{args.method}", package=_ACCOUNTING_METHOD_PACKAGE)
-        if not hasattr(accounting_method_module, "AccountingMethod"):
-            LOGGER.error("Accounting method plugin %s doesn't have an AccountingMethod class", args.method)
-            sys.exit(1)
-        accounting_method: AbstractAccountingMethod = accounting_method_module.AccountingMethod()
-        LOGGER.info("Accounting Method: %s", args.method)
+        accounting_method_list: List[AbstractAccountingMethod] = []
+        for method_name in method_names:
+            accounting_method_module: ModuleType = import_module(f"{_ACCOUNTING_METHOD_PACKAGE}.{method_name}", package=_ACCOUNTING_METHOD_PACKAGE)
+            if not hasattr(accounting_method_module, "AccountingMethod"):
+                LOGGER.error("Accounting method plugin %s doesn't have an AccountingMethod class", method_name)
+                sys.exit(1)
+            accounting_method_list.append(accounting_method_module.AccountingMethod())
+        LOGGER.info("Accounting Method: %s", ", ".join(method_names))
 
         configuration: Configuration = Configuration(
-            configuration_path=args.configuration_file, country=country, from_date=args.from_date, to_date=args.to_date
+            configuration_path=args.configuration_file,
+            country=country,
+            from_date=args.from_date,
+            to_date=args.to_date,
+            per_wallet=args.per_wallet,
+            fixed_point=args.fixed_point,
         )
         LOGGER.info("Configuration file: %s", args.configuration_file)
         LOGGER.debug("Configuration object: %s", configuration)
@@ -89,30 +133,112 @@ def _rp2_main_internal(country: AbstractCountry) -> None:
         asset_to_computed_data: Dict[str, ComputedData] = {}
         asset: str
 
-        LOGGER.info("Input file: %s", args.input_file)
-        input_file_handle: object = open_ods(configuration=configuration, input_file_path=args.input_file)
-        for asset in assets:
-            LOGGER.info("Processing %s", asset)
-
-            input_data: InputData = parse_ods(configuration=configuration, asset=asset, input_file_handle=input_file_handle)
-            LOGGER.debug("InputData object: %s", input_data)
-
-            computed_data: ComputedData = compute_tax(configuration=configuration, accounting_method=accounting_method, input_data=input_data)
-            LOGGER.debug("ComputedData object: %s", computed_data)
+        lot_snapshot: Optional[LotSnapshot] = None
+        if args.opening_lots:
+            lot_snapshot = read_lot_snapshot(args.opening_lots)
+            LOGGER.info("Opening lots: %s (%s, as of %s)", args.opening_lots, lot_snapshot.accounting_method, lot_snapshot.cutoff_date)
+            for method_name in method_names:
+                if method_name != lot_snapshot.accounting_method:
+                    raise RP2ValueError(
+                        f"Opening lots in {args.opening_lots} were computed with accounting method {lot_snapshot.accounting_method}: "
+                        f"they can't be used with {method_name}"
+                    )
 
-            asset_to_computed_data[asset] = computed_data
-
-        # Run report generators (both country-specific and non-country-specific)
-        _find_and_run_report_generators(
-            configuration=configuration,
-            package_paths=[_REPORT_GENERATOR_PACKAGE, f"{_REPORT_GENERATOR_PACKAGE}.{country.country_iso_code}"],
-            args=args,
-            country=country,
-            accounting_method=accounting_method,
-            asset_to_computed_data=asset_to_computed_data,
-            from_date=configuration.from_date,
-            to_date=configuration.to_date,
-        )
+        LOGGER.info("Input file: %s", args.input_file)
+        input_file_handle: AbstractInputReader
+        if args.input_file.endswith(_ODS_EXTENSION):
+            input_file_handle = open_ods(configuration=configuration, input_file_path=args.input_file)
+        else:
+            input_file_handle = open_csv(configuration=configuration, input_file_path=args.input_file)
+        cache: Optional[InputDataCache] = None
+        if args.cache_dir:
+            cache = InputDataCache(cache_dir=args.cache_dir, max_size=args.cache_size * 1024 * 1024)
+            LOGGER.info("Cache directory: %s", args.cache_dir)
+        # In ledger mode the input data of all assets is parsed upfront in one pass, so only tax computation is left to do per asset
+        asset_to_input_data: Dict[str, InputData] = {}
+        if args.ledger:
+            LOGGER.info("Ledger: %s", args.ledger)
+            asset_to_input_data = parse_ledger(
+                configuration=configuration, ledger_name=args.ledger, assets=assets, input_file_handle=input_file_handle, cache=cache
+            )
+        method_2_asset_to_computed_data: Dict[str, Dict[str, ComputedData]]
+        if len(accounting_method_list) > 1:
+            method_2_asset_to_computed_data = _process_assets_with_accounting_methods(
+                configuration=configuration,
+                accounting_methods=accounting_method_list,
+                input_file_handle=input_file_handle,
+                cache=cache,
+                assets=assets,
+                asset_to_input_data=asset_to_input_data,
+                jobs=args.jobs,
+                thread_pool=args.thread_pool,
+                lot_snapshot=lot_snapshot,
+            )
+        elif args.jobs > 1 and len(assets) > 1:
+            asset_to_computed_data = _process_assets_in_parallel(
+                configuration=configuration,
+                accounting_method=accounting_method_list[0],
+                input_file_handle=input_file_handle,
+                cache=cache,
+                assets=assets,
+                asset_to_input_data=asset_to_input_data,
+                jobs=args.jobs,
+                thread_pool=args.thread_pool,
+                lot_snapshot=lot_snapshot,
+            )
+        elif args.jobs > 1 and args.per_wallet:
+            # Assets are processed sequentially, so the worker pool is used to pair the independent account partitions of each asset
+            with _create_executor(args.jobs, args.thread_pool) as partition_executor:
+                for asset in assets:
+                    asset_to_computed_data[asset] = _process_asset(
+                        configuration=configuration,
+                        accounting_method=accounting_method_list[0],
+                        input_file_handle=input_file_handle,
+                        cache=cache,
+                        asset=asset,
+                        input_data=asset_to_input_data.get(asset),
+                        executor=partition_executor,
+                        lot_snapshot=lot_snapshot,
+                    )
+        else:
+            for asset in assets:
+                asset_to_computed_data[asset] = _process_asset(
+                    configuration=configuration,
+                    accounting_method=accounting_method_list[0],
+                    input_file_handle=input_file_handle,
+                    cache=cache,
+                    asset=asset,
+                    input_data=asset_to_input_data.get(asset),
+                    lot_snapshot=lot_snapshot,
+                )
+        if len(accounting_method_list) == 1:
+            method_2_asset_to_computed_data = {accounting_method_list[0].name: asset_to_computed_data}
+
+        # Run report generators (both country-specific and non-country-specific) for each accounting method: output file names contain the
+        # method name, so the outputs of different methods don't overwrite each other
+        accounting_method: AbstractAccountingMethod
+        for accounting_method in accounting_method_list:
+            _find_and_run_report_generators(
+                configuration=configuration,
+                package_paths=[_REPORT_GENERATOR_PACKAGE, f"{_REPORT_GENERATOR_PACKAGE}.{country.country_iso_code}"],
+                args=args,
+                country=country,
+                accounting_method=accounting_method,
+                asset_to_computed_data=method_2_asset_to_computed_data[accounting_method.name],
+                from_date=configuration.from_date,
+                to_date=configuration.to_date,
+            )
+        if args.export_opening_lots:
+            for accounting_method in accounting_method_list:
+                snapshot_path: Path = write_lot_snapshot(
+                    create_lot_snapshot(configuration, accounting_method, method_2_asset_to_computed_data[accounting_method.name], args.export_opening_lots),
+                    args.output_dir,
+                    args.prefix,
+                )
+                LOGGER.info("Opening lots as of %s (%s): %s", args.export_opening_lots, accounting_method, snapshot_path)
+        if len(accounting_method_list) > 1:
+            comparison_path: Path = generate_method_comparison(method_2_asset_to_computed_data, args.output_dir, args.prefix)
+            LOGGER.info("Accounting method comparison: %s", comparison_path)
     except Exception:  # pylint: disable=broad-except
         LOGGER.exception("Fatal exception occurred:")
 
@@ -121,6 +247,172 @@ def _rp2_main_internal(country: AbstractCountry) -> None:
     LOGGER.info("Done")
 
 
+def _create_executor(max_workers: int, thread_pool: bool) -> Executor:
+    if thread_pool:
+        return ThreadPoolExecutor(max_workers=max_workers, initializer=install_decimal_context)
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=install_decimal_context)
+
+
+# Parse (unless input_data has already been parsed) and compute a single asset: this is also the unit of work of the process pool in parallel
+# mode, so its parameters and return value must be picklable. The executor, if any, is passed to compute_tax() to pair per-wallet partitions
+# concurrently: it's never used together with the asset-level pool.
+def _process_asset(
+    configuration: Configuration,
+    accounting_method: AbstractAccountingMethod,
+    input_file_handle: AbstractInputReader,
+    cache: Optional[InputDataCache],
+    asset: str,
+    input_data: Optional[InputData] = None,
+    executor: Optional[Executor] = None,
+    lot_snapshot: Optional[LotSnapshot] = None,
+) -> ComputedData:
+    LOGGER.info("Processing %s", asset)
+
+    input_data = _load_input_data(configuration, input_file_handle, cache, asset, input_data, lot_snapshot)
+
+    computed_data: ComputedData = compute_tax(
+        configuration=configuration, accounting_method=accounting_method, input_data=input_data, executor=executor, cache=cache
+    )
+    LOGGER.debug("ComputedData object: %s", computed_data)
+
+    return computed_data
+
+
+# Parse the asset (unless input_data has already been parsed) and replace the transactions that occurred on or before the cutoff date of the
+# opening lot snapshot, if any, with its opening lots.
+def _load_input_data(
+    configuration: Configuration,
+    input_file_handle: AbstractInputReader,
+    cache: Optional[InputDataCache],
+    asset: str,
+    input_data: Optional[InputData],
+    lot_snapshot: Optional[LotSnapshot],
+) -> InputData:
+    if input_data is None:
+        input_data = parse_ods(configuration=configuration, asset=asset, input_file_handle=input_file_handle, cache=cache)
+    if lot_snapshot is not None:
+        input_data = apply_lot_snapshot(configuration, input_data, lot_snapshot)
+    LOGGER.debug("InputData object: %s", input_data)
+    return input_data
+
+
+# Assets are independent of one another until report generation, so they are parsed and computed in separate processes (or threads, if
+# thread_pool is True). Results are collected in asset order (not in completion order), so report generators receive the same dictionary as in
+# sequential mode. Every worker installs the RP2Decimal context before running, like the main thread does at import time. Accounting methods
+# keep per-asset state, so in thread mode each asset gets its own copy (in process mode this happens implicitly via pickling).
+def _process_assets_in_parallel(
+    configuration: Configuration,
+    accounting_method: AbstractAccountingMethod,
+    input_file_handle: AbstractInputReader,
+    cache: Optional[InputDataCache],
+    assets: List[str],
+    asset_to_input_data: Dict[str, InputData],
+    jobs: int,
+    thread_pool: bool = False,
+    lot_snapshot: Optional[LotSnapshot] = None,
+) -> Dict[str, ComputedData]:
+    asset: str
+    asset_to_future: Dict[str, "Future[ComputedData]"] = {}
+    with _create_executor(min(jobs, len(assets)), thread_pool) as executor:
+        for asset in assets:
+            asset_to_future[asset] = executor.submit(
+                _process_asset,
+                configuration,
+                copy.deepcopy(accounting_method) if thread_pool else accounting_method,
+                input_file_handle,
+                cache,
+                asset,
+                asset_to_input_data.get(asset),
+                None,
+                lot_snapshot,
+            )
+        return {asset: asset_to_future[asset].result() for asset in assets}
+
+
+# Parse an asset and create its taxable event set: when computing multiple accounting methods this is done once per asset and the result is
+# shared by all methods.
+def _prepare_asset(
+    configuration: Configuration,
+    input_file_handle: AbstractInputReader,
+    cache: Optional[InputDataCache],
+    asset: str,
+    input_data: Optional[InputData] = None,
+    lot_snapshot: Optional[LotSnapshot] = None,
+) -> Tuple[InputData, TransactionSet]:
+    LOGGER.info("Processing %s", asset)
+
+    input_data = _load_input_data(configuration, input_file_handle, cache, asset, input_data, lot_snapshot)
+
+    return (input_data, create_unfiltered_taxable_event_set(configuration, input_data))
+
+
+def _compute_asset(
+    configuration: Configuration,
+    accounting_method: AbstractAccountingMethod,
+    cache: Optional[InputDataCache],
+    input_data: InputData,
+    unfiltered_taxable_event_set: TransactionSet,
+) -> ComputedData:
+    computed_data: ComputedData = compute_tax(
+        configuration=configuration,
+        accounting_method=accounting_method,
+        input_data=input_data,
+        unfiltered_taxable_event_set=unfiltered_taxable_event_set,
+        cache=cache,
+    )
+    LOGGER.debug("ComputedData object (%s): %s", accounting_method, computed_data)
+    return computed_data
+
+
+# Multiple accounting methods in the same run: each asset is parsed (and its taxable event set is created) once, then every (method, asset) pair
+# is computed independently. With JOBS > 1 both phases run in the worker pool, so methods are computed in parallel even for a single asset
+# (in process mode the shared input data is pickled for each pair, which is still much cheaper than parsing it again). Taxable event sets are
+# sorted when they are created, so that in thread mode they can be iterated by multiple threads at the same time.
+def _process_assets_with_accounting_methods(
+    configuration: Configuration,
+    accounting_methods: List[AbstractAccountingMethod],
+    input_file_handle: AbstractInputReader,
+    cache: Optional[InputDataCache],
+    assets: List[str],
+    asset_to_input_data: Dict[str, InputData],
+    jobs: int,
+    thread_pool: bool = False,
+    lot_snapshot: Optional[LotSnapshot] = None,
+) -> Dict[str, Dict[str, ComputedData]]:
+    asset: str
+    accounting_method: AbstractAccountingMethod
+    asset_to_prepared_data: Dict[str, Tuple[InputData, TransactionSet]]
+    if jobs == 1:
+        asset_to_prepared_data = {
+            asset: _prepare_asset(configuration, input_file_handle, cache, asset, asset_to_input_data.get(asset), lot_snapshot) for asset in assets
+        }
+        return {
+            accounting_method.name: {asset: _compute_asset(configuration, accounting_method, cache, *asset_to_prepared_data[asset]) for asset in assets}
+            for accounting_method in accounting_methods
+        }
+
+    with _create_executor(min(jobs, len(assets) * len(accounting_methods)), thread_pool) as executor:
+        asset_to_prepare_future: Dict[str, "Future[Tuple[InputData, TransactionSet]]"] = {
+            asset: executor.submit(_prepare_asset, configuration, input_file_handle, cache, asset, asset_to_input_data.get(asset), lot_snapshot)
+            for asset in assets
+        }
+        asset_to_prepared_data = {asset: asset_to_prepare_future[asset].result() for asset in assets}
+        method_and_asset_to_future: Dict[Tuple[str, str], "Future[ComputedData]"] = {}
+        for accounting_method in accounting_methods:
+            for asset in assets:
+                method_and_asset_to_future[(accounting_method.name, asset)] = executor.submit(
+                    _compute_asset,
+                    configuration,
+                    copy.deepcopy(accounting_method) if thread_pool else accounting_method,
+                    cache,
+                    *asset_to_prepared_data[asset],
+                )
+        return {
+            accounting_method.name: {asset: method_and_asset_to_future[(accounting_method.name, asset)].result() for asset in assets}
+            for accounting_method in accounting_methods
+        }
+
+
 def _find_and_run_report_generators(
     configuration: Configuration,
     package_paths: List[str],
@@ -203,6 +495,35 @@ def _setup_argument_parser(accounting_methods: List[str]) -> ArgumentParser:
         metavar="ASSET",
         type=str,
     )
+    parser.add_argument(
+        "--cache_dir",
+        action="store",
+        help=(
+            "Store parsed input data in CACHE_DIR, so that unchanged asset sheets are not parsed again, and tax computation checkpoints, so that\n"
+            "only transactions appended after the previous run are computed (default: no cache). CACHE_DIR must not be writable by other users:\n"
+            "its entries are loaded with pickle"
+        ),
+        metavar="CACHE_DIR",
+        type=str,
+    )
+    parser.add_argument(
+        "--cache_size",
+        action="store",
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Maximum size of the cache in MB: least recently used entries are evicted past this size (default: %(default)s)",
+        metavar="SIZE",
+        type=int,
+    )
+    parser.add_argument(
+        "--export_opening_lots",
+        action="store",
+        help=(
+            "Write the acquired lots that are still open at the end of DATE (in ISO 8601 format: e.g. YYYY-MM-DD) to a CSV file in OUTPUT_DIR\n"
+            "(one file per accounting method): a later run can read it with --opening_lots instead of all transactions up to DATE"
+        ),
+        metavar="DATE",
+        type=date.fromisoformat,
+    )
     parser.add_argument(
         "-f",
         "--from_date",
@@ -212,6 +533,15 @@ def _setup_argument_parser(accounting_methods: List[str]) -> ArgumentParser:
         metavar="DATE",
         type=date.fromisoformat,
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        default=1,
+        help="Parse and compute up to JOBS assets in parallel, each in a separate process (default: %(default)s)",
+        metavar="JOBS",
+        type=int,
+    )
     parser.add_argument(
         "-l",
         "--plugin",
@@ -220,15 +550,51 @@ def _setup_argument_parser(accounting_methods: List[str]) -> ArgumentParser:
         metavar="PLUGIN",
         type=str,
     )
+    parser.add_argument(
+        "--ledger",
+        action="store",
+        help=(
+            "Read the transactions of all assets from the LEDGER sheet (or CSV / TSV file), whose tables contain transactions of multiple\n"
+            "assets, instead of reading one sheet per asset: rows are partitioned by their asset column in one pass"
+        ),
+        metavar="LEDGER",
+        type=str,
+    )
+    parser.add_argument(
+        "--all_methods",
+        action="store_true",
+        help="Compute all the supported accounting methods in the same run (see METHOD)",
+    )
     parser.add_argument(
         "-m",
         "--method",
         default="fifo",
-        choices=accounting_methods,
-        help=f"accounting method (default: '%(default)s'). Supported values: {', '.join(accounting_methods)}",
+        help=(
+            f"accounting method (default: '%(default)s'). Supported values: {', '.join(accounting_methods)}. A comma-separated list of methods\n"
+            "(e.g. fifo,lifo) computes all of them in the same run, parsing the input only once: each method has its own output files and\n"
+            "an extra file compares their yearly gain/loss side by side"
+        ),
         metavar="METHOD",
         type=str,
     )
+    parser.add_argument(
+        "--opening_lots",
+        action="store",
+        help=(
+            "Use the acquired lots in FILE (written by --export_opening_lots with the same accounting method) in place of all transactions\n"
+            "that occurred on or before its cutoff date, which can then be removed from the input: results after the cutoff date don't change"
+        ),
+        metavar="FILE",
+        type=str,
+    )
+    parser.add_argument(
+        "--fixed_point",
+        action="store_true",
+        help=(
+            "Add, subtract and compare crypto amounts as scaled integers, where possible, instead of decimals: results are the same,\n"
+            "but computation is faster"
+        ),
+    )
     parser.add_argument(
         "-o",
         "--output_dir",
@@ -238,6 +604,15 @@ def _setup_argument_parser(accounting_methods: List[str]) -> ArgumentParser:
         metavar="OUTPUT_DIR",
         type=str,
     )
+    parser.add_argument(
+        "--per_wallet",
+        action="store_true",
+        help=(
+            "Keep a separate pool of acquired lots for each account (exchange and holder): sales dispose of lots of their own account and\n"
+            "intra-account transfers move lots (with their cost basis) between pools. With JOBS > 1 and assets processed one at a time,\n"
+            "independent groups of accounts are computed in parallel"
+        ),
+    )
     parser.add_argument(
         "-p",
         "--prefix",
@@ -247,6 +622,11 @@ def _setup_argument_parser(accounting_methods: List[str]) -> ArgumentParser:
         metavar="PREFIX",
         type=str,
     )
+    parser.add_argument(
+        "--thread_pool",
+        action="store_true",
+        help="With JOBS > 1, parse and compute assets in a pool of threads of the same process instead of a pool of processes",
+    )
     parser.add_argument(
         "-t",
         "--to_date",
@@ -273,7 +653,7 @@ def _setup_argument_parser(accounting_methods: List[str]) -> ArgumentParser:
     parser.add_argument(
         "input_file",
         action="store",
-        help="ODS file containing input transactions",
+        help="ODS file, CSV / TSV file or directory of CSV / TSV files (one per asset, named after the asset) containing input transactions",
         metavar="INPUT",
         type=str,
     )
@@ -287,13 +667,13 @@ def _setup_paths(parser: ArgumentParser, configuration_file: str, input_file: st
         parser.print_help()
         sys.exit(1)
 
-    if not input_file.endswith(".ods"):
-        print(f"Input file '{input_file}' does not end with '.ods'")
+    if not Path(input_file).exists():
+        print(f"Input file '{input_file}' not found")
         parser.print_help()
         sys.exit(1)
 
-    if not Path(input_file).exists():
-        print(f"Input file '{input_file}' not found")
+    if not Path(input_file).is_dir() and not input_file.endswith((_ODS_EXTENSION, CSV_EXTENSION, TSV_EXTENSION)):
+        print(f"Input file '{input_file}' does not end with '{_ODS_EXTENSION}', '{CSV_EXTENSION}' or '{TSV_EXTENSION}' and it's not a directory")
         parser.print_help()
         sys.exit(1)
 
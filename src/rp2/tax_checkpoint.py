@@ -0,0 +1,182 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple, cast
+
+from rp2.abstract_entry import AbstractEntry
+from rp2.abstract_transaction import AbstractTransaction
+from rp2.configuration import Configuration
+from rp2.input_data import InputData
+from rp2.rp2_decimal import RP2Decimal
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.transaction_set import TransactionSet
+
+# Acquired lot position of gain/loss entries without acquired lot (earn-typed taxable events)
+NO_ACQUIRED_LOT: int = -1
+
+
+# Gain/loss entry of a checkpoint. Transactions are parsed again on every run, so they are referred to by position: taxable_event_position is
+# the position in the taxable event set, acquired_lot_position the position in the in-transaction set (or NO_ACQUIRED_LOT). Fractions are the
+# ones computed by the gain/loss set (acquired_lot_fraction is NO_ACQUIRED_LOT if there is no acquired lot).
+class CheckpointGainLoss(NamedTuple):
+    taxable_event_position: int
+    acquired_lot_position: int
+    crypto_amount: RP2Decimal
+    taxable_event_fraction: int
+    acquired_lot_fraction: int
+
+
+# State of the tax engine after computing all the gain/loss entries of an asset with a lot-pairing accounting method: a later run resumes from
+# it if the only change to the input is new transactions later than the checkpoint (e.g. a ledger that is appended to every month). It contains
+# the gain/loss entries computed so far, the amount left of each acquired lot (the state the accounting method resumes from), the number of
+# in-, out- and intra-transactions and of taxable events covered (where the iterators resume) and a fingerprint of the covered transactions,
+# which detects edits to them. Fractions of the gain/loss entries are restored too, so the gain/loss set computes only the fractions of the new
+# entries (and the number of fractions of the lots that are partially disposed of at the checkpoint).
+class TaxCheckpoint:
+    __slots__ = (
+        "__accounting_method",
+        "__timestamp",
+        "__transaction_counts",
+        "__taxable_event_count",
+        "__fingerprint",
+        "__gain_losses",
+        "__acquired_lot_amounts",
+    )
+
+    @classmethod
+    def type_check(cls, name: str, instance: "TaxCheckpoint") -> "TaxCheckpoint":
+        Configuration.type_check_parameter_name(name)
+        if not isinstance(instance, cls):
+            raise RP2TypeError(f"Parameter '{name}' is not of type {cls.__name__}: {instance}")
+        return instance
+
+    def __init__(
+        self,
+        accounting_method: str,
+        timestamp: datetime,
+        transaction_counts: Tuple[int, int, int],
+        taxable_event_count: int,
+        fingerprint: str,
+        gain_losses: List[CheckpointGainLoss],
+        acquired_lot_amounts: List[RP2Decimal],
+    ) -> None:
+        self.__accounting_method: str = Configuration.type_check_string("accounting_method", accounting_method)
+        if not isinstance(timestamp, datetime):
+            raise RP2TypeError(f"Parameter 'timestamp' is not of type datetime: {timestamp}")
+        self.__timestamp: datetime = timestamp
+        if len(transaction_counts) != 3:
+            raise RP2ValueError(f"Parameter 'transaction_counts' doesn't have 3 elements: {transaction_counts}")
+        for transaction_count in transaction_counts:
+            Configuration.type_check_positive_int("transaction_count", transaction_count)
+        self.__transaction_counts: Tuple[int, int, int] = transaction_counts
+        self.__taxable_event_count: int = Configuration.type_check_positive_int("taxable_event_count", taxable_event_count)
+        self.__fingerprint: str = Configuration.type_check_string("fingerprint", fingerprint)
+        if len(acquired_lot_amounts) != transaction_counts[0]:
+            raise RP2ValueError(f"Number of acquired lot amounts ({len(acquired_lot_amounts)}) differs from in-transaction count ({transaction_counts[0]})")
+        self.__gain_losses: List[CheckpointGainLoss] = gain_losses
+        self.__acquired_lot_amounts: List[RP2Decimal] = acquired_lot_amounts
+
+    @property
+    def accounting_method(self) -> str:
+        return self.__accounting_method
+
+    # Timestamp of the latest transaction covered by the checkpoint
+    @property
+    def timestamp(self) -> datetime:
+        return self.__timestamp
+
+    # Number of in-, out- and intra-transactions covered by the checkpoint
+    @property
+    def transaction_counts(self) -> Tuple[int, int, int]:
+        return self.__transaction_counts
+
+    @property
+    def taxable_event_count(self) -> int:
+        return self.__taxable_event_count
+
+    @property
+    def fingerprint(self) -> str:
+        return self.__fingerprint
+
+    @property
+    def gain_losses(self) -> List[CheckpointGainLoss]:
+        return self.__gain_losses
+
+    # Amount left of each acquired lot covered by the checkpoint (by position in the in-transaction set)
+    @property
+    def acquired_lot_amounts(self) -> List[RP2Decimal]:
+        return self.__acquired_lot_amounts
+
+
+class InputFingerprint(NamedTuple):
+    fingerprint: str
+    # Number of in-, out- and intra-transactions and timestamp of the latest one (None if there are no transactions)
+    transaction_counts: Tuple[int, int, int]
+    timestamp: Optional[datetime]
+    # True if the input starts with the transactions covered by the checkpoint, unchanged, and all other transactions are later than it
+    is_checkpoint_resumable: bool
+
+
+# The fingerprint covers the fields lot pairing depends on: order, type and amounts (HIFO also depends on the fiat value of acquired lots).
+# Gain/loss entries restored from a checkpoint refer to the transactions of the current run, so changes to the other fields (e.g. notes or the
+# spot price of a sale) are reflected in the results anyway. Internal ids are row numbers: appending rows to a table shifts the rows of the
+# tables below it, so ids are not part of the fingerprint.
+def _get_transaction_fingerprint(transaction: AbstractTransaction) -> bytes:
+    return (
+        f"{type(transaction).__name__}|{transaction.timestamp.isoformat()}|{transaction.transaction_type.value}|{transaction.is_taxable()}|"
+        f"{transaction.crypto_balance_change}|{transaction.fiat_balance_change}\n"
+    ).encode("utf-8")
+
+
+# Fingerprint of the input data and check of the checkpoint (if any) against it, in one pass over the transactions.
+def compute_input_fingerprint(input_data: InputData, checkpoint: Optional[TaxCheckpoint]) -> InputFingerprint:
+    InputData.type_check("input_data", input_data)
+    fingerprint_hash: "hashlib._Hash" = hashlib.sha256()
+    checkpoint_hash: "hashlib._Hash" = hashlib.sha256()
+    checkpoint_counts: Tuple[int, int, int] = checkpoint.transaction_counts if checkpoint else (0, 0, 0)
+    is_checkpoint_resumable: bool = checkpoint is not None
+    transaction_counts: List[int] = []
+    timestamp: Optional[datetime] = None
+    transaction_set: TransactionSet
+    checkpoint_count: int
+    for transaction_set, checkpoint_count in zip(
+        [input_data.unfiltered_in_transaction_set, input_data.unfiltered_out_transaction_set, input_data.unfiltered_intra_transaction_set],
+        checkpoint_counts,
+    ):
+        position: int = 0
+        entry: AbstractEntry
+        for entry in transaction_set:
+            transaction_fingerprint: bytes = _get_transaction_fingerprint(cast(AbstractTransaction, entry))
+            fingerprint_hash.update(transaction_fingerprint)
+            if position < checkpoint_count:
+                checkpoint_hash.update(transaction_fingerprint)
+            elif position == checkpoint_count and checkpoint is not None and entry.timestamp <= checkpoint.timestamp:
+                # New transactions must be later than the checkpoint
+                is_checkpoint_resumable = False
+            position += 1
+            if timestamp is None or entry.timestamp > timestamp:
+                timestamp = entry.timestamp
+        if position < checkpoint_count:
+            is_checkpoint_resumable = False
+        transaction_counts.append(position)
+        fingerprint_hash.update(b"\0")
+        checkpoint_hash.update(b"\0")
+    if checkpoint is not None and checkpoint_hash.hexdigest() != checkpoint.fingerprint:
+        is_checkpoint_resumable = False
+
+    return InputFingerprint(
+        fingerprint_hash.hexdigest(), (transaction_counts[0], transaction_counts[1], transaction_counts[2]), timestamp, is_checkpoint_resumable
+    )
@@ -12,36 +12,84 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Iterable, Iterator, Optional, cast
+from concurrent.futures import Executor, Future
+from datetime import datetime
+from heapq import heappop, heappush, merge
+from itertools import islice
+from typing import Dict, Generic, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type, TypeVar, cast
 
 from rp2.abstract_accounting_method import (
     AbstractAccountingMethod,
+    AbstractLotPairingMethod,
     AcquiredLotsExhaustedException,
+    BatchPairing,
     TaxableEventAndAcquiredLot,
     TaxableEventsExhaustedException,
 )
 from rp2.abstract_entry import AbstractEntry
+from rp2.abstract_pooled_cost_method import AbstractPooledCostMethod
 from rp2.abstract_transaction import AbstractTransaction
+from rp2.balance import Account
 from rp2.computed_data import ComputedData
 from rp2.configuration import MAX_DATE, MIN_DATE, Configuration
+from rp2.entry_table import EntryTable
+from rp2.entry_types import EntrySetType
+from rp2.fixed_point import from_fixed_point, to_fixed_point
 from rp2.gain_loss import GainLoss
-from rp2.gain_loss_set import GainLossSet
+from rp2.gain_loss_set import FractionCheckpoint, GainLossSet
 from rp2.in_transaction import InTransaction
 from rp2.input_data import InputData
+from rp2.input_data_cache import InputDataCache
+from rp2.intra_transaction import IntraTransaction
 from rp2.logger import LOGGER
+from rp2.out_transaction import OutTransaction
 from rp2.rp2_decimal import ZERO, RP2Decimal
-from rp2.rp2_error import RP2ValueError
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.tax_checkpoint import (
+    NO_ACQUIRED_LOT,
+    CheckpointGainLoss,
+    InputFingerprint,
+    TaxCheckpoint,
+    compute_input_fingerprint,
+)
 from rp2.transaction_set import TransactionSet
 
 
-def compute_tax(configuration: Configuration, accounting_method: AbstractAccountingMethod, input_data: InputData) -> ComputedData:
+# The taxable event set depends only on input data: when comparing accounting methods, callers can build it once with
+# create_unfiltered_taxable_event_set() and pass it to every compute_tax() call. In per-wallet mode (see Configuration.per_wallet) the
+# independent partitions of the accounts are paired concurrently if an executor is passed. If a cache is passed, lot-pairing accounting methods
+# resume from the checkpoint of the previous run, if the input has only grown by later transactions, and store a new checkpoint (see
+# tax_checkpoint).
+def compute_tax(
+    configuration: Configuration,
+    accounting_method: AbstractAccountingMethod,
+    input_data: InputData,
+    unfiltered_taxable_event_set: Optional[TransactionSet] = None,
+    executor: Optional[Executor] = None,
+    cache: Optional[InputDataCache] = None,
+) -> ComputedData:
     Configuration.type_check("configuration", configuration)
     AbstractAccountingMethod.type_check("accounting_method", accounting_method)
     InputData.type_check("input_data", input_data)
+    if cache is not None:
+        InputDataCache.type_check("cache", cache)
 
-    unfiltered_taxable_event_set: TransactionSet = _create_unfiltered_taxable_event_set(configuration, input_data)
-    LOGGER.debug("%s: Created taxable event set", input_data.asset)
-    unfiltered_gain_loss_set: GainLossSet = _create_unfiltered_gain_and_loss_set(configuration, accounting_method, input_data, unfiltered_taxable_event_set)
+    if unfiltered_taxable_event_set is None:
+        unfiltered_taxable_event_set = create_unfiltered_taxable_event_set(configuration, input_data)
+    else:
+        TransactionSet.type_check("unfiltered_taxable_event_set", unfiltered_taxable_event_set, EntrySetType.MIXED, input_data.asset, True)
+    unfiltered_gain_loss_set: GainLossSet
+    if isinstance(accounting_method, AbstractPooledCostMethod):
+        if configuration.per_wallet:
+            raise RP2ValueError(f"Per-wallet mode is not supported by pooled-cost accounting method {accounting_method}")
+        unfiltered_gain_loss_set = _create_pooled_cost_gain_and_loss_set(configuration, accounting_method, input_data, unfiltered_taxable_event_set)
+    elif isinstance(accounting_method, AbstractLotPairingMethod):
+        if configuration.per_wallet:
+            unfiltered_gain_loss_set = _create_per_wallet_gain_and_loss_set(configuration, accounting_method, input_data, executor)
+        else:
+            unfiltered_gain_loss_set = _create_unfiltered_gain_and_loss_set(configuration, accounting_method, input_data, unfiltered_taxable_event_set, cache)
+    else:
+        raise RP2TypeError(f"Parameter 'accounting_method' is neither a lot-pairing nor a pooled-cost accounting method: {accounting_method}")
     LOGGER.debug("%s: Created gain-loss set", input_data.asset)
 
     return ComputedData(
@@ -54,7 +102,9 @@ def compute_tax(configuration: Configuration, accounting_method: AbstractAccount
     )
 
 
-def _create_unfiltered_taxable_event_set(configuration: Configuration, input_data: InputData) -> TransactionSet:
+# The result is sorted before it's returned, so that it can be shared by accounting methods running in parallel threads (iteration doesn't
+# modify a sorted set).
+def create_unfiltered_taxable_event_set(configuration: Configuration, input_data: InputData) -> TransactionSet:
     transaction_set: TransactionSet
     entry: AbstractEntry
     transaction: AbstractTransaction
@@ -68,12 +118,14 @@ def _create_unfiltered_taxable_event_set(configuration: Configuration, input_dat
             transaction = cast(AbstractTransaction, entry)
             if transaction.is_taxable():
                 taxable_event_set.add_entry(transaction)
+    taxable_event_set.sort()
+    LOGGER.debug("%s: Created taxable event set", input_data.asset)
 
     return taxable_event_set
 
 
 def _get_next_taxable_event_and_acquired_lot(
-    accounting_method: AbstractAccountingMethod,
+    accounting_method: AbstractLotPairingMethod,
     taxable_event: Optional[AbstractTransaction],
     acquired_lot: Optional[InTransaction],
     taxable_event_amount: RP2Decimal,
@@ -94,16 +146,69 @@ def _get_next_taxable_event_and_acquired_lot(
 
 
 def _create_unfiltered_gain_and_loss_set(
-    configuration: Configuration, accounting_method: AbstractAccountingMethod, input_data: InputData, unfiltered_taxable_event_set: TransactionSet
+    configuration: Configuration,
+    accounting_method: AbstractLotPairingMethod,
+    input_data: InputData,
+    unfiltered_taxable_event_set: TransactionSet,
+    cache: Optional[InputDataCache] = None,
 ) -> GainLossSet:
     gain_loss_set: GainLossSet = GainLossSet(configuration, accounting_method, input_data.asset, MIN_DATE, MAX_DATE)
     # Create a fresh instance of accounting method
-    method: AbstractAccountingMethod = accounting_method.__class__()
-    taxable_event_iterator: Iterator[AbstractTransaction] = iter(cast(Iterable[AbstractTransaction], unfiltered_taxable_event_set))
-    acquired_lot_iterator: Iterator[InTransaction] = iter(cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set))
+    method: AbstractLotPairingMethod = accounting_method.__class__()
+
+    checkpoint_key: Optional[str] = None
+    input_fingerprint: Optional[InputFingerprint] = None
+    is_resumed: bool = False
+    if cache is not None:
+        checkpoint_key = InputDataCache.get_checkpoint_key(configuration, input_data.asset, method.name)
+        checkpoint: Optional[TaxCheckpoint] = cache.load_checkpoint(checkpoint_key)
+        input_fingerprint = compute_input_fingerprint(input_data, checkpoint)
+        if checkpoint is not None and input_fingerprint.is_checkpoint_resumable and checkpoint.accounting_method == method.name:
+            _resume_from_checkpoint(configuration, method, input_data, unfiltered_taxable_event_set, checkpoint, gain_loss_set)
+            is_resumed = True
+        elif checkpoint is not None:
+            LOGGER.debug("%s: Input changed before the %s checkpoint: computing from scratch", input_data.asset, method.name)
+    if is_resumed or not _pair_in_batch(configuration, method, input_data, unfiltered_taxable_event_set, gain_loss_set):
+        if not is_resumed:
+            method.initialize(
+                iter(cast(Iterable[AbstractTransaction], unfiltered_taxable_event_set)),
+                iter(cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set)),
+            )
+        _pair_one_step_at_a_time(configuration, method, gain_loss_set)
+
+    if cache is not None and checkpoint_key is not None and input_fingerprint is not None and input_fingerprint.timestamp is not None:
+        cache.store_checkpoint(
+            checkpoint_key, _create_checkpoint(method, input_data, unfiltered_taxable_event_set, gain_loss_set, input_fingerprint, input_fingerprint.timestamp)
+        )
+
+    return gain_loss_set
 
-    method.initialize(taxable_event_iterator, acquired_lot_iterator)
 
+# Batch fast path of lot pairing (see AbstractLotPairingMethod.pair_in_batch()): returns False (without side effects) if the accounting method
+# doesn't support it or can't pair this input in batch.
+def _pair_in_batch(
+    configuration: Configuration,
+    method: AbstractLotPairingMethod,
+    input_data: InputData,
+    unfiltered_taxable_event_set: TransactionSet,
+    gain_loss_set: GainLossSet,
+) -> bool:
+    batch_pairing: Optional[BatchPairing] = method.pair_in_batch(
+        list(cast(Iterable[AbstractTransaction], unfiltered_taxable_event_set)),
+        list(cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set)),
+    )
+    if batch_pairing is None:
+        LOGGER.debug("%s: Accounting method %s can't pair this input in batch: pairing one step at a time", input_data.asset, method.name)
+        return False
+    gain_loss_set.add_entries(
+        GainLoss.create_batch(configuration, method, batch_pairing.crypto_amounts, batch_pairing.taxable_events, batch_pairing.acquired_lots)
+    )
+    LOGGER.debug("%s: Paired %d taxable events with acquired lots in batch", input_data.asset, unfiltered_taxable_event_set.count)
+    return True
+
+
+# Generic lot-pairing loop: the accounting method selects the taxable events and acquired lots to pair, one step at a time.
+def _pair_one_step_at_a_time(configuration: Configuration, method: AbstractLotPairingMethod, gain_loss_set: GainLossSet) -> None:
     try:
         gain_loss: GainLoss
         taxable_event: AbstractTransaction
@@ -121,8 +226,7 @@ def _create_unfiltered_gain_and_loss_set(
                 # There must always be at least one acquired_lot
                 raise Exception("Parameter 'acquired_lot' is None")
             InTransaction.type_check("acquired_lot", acquired_lot)
-            Configuration.type_check_positive_decimal("taxable_event_amount", taxable_event_amount)
-            Configuration.type_check_positive_decimal("acquired_lot_amount", acquired_lot_amount)
+            comparison: int = _compare_pairing_amounts(configuration, taxable_event_amount, acquired_lot_amount)
 
             if taxable_event.transaction_type.is_earn_type():
                 # Handle earn-typed transactions first: they have no acquired-lot
@@ -132,13 +236,13 @@ def _create_unfiltered_gain_and_loss_set(
                     taxable_event, acquired_lot, ZERO, acquired_lot_amount
                 )
                 continue
-            if taxable_event_amount == acquired_lot_amount:
+            if comparison == 0:
                 gain_loss = GainLoss(configuration, method, taxable_event_amount, taxable_event, acquired_lot)
                 gain_loss_set.add_entry(gain_loss)
                 (taxable_event, acquired_lot, taxable_event_amount, acquired_lot_amount) = _get_next_taxable_event_and_acquired_lot(
                     method, taxable_event, acquired_lot, taxable_event_amount, acquired_lot_amount
                 )
-            elif taxable_event_amount < acquired_lot_amount:
+            elif comparison < 0:
                 gain_loss = GainLoss(configuration, method, taxable_event_amount, taxable_event, acquired_lot)
                 gain_loss_set.add_entry(gain_loss)
                 (taxable_event, acquired_lot, taxable_event_amount, acquired_lot_amount) = method.get_next_taxable_event_and_amount(
@@ -156,4 +260,432 @@ def _create_unfiltered_gain_and_loss_set(
     except TaxableEventsExhaustedException:
         pass
 
+
+# Checks the (non-negative) amounts returned by the lot pairing method and compares them: -1, 0 or 1 if the taxable event amount is less than,
+# equal to or greater than the acquired lot amount. In fixed-point mode they are checked and compared as fixed-point values, if they have them.
+def _compare_pairing_amounts(configuration: Configuration, taxable_event_amount: RP2Decimal, acquired_lot_amount: RP2Decimal) -> int:
+    if configuration.fixed_point:
+        fixed_point_taxable_event_amount: Optional[int] = to_fixed_point(Configuration.type_check_decimal("taxable_event_amount", taxable_event_amount))
+        fixed_point_acquired_lot_amount: Optional[int] = to_fixed_point(Configuration.type_check_decimal("acquired_lot_amount", acquired_lot_amount))
+        if (
+            fixed_point_taxable_event_amount is not None
+            and fixed_point_acquired_lot_amount is not None
+            and fixed_point_taxable_event_amount >= 0
+            and fixed_point_acquired_lot_amount >= 0
+        ):
+            return (fixed_point_taxable_event_amount > fixed_point_acquired_lot_amount) - (fixed_point_taxable_event_amount < fixed_point_acquired_lot_amount)
+    Configuration.type_check_positive_decimal("taxable_event_amount", taxable_event_amount)
+    Configuration.type_check_positive_decimal("acquired_lot_amount", acquired_lot_amount)
+    if taxable_event_amount == acquired_lot_amount:
+        return 0
+    return -1 if taxable_event_amount < acquired_lot_amount else 1
+
+
+# Add the gain/loss entries of the checkpoint to the gain/loss set and initialize the accounting method to continue after them.
+def _resume_from_checkpoint(
+    configuration: Configuration,
+    method: AbstractLotPairingMethod,
+    input_data: InputData,
+    unfiltered_taxable_event_set: TransactionSet,
+    checkpoint: TaxCheckpoint,
+    gain_loss_set: GainLossSet,
+) -> None:
+    taxable_event_iterator: Iterator[AbstractTransaction] = iter(cast(Iterable[AbstractTransaction], unfiltered_taxable_event_set))
+    taxable_events: List[AbstractTransaction] = list(islice(taxable_event_iterator, checkpoint.taxable_event_count))
+    acquired_lots: List[InTransaction] = list(cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set))
+    method.initialize_from_checkpoint(taxable_event_iterator, iter(acquired_lots), list(checkpoint.acquired_lot_amounts))
+    LOGGER.debug(
+        "%s: Resuming %s from checkpoint (%d of %d taxable events already computed)",
+        input_data.asset,
+        method.name,
+        checkpoint.taxable_event_count,
+        unfiltered_taxable_event_set.count,
+    )
+    # The gain/loss entries of the checkpoint were checked when they were created by the run that stored it and the transactions they refer to
+    # are the same (see compute_input_fingerprint()), so they are restored with the trusted constructor and added to the set at once.
+    gain_losses: List[AbstractEntry] = []
+    checkpoint_gain_loss: CheckpointGainLoss
+    for checkpoint_gain_loss in checkpoint.gain_losses:
+        gain_losses.append(
+            GainLoss._create_unchecked(  # pylint: disable=protected-access
+                configuration,
+                checkpoint_gain_loss.crypto_amount,
+                taxable_events[checkpoint_gain_loss.taxable_event_position],
+                None if checkpoint_gain_loss.acquired_lot_position == NO_ACQUIRED_LOT else acquired_lots[checkpoint_gain_loss.acquired_lot_position],
+            )
+        )
+    gain_loss_set.add_entries(gain_losses)
+    acquired_lot_2_amount: Dict[InTransaction, RP2Decimal] = {}
+    position: int
+    amount: RP2Decimal
+    for position, amount in enumerate(checkpoint.acquired_lot_amounts):
+        acquired_lot: InTransaction = acquired_lots[position]
+        if ZERO < amount < acquired_lot.crypto_in:
+            acquired_lot_2_amount[acquired_lot] = acquired_lot.crypto_in - amount
+    gain_loss_set.set_fraction_checkpoint(
+        FractionCheckpoint(
+            [checkpoint_gain_loss.taxable_event_fraction for checkpoint_gain_loss in checkpoint.gain_losses],
+            [checkpoint_gain_loss.acquired_lot_fraction for checkpoint_gain_loss in checkpoint.gain_losses],
+            acquired_lot_2_amount,
+        )
+    )
+
+
+def _create_checkpoint(
+    method: AbstractLotPairingMethod,
+    input_data: InputData,
+    unfiltered_taxable_event_set: TransactionSet,
+    gain_loss_set: GainLossSet,
+    input_fingerprint: InputFingerprint,
+    timestamp: datetime,
+) -> TaxCheckpoint:
+    # Taxable events are indexed by different sets depending on their type, so their positions are kept in a dict (see GainLossSet)
+    taxable_event_2_position: Dict[AbstractTransaction, int] = {}
+    position: int
+    entry: AbstractEntry
+    for position, entry in enumerate(unfiltered_taxable_event_set):
+        taxable_event_2_position[cast(AbstractTransaction, entry)] = position
+    acquired_lots: List[InTransaction] = list(cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set))
+    acquired_lot_2_position: EntryTable[InTransaction, int] = EntryTable(len(acquired_lots))
+    acquired_lot: InTransaction
+    for position, acquired_lot in enumerate(acquired_lots):
+        acquired_lot_2_position[acquired_lot] = position
+    acquired_lot_amounts: List[RP2Decimal] = [acquired_lot.crypto_in for acquired_lot in acquired_lots]
+
+    gain_losses: List[CheckpointGainLoss] = []
+    gain_loss: GainLoss
+    taxable_event_fraction: int
+    acquired_lot_fraction: Optional[int]
+    for gain_loss, taxable_event_fraction, acquired_lot_fraction in gain_loss_set.get_fractions():
+        acquired_lot_position: int = NO_ACQUIRED_LOT
+        if gain_loss.acquired_lot is not None:
+            acquired_lot_position = acquired_lot_2_position[gain_loss.acquired_lot]
+            acquired_lot_amounts[acquired_lot_position] -= gain_loss.crypto_amount
+        gain_losses.append(
+            CheckpointGainLoss(
+                taxable_event_2_position[gain_loss.taxable_event],
+                acquired_lot_position,
+                gain_loss.crypto_amount,
+                taxable_event_fraction,
+                NO_ACQUIRED_LOT if acquired_lot_fraction is None else acquired_lot_fraction,
+            )
+        )
+
+    return TaxCheckpoint(
+        method.name,
+        timestamp,
+        input_fingerprint.transaction_counts,
+        len(taxable_event_2_position),
+        input_fingerprint.fingerprint,
+        gain_losses,
+        acquired_lot_amounts,
+    )
+
+
+# Pooled-cost accounting methods don't pair taxable events with acquired lots: each taxable event yields exactly one gain/loss, with the cost
+# basis computed by the method (in one streaming pass over taxable events).
+def _create_pooled_cost_gain_and_loss_set(
+    configuration: Configuration,
+    accounting_method: AbstractPooledCostMethod,
+    input_data: InputData,
+    unfiltered_taxable_event_set: TransactionSet,
+) -> GainLossSet:
+    gain_loss_set: GainLossSet = GainLossSet(configuration, accounting_method, input_data.asset, MIN_DATE, MAX_DATE)
+    # Create a fresh instance of accounting method
+    method: AbstractPooledCostMethod = accounting_method.__class__()
+    taxable_event: AbstractTransaction
+    fiat_cost_basis: RP2Decimal
+    try:
+        for taxable_event, fiat_cost_basis in method.compute_cost_bases(
+            cast(Iterable[AbstractTransaction], unfiltered_taxable_event_set), cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set)
+        ):
+            AbstractTransaction.type_check("taxable_event", taxable_event)
+            Configuration.type_check_positive_decimal("fiat_cost_basis", fiat_cost_basis)
+            gain_loss_set.add_entry(
+                GainLoss(
+                    configuration,
+                    method,
+                    taxable_event.crypto_balance_change,
+                    taxable_event,
+                    None,
+                    None if taxable_event.transaction_type.is_earn_type() else fiat_cost_basis,
+                )
+            )
+    except AcquiredLotsExhaustedException:
+        raise RP2ValueError("Total in-transaction crypto value < total taxable crypto value") from None
+
+    return gain_loss_set
+
+
+# Per-wallet mode: each account has its own pool of acquired lots, which intra-transactions move lots between. Accounts connected by
+# intra-transactions form a partition and partitions are paired independently (concurrently, if an executor is passed).
+
+# Event kinds: at the same timestamp in-transactions come first, then out- and intra-transactions (the same order as the taxable event set)
+_WALLET_IN: int = 0
+_WALLET_OUT: int = 1
+_WALLET_INTRA: int = 2
+_NO_ACCOUNT: int = -1
+
+
+# Picklable event for the partition workers (accounts are numbered): disposed_amount is taken from the pool of from_account, moved_amount is
+# added to the pool of to_account. Fixed-point amounts are None if not in fixed-point mode (see fixed_point).
+class _WalletEvent(NamedTuple):
+    kind: int
+    from_account: int
+    to_account: int
+    lot_index: int
+    lot_priority: int
+    disposed_amount: RP2Decimal
+    moved_amount: RP2Decimal
+    fixed_point_disposed_amount: Optional[int]
+    fixed_point_moved_amount: Optional[int]
+
+
+# Amounts in the pools: RP2Decimal amounts or their fixed-point values
+_WalletAmount = TypeVar("_WalletAmount", int, RP2Decimal)
+
+
+# Raised when the pool of an account (by number) runs out of acquired lots
+class _WalletPoolExhaustedException(AcquiredLotsExhaustedException):
+    def __init__(self, account: int) -> None:
+        super().__init__(f"Acquired lots exhausted in account {account}")
+        self.__account: int = account
+
+    # Exceptions raised in a process pool are pickled with their constructor arguments
+    def __reduce__(self) -> Tuple[Type["_WalletPoolExhaustedException"], Tuple[int]]:
+        return (type(self), (self.__account,))
+
+    @property
+    def account(self) -> int:
+        return self.__account
+
+
+# Pool of an account: a heap of (-priority, lot index) and the amount left of each lot in the heap
+class _WalletPool(Generic[_WalletAmount]):
+    __slots__ = ("heap", "lot_index_2_amount")
+
+    def __init__(self) -> None:
+        self.heap: List[Tuple[int, int]] = []
+        self.lot_index_2_amount: Dict[int, _WalletAmount] = {}
+
+
+def _add_to_wallet_pool(pool: _WalletPool[_WalletAmount], lot_priority: int, lot_index: int, amount: _WalletAmount) -> None:
+    if lot_index in pool.lot_index_2_amount:
+        pool.lot_index_2_amount[lot_index] += amount
+    else:
+        heappush(pool.heap, (-lot_priority, lot_index))
+        pool.lot_index_2_amount[lot_index] = amount
+
+
+# Returns the (priority, lot index, amount) fractions taken from the pool, in selection order
+def _take_from_wallet_pool(pool: _WalletPool[_WalletAmount], account: int, amount: _WalletAmount, zero: _WalletAmount) -> List[Tuple[int, int, _WalletAmount]]:
+    result: List[Tuple[int, int, _WalletAmount]] = []
+    while amount > zero:
+        if not pool.heap:
+            raise _WalletPoolExhaustedException(account)
+        negative_priority, lot_index = pool.heap[0]
+        lot_amount: _WalletAmount = pool.lot_index_2_amount[lot_index]
+        if lot_amount > amount:
+            pool.lot_index_2_amount[lot_index] = lot_amount - amount
+            result.append((-negative_priority, lot_index, amount))
+            break
+        heappop(pool.heap)
+        del pool.lot_index_2_amount[lot_index]
+        result.append((-negative_priority, lot_index, lot_amount))
+        amount -= lot_amount
+    return result
+
+
+# Pairs the (position, event) pairs of one partition, in chronological order: returns the (lot index, amount) fractions of each taxable event,
+# by position. Module-level, so it can run in a process pool.
+def _pair_wallet_partition(events: List[Tuple[int, _WalletEvent]]) -> Dict[int, List[Tuple[int, RP2Decimal]]]:
+    event: _WalletEvent
+    fixed_point_amounts: List[Tuple[Optional[int], Optional[int]]] = [
+        (event.fixed_point_disposed_amount, event.fixed_point_moved_amount) for _, event in events
+    ]
+    if all(disposed_amount is not None and moved_amount is not None for disposed_amount, moved_amount in fixed_point_amounts):
+        position: int
+        lot_fractions: List[Tuple[int, int]]
+        return {
+            position: [(lot_index, from_fixed_point(amount)) for lot_index, amount in lot_fractions]
+            for position, lot_fractions in _pair_wallet_partition_amounts(events, cast(List[Tuple[int, int]], fixed_point_amounts), 0).items()
+        }
+    return _pair_wallet_partition_amounts(events, [(event.disposed_amount, event.moved_amount) for _, event in events], ZERO)
+
+
+# Same as _pair_wallet_partition(), given the (disposed, moved) amounts of the events: either RP2Decimal amounts or their fixed-point values
+def _pair_wallet_partition_amounts(
+    events: List[Tuple[int, _WalletEvent]], amounts: List[Tuple[_WalletAmount, _WalletAmount]], zero: _WalletAmount
+) -> Dict[int, List[Tuple[int, _WalletAmount]]]:
+    account_2_pool: Dict[int, _WalletPool[_WalletAmount]] = {}
+    position_2_lot_fractions: Dict[int, List[Tuple[int, _WalletAmount]]] = {}
+    position: int
+    event: _WalletEvent
+    disposed_amount: _WalletAmount
+    moved_amount: _WalletAmount
+    for (position, event), (disposed_amount, moved_amount) in zip(events, amounts):
+        if event.kind == _WALLET_IN:
+            _add_to_wallet_pool(account_2_pool.setdefault(event.to_account, _WalletPool()), event.lot_priority, event.lot_index, moved_amount)
+            continue
+        from_pool: _WalletPool[_WalletAmount] = account_2_pool.setdefault(event.from_account, _WalletPool())
+        if disposed_amount > zero:
+            position_2_lot_fractions[position] = [
+                (lot_index, amount) for _, lot_index, amount in _take_from_wallet_pool(from_pool, event.from_account, disposed_amount, zero)
+            ]
+        if moved_amount > zero:
+            to_pool: _WalletPool[_WalletAmount] = account_2_pool.setdefault(event.to_account, _WalletPool())
+            lot_priority: int
+            lot_index: int
+            amount: _WalletAmount
+            for lot_priority, lot_index, amount in _take_from_wallet_pool(from_pool, event.from_account, moved_amount, zero):
+                _add_to_wallet_pool(to_pool, lot_priority, lot_index, amount)
+    return position_2_lot_fractions
+
+
+def _find_wallet_partition(account_2_parent: List[int], account: int) -> int:
+    root: int = account
+    while account_2_parent[root] != root:
+        root = account_2_parent[root]
+    # Path compression
+    while account_2_parent[account] != root:
+        account_2_parent[account], account = root, account_2_parent[account]
+    return root
+
+
+def _get_wallet_event_sort_key(kind_and_transaction: Tuple[int, AbstractTransaction]) -> Tuple[datetime, int]:
+    return (kind_and_transaction[1].timestamp, kind_and_transaction[0])
+
+
+def _create_per_wallet_gain_and_loss_set(
+    configuration: Configuration,
+    accounting_method: AbstractLotPairingMethod,
+    input_data: InputData,
+    executor: Optional[Executor],
+) -> GainLossSet:
+    gain_loss_set: GainLossSet = GainLossSet(configuration, accounting_method, input_data.asset, MIN_DATE, MAX_DATE)
+    method: AbstractLotPairingMethod = accounting_method.__class__()
+
+    acquired_lots: List[InTransaction] = list(cast(Iterable[InTransaction], input_data.unfiltered_in_transaction_set))
+    lot_priorities: List[int] = method.get_acquired_lot_priorities(acquired_lots)
+    acquired_lot_2_index: EntryTable[InTransaction, int] = EntryTable(len(acquired_lots))
+    lot_index: int
+    acquired_lot: InTransaction
+    for lot_index, acquired_lot in enumerate(acquired_lots):
+        acquired_lot_2_index[acquired_lot] = lot_index
+
+    accounts: List[Account] = []
+    account_2_id: Dict[Account, int] = {}
+    # Union-find forest of accounts: partitions are its trees
+    account_2_parent: List[int] = []
+
+    def get_account_id(exchange: str, holder: str) -> int:
+        account: Account = Account(exchange, holder)
+        account_id: Optional[int] = account_2_id.get(account)
+        if account_id is None:
+            account_id = len(accounts)
+            accounts.append(account)
+            account_2_id[account] = account_id
+            account_2_parent.append(account_id)
+        return account_id
+
+    transactions: List[AbstractTransaction] = []
+    events: List[_WalletEvent] = []
+    kind: int
+    transaction: AbstractTransaction
+    for kind, transaction in merge(
+        ((_WALLET_IN, cast(AbstractTransaction, entry)) for entry in input_data.unfiltered_in_transaction_set),
+        ((_WALLET_OUT, cast(AbstractTransaction, entry)) for entry in input_data.unfiltered_out_transaction_set),
+        ((_WALLET_INTRA, cast(AbstractTransaction, entry)) for entry in input_data.unfiltered_intra_transaction_set),
+        key=_get_wallet_event_sort_key,
+    ):
+        transactions.append(transaction)
+        if kind == _WALLET_IN:
+            in_transaction: InTransaction = cast(InTransaction, transaction)
+            lot_index = acquired_lot_2_index[in_transaction]
+            events.append(
+                _WalletEvent(
+                    kind,
+                    _NO_ACCOUNT,
+                    get_account_id(in_transaction.exchange, in_transaction.holder),
+                    lot_index,
+                    lot_priorities[lot_index],
+                    ZERO,
+                    in_transaction.crypto_in,
+                    0 if configuration.fixed_point else None,
+                    in_transaction.fixed_point_crypto_in,
+                )
+            )
+        elif kind == _WALLET_OUT:
+            out_transaction: OutTransaction = cast(OutTransaction, transaction)
+            events.append(
+                _WalletEvent(
+                    kind,
+                    get_account_id(out_transaction.exchange, out_transaction.holder),
+                    _NO_ACCOUNT,
+                    -1,
+                    -1,
+                    out_transaction.crypto_balance_change,
+                    ZERO,
+                    out_transaction.fixed_point_crypto_balance_change,
+                    0 if configuration.fixed_point else None,
+                )
+            )
+        else:
+            intra_transaction: IntraTransaction = cast(IntraTransaction, transaction)
+            from_account: int = get_account_id(intra_transaction.from_exchange, intra_transaction.from_holder)
+            to_account: int = get_account_id(intra_transaction.to_exchange, intra_transaction.to_holder)
+            from_root: int = _find_wallet_partition(account_2_parent, from_account)
+            to_root: int = _find_wallet_partition(account_2_parent, to_account)
+            if from_root != to_root:
+                account_2_parent[to_root] = from_root
+            events.append(
+                _WalletEvent(
+                    kind,
+                    from_account,
+                    to_account,
+                    -1,
+                    -1,
+                    intra_transaction.crypto_fee,
+                    intra_transaction.crypto_received,
+                    intra_transaction.fixed_point_crypto_fee,
+                    intra_transaction.fixed_point_crypto_received,
+                )
+            )
+
+    partition_2_events: Dict[int, List[Tuple[int, _WalletEvent]]] = {}
+    position: int
+    event: _WalletEvent
+    for position, event in enumerate(events):
+        account: int = event.to_account if event.kind == _WALLET_IN else event.from_account
+        partition_2_events.setdefault(_find_wallet_partition(account_2_parent, account), []).append((position, event))
+    LOGGER.debug("%s: %d accounts in %d partitions", input_data.asset, len(accounts), len(partition_2_events))
+
+    position_2_lot_fractions: Dict[int, List[Tuple[int, RP2Decimal]]] = {}
+    try:
+        if executor is not None and len(partition_2_events) > 1:
+            futures: List["Future[Dict[int, List[Tuple[int, RP2Decimal]]]]"] = [
+                executor.submit(_pair_wallet_partition, partition_events) for partition_events in partition_2_events.values()
+            ]
+            for future in futures:
+                position_2_lot_fractions.update(future.result())
+        else:
+            for partition_events in partition_2_events.values():
+                position_2_lot_fractions.update(_pair_wallet_partition(partition_events))
+    except _WalletPoolExhaustedException as exception:
+        exhausted_account: Account = accounts[exception.account]
+        raise RP2ValueError(
+            f"Total in-transaction crypto value < total taxable crypto value in account {exhausted_account.exchange}/{exhausted_account.holder}"
+        ) from None
+
+    # Gain/loss entries are created in the order of the taxable event set
+    for position, transaction in enumerate(transactions):
+        if not transaction.is_taxable():
+            continue
+        if transaction.transaction_type.is_earn_type():
+            gain_loss_set.add_entry(GainLoss(configuration, method, transaction.crypto_balance_change, transaction, None))
+            continue
+        amount: RP2Decimal
+        for lot_index, amount in position_2_lot_fractions[position]:
+            gain_loss_set.add_entry(GainLoss(configuration, method, amount, transaction, acquired_lots[lot_index]))
+
     return gain_loss_set
@@ -0,0 +1,119 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from datetime import datetime, tzinfo
+from typing import Dict, List, Optional, Pattern
+
+from dateutil.parser import parse
+from dateutil.tz import tzoffset, tzutc
+
+# Fast-path timestamp formats (ISO 8601 variants). They all use the same group names, so that a match can be turned into a datetime by the
+# same code regardless of the format.
+_DATE: str = r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})"
+_TIME_SEPARATOR: str = r"[T ]"
+_HOURS_MINUTES: str = r"(?P<hour>\d{2}):(?P<minute>\d{2})"
+_SECONDS: str = r":(?P<second>\d{2})"
+_MICROSECONDS: str = r"\.(?P<fraction>\d{1,6})"
+_TIMEZONE: str = r" ?(?:(?P<utc>Z)|(?P<sign>[+-])(?P<offset_hours>\d{2}):?(?P<offset_minutes>\d{2}))"
+
+_FORMATS: List[Pattern[str]] = [
+    # 2020-01-01 08:41:00+00:00
+    re.compile(f"{_DATE}{_TIME_SEPARATOR}{_HOURS_MINUTES}{_SECONDS}{_TIMEZONE}$"),
+    # 2020-01-01T08:41:00.123Z
+    re.compile(f"{_DATE}{_TIME_SEPARATOR}{_HOURS_MINUTES}{_SECONDS}{_MICROSECONDS}{_TIMEZONE}$"),
+    # 2020-01-01T08:41Z
+    re.compile(f"{_DATE}{_TIME_SEPARATOR}{_HOURS_MINUTES}{_TIMEZONE}$"),
+]
+
+
+_UTC: tzinfo = tzutc()
+
+
+# Parses a timestamp with the fast-path formats (tried in order) or, if none matches, with dateutil. It has no state, so it can be used for
+# timestamps that don't come from a column (e.g. transaction constructor arguments) and from multiple threads.
+def parse_timestamp(value: str) -> datetime:
+    timestamp_format: Pattern[str]
+    for timestamp_format in _FORMATS:
+        result: Optional[datetime] = _parse_with_format(timestamp_format, value, None)
+        if result is not None:
+            return result
+    return parse(value)
+
+
+# Timestamp parser of one column, with the same results as parse_timestamp(). The timestamps of a column are normally all in the same format,
+# so the parser infers the format from the first timestamps it sees and then tries that format first: in practice each timestamp is parsed
+# with one precompiled regular expression. Timezone objects are cached by UTC offset. The parser has state, so each column (e.g. the
+# timestamp column of a table) has its own instance.
+class TimestampParser:
+    def __init__(self) -> None:
+        self.__current_format: Optional[Pattern[str]] = None
+        self.__offset_2_timezone: Dict[int, tzinfo] = {}
+
+    def parse(self, value: str) -> datetime:
+        current_format: Optional[Pattern[str]] = self.__current_format
+        if current_format is not None:
+            result: Optional[datetime] = _parse_with_format(current_format, value, self.__offset_2_timezone)
+            if result is not None:
+                return result
+        # Infer the format of the column (or detect a format change)
+        timestamp_format: Pattern[str]
+        for timestamp_format in _FORMATS:
+            if timestamp_format is current_format:
+                continue
+            result = _parse_with_format(timestamp_format, value, self.__offset_2_timezone)
+            if result is not None:
+                self.__current_format = timestamp_format
+                return result
+        return parse(value)
+
+
+# Timezones are cached in offset_2_timezone, if it's not None.
+def _parse_with_format(timestamp_format: Pattern[str], value: str, offset_2_timezone: Optional[Dict[int, tzinfo]]) -> Optional[datetime]:
+    match: Optional["re.Match[str]"] = timestamp_format.match(value)
+    if match is None:
+        return None
+    fraction: Optional[str] = match.group("fraction") if "fraction" in timestamp_format.groupindex else None
+    second: Optional[str] = match.group("second") if "second" in timestamp_format.groupindex else None
+    try:
+        return datetime(
+            int(match.group("year")),
+            int(match.group("month")),
+            int(match.group("day")),
+            int(match.group("hour")),
+            int(match.group("minute")),
+            int(second) if second else 0,
+            int(fraction.ljust(6, "0")) if fraction else 0,
+            tzinfo=_get_timezone(match, offset_2_timezone),
+        )
+    except ValueError:
+        # Out-of-range field (e.g. month 13): let dateutil handle it
+        return None
+
+
+def _get_timezone(match: "re.Match[str]", offset_2_timezone: Optional[Dict[int, tzinfo]]) -> tzinfo:
+    if match.group("utc"):
+        return _UTC
+    offset: int = int(match.group("offset_hours")) * 3600 + int(match.group("offset_minutes")) * 60
+    if str(match.group("sign")) == "-":
+        offset = -offset
+    if offset == 0:
+        return _UTC
+    if offset_2_timezone is None:
+        return tzoffset(None, offset)
+    result: Optional[tzinfo] = offset_2_timezone.get(offset)
+    if result is None:
+        result = tzoffset(None, offset)
+        offset_2_timezone[offset] = result
+    return result
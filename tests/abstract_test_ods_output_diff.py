@@ -38,7 +38,7 @@ class OutputPlugins(Enum):
 
 class AbstractTestODSOutputDiff(unittest.TestCase):
 
-    METHODS: List[str] = ["fifo", "lifo"]
+    METHODS: List[str] = ["fifo", "lifo", "hifo"]
 
     def setUp(self) -> None:
         self.maxDiff = None  # pylint: disable=invalid-name
@@ -54,6 +54,7 @@ class AbstractTestODSOutputDiff(unittest.TestCase):
             time_interval = f"0_{to_date}_"
         return time_interval
 
+    # Method can also be a comma-separated list of methods, which are computed in the same run of rp2
     @classmethod
     def _generate(
         cls,
@@ -64,6 +65,9 @@ class AbstractTestODSOutputDiff(unittest.TestCase):
         input_path: Path = INPUT_PATH,
         from_date: date = MIN_DATE,
         to_date: date = MAX_DATE,
+        jobs: int = 1,
+        thread_pool: bool = False,
+        fixed_point: bool = False,
     ) -> None:
         config = test_name if config is None else config
         time_interval: str = cls.__get_time_interval(from_date, to_date)
@@ -81,6 +85,12 @@ class AbstractTestODSOutputDiff(unittest.TestCase):
             arguments.extend(["-f", str(from_date)])
         if to_date:
             arguments.extend(["-t", str(to_date)])
+        if jobs > 1:
+            arguments.extend(["-j", str(jobs)])
+        if thread_pool:
+            arguments.append("--thread_pool")
+        if fixed_point:
+            arguments.append("--fixed_point")
         arguments.extend(
             [
                 str(CONFIG_PATH / Path(f"{config}.config")),
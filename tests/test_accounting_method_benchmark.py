@@ -0,0 +1,125 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from random import Random
+from time import perf_counter
+from typing import Callable, Dict, List, cast
+
+from rp2.abstract_accounting_method import AbstractAccountingMethod
+from rp2.computed_data import ComputedData
+from rp2.configuration import Configuration
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo, hifo, lifo, total_average
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+_BENCHMARK_LOT_COUNT: int = 3000 if "RP2_TEST_BENCHMARK_LOT_COUNT" not in os.environ else int(str(os.environ.get("RP2_TEST_BENCHMARK_LOT_COUNT")))
+_METHODS: Dict[str, Callable[[], AbstractAccountingMethod]] = {
+    "fifo": fifo.AccountingMethod,
+    "lifo": lifo.AccountingMethod,
+    "hifo": hifo.AccountingMethod,
+    "total_average": total_average.AccountingMethod,
+}
+
+
+# Large-input benchmark of the accounting methods, on a heavy-trading ledger: acquired lots at random prices, each followed by a sale that
+# leaves most of the crypto unsold (so the number of open lots grows with the input).
+class TestAccountingMethodBenchmark(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestAccountingMethodBenchmark._configuration = Configuration("./config/test_data.config", US())
+
+    def _create_input_data(self, lot_count: int) -> InputData:
+        random: Random = Random(17)
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(self._configuration, "OUT", "B1")
+        intra_transaction_set: TransactionSet = TransactionSet(self._configuration, "INTRA", "B1")
+        timestamp: datetime = datetime(2018, 1, 1, tzinfo=timezone.utc)
+        for index in range(lot_count):
+            in_transaction_set.add_entry(
+                InTransaction(
+                    self._configuration,
+                    timestamp.isoformat(),
+                    "B1",
+                    "Coinbase",
+                    "Bob",
+                    "Buy",
+                    RP2Decimal(str(random.randint(1000, 60000))),
+                    RP2Decimal(str(random.randint(2, 9))),
+                    fiat_fee=RP2Decimal(str(random.randint(0, 20))),
+                    internal_id=2 * index,
+                )
+            )
+            timestamp += timedelta(hours=1)
+            out_transaction_set.add_entry(
+                OutTransaction(
+                    self._configuration,
+                    timestamp.isoformat(),
+                    "B1",
+                    "Coinbase",
+                    "Bob",
+                    "Sell",
+                    RP2Decimal(str(random.randint(1000, 60000))),
+                    RP2Decimal(str(random.randint(1, 3))),
+                    ZERO,
+                    internal_id=2 * index + 1,
+                )
+            )
+            timestamp += timedelta(hours=1)
+        return InputData("B1", in_transaction_set, out_transaction_set, intra_transaction_set)
+
+    # Checks the HIFO rule on every gain/loss, with a linear scan of all acquired lots
+    def test_hifo_lot_selection(self) -> None:
+        input_data: InputData = self._create_input_data(150)
+        computed_data: ComputedData = compute_tax(self._configuration, hifo.AccountingMethod(), input_data)
+        acquired_lots: List[InTransaction] = cast(List[InTransaction], list(input_data.unfiltered_in_transaction_set))
+        remaining_amounts: Dict[InTransaction, RP2Decimal] = {acquired_lot: acquired_lot.crypto_in for acquired_lot in acquired_lots}
+        unit_costs: Dict[InTransaction, RP2Decimal] = {acquired_lot: acquired_lot.fiat_in_with_fee / acquired_lot.crypto_in for acquired_lot in acquired_lots}
+
+        for entry in computed_data.gain_loss_set:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            selected_lot: InTransaction = cast(InTransaction, gain_loss.acquired_lot)
+            self.assertLessEqual(selected_lot.timestamp, gain_loss.taxable_event.timestamp)
+            for acquired_lot in acquired_lots:
+                if acquired_lot.timestamp > gain_loss.taxable_event.timestamp:
+                    break
+                if acquired_lot is not selected_lot and remaining_amounts[acquired_lot] > ZERO:
+                    self.assertLessEqual(unit_costs[acquired_lot], unit_costs[selected_lot], f"{gain_loss.internal_id}: {acquired_lot.internal_id}")
+            remaining_amounts[selected_lot] -= gain_loss.crypto_amount
+            self.assertGreaterEqual(remaining_amounts[selected_lot], ZERO)
+
+    def test_benchmark(self) -> None:
+        input_data: InputData = self._create_input_data(_BENCHMARK_LOT_COUNT)
+        sold_amount: RP2Decimal = RP2Decimal.exact_sum(transaction.crypto_balance_change for transaction in input_data.unfiltered_out_transaction_set)
+        results: List[str] = []
+        for method, create_accounting_method in _METHODS.items():
+            start: float = perf_counter()
+            computed_data: ComputedData = compute_tax(self._configuration, create_accounting_method(), input_data)
+            results.append(f"{method}: {perf_counter() - start:.3f}s")
+            self.assertEqual(RP2Decimal.exact_sum(cast(GainLoss, entry).crypto_amount for entry in computed_data.gain_loss_set), sold_amount, method)
+        print(f"compute_tax ({_BENCHMARK_LOT_COUNT} acquired lots, {_BENCHMARK_LOT_COUNT} taxable events): {', '.join(results)}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,11 +13,20 @@
 # limitations under the License.
 
 import logging
+import os
 import sys
 import unittest
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from random import Random
+from time import perf_counter
+from typing import List, Optional, Tuple
 
-from rp2.avl_tree import AVLTree
+from rp2.avl_tree import AVLNode, AVLTree, get_timestamp_key
+from rp2.logger import LOGGER
+from rp2.rp2_error import RP2ValueError
+
+# The micro-benchmark runs only if RP2_TEST_BENCHMARK_AVL_TREE_SIZE is set (to the number of nodes, e.g. 20000)
+_BENCHMARK_SIZE: int = 0 if "RP2_TEST_BENCHMARK_AVL_TREE_SIZE" not in os.environ else int(str(os.environ.get("RP2_TEST_BENCHMARK_AVL_TREE_SIZE")))
 
 
 class TestRP2Decimal(unittest.TestCase):
@@ -134,6 +143,145 @@ class TestRP2Decimal(unittest.TestCase):
         ]:
             self.assertEqual(tree.find_max_value_less_than(threshold), expected_value, f"result != {expected_value}")
 
+    # Checks the AVL invariants (ordering, heights, balance) and returns the keys in order
+    def _check_tree(self, tree: AVLTree[int, int]) -> List[int]:
+        keys: List[int] = []
+
+        def check_node(node: Optional[AVLNode[int, int]]) -> int:
+            if node is None:
+                return 0
+            left_height: int = check_node(node.left)
+            keys.append(node.key)
+            right_height: int = check_node(node.right)
+            self.assertEqual(node.height, 1 + max(left_height, right_height))
+            self.assertLessEqual(abs(left_height - right_height), 1)
+            return node.height
+
+        check_node(tree.root)
+        sorted_keys: List[int] = sorted(keys)
+        self.assertEqual(keys, sorted_keys)
+        self.assertEqual(len(keys), len(tree))
+        return keys
+
+    def _check_keys(self, keys: List[int], expected_keys: List[int]) -> None:
+        self.assertEqual(keys, expected_keys)
+
+    def _check_range(self, tree: AVLTree[int, int], from_key: Optional[int], to_key: Optional[int], expected_keys: List[int]) -> None:
+        keys: List[int] = [key for key, _ in tree.find_range(from_key, to_key)]
+        self.assertEqual(keys, expected_keys)
+
+    def test_from_sorted(self) -> None:
+        for size in range(20):
+            values: List[int] = [value // 2 for value in range(size)]
+            tree: AVLTree[int, int] = AVLTree.from_sorted([(value, value) for value in values])
+            self.assertEqual(self._check_tree(tree), values)
+            self._check_range(tree, None, None, values)
+            tree.insert_node(7, 7)
+            self._check_keys(self._check_tree(tree), sorted(values + [7]))
+
+        with self.assertRaisesRegex(RP2ValueError, "items are not sorted by key"):
+            AVLTree.from_sorted([(1, 1), (3, 3), (2, 2)])
+
+    def test_insert_and_delete(self) -> None:
+        random: Random = Random(11)
+        tree: AVLTree[int, int] = AVLTree()
+        values: List[int] = []
+        for _ in range(300):
+            value: int = random.randint(0, 100)
+            tree.insert_node(value, value)
+            values.append(value)
+        self._check_keys(self._check_tree(tree), sorted(values))
+
+        self.assertFalse(tree.delete_node(1000))
+        random.shuffle(values)
+        for index, value in enumerate(values):
+            self.assertTrue(tree.delete_node(value))
+            if index % 10 == 0:
+                self._check_keys(self._check_tree(tree), sorted(values[index + 1 :]))
+        self.assertIsNone(tree.root)
+        self.assertEqual(len(tree), 0)
+        self.assertFalse(tree.delete_node(0))
+
+    def test_floor_ceiling_and_range(self) -> None:
+        tree: AVLTree[int, int] = self._populate_with_numbers([48, 13, 92, 99, 2, 12, 6, 57, 22])
+        for key, expected_floor, expected_ceiling in [
+            (0, None, 2),
+            (2, 2, 2),
+            (9, 6, 12),
+            (22, 22, 22),
+            (72, 57, 92),
+            (99, 99, 99),
+            (1000, 99, None),
+        ]:
+            self.assertEqual(tree.find_floor_value(key), expected_floor, f"floor of {key}")
+            self.assertEqual(tree.find_ceiling_value(key), expected_ceiling, f"ceiling of {key}")
+
+        self._check_range(tree, 6, 57, [6, 12, 13, 22, 48, 57])
+        self._check_range(tree, 7, 47, [12, 13, 22])
+        self._check_range(tree, None, 12, [2, 6, 12])
+        self._check_range(tree, 93, None, [99])
+        self._check_range(tree, 49, 56, [])
+        self._check_range(tree, 1000, None, [])
+
+    def test_timestamp_keys(self) -> None:
+        tree: AVLTree[Tuple[int, int], str] = AVLTree()
+        timestamp: datetime = datetime(2021, 3, 4, 5, 6, 7, 123456, tzinfo=timezone.utc)
+        same_instant: datetime = timestamp.astimezone(timezone(timedelta(hours=-4)))
+        tree.insert_node(get_timestamp_key(timestamp, 2), "a")
+        tree.insert_node(get_timestamp_key(same_instant, 10), "b")
+        tree.insert_node(get_timestamp_key(timestamp + timedelta(microseconds=1), 1), "c")
+        tree.insert_node(get_timestamp_key(timestamp - timedelta(days=400), 5), "d")
+
+        # Ids disambiguate keys with the same timestamp (regardless of timezone): 10 > 2 numerically, unlike "10" < "2"
+        self.assertEqual("".join(value for _, value in tree.find_range()), "dabc")
+        self.assertEqual(tree.find_floor_value(get_timestamp_key(timestamp, sys.maxsize)), "b")
+        self.assertEqual(tree.find_ceiling_value(get_timestamp_key(timestamp, 3)), "b")
+        self.assertEqual(get_timestamp_key(datetime(1970, 1, 1, 0, 0, 1, tzinfo=timezone.utc), 7), (1000000, 7))
+
+    # Micro-benchmark: construction and lookups with formatted string keys (as LIFO used to build them) and with tuple keys.
+    def test_benchmark(self) -> None:
+        if _BENCHMARK_SIZE <= 0:
+            self.skipTest("RP2_TEST_BENCHMARK_AVL_TREE_SIZE not set")
+        start_timestamp: datetime = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        timestamps: List[datetime] = [start_timestamp + timedelta(minutes=index) for index in range(_BENCHMARK_SIZE)]
+
+        def string_key(timestamp: datetime, internal_id: int) -> str:
+            return f"{timestamp.strftime('%Y%m%d%H%M%S.%f')}_{internal_id:0>12}"
+
+        results: List[str] = []
+
+        start: float = perf_counter()
+        string_tree: AVLTree[str, int] = AVLTree()
+        for index, timestamp in enumerate(timestamps):
+            string_tree.insert_node(string_key(timestamp, index), index)
+        for timestamp in timestamps:
+            string_tree.find_floor_value(string_key(timestamp, 999999999999))
+        results.append(f"string keys, insert_node: {perf_counter() - start:.3f}s")
+
+        start = perf_counter()
+        tuple_tree: AVLTree[Tuple[int, int], int] = AVLTree()
+        for index, timestamp in enumerate(timestamps):
+            tuple_tree.insert_node(get_timestamp_key(timestamp, index), index)
+        for timestamp in timestamps:
+            tuple_tree.find_floor_value(get_timestamp_key(timestamp, sys.maxsize))
+        results.append(f"tuple keys, insert_node: {perf_counter() - start:.3f}s")
+
+        start = perf_counter()
+        bulk_tree: AVLTree[Tuple[int, int], int] = AVLTree.from_sorted(
+            [(get_timestamp_key(timestamp, index), index) for index, timestamp in enumerate(timestamps)]
+        )
+        for timestamp in timestamps:
+            bulk_tree.find_floor_value(get_timestamp_key(timestamp, sys.maxsize))
+        results.append(f"tuple keys, from_sorted: {perf_counter() - start:.3f}s")
+
+        LOGGER.info("AVLTree (%d nodes, %d lookups): %s", _BENCHMARK_SIZE, _BENCHMARK_SIZE, ", ".join(results))
+        self.assertEqual(len(string_tree), _BENCHMARK_SIZE)
+        self.assertEqual(len(tuple_tree), _BENCHMARK_SIZE)
+        self.assertEqual(len(bulk_tree), _BENCHMARK_SIZE)
+        tuple_tree_items: List[Tuple[Tuple[int, int], int]] = list(tuple_tree.find_range())
+        bulk_tree_items: List[Tuple[Tuple[int, int], int]] = list(bulk_tree.find_range())
+        self.assertEqual(tuple_tree_items, bulk_tree_items)
+
 
 if __name__ == "__main__":
     logging.basicConfig(stream=sys.stderr)
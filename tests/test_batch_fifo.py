@@ -0,0 +1,268 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from datetime import datetime, timedelta, timezone
+from random import Random
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from rp2.abstract_accounting_method import BatchPairing
+from rp2.abstract_transaction import AbstractTransaction
+from rp2.batch_fifo import pair_fifo_in_batch
+from rp2.computed_data import ComputedData
+from rp2.configuration import Configuration
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.intra_transaction import IntraTransaction
+from rp2.logger import LOGGER
+from rp2.ods_parser import open_ods, parse_ods
+from rp2.ods_reader import ODSReader
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+
+# FIFO without the batch fast path: the reference for the batch results
+class _GenericFifo(fifo.AccountingMethod):
+    @property
+    def name(self) -> str:
+        return "generic_fifo"
+
+    def pair_in_batch(self, taxable_events: List[AbstractTransaction], acquired_lots: List[InTransaction]) -> Optional[BatchPairing]:
+        return None
+
+
+# Row of a test ledger: kind is IN, OUT or INTRA, amount is crypto in/out/received (fee is sent minus received)
+class _Row(NamedTuple):
+    kind: str
+    transaction_type: str
+    amount: str
+    fee: str = "0"
+    hours: int = 1
+
+
+# Amounts with different exponents, to check that the representation of the crypto amounts is the same as the one of the generic loop
+_AMOUNTS: List[str] = ["1", "1.0", "2", "0.5", "0.50", "1.5", "3", "1E+1", "2.00000000", "0.1", "0.2", "0.3", "0.0000000000001", "7.25"]
+
+_GainLossTuple = Tuple[int, Optional[int], str, str]
+
+
+class TestBatchFifo(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestBatchFifo._configuration = Configuration("./config/test_data.config", US())
+
+    # Each row is hours later than the previous one
+    def _create_input_data(self, rows: Iterable[_Row]) -> InputData:
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(self._configuration, "OUT", "B1")
+        intra_transaction_set: TransactionSet = TransactionSet(self._configuration, "INTRA", "B1")
+        timestamp: datetime = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        internal_id: int
+        row: _Row
+        for internal_id, row in enumerate(rows, 1):
+            timestamp += timedelta(hours=row.hours)
+            if row.kind == "IN":
+                in_transaction_set.add_entry(
+                    InTransaction(
+                        self._configuration,
+                        timestamp.isoformat(),
+                        "B1",
+                        "Coinbase",
+                        "Bob",
+                        row.transaction_type,
+                        RP2Decimal("100"),
+                        RP2Decimal(row.amount),
+                        fiat_fee=ZERO,
+                        internal_id=internal_id,
+                    )
+                )
+            elif row.kind == "OUT":
+                out_transaction_set.add_entry(
+                    OutTransaction(
+                        self._configuration,
+                        timestamp.isoformat(),
+                        "B1",
+                        "Coinbase",
+                        "Bob",
+                        row.transaction_type,
+                        RP2Decimal("200"),
+                        RP2Decimal(row.amount),
+                        ZERO,
+                        internal_id=internal_id,
+                    )
+                )
+            else:
+                intra_transaction_set.add_entry(
+                    IntraTransaction(
+                        self._configuration,
+                        timestamp.isoformat(),
+                        "B1",
+                        "Coinbase",
+                        "Bob",
+                        "Kraken",
+                        "Bob",
+                        RP2Decimal("150"),
+                        RP2Decimal(row.amount) + RP2Decimal(row.fee),
+                        RP2Decimal(row.amount),
+                        internal_id=internal_id,
+                    )
+                )
+        return InputData("B1", in_transaction_set, out_transaction_set, intra_transaction_set)
+
+    # Returns (taxable event id, acquired lot id, crypto amount, fiat gain) for each gain/loss (with the exact representation of the amounts) or
+    # the error message
+    @staticmethod
+    def _get_gain_losses(computed_data: ComputedData) -> List[_GainLossTuple]:
+        result: List[_GainLossTuple] = []
+        for entry in computed_data.gain_loss_set:
+            assert isinstance(entry, GainLoss)
+            result.append(
+                (
+                    int(entry.taxable_event.internal_id),
+                    int(entry.acquired_lot.internal_id) if entry.acquired_lot else None,
+                    str(entry.crypto_amount),
+                    str(entry.fiat_gain),
+                )
+            )
+        return result
+
+    # Computes the input with and without the batch fast path, checks that the results are the same and returns whether the batch was used
+    def _compare(self, input_data: InputData) -> bool:
+        batch_result: Union[List[_GainLossTuple], str]
+        generic_result: Union[List[_GainLossTuple], str]
+        with self.assertLogs(LOGGER, "DEBUG") as log:
+            try:
+                batch_result = self._get_gain_losses(compute_tax(self._configuration, fifo.AccountingMethod(), input_data))
+            except RP2ValueError as error:
+                batch_result = str(error)
+        try:
+            generic_result = self._get_gain_losses(compute_tax(self._configuration, _GenericFifo(), input_data))
+        except RP2ValueError as error:
+            generic_result = str(error)
+        self.assertEqual(batch_result, generic_result)
+        return any("acquired lots in batch" in line for line in log.output)
+
+    def test_ods_input(self) -> None:
+        input_file_handle: ODSReader = open_ods(self._configuration, "./input/test_data.ods")
+        for asset in ["B1", "B2", "B3", "B4"]:
+            input_data: InputData = parse_ods(self._configuration, asset, input_file_handle)
+            self.assertEqual(
+                str(compute_tax(self._configuration, fifo.AccountingMethod(), input_data).gain_loss_set),
+                str(compute_tax(self._configuration, _GenericFifo(), input_data).gain_loss_set),
+                asset,
+            )
+
+    def test_representation(self) -> None:
+        rows: List[_Row] = [
+            _Row("IN", "Buy", "1.0"),
+            _Row("IN", "Buy", "2"),
+            _Row("IN", "Interest", "0.50"),
+            _Row("OUT", "Sell", "0.5"),
+            _Row("OUT", "Sell", "0.5"),
+            _Row("IN", "Staking", "1E+1"),
+            _Row("OUT", "Sell", "1.00000"),
+            _Row("INTRA", "Move", "1", "0.25"),
+            _Row("OUT", "Gift", "2.0000000000001"),
+        ]
+        self.assertTrue(self._compare(self._create_input_data(rows)))
+
+    def test_random_input(self) -> None:
+        random: Random = Random(7)
+        batch_count: int = 0
+        for _ in range(300):
+            rows: List[_Row] = []
+            for _ in range(random.randint(1, 25)):
+                kind: float = random.random()
+                if kind < 0.55:
+                    rows.append(_Row("IN", random.choice(["Buy", "Buy", "Interest", "Staking"]), random.choice(_AMOUNTS), hours=random.randint(0, 1)))
+                elif kind < 0.8:
+                    rows.append(_Row("OUT", random.choice(["Sell", "Gift"]), random.choice(_AMOUNTS), hours=random.randint(0, 1)))
+                else:
+                    rows.append(_Row("INTRA", "Move", random.choice(_AMOUNTS), random.choice(["0", "0.1", "0.25"]), hours=random.randint(0, 1)))
+            try:
+                input_data: InputData = self._create_input_data(rows)
+            except RP2ValueError:
+                continue
+            batch_count += self._compare(input_data)
+        self.assertGreater(batch_count, 50)
+
+    def test_fallback(self) -> None:
+        for rows in [
+            # Not enough crypto in acquired lots
+            [_Row("IN", "Buy", "1"), _Row("OUT", "Sell", "1.5")],
+            # More decimal digits than the ones RP2Decimal compares
+            [_Row("IN", "Buy", "1.00000000000001"), _Row("OUT", "Sell", "1")],
+            # Taxable event earlier than its acquired lot
+            [_Row("IN", "Buy", "1"), _Row("OUT", "Sell", "1.5"), _Row("IN", "Buy", "1")],
+        ]:
+            self.assertFalse(self._compare(self._create_input_data(rows)), str(rows))
+
+    def test_used_up_lots(self) -> None:
+        input_data: InputData = self._create_input_data([_Row("IN", "Buy", "1"), _Row("OUT", "Sell", "2"), _Row("IN", "Interest", "1", hours=0)])
+        acquired_lots: List[InTransaction] = list(input_data.unfiltered_in_transaction_set)  # type: ignore
+        sell: AbstractTransaction = next(iter(input_data.unfiltered_out_transaction_set))  # type: ignore
+        interest: InTransaction = acquired_lots[1]
+        batch_pairing: Optional[BatchPairing] = pair_fifo_in_batch([interest, sell], acquired_lots)
+        assert batch_pairing is not None
+        expected_acquired_lots: List[Optional[InTransaction]] = [None, acquired_lots[0], acquired_lots[1]]
+        self.assertEqual(batch_pairing.acquired_lots, expected_acquired_lots)
+        crypto_amounts: List[str] = [str(crypto_amount) for crypto_amount in batch_pairing.crypto_amounts]
+        expected_crypto_amounts: List[str] = ["1", "1", "1"]
+        self.assertEqual(crypto_amounts, expected_crypto_amounts)
+        # The sell uses up the lots: the generic loop fails looking for the lot of the next taxable event, even if it's earn-typed
+        self.assertIsNone(pair_fifo_in_batch([sell, interest], acquired_lots))
+
+    def test_create_batch_errors(self) -> None:
+        input_data: InputData = self._create_input_data([_Row("IN", "Buy", "2"), _Row("OUT", "Sell", "1"), _Row("IN", "Interest", "1")])
+        acquired_lot: InTransaction = next(iter(input_data.unfiltered_in_transaction_set))  # type: ignore
+        interest: InTransaction = list(input_data.unfiltered_in_transaction_set)[1]  # type: ignore
+        taxable_event: AbstractTransaction = next(iter(input_data.unfiltered_out_transaction_set))  # type: ignore
+        method: fifo.AccountingMethod = fifo.AccountingMethod()
+
+        gain_losses: List[GainLoss] = GainLoss.create_batch(
+            self._configuration, method, [RP2Decimal("1"), RP2Decimal("1")], [taxable_event, interest], [acquired_lot, None]
+        )
+        gain_loss_acquired_lots: List[Optional[InTransaction]] = [gain_loss.acquired_lot for gain_loss in gain_losses]
+        expected_acquired_lots: List[Optional[InTransaction]] = [acquired_lot, None]
+        self.assertEqual(gain_loss_acquired_lots, expected_acquired_lots)
+        gain_loss_strings: List[str] = [str(gain_loss) for gain_loss in gain_losses]
+        expected_strings: List[str] = [
+            str(GainLoss(self._configuration, method, RP2Decimal("1"), taxable_event, acquired_lot)),
+            str(GainLoss(self._configuration, method, RP2Decimal("1"), interest, None)),
+        ]
+        self.assertEqual(gain_loss_strings, expected_strings)
+
+        with self.assertRaisesRegex(RP2ValueError, "Lists have different lengths"):
+            GainLoss.create_batch(self._configuration, method, [RP2Decimal("1")], [taxable_event, interest], [acquired_lot, None])
+        with self.assertRaisesRegex(RP2ValueError, "Parameter 'crypto_amount' has zero value"):
+            GainLoss.create_batch(self._configuration, method, [RP2Decimal("0")], [taxable_event], [acquired_lot])
+        with self.assertRaisesRegex(RP2ValueError, "crypto_amount .* is greater than taxable event amount"):
+            GainLoss.create_batch(self._configuration, method, [RP2Decimal("1.5")], [taxable_event], [acquired_lot])
+        with self.assertRaisesRegex(RP2TypeError, "Parameter 'crypto_amount'"):
+            GainLoss.create_batch(self._configuration, method, [1], [taxable_event], [acquired_lot])  # type: ignore
+        with self.assertRaisesRegex(RP2TypeError, "must not be None"):
+            # Taxable event that isn't earn-typed without acquired lot
+            GainLoss.create_batch(self._configuration, method, [RP2Decimal("1")], [taxable_event], [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
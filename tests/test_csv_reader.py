@@ -0,0 +1,165 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import unittest
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, List
+
+from rp2.configuration import Configuration
+from rp2.csv_reader import CSVReader
+from rp2.input_data import InputData
+from rp2.ods_parser import open_csv, open_ods, parse_ods
+from rp2.ods_reader import ODSReader
+from rp2.plugin.country.us import US
+from rp2.rp2_error import RP2ValueError
+
+
+class TestCSVReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None  # pylint: disable=invalid-name
+
+    # Write each sheet of the ODS file as a separate CSV / TSV file named after the sheet
+    @staticmethod
+    def _convert(input_file_path: str, output_dir: Path, extension: str) -> None:
+        reader: ODSReader = ODSReader(input_file_path)
+        for sheet_name in reader.sheet_names:
+            with open(output_dir / Path(f"{sheet_name}{extension}"), "w", encoding="utf-8", newline="") as output_file:
+                writer: Any = csv.writer(output_file, delimiter="\t" if extension == ".tsv" else ",")
+                for row in reader.rows(sheet_name):
+                    writer.writerow(["" if value is None else str(value) for value in row])
+
+    @staticmethod
+    def _to_string(input_data: InputData) -> List[str]:
+        return [
+            str(transaction_set)
+            for transaction_set in [
+                input_data.unfiltered_in_transaction_set,
+                input_data.unfiltered_out_transaction_set,
+                input_data.unfiltered_intra_transaction_set,
+            ]
+        ]
+
+    # The CSV / TSV backend must produce the same input data as the ODS backend (including artificial fee transactions and internal ids)
+    def test_same_input_data_as_ods(self) -> None:
+        for test_name, assets in [("test_data", ["B1", "B2", "B3", "B4"]), ("crypto_example", ["BTC", "ETH"])]:
+            configuration: Configuration = Configuration(f"./config/{test_name}.config", US())
+            ods_reader: ODSReader = open_ods(configuration, f"./input/{test_name}.ods")
+            for extension in [".csv", ".tsv"]:
+                with TemporaryDirectory() as input_dir:
+                    self._convert(f"./input/{test_name}.ods", Path(input_dir), extension)
+                    csv_reader: CSVReader = open_csv(configuration, input_dir)
+                    self.assertEqual(sorted(csv_reader.sheet_names), sorted(ods_reader.sheet_names))
+                    for asset in assets:
+                        self.assertEqual(
+                            self._to_string(parse_ods(configuration, asset, csv_reader)),
+                            self._to_string(parse_ods(configuration, asset, ods_reader)),
+                            f"{test_name}/{asset}{extension}",
+                        )
+                        # Single-file input
+                        single_file_reader: CSVReader = open_csv(configuration, str(Path(input_dir) / Path(f"{asset}{extension}")))
+                        self.assertEqual(single_file_reader.sheet_names, [asset])
+                        self.assertEqual(
+                            self._to_string(parse_ods(configuration, asset, single_file_reader)),
+                            self._to_string(parse_ods(configuration, asset, ods_reader)),
+                        )
+
+    def test_bad_input(self) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US())
+        with self.assertRaisesRegex(RP2ValueError, "Error: .* does not exist"):
+            CSVReader("./input/non_existent.csv")
+        with self.assertRaisesRegex(RP2ValueError, "Error: .* is not a CSV or TSV file"):
+            CSVReader("./config/test_data.config")
+        with TemporaryDirectory() as input_dir:
+            (Path(input_dir) / Path("B1.csv")).write_text("IN\ntimestamp,exchange\n2020-01-01T08:41Z,Coinbase,Bob,,,BuY,B1,1,foobar,,,0,note\nTABLE END\n")
+            (Path(input_dir) / Path("B2.csv")).write_text("IN\n")
+            (Path(input_dir) / Path("notes.txt")).write_text("foobar")
+            reader: CSVReader = CSVReader(input_dir)
+            self.assertEqual(reader.sheet_names, ["B1", "B2"])
+            self.assertFalse(reader.has_sheet("notes"))
+            with self.assertRaisesRegex(RP2ValueError, "Error: sheet B3 does not exist in .*"):
+                next(reader.rows("B3"))
+            with self.assertRaisesRegex(RP2ValueError, "Argument 'spot_price' has non-numeric value: foobar"):
+                parse_ods(configuration, "B1", reader)
+            with self.assertRaisesRegex(RP2ValueError, "TABLE END not found for .*"):
+                parse_ods(configuration, "B2", reader)
+            (Path(input_dir) / Path("B2.tsv")).write_text("IN\n")
+            with self.assertRaisesRegex(RP2ValueError, "Error: found more than one file for asset B2 in .*"):
+                CSVReader(input_dir)
+
+    # The row after a table-begin keyword is transaction data (not a header) if its timestamp and numeric cells are valid, even if other cells
+    # aren't (e.g. an unknown exchange)
+    def test_data_with_no_header(self) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US())
+        for row in ["2020-01-01T08:41Z,Coinbase,Bob,,,Buy,B1,1,1000,,,0,", "2020-01-01T08:41Z,FooExchange,Bob,,,Buy,B1,1,1000,,,0,"]:
+            with TemporaryDirectory() as input_dir:
+                (Path(input_dir) / Path("B1.csv")).write_text(f"IN\n{row}\nTABLE END\n")
+                with self.assertRaisesRegex(RP2ValueError, "Found data with no header"):
+                    parse_ods(configuration, "B1", CSVReader(input_dir))
+
+    # Transactions are created in batches, whose arguments are checked column by column: invalid values are reported as if the rows were processed
+    # one at a time (i.e. the error of the first invalid row is reported), and values close to zero are checked as usual.
+    def test_column_checks(self) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US())
+        table_begin: str = "IN\ntimestamp,exchange\n2020-01-01T08:41Z,Coinbase,Bob,,,BuY,B1,1,1000,,,0,note\n"
+        with TemporaryDirectory() as input_dir:
+            (Path(input_dir) / Path("B1.csv")).write_text(
+                f"{table_begin}2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,0.0000000000001,1000,,,-0,\n2020-01-03T08:41Z,Kraken,Alice,,,Interest,B1,2,1000,,,,\n"
+                "TABLE END\n"
+            )
+            input_data: InputData = parse_ods(configuration, "B1", CSVReader(input_dir))
+            self.assertEqual([str(transaction.crypto_in) for transaction in input_data.unfiltered_in_transaction_set], ["1", "1E-13", "2"])  # type: ignore
+
+        for rows, message in [
+            (
+                "2020-01-02T08:41Z,Coinbase,Carol,,,Buy,B1,1,1000,,,0,\n2020-01-03T08:41Z,FooExchange,Bob,,,Buy,B1,1,1000,,,0,\n",
+                "Parameter 'holder' value is not known",
+            ),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,0,1000,,,0,\n", "Parameter 'crypto_in' has zero value"),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,0.00000000000001,1000,,,0,\n", "Parameter 'crypto_in' has zero value"),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,1,-0.1,,,0,\n", "Parameter 'spot_price' has non-positive value"),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,1,1000,,,foobar,\n", "Argument 'fiat_fee' has non-numeric value: foobar"),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,Sell,B1,1,1000,,,0,\n", "invalid transaction type"),
+        ]:
+            with TemporaryDirectory() as input_dir:
+                (Path(input_dir) / Path("B1.csv")).write_text(f"{table_begin}{rows}TABLE END\n")
+                with self.assertRaisesRegex(RP2ValueError, message):
+                    parse_ods(configuration, "B1", CSVReader(input_dir))
+
+
+    # Rows that occurred after to_date don't become transactions, but their cells are checked as usual
+    def test_rows_after_to_date(self) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US(), to_date=date(2020, 1, 1))
+        table_begin: str = "IN\ntimestamp,exchange\n2020-01-01T08:41Z,Coinbase,Bob,,,Buy,B1,1,1000,,,0,\n"
+        with TemporaryDirectory() as input_dir:
+            (Path(input_dir) / Path("B1.csv")).write_text(f"{table_begin}2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,2,1000,,,0,\nTABLE END\n")
+            input_data: InputData = parse_ods(configuration, "B1", CSVReader(input_dir))
+            self.assertEqual(input_data.unfiltered_in_transaction_set.count, 1)
+
+        for row, message in [
+            ("2020-01-02T08:41Z,FooExchange,Bob,,,Buy,B1,1,1000,,,0,", "Parameter 'exchange' value is not known"),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,Buy,B1,1,-1000,,,0,", "Parameter 'spot_price' has non-positive value"),
+            ("2020-01-02T08:41Z,Coinbase,Carol,,,Buy,B1,1,1000,,,0,", "Parameter 'holder' value is not known"),
+            ("2020-01-02T08:41Z,Coinbase,Bob,,,FooType,B1,1,1000,,,0,", "invalid transaction type value"),
+        ]:
+            with TemporaryDirectory() as input_dir:
+                (Path(input_dir) / Path("B1.csv")).write_text(f"{table_begin}{row}\nTABLE END\n")
+                with self.assertRaisesRegex(RP2ValueError, message):
+                    parse_ods(configuration, "B1", CSVReader(input_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
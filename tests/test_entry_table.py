@@ -0,0 +1,153 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from typing import List
+
+from rp2.configuration import Configuration
+from rp2.entry_table import EntryTable
+from rp2.in_transaction import InTransaction
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import RP2Decimal
+from rp2.rp2_error import RP2ValueError
+from rp2.transaction_set import TransactionSet
+
+
+class TestEntryTable(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestEntryTable._configuration = Configuration("./config/test_data.config", US())
+
+    def _create_in_transaction(self, day: int, internal_id: int) -> InTransaction:
+        return InTransaction(
+            self._configuration,
+            f"2021-01-{day:02d}T08:42:43.883Z",
+            "B1",
+            "Coinbase",
+            "Bob",
+            "Buy",
+            RP2Decimal("1000"),
+            RP2Decimal("1"),
+            fiat_fee=RP2Decimal("0"),
+            internal_id=internal_id,
+        )
+
+    def _check_entry_indexes(self, transactions: List[InTransaction], expected_entry_indexes: List[int]) -> None:
+        entry_indexes: List[int] = [transaction.entry_index for transaction in transactions]
+        self.assertEqual(entry_indexes, expected_entry_indexes)
+
+    def test_entry_index(self) -> None:
+        # Transactions are added out of order: indexes follow insertion order, not timestamp order
+        transactions: List[InTransaction] = [self._create_in_transaction(day, internal_id) for internal_id, day in enumerate([3, 1, 2])]
+        for transaction in transactions:
+            self.assertEqual(transaction.entry_index, -1)
+
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        for transaction in transactions:
+            in_transaction_set.add_entry(transaction)
+        self._check_entry_indexes(transactions, [0, 1, 2])
+
+        # MIXED sets don't assign indexes and don't change the ones assigned by typed sets
+        mixed_transaction_set: TransactionSet = TransactionSet(self._configuration, "MIXED", "B1")
+        for transaction in reversed(transactions):
+            mixed_transaction_set.add_entry(transaction)
+        self._check_entry_indexes(transactions, [0, 1, 2])
+        unindexed_transaction: InTransaction = self._create_in_transaction(4, 3)
+        mixed_transaction_set.add_entry(unindexed_transaction)
+        self.assertEqual(unindexed_transaction.entry_index, -1)
+
+        # Entries keep the index assigned by the first typed set they're added to
+        other_in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        for transaction in reversed(transactions):
+            other_in_transaction_set.add_entry(transaction)
+        self._check_entry_indexes(transactions, [0, 1, 2])
+        self.assertIsNotNone(transactions[0].entry_index_owner)
+        self.assertIs(transactions[0].entry_index_owner, transactions[2].entry_index_owner)
+
+    def test_entry_table(self) -> None:
+        transactions: List[InTransaction] = [self._create_in_transaction(day, day) for day in range(1, 6)]
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        for transaction in transactions:
+            in_transaction_set.add_entry(transaction)
+
+        table: EntryTable[InTransaction, int] = EntryTable()
+        self.assertEqual(len(table), 0)
+        self.assertFalse(transactions[0] in table)
+        with self.assertRaises(KeyError):
+            table[transactions[0]]  # pylint: disable=pointless-statement
+        self.assertEqual(table.get(transactions[0], 7), 7)
+
+        # The table grows as needed and zero is a valid value
+        table[transactions[3]] = 0
+        table[transactions[1]] = 10
+        table[transactions[1]] = 11
+        self.assertEqual(len(table), 2)
+        self.assertTrue(transactions[3] in table)
+        self.assertFalse(transactions[4] in table)
+        self.assertEqual(table[transactions[3]], 0)
+        self.assertEqual(table[transactions[1]], 11)
+        self.assertEqual(table.get(transactions[2], 7), 7)
+        values: List[int] = list(table.values())
+        expected_values: List[int] = [11, 0]
+        self.assertEqual(values, expected_values)
+
+        # Preallocated table
+        preallocated_table: EntryTable[InTransaction, int] = EntryTable(len(transactions))
+        self.assertEqual(len(preallocated_table), 0)
+        self.assertFalse(transactions[4] in preallocated_table)
+        preallocated_table[transactions[4]] = 4
+        self.assertEqual(preallocated_table[transactions[4]], 4)
+
+    # Indexes are unique only within the entry set that assigned them: entries indexed by different sets with the same index don't collide
+    def test_entries_of_different_sets(self) -> None:
+        table: EntryTable[InTransaction, int] = EntryTable()
+        transaction: InTransaction = self._create_in_transaction(1, 1)
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        in_transaction_set.add_entry(transaction)
+        other_transaction: InTransaction = self._create_in_transaction(2, 2)
+        other_in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        other_in_transaction_set.add_entry(other_transaction)
+        self.assertEqual(other_transaction.entry_index, transaction.entry_index)
+        self.assertIsNot(other_transaction.entry_index_owner, transaction.entry_index_owner)
+        table[transaction] = 1
+        self.assertFalse(other_transaction in table)
+        self.assertEqual(table.get(other_transaction, 7), 7)
+        table[other_transaction] = 2
+        table[other_transaction] = 3
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table[transaction], 1)
+        self.assertEqual(table[other_transaction], 3)
+
+    def test_bad_entry_table(self) -> None:
+        table: EntryTable[InTransaction, int] = EntryTable()
+        unindexed_transaction: InTransaction = self._create_in_transaction(1, 1)
+
+        with self.assertRaisesRegex(RP2ValueError, "Entry has not been added to an entry set"):
+            table[unindexed_transaction] = 1
+        # Lookups treat entries without an index as missing
+        self.assertFalse(unindexed_transaction in table)
+        self.assertEqual(table.get(unindexed_transaction, 7), 7)
+        with self.assertRaises(KeyError):
+            table[unindexed_transaction]  # pylint: disable=pointless-statement
+
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        in_transaction_set.add_entry(unindexed_transaction)
+        with self.assertRaisesRegex(RP2ValueError, "Invalid value None"):
+            table[unindexed_transaction] = None  # type: ignore
+
+
+if __name__ == "__main__":
+    unittest.main()
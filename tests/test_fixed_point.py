@@ -0,0 +1,354 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from random import Random
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple, cast
+
+from rp2.abstract_accounting_method import AbstractAccountingMethod
+from rp2.balance import Balance
+from rp2.computed_data import ComputedData, YearlyGainLoss
+from rp2.configuration import MAX_DATE, Configuration
+from rp2.fixed_point import FIXED_POINT_LIMIT, fixed_point_prefix_sums, fixed_point_sum, from_fixed_point, to_fixed_point
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.intra_transaction import IntraTransaction
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo, hifo, lifo, total_average
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2ValueError
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+_BENCHMARK_LOT_COUNT: int = (
+    0 if "RP2_TEST_BENCHMARK_FIXED_POINT_LOT_COUNT" not in os.environ else int(str(os.environ.get("RP2_TEST_BENCHMARK_FIXED_POINT_LOT_COUNT")))
+)
+_BENCHMARK_REPEAT: int = 5
+_METHODS: Dict[str, Callable[[], AbstractAccountingMethod]] = {
+    "fifo": fifo.AccountingMethod,
+    "lifo": lifo.AccountingMethod,
+    "hifo": hifo.AccountingMethod,
+    "total_average": total_average.AccountingMethod,
+}
+
+# Values (as Decimal, so that they are compared exactly rather than to CRYPTO_DECIMALS digits) of the results of a tax computation
+_Results = Tuple[
+    List[Tuple[str, Optional[str], Decimal, Decimal, Decimal, int, Optional[int]]],
+    List[Tuple[int, str, bool, Decimal, Decimal, Decimal, Decimal]],
+    List[Tuple[str, str, Decimal, Decimal, Decimal, Decimal]],
+    List[Decimal],
+    Decimal,
+]
+
+
+class TestFixedPoint(unittest.TestCase):
+    def test_to_fixed_point(self) -> None:
+        self.assertEqual(to_fixed_point(RP2Decimal("1.5")), 15000000000000)
+        self.assertEqual(to_fixed_point(RP2Decimal("-0.0000000000001")), -1)
+        self.assertEqual(to_fixed_point(RP2Decimal("1.5000000000000000000")), 15000000000000)
+        self.assertEqual(to_fixed_point(RP2Decimal("12E+3")), 120000000000000000)
+        self.assertEqual(to_fixed_point(ZERO), 0)
+        # Too many decimal digits
+        self.assertIsNone(to_fixed_point(RP2Decimal("0.00000000000001")))
+        # Too large
+        self.assertIsNone(to_fixed_point(RP2Decimal("100000000000000000")))
+        self.assertEqual(to_fixed_point(RP2Decimal("99999999999999999")), FIXED_POINT_LIMIT - 10000000000000)
+        self.assertIsNone(to_fixed_point(RP2Decimal("Infinity")))
+
+    def test_from_fixed_point(self) -> None:
+        amount: RP2Decimal
+        for amount in [RP2Decimal("1.5"), RP2Decimal("-0.0000000000001"), RP2Decimal("12E+3"), ZERO, RP2Decimal("99999999999999999.9999999999999")]:
+            result: RP2Decimal = from_fixed_point(cast(int, to_fixed_point(amount)))
+            self.assertIsInstance(result, RP2Decimal)
+            self.assertEqual(Decimal(result), Decimal(amount))
+
+    def test_fixed_point_sum(self) -> None:
+        values: List[Optional[int]] = [1, 2, 3]
+        self.assertEqual(fixed_point_sum(values), 6)
+        values = []
+        self.assertEqual(fixed_point_sum(values), 0)
+        values = [1, None, 3]
+        self.assertIsNone(fixed_point_sum(values))
+        values = [FIXED_POINT_LIMIT - 1, 1]
+        self.assertIsNone(fixed_point_sum(values))
+        values = [FIXED_POINT_LIMIT - 1, 1, -1]
+        self.assertEqual(fixed_point_sum(values), FIXED_POINT_LIMIT - 1)
+
+    def test_fixed_point_prefix_sums(self) -> None:
+        values: List[Optional[int]] = [1, 2, 3]
+        expected: List[int] = [1, 3, 6]
+        self.assertEqual(fixed_point_prefix_sums(values), expected)
+        values = []
+        expected = []
+        self.assertEqual(fixed_point_prefix_sums(values), expected)
+        values = [1, None, 3]
+        self.assertIsNone(fixed_point_prefix_sums(values))
+        # The sum fits, but a running sum doesn't
+        values = [FIXED_POINT_LIMIT - 1, 1, -1]
+        self.assertIsNone(fixed_point_prefix_sums(values))
+
+    def test_entry_fixed_point_amounts(self) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US(), fixed_point=True)
+        in_transaction: InTransaction = InTransaction(
+            configuration, "2020-01-01T00:00:00Z", "B1", "Coinbase", "Bob", "Buy", RP2Decimal("100"), RP2Decimal("2.5"), ZERO, internal_id=1
+        )
+        self.assertEqual(in_transaction.fixed_point_crypto_in, 25000000000000)
+        self.assertEqual(in_transaction.fixed_point_crypto_balance_change, 25000000000000)
+        out_transaction: OutTransaction = OutTransaction(
+            configuration, "2020-02-01T00:00:00Z", "B1", "Coinbase", "Bob", "Sell", RP2Decimal("100"), RP2Decimal("1"), RP2Decimal("0.01"), internal_id=2
+        )
+        self.assertEqual(out_transaction.fixed_point_crypto_out_no_fee, 10000000000000)
+        self.assertEqual(out_transaction.fixed_point_crypto_fee, 100000000000)
+        self.assertEqual(out_transaction.fixed_point_crypto_balance_change, 10100000000000)
+        intra_transaction: IntraTransaction = IntraTransaction(
+            configuration,
+            "2020-03-01T00:00:00Z",
+            "B1",
+            "Coinbase",
+            "Bob",
+            "Kraken",
+            "Bob",
+            RP2Decimal("100"),
+            RP2Decimal("1"),
+            RP2Decimal("0.00000000000001"),
+            internal_id=3,
+        )
+        self.assertEqual(intra_transaction.fixed_point_crypto_sent, 10000000000000)
+        self.assertIsNone(intra_transaction.fixed_point_crypto_received)
+        self.assertIsNone(intra_transaction.fixed_point_crypto_fee)
+        gain_loss: GainLoss = GainLoss(configuration, fifo.AccountingMethod(), RP2Decimal("1.01"), out_transaction, in_transaction)
+        self.assertEqual(gain_loss.fixed_point_crypto_amount, 10100000000000)
+
+        # Not in fixed-point mode
+        configuration = Configuration("./config/test_data.config", US())
+        in_transaction = InTransaction(
+            configuration, "2020-01-01T00:00:00Z", "B1", "Coinbase", "Bob", "Buy", RP2Decimal("100"), RP2Decimal("2.5"), ZERO, internal_id=1
+        )
+        self.assertIsNone(in_transaction.fixed_point_crypto_in)
+
+    # Invalid amounts raise the same errors as with RP2Decimal arithmetic
+    def test_gain_loss_errors(self) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US(), fixed_point=True)
+        in_transaction: InTransaction = InTransaction(
+            configuration, "2020-01-01T00:00:00Z", "B1", "Coinbase", "Bob", "Buy", RP2Decimal("100"), RP2Decimal("1"), ZERO, internal_id=1
+        )
+        out_transaction: OutTransaction = OutTransaction(
+            configuration, "2020-02-01T00:00:00Z", "B1", "Coinbase", "Bob", "Sell", RP2Decimal("100"), RP2Decimal("2"), ZERO, internal_id=2
+        )
+        with self.assertRaisesRegex(RP2ValueError, "Parameter 'crypto_amount' has zero value"):
+            GainLoss(configuration, fifo.AccountingMethod(), ZERO, out_transaction, in_transaction)
+        with self.assertRaisesRegex(RP2ValueError, "Parameter 'crypto_amount' has non-positive value -1"):
+            GainLoss(configuration, fifo.AccountingMethod(), RP2Decimal("-1"), out_transaction, in_transaction)
+        with self.assertRaisesRegex(RP2ValueError, r"crypto_amount \(1.5\) is greater than taxable event amount \(2\) or acquired-lot amount \(1\)"):
+            GainLoss(configuration, fifo.AccountingMethod(), RP2Decimal("1.5"), out_transaction, in_transaction)
+        with self.assertRaisesRegex(RP2ValueError, "crypto_amount must be == taxable_event.crypto_balance_change for taxable events with pooled cost"):
+            GainLoss(configuration, total_average.AccountingMethod(), RP2Decimal("1"), out_transaction, None, RP2Decimal("100"))
+
+    # Sales from two accounts and transfers between them, with 8-decimal amounts (plus, if so requested, an amount that has no fixed-point value)
+    def _create_input_data(self, configuration: Configuration, lot_count: int, has_non_fixed_point_amount: bool = False) -> InputData:
+        random: Random = Random(17)
+        in_transaction_set: TransactionSet = TransactionSet(configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(configuration, "OUT", "B1")
+        intra_transaction_set: TransactionSet = TransactionSet(configuration, "INTRA", "B1")
+        timestamp: datetime = datetime(2018, 1, 1, tzinfo=timezone.utc)
+        internal_id: int = 0
+
+        def get_amount(minimum: int, maximum: int) -> RP2Decimal:
+            return RP2Decimal(f"{random.randint(minimum, maximum)}.{random.randint(0, 99999999):08d}")
+
+        for index in range(lot_count):
+            crypto_in: RP2Decimal = get_amount(2, 3)
+            if has_non_fixed_point_amount and index == lot_count // 2:
+                crypto_in += RP2Decimal("0.000000000000001")
+            in_transaction_set.add_entry(
+                InTransaction(
+                    configuration,
+                    timestamp.isoformat(),
+                    "B1",
+                    "Coinbase",
+                    "Bob",
+                    "Buy" if index % 5 else "Interest",
+                    RP2Decimal(str(random.randint(1000, 60000))),
+                    crypto_in,
+                    fiat_fee=RP2Decimal(f"{random.randint(0, 20)}.{random.randint(0, 99):02d}"),
+                    internal_id=internal_id,
+                )
+            )
+            timestamp += timedelta(days=1)
+            crypto_sent: RP2Decimal = get_amount(0, 0) + RP2Decimal("0.5")
+            intra_transaction_set.add_entry(
+                IntraTransaction(
+                    configuration,
+                    timestamp.isoformat(),
+                    "B1",
+                    "Coinbase",
+                    "Bob",
+                    "Kraken",
+                    "Bob",
+                    RP2Decimal(str(random.randint(1000, 60000))),
+                    crypto_sent,
+                    crypto_sent - RP2Decimal("0.001"),
+                    internal_id=internal_id + 1,
+                )
+            )
+            timestamp += timedelta(days=1)
+            out_transaction_set.add_entry(
+                OutTransaction(
+                    configuration,
+                    timestamp.isoformat(),
+                    "B1",
+                    "Kraken",
+                    "Bob",
+                    "Sell",
+                    RP2Decimal(str(random.randint(1000, 60000))),
+                    get_amount(0, 0) * RP2Decimal("0.4"),
+                    RP2Decimal("0.0001"),
+                    internal_id=internal_id + 2,
+                )
+            )
+            out_transaction_set.add_entry(
+                OutTransaction(
+                    configuration,
+                    timestamp.isoformat(),
+                    "B1",
+                    "Coinbase",
+                    "Bob",
+                    "Sell",
+                    RP2Decimal(str(random.randint(1000, 60000))),
+                    get_amount(0, 0) * RP2Decimal("0.5") + RP2Decimal("0.5"),
+                    RP2Decimal("0.0001"),
+                    internal_id=internal_id + 3,
+                )
+            )
+            timestamp += timedelta(days=1)
+            internal_id += 4
+        return InputData("B1", in_transaction_set, out_transaction_set, intra_transaction_set)
+
+    def _get_results(self, computed_data: ComputedData) -> _Results:
+        gain_losses: List[Tuple[str, Optional[str], Decimal, Decimal, Decimal, int, Optional[int]]] = []
+        crypto_running_sums: List[Decimal] = []
+        for entry in computed_data.gain_loss_set:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            gain_losses.append(
+                (
+                    gain_loss.taxable_event.internal_id,
+                    gain_loss.acquired_lot.internal_id if gain_loss.acquired_lot else None,
+                    Decimal(gain_loss.crypto_amount),
+                    Decimal(gain_loss.fiat_cost_basis),
+                    Decimal(gain_loss.fiat_gain),
+                    computed_data.gain_loss_set.get_taxable_event_fraction(gain_loss),
+                    computed_data.gain_loss_set.get_acquired_lot_fraction(gain_loss) if gain_loss.acquired_lot else None,
+                )
+            )
+            crypto_running_sums.append(Decimal(computed_data.get_crypto_gain_loss_running_sum(gain_loss)))
+        yearly_gain_losses: List[Tuple[int, str, bool, Decimal, Decimal, Decimal, Decimal]] = []
+        yearly_gain_loss: YearlyGainLoss
+        for yearly_gain_loss in computed_data.yearly_gain_loss_list:
+            yearly_gain_losses.append(
+                (
+                    yearly_gain_loss.year,
+                    yearly_gain_loss.transaction_type.value,
+                    yearly_gain_loss.is_long_term_capital_gains,
+                    Decimal(yearly_gain_loss.crypto_amount),
+                    Decimal(yearly_gain_loss.fiat_amount),
+                    Decimal(yearly_gain_loss.fiat_cost_basis),
+                    Decimal(yearly_gain_loss.fiat_gain_loss),
+                )
+            )
+        balances: List[Tuple[str, str, Decimal, Decimal, Decimal, Decimal]] = []
+        balance: Balance
+        for balance in computed_data.balance_set:
+            balances.append(
+                (
+                    balance.exchange,
+                    balance.holder,
+                    Decimal(balance.final_balance),
+                    Decimal(balance.acquired_balance),
+                    Decimal(balance.sent_balance),
+                    Decimal(balance.received_balance),
+                )
+            )
+        for entry in computed_data.in_transaction_set:
+            crypto_running_sums.append(Decimal(computed_data.get_crypto_in_running_sum(cast(InTransaction, entry))))
+        for entry in computed_data.out_transaction_set:
+            crypto_running_sums.append(Decimal(computed_data.get_crypto_out_running_sum(cast(OutTransaction, entry))))
+            crypto_running_sums.append(Decimal(computed_data.get_crypto_out_fee_running_sum(cast(OutTransaction, entry))))
+        for entry in computed_data.intra_transaction_set:
+            crypto_running_sums.append(Decimal(computed_data.get_crypto_intra_fee_running_sum(cast(IntraTransaction, entry))))
+        return (gain_losses, yearly_gain_losses, balances, crypto_running_sums, Decimal(computed_data.price_per_unit))
+
+    def _check_same_results(self, to_date: date, per_wallet: bool, has_non_fixed_point_amount: bool) -> None:
+        configuration: Configuration = Configuration("./config/test_data.config", US(), to_date=to_date, per_wallet=per_wallet)
+        fixed_point_configuration: Configuration = Configuration("./config/test_data.config", US(), to_date=to_date, per_wallet=per_wallet, fixed_point=True)
+        input_data: InputData = self._create_input_data(configuration, 60, has_non_fixed_point_amount)
+        fixed_point_input_data: InputData = self._create_input_data(fixed_point_configuration, 60, has_non_fixed_point_amount)
+        method: str
+        create_accounting_method: Callable[[], AbstractAccountingMethod]
+        for method, create_accounting_method in _METHODS.items():
+            if per_wallet and method == "total_average":
+                continue
+            message: str = f"{method}, to_date={to_date}, per_wallet={per_wallet}, has_non_fixed_point_amount={has_non_fixed_point_amount}"
+            fixed_point_computed_data: ComputedData = compute_tax(fixed_point_configuration, create_accounting_method(), fixed_point_input_data)
+            self.assertEqual(
+                self._get_results(fixed_point_computed_data),
+                self._get_results(compute_tax(configuration, create_accounting_method(), input_data)),
+                message,
+            )
+            if not has_non_fixed_point_amount:
+                for entry in fixed_point_computed_data.gain_loss_set:
+                    self.assertIsNotNone(cast(GainLoss, entry).fixed_point_crypto_amount, message)
+
+    def test_same_results(self) -> None:
+        to_date: date
+        for to_date in [MAX_DATE, date(2018, 4, 15)]:
+            for per_wallet in [False, True]:
+                for has_non_fixed_point_amount in [False, True]:
+                    self._check_same_results(to_date, per_wallet, has_non_fixed_point_amount)
+
+    # End-to-end benchmark of the two backends: creation of the transactions (which computes their fixed-point values) and tax computation
+    # (which includes the computed data and balances). Times are the best of _BENCHMARK_REPEAT runs.
+    def test_benchmark(self) -> None:
+        if _BENCHMARK_LOT_COUNT == 0:
+            self.skipTest("Set RP2_TEST_BENCHMARK_FIXED_POINT_LOT_COUNT to run the benchmark")
+        columns: List[str] = ["input"] + list(_METHODS)
+        results: Dict[bool, List[float]] = {False: [float("inf")] * len(columns), True: [float("inf")] * len(columns)}
+        fixed_point: bool
+        for _ in range(_BENCHMARK_REPEAT):
+            for fixed_point in [False, True]:
+                configuration: Configuration = Configuration("./config/test_data.config", US(), fixed_point=fixed_point)
+                start: float = perf_counter()
+                input_data: InputData = self._create_input_data(configuration, _BENCHMARK_LOT_COUNT)
+                times: List[float] = [perf_counter() - start]
+                for create_accounting_method in _METHODS.values():
+                    start = perf_counter()
+                    compute_tax(configuration, create_accounting_method(), input_data)
+                    times.append(perf_counter() - start)
+                results[fixed_point] = [min(best_time, time) for best_time, time in zip(results[fixed_point], times)]
+        output: List[str] = [f"RP2Decimal vs fixed point ({_BENCHMARK_LOT_COUNT} acquired lots, {3 * _BENCHMARK_LOT_COUNT} taxable events):"]
+        column: str
+        decimal_time: float
+        fixed_point_time: float
+        for column, decimal_time, fixed_point_time in zip(columns + ["total"], results[False] + [sum(results[False])], results[True] + [sum(results[True])]):
+            output.append(f"  {column}: {decimal_time:.3f}s vs {fixed_point_time:.3f}s ({decimal_time / fixed_point_time:.2f}x)")
+        print("\n".join(output))
+
+
+if __name__ == "__main__":
+    unittest.main()
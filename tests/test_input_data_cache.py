@@ -0,0 +1,110 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List
+
+from rp2.configuration import Configuration
+from rp2.input_data import InputData
+from rp2.input_data_cache import InputDataCache
+from rp2.ods_parser import open_ods, parse_ods
+from rp2.ods_reader import ODSReader
+from rp2.plugin.country.us import US
+
+
+class TestInputDataCache(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestInputDataCache._configuration = Configuration("./config/test_data.config", US())
+
+    def setUp(self) -> None:
+        self.maxDiff = None  # pylint: disable=invalid-name
+
+    @staticmethod
+    def _to_string(input_data: InputData) -> List[str]:
+        return [
+            str(transaction_set)
+            for transaction_set in [
+                input_data.unfiltered_in_transaction_set,
+                input_data.unfiltered_out_transaction_set,
+                input_data.unfiltered_intra_transaction_set,
+                input_data.filtered_in_transaction_set,
+                input_data.filtered_out_transaction_set,
+                input_data.filtered_intra_transaction_set,
+            ]
+        ]
+
+    def test_cache_hit(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            cache: InputDataCache = InputDataCache(cache_dir)
+            input_file_handle: ODSReader = open_ods(configuration=self._configuration, input_file_path="./input/test_data.ods")
+            for asset in ["B1", "B2", "B3", "B4"]:
+                parsed: InputData = parse_ods(self._configuration, asset, input_file_handle, cache)
+                cached: InputData = parse_ods(self._configuration, asset, input_file_handle, cache)
+                self.assertIsNot(parsed, cached)
+                self.assertEqual(self._to_string(parsed), self._to_string(cached))
+                self.assertEqual(self._to_string(parsed), self._to_string(parse_ods(self._configuration, asset, input_file_handle)))
+            self.assertEqual(len(list(Path(cache_dir).iterdir())), 4)
+
+    def test_key(self) -> None:
+        input_file_handle: ODSReader = open_ods(configuration=self._configuration, input_file_path="./input/test_data.ods")
+        key: str = InputDataCache.get_key(self._configuration, "B1", input_file_handle.get_sheet_digest("B1"))
+        self.assertEqual(key, InputDataCache.get_key(self._configuration, "B1", input_file_handle.get_sheet_digest("B1")))
+        # Different sheet content
+        self.assertNotEqual(key, InputDataCache.get_key(self._configuration, "B1", input_file_handle.get_sheet_digest("B2")))
+        # Different asset
+        self.assertNotEqual(key, InputDataCache.get_key(self._configuration, "B2", input_file_handle.get_sheet_digest("B1")))
+        # Different configuration
+        configuration: Configuration = Configuration("./config/test_data.config", US(), from_date=date(2020, 1, 1))
+        self.assertNotEqual(key, InputDataCache.get_key(configuration, "B1", input_file_handle.get_sheet_digest("B1")))
+
+    def test_eviction(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            input_file_handle: ODSReader = open_ods(configuration=self._configuration, input_file_path="./input/test_data.ods")
+            keys: Dict[str, str] = {
+                asset: InputDataCache.get_key(self._configuration, asset, input_file_handle.get_sheet_digest(asset)) for asset in ["B1", "B2", "B3"]
+            }
+            cache: InputDataCache = InputDataCache(cache_dir)
+            for asset in ["B1", "B2", "B3"]:
+                parse_ods(self._configuration, asset, input_file_handle, cache)
+            sizes: Dict[str, int] = {asset: (Path(cache_dir) / Path(f"{key}.input_data")).stat().st_size for asset, key in keys.items()}
+            for entry_path in Path(cache_dir).iterdir():
+                entry_path.unlink()
+
+            # Room for two of the three entries: B2 is the least recently used entry when B3 is stored, so it's evicted
+            cache = InputDataCache(cache_dir, max_size=sizes["B1"] + sizes["B2"] + sizes["B3"] - 1)
+            parse_ods(self._configuration, "B1", input_file_handle, cache)
+            parse_ods(self._configuration, "B2", input_file_handle, cache)
+            os.utime(Path(cache_dir) / Path(f"{keys['B1']}.input_data"), (1, 1))
+            os.utime(Path(cache_dir) / Path(f"{keys['B2']}.input_data"), (0, 0))
+            parse_ods(self._configuration, "B3", input_file_handle, cache)
+            self.assertIsNotNone(cache.load(keys["B1"]))
+            self.assertIsNone(cache.load(keys["B2"]))
+            self.assertIsNotNone(cache.load(keys["B3"]))
+
+            # Corrupted entries are treated as misses and overwritten
+            (Path(cache_dir) / Path(f"{keys['B1']}.input_data")).write_bytes(b"foobar")
+            self.assertIsNone(cache.load(keys["B1"]))
+            parse_ods(self._configuration, "B1", input_file_handle, cache)
+            self.assertIsNotNone(cache.load(keys["B1"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,7 +13,8 @@
 # limitations under the License.
 
 import unittest
-from typing import Dict, List, NamedTuple, Optional, Type
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
 
 from dateutil.parser import parse
 
@@ -23,6 +24,7 @@ from rp2.in_transaction import InTransaction
 from rp2.input_data import InputData
 from rp2.intra_transaction import IntraTransaction
 from rp2.ods_parser import open_ods, parse_ods
+from rp2.ods_reader import ODSReader
 from rp2.out_transaction import OutTransaction
 from rp2.plugin.country.us import US
 from rp2.rp2_decimal import RP2Decimal
@@ -56,7 +58,7 @@ class TestInputParser(unittest.TestCase):
     def _verify_good_sheet(self, sheet_name: str, out_empty: bool, intra_empty: bool) -> None:
 
         asset = sheet_name
-        input_file_handle: object = open_ods(configuration=self._good_input_configuration, input_file_path="./input/test_data.ods")
+        input_file_handle: ODSReader = open_ods(configuration=self._good_input_configuration, input_file_path="./input/test_data.ods")
         input_data: InputData = parse_ods(self._good_input_configuration, asset, input_file_handle)
 
         # In table is always present
@@ -285,6 +287,38 @@ class TestInputParser(unittest.TestCase):
             count += 1
         self.assertEqual(count, 4)
 
+    def test_to_date(self) -> None:
+        input_file_handle: ODSReader = open_ods(configuration=self._good_input_configuration, input_file_path="./input/test_data.ods")
+        unfiltered_input_data: InputData = parse_ods(self._good_input_configuration, "B4", input_file_handle)
+
+        # Transactions that occurred after to_date are not created
+        configuration: Configuration = Configuration("./config/test_data.config", US(), to_date=date(2020, 4, 11))
+        input_data: InputData = parse_ods(configuration, "B4", input_file_handle)
+        transaction_sets_and_internal_ids: List[Tuple[TransactionSet, TransactionSet, List[str]]] = [
+            (input_data.unfiltered_in_transaction_set, unfiltered_input_data.unfiltered_in_transaction_set, ["4", "3", "7", "6"]),
+            (input_data.unfiltered_out_transaction_set, unfiltered_input_data.unfiltered_out_transaction_set, ["16", "15", "17"]),
+            (input_data.unfiltered_intra_transaction_set, unfiltered_input_data.unfiltered_intra_transaction_set, ["26", "24"]),
+        ]
+        transaction_set: TransactionSet
+        unfiltered_transaction_set: TransactionSet
+        internal_ids: List[str]
+        for transaction_set, unfiltered_transaction_set, internal_ids in transaction_sets_and_internal_ids:
+            created_internal_ids: List[str] = [transaction.internal_id for transaction in transaction_set]
+            self.assertEqual(created_internal_ids, internal_ids)
+            transaction_strings: List[str] = [str(transaction) for transaction in transaction_set]
+            expected_transaction_strings: List[str] = [
+                str(transaction) for transaction in unfiltered_transaction_set if transaction.timestamp.date() <= date(2020, 4, 11)
+            ]
+            self.assertEqual(transaction_strings, expected_transaction_strings)
+
+        # If all IN transactions occurred after to_date, all transactions are created
+        configuration = Configuration("./config/test_data.config", US(), to_date=date(2019, 12, 31))
+        input_data = parse_ods(configuration, "B4", input_file_handle)
+        self.assertEqual(str(input_data.unfiltered_in_transaction_set), str(unfiltered_input_data.unfiltered_in_transaction_set))
+        self.assertEqual(str(input_data.unfiltered_out_transaction_set), str(unfiltered_input_data.unfiltered_out_transaction_set))
+        self.assertEqual(str(input_data.unfiltered_intra_transaction_set), str(unfiltered_input_data.unfiltered_intra_transaction_set))
+        self.assertEqual(len(list(input_data.filtered_in_transaction_set)), 0)
+
     def test_bad_input(self) -> None:
 
         sheets_to_expected_messages: Dict[str, ErrorAndMessage] = {
@@ -331,7 +365,7 @@ class TestInputParser(unittest.TestCase):
         for sheet, (error_class, message) in sheets_to_expected_messages.items():
             with self.assertRaisesRegex(error_class, message):
                 asset: str = sheet
-                input_file_handle: object = open_ods(configuration=self._bad_input_configuration, input_file_path="./input/test_bad_data.ods")
+                input_file_handle: ODSReader = open_ods(configuration=self._bad_input_configuration, input_file_path="./input/test_bad_data.ods")
                 parse_ods(self._bad_input_configuration, asset, input_file_handle)
 
 
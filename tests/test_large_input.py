@@ -29,6 +29,8 @@ ROOT_PATH: Path = Path(os.path.dirname(__file__)).parent.absolute()
 class TestLargeInput(AbstractTestODSOutputDiff):
 
     output_dir: Path
+    multi_method_output_dir: Path
+    fixed_point_output_dir: Path
 
     @classmethod
     def setUpClass(cls) -> None:
@@ -41,6 +43,25 @@ class TestLargeInput(AbstractTestODSOutputDiff):
             AbstractTestODSOutputDiff._generate(
                 cls.output_dir, test_name="test_large_input", config="test_large_input", method=method, input_path=cls.output_dir
             )
+        # All methods in the same run of rp2: the result must be the same as with one method per run
+        cls.multi_method_output_dir = cls.output_dir / Path("multi_method")
+        AbstractTestODSOutputDiff._generate(
+            cls.multi_method_output_dir,
+            test_name="test_large_input",
+            config="test_large_input",
+            method=",".join(AbstractTestODSOutputDiff.METHODS),
+            input_path=cls.output_dir,
+        )
+        # Fixed-point arithmetic on crypto amounts: the result must be the same as with RP2Decimal arithmetic
+        cls.fixed_point_output_dir = cls.output_dir / Path("fixed_point")
+        AbstractTestODSOutputDiff._generate(
+            cls.fixed_point_output_dir,
+            test_name="test_large_input",
+            config="test_large_input",
+            method=",".join(AbstractTestODSOutputDiff.METHODS),
+            input_path=cls.output_dir,
+            fixed_point=True,
+        )
 
     def setUp(self) -> None:
         self.maxDiff = None  # pylint: disable=invalid-name
@@ -159,6 +180,16 @@ class TestLargeInput(AbstractTestODSOutputDiff):
         for method in self.METHODS:
             self._compare(output_dir=self.output_dir, test_name="test_large_input", method=method, output_plugin=OutputPlugins.TAX_REPORT_US)
 
+    def test_large_input_multi_method(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(output_dir=self.multi_method_output_dir, test_name="test_large_input", method=method, output_plugin=output_plugin)
+
+    def test_large_input_fixed_point(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(output_dir=self.fixed_point_output_dir, test_name="test_large_input", method=method, output_plugin=output_plugin)
+
 
 if __name__ == "__main__":
     unittest.main()
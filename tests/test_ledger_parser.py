@@ -0,0 +1,131 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import re
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+
+from rp2.configuration import Configuration
+from rp2.input_data import InputData
+from rp2.input_data_cache import InputDataCache
+from rp2.ods_parser import open_csv, open_ods, parse_ledger, parse_ods
+from rp2.ods_reader import ODSReader
+from rp2.plugin.country.us import US
+from rp2.rp2_error import RP2ValueError
+
+_TABLE_NAMES: List[str] = ["IN", "OUT", "INTRA"]
+_ASSETS: List[str] = ["B1", "B2", "B3", "B4"]
+
+
+class TestLedgerParser(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestLedgerParser._configuration = Configuration("./config/test_data.config", US())
+
+    def setUp(self) -> None:
+        self.maxDiff = None  # pylint: disable=invalid-name
+
+    # Merge the tables of all the sheets of test_data.ods into a single CSV ledger (transactions of different assets are interleaved)
+    @staticmethod
+    def _create_ledger(ledger_path: Path) -> None:
+        reader: ODSReader = ODSReader("./input/test_data.ods")
+        table_2_header: Dict[str, List[Any]] = {}
+        table_2_rows: Dict[str, List[List[Any]]] = {table_name: [] for table_name in _TABLE_NAMES}
+        for sheet_name in _ASSETS:
+            table_name: str = ""
+            row_count: int = 0
+            for row in reader.rows(sheet_name):
+                if row[0] in _TABLE_NAMES:
+                    table_name = row[0]
+                    row_count = 0
+                elif row[0] == "TABLE END":
+                    table_name = ""
+                elif table_name and row_count == 1:
+                    table_2_header[table_name] = row
+                elif table_name:
+                    table_2_rows[table_name].append(row)
+                row_count += 1
+        with open(ledger_path, "w", encoding="utf-8", newline="") as ledger_file:
+            writer: Any = csv.writer(ledger_file)
+            for table_name in _TABLE_NAMES:
+                writer.writerow([table_name])
+                writer.writerow(["" if value is None else str(value) for value in table_2_header[table_name]])
+                for row in sorted(table_2_rows[table_name], key=lambda row: str(row[0])):
+                    writer.writerow(["" if value is None else str(value) for value in row])
+                writer.writerow(["TABLE END"])
+                writer.writerow([])
+
+    # Internal ids (and parent ids) are row numbers, so they differ between the ledger and the per-asset sheets
+    @staticmethod
+    def _to_string(input_data: InputData) -> List[str]:
+        return sorted(
+            re.sub(r"\b(id|parent)=-?\d+", r"\1=", line)
+            for transaction_set in [
+                input_data.unfiltered_in_transaction_set,
+                input_data.unfiltered_out_transaction_set,
+                input_data.unfiltered_intra_transaction_set,
+            ]
+            for line in str(transaction_set).split("\n")
+        )
+
+    def test_same_input_data_as_sheets(self) -> None:
+        ods_reader: ODSReader = open_ods(self._configuration, "./input/test_data.ods")
+        with TemporaryDirectory() as input_dir:
+            self._create_ledger(Path(input_dir) / Path("ledger.csv"))
+            asset_2_input_data: Dict[str, InputData] = parse_ledger(
+                self._configuration, "ledger", list(reversed(_ASSETS)), open_csv(self._configuration, input_dir)
+            )
+            self.assertEqual(list(asset_2_input_data), _ASSETS)
+            for asset in _ASSETS:
+                self.assertEqual(self._to_string(asset_2_input_data[asset]), self._to_string(parse_ods(self._configuration, asset, ods_reader)), asset)
+
+            # Only the requested assets are returned
+            asset_2_input_data = parse_ledger(self._configuration, "ledger", ["B2"], open_csv(self._configuration, input_dir))
+            self.assertEqual(list(asset_2_input_data), ["B2"])
+            self.assertEqual(self._to_string(asset_2_input_data["B2"]), self._to_string(parse_ods(self._configuration, "B2", ods_reader)))
+
+            # Cache
+            with TemporaryDirectory() as cache_dir:
+                cache: InputDataCache = InputDataCache(cache_dir)
+                parsed: Dict[str, InputData] = parse_ledger(self._configuration, "ledger", _ASSETS, open_csv(self._configuration, input_dir), cache)
+                cached: Dict[str, InputData] = parse_ledger(self._configuration, "ledger", _ASSETS, open_csv(self._configuration, input_dir), cache)
+                self.assertEqual(len(list(Path(cache_dir).iterdir())), len(_ASSETS))
+                for asset in _ASSETS:
+                    self.assertIsNot(parsed[asset], cached[asset])
+                    self.assertEqual(str(parsed[asset].unfiltered_in_transaction_set), str(cached[asset].unfiltered_in_transaction_set))
+
+    def test_bad_ledger(self) -> None:
+        with TemporaryDirectory() as input_dir:
+            self._create_ledger(Path(input_dir) / Path("ledger.csv"))
+            with self.assertRaisesRegex(RP2ValueError, "Error: sheet foobar does not exist in .*"):
+                parse_ledger(self._configuration, "foobar", _ASSETS, open_csv(self._configuration, input_dir))
+            ledger_path: Path = Path(input_dir) / Path("ledger.csv")
+            ledger: str = ledger_path.read_text(encoding="utf-8")
+            # Unknown asset
+            ledger_path.write_text(ledger.replace(",B3,", ",FOO,"), encoding="utf-8")
+            with self.assertRaisesRegex(RP2ValueError, "Parameter 'asset' value is not known: FOO"):
+                parse_ledger(self._configuration, "ledger", _ASSETS, open_csv(self._configuration, input_dir))
+            # Missing asset
+            ledger_path.write_text(ledger.replace(",B3,", ",,"), encoding="utf-8")
+            with self.assertRaisesRegex(RP2ValueError, r"ledger\(\d+\): Found a transaction with no asset"):
+                parse_ledger(self._configuration, "ledger", _ASSETS, open_csv(self._configuration, input_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
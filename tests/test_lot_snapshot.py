@@ -0,0 +1,258 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional, Tuple, cast
+
+from rp2.abstract_accounting_method import AbstractAccountingMethod
+from rp2.abstract_input_reader import AbstractInputReader
+from rp2.computed_data import ComputedData, YearlyGainLoss
+from rp2.configuration import Configuration
+from rp2.entry_types import TransactionType
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.intra_transaction import IntraTransaction
+from rp2.lot_snapshot import (
+    LOT_SNAPSHOT_FILE_NAME,
+    LotSnapshot,
+    apply_lot_snapshot,
+    create_lot_snapshot,
+    read_lot_snapshot,
+    write_lot_snapshot,
+)
+from rp2.ods_parser import open_ods, parse_ods
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo, hifo, lifo, total_average
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+_ASSETS: List[str] = ["B1", "B2", "B3", "B4"]
+
+
+class TestLotSnapshot(unittest.TestCase):
+    _configuration: Configuration
+    _input_file_handle: AbstractInputReader
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestLotSnapshot._configuration = Configuration("./config/test_data.config", US())
+        TestLotSnapshot._input_file_handle = open_ods(TestLotSnapshot._configuration, "./input/test_data.ods")
+
+    def _parse(self, asset: str) -> InputData:
+        return parse_ods(self._configuration, asset, self._input_file_handle)
+
+    # Returns (taxable event timestamp, acquired lot timestamp, crypto amount, fiat gain, long term) for each gain/loss after the cutoff date (ids
+    # differ between the full input and the snapshot one). A lot held by more than one account at the cutoff date becomes one opening lot per
+    # account: consecutive entries with the same taxable event and acquired lot timestamp are merged.
+    def _get_gain_losses(self, computed_data: ComputedData, cutoff_date: date) -> List[Tuple[str, Optional[str], RP2Decimal, RP2Decimal, bool]]:
+        result: List[Tuple[str, Optional[str], RP2Decimal, RP2Decimal, bool]] = []
+        for entry in computed_data.gain_loss_set:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            if gain_loss.taxable_event.timestamp.date() <= cutoff_date:
+                continue
+            taxable_event_timestamp: str = str(gain_loss.taxable_event.timestamp)
+            acquired_lot_timestamp: Optional[str] = str(gain_loss.acquired_lot.timestamp) if gain_loss.acquired_lot else None
+            crypto_amount: RP2Decimal = gain_loss.crypto_amount
+            fiat_gain: RP2Decimal = gain_loss.fiat_gain
+            if result and result[-1][0] == taxable_event_timestamp and result[-1][1] == acquired_lot_timestamp:
+                crypto_amount += result[-1][2]
+                fiat_gain += result[-1][3]
+                result.pop()
+            result.append((taxable_event_timestamp, acquired_lot_timestamp, crypto_amount, fiat_gain, gain_loss.is_long_term_capital_gains()))
+        return result
+
+    # Writes the snapshot of the full input and reads it back
+    def _export_and_import(self, accounting_method: AbstractAccountingMethod, cutoff_date: date) -> Tuple[Dict[str, ComputedData], LotSnapshot]:
+        asset_to_computed_data: Dict[str, ComputedData] = {asset: compute_tax(self._configuration, accounting_method, self._parse(asset)) for asset in _ASSETS}
+        with TemporaryDirectory() as output_dir:
+            snapshot_path: Path = write_lot_snapshot(
+                create_lot_snapshot(self._configuration, accounting_method, asset_to_computed_data, cutoff_date), output_dir, "test_"
+            )
+            self.assertEqual(snapshot_path, Path(output_dir) / Path(f"test_{accounting_method.name}_{LOT_SNAPSHOT_FILE_NAME}"))
+            lot_snapshot: LotSnapshot = read_lot_snapshot(str(snapshot_path))
+        self.assertEqual(lot_snapshot.accounting_method, accounting_method.name)
+        self.assertEqual(lot_snapshot.cutoff_date, cutoff_date)
+        return (asset_to_computed_data, lot_snapshot)
+
+    def test_same_results_after_cutoff_date(self) -> None:
+        accounting_method: AbstractAccountingMethod
+        for accounting_method in [fifo.AccountingMethod(), lifo.AccountingMethod(), hifo.AccountingMethod()]:
+            for cutoff_date in [date(2020, 3, 1), date(2020, 6, 1), date(2020, 12, 31), date(2021, 3, 1)]:
+                asset_to_computed_data, lot_snapshot = self._export_and_import(accounting_method, cutoff_date)
+                for asset in _ASSETS:
+                    computed_data: ComputedData = compute_tax(
+                        self._configuration, accounting_method, apply_lot_snapshot(self._configuration, self._parse(asset), lot_snapshot)
+                    )
+                    self.assertEqual(
+                        self._get_gain_losses(computed_data, cutoff_date),
+                        self._get_gain_losses(asset_to_computed_data[asset], cutoff_date),
+                        f"{accounting_method}, {cutoff_date}, {asset}",
+                    )
+                    if cutoff_date == date(2020, 12, 31):
+                        yearly_gain_losses: List[YearlyGainLoss] = [
+                            yearly_gain_loss for yearly_gain_loss in computed_data.yearly_gain_loss_list if yearly_gain_loss.year > 2020
+                        ]
+                        expected_yearly_gain_losses: List[YearlyGainLoss] = [
+                            yearly_gain_loss for yearly_gain_loss in asset_to_computed_data[asset].yearly_gain_loss_list if yearly_gain_loss.year > 2020
+                        ]
+                        self.assertEqual(yearly_gain_losses, expected_yearly_gain_losses)
+
+    def test_opening_lots(self) -> None:
+        cutoff_date: date = date(2020, 3, 1)
+        asset_to_computed_data, lot_snapshot = self._export_and_import(fifo.AccountingMethod(), cutoff_date)
+        input_data: InputData = self._parse("B2")
+        max_internal_id: int = max(
+            int(entry.internal_id)
+            for transaction_set in [input_data.unfiltered_in_transaction_set, input_data.unfiltered_out_transaction_set]
+            for entry in transaction_set
+        )
+        snapshot_input_data: InputData = apply_lot_snapshot(self._configuration, input_data, lot_snapshot)
+
+        in_transactions: List[InTransaction] = cast(List[InTransaction], list(snapshot_input_data.unfiltered_in_transaction_set))
+        opening_lots: List[InTransaction] = [in_transaction for in_transaction in in_transactions if in_transaction.timestamp.date() <= cutoff_date]
+        self.assertEqual(len(opening_lots), len(lot_snapshot.get_opening_lots("B2")))
+        self.assertGreater(len(opening_lots), 0)
+        # Opening lots have new ids, aren't taxable and have the cost basis per unit of the original lots
+        original_in_transactions: List[InTransaction] = cast(List[InTransaction], list(asset_to_computed_data["B2"].unfiltered_in_transaction_set))
+        for opening_lot in opening_lots:
+            self.assertGreater(int(opening_lot.internal_id), max_internal_id)
+            self.assertFalse(opening_lot.is_taxable())
+            original_lot: InTransaction = next(
+                in_transaction for in_transaction in original_in_transactions if in_transaction.timestamp == opening_lot.timestamp
+            )
+            self.assertEqual(opening_lot.fiat_in_with_fee / opening_lot.crypto_in, original_lot.fiat_in_with_fee / original_lot.crypto_in)
+            self.assertEqual(opening_lot.transaction_type, TransactionType.BUY if original_lot.is_taxable() else original_lot.transaction_type)
+        # Out-transactions that occurred on or before the cutoff date are gone
+        for entry in snapshot_input_data.unfiltered_out_transaction_set:
+            self.assertGreater(entry.timestamp.date(), cutoff_date)
+
+    # A snapshot taken from input that already has opening lots doesn't stack the opening lot prefix of their notes
+    def test_snapshot_of_opening_lots(self) -> None:
+        accounting_method: AbstractAccountingMethod = fifo.AccountingMethod()
+        cutoff_date: date = date(2020, 6, 1)
+        asset_to_computed_data, lot_snapshot = self._export_and_import(accounting_method, date(2020, 3, 1))
+        snapshot_input_data: InputData = apply_lot_snapshot(self._configuration, self._parse("B1"), lot_snapshot)
+        computed_data: ComputedData = compute_tax(self._configuration, accounting_method, snapshot_input_data)
+        later_lot_snapshot: LotSnapshot = create_lot_snapshot(self._configuration, accounting_method, {"B1": computed_data}, cutoff_date)
+        later_snapshot_input_data: InputData = apply_lot_snapshot(self._configuration, snapshot_input_data, later_lot_snapshot)
+
+        opening_lot_count: int = 0
+        for entry in later_snapshot_input_data.unfiltered_in_transaction_set:
+            if entry.timestamp.date() <= cutoff_date:
+                opening_lot_count += 1
+                self.assertEqual(cast(InTransaction, entry).notes.count("Opening lot as of "), 1, str(entry))
+        self.assertEqual(opening_lot_count, len(later_lot_snapshot.get_opening_lots("B1")))
+        self.assertGreater(opening_lot_count, 0)
+        self.assertEqual(
+            self._get_gain_losses(compute_tax(self._configuration, accounting_method, later_snapshot_input_data), cutoff_date),
+            self._get_gain_losses(asset_to_computed_data["B1"], cutoff_date),
+        )
+
+    # Before the cutoff date crypto is moved from Coinbase to Kraken and a Kraken sale is paired (FIFO) with the Coinbase lot: the opening lots
+    # are held by the accounts that hold the crypto at the cutoff date, not by the ones the lots were acquired in.
+    def test_transfer_before_cutoff_date(self) -> None:
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(self._configuration, "OUT", "B1")
+        intra_transaction_set: TransactionSet = TransactionSet(self._configuration, "INTRA", "B1")
+        in_transaction_set.add_entry(
+            InTransaction(self._configuration, "2020-01-01T00:00:00Z", "B1", "Coinbase", "Bob", "Buy", RP2Decimal("100"), RP2Decimal("2"), internal_id=1)
+        )
+        in_transaction_set.add_entry(
+            InTransaction(self._configuration, "2020-01-15T00:00:00Z", "B1", "Kraken", "Bob", "Buy", RP2Decimal("200"), RP2Decimal("1"), internal_id=2)
+        )
+        intra_transaction_set.add_entry(
+            IntraTransaction(
+                self._configuration,
+                "2020-02-01T00:00:00Z",
+                "B1",
+                "Coinbase",
+                "Bob",
+                "Kraken",
+                "Bob",
+                RP2Decimal("150"),
+                RP2Decimal("1.5"),
+                RP2Decimal("1.4"),
+                internal_id=3,
+            )
+        )
+        for internal_id, (timestamp, exchange, spot_price, crypto_out) in enumerate(
+            [
+                ("2020-02-15T00:00:00Z", "Kraken", "300", "0.5"),
+                ("2020-04-01T00:00:00Z", "Kraken", "400", "1.9"),
+                ("2020-05-01T00:00:00Z", "Coinbase", "500", "0.5"),
+            ],
+            4,
+        ):
+            out_transaction_set.add_entry(
+                OutTransaction(
+                    self._configuration, timestamp, "B1", exchange, "Bob", "Sell", RP2Decimal(spot_price), RP2Decimal(crypto_out), ZERO, internal_id=internal_id
+                )
+            )
+        input_data: InputData = InputData("B1", in_transaction_set, out_transaction_set, intra_transaction_set)
+        cutoff_date: date = date(2020, 3, 1)
+        computed_data: ComputedData = compute_tax(self._configuration, fifo.AccountingMethod(), input_data)
+        lot_snapshot: LotSnapshot = create_lot_snapshot(self._configuration, fifo.AccountingMethod(), {"B1": computed_data}, cutoff_date)
+
+        # The Coinbase lot (1.4 left) is split between Coinbase (0.5) and Kraken (0.9)
+        opening_lots: List[Tuple[str, str, RP2Decimal]] = [
+            (str(opening_lot.timestamp.date()), opening_lot.exchange, opening_lot.crypto_amount) for opening_lot in lot_snapshot.get_opening_lots("B1")
+        ]
+        expected_opening_lots: List[Tuple[str, str, RP2Decimal]] = [
+            ("2020-01-01", "Coinbase", RP2Decimal("0.5")),
+            ("2020-01-01", "Kraken", RP2Decimal("0.9")),
+            ("2020-01-15", "Kraken", RP2Decimal("1")),
+        ]
+        self.assertEqual(opening_lots, expected_opening_lots)
+
+        snapshot_computed_data: ComputedData = compute_tax(
+            self._configuration, fifo.AccountingMethod(), apply_lot_snapshot(self._configuration, input_data, lot_snapshot)
+        )
+        self.assertEqual(self._get_gain_losses(snapshot_computed_data, cutoff_date), self._get_gain_losses(computed_data, cutoff_date))
+        # Account balances are the same as with the full input
+        balances: Dict[Tuple[str, str], RP2Decimal] = {
+            (balance.exchange, balance.holder): balance.final_balance for balance in snapshot_computed_data.balance_set
+        }
+        expected_balances: Dict[Tuple[str, str], RP2Decimal] = {
+            (balance.exchange, balance.holder): balance.final_balance for balance in computed_data.balance_set
+        }
+        self.assertEqual(balances, expected_balances)
+
+    def test_unsupported(self) -> None:
+        asset_to_computed_data: Dict[str, ComputedData] = {
+            asset: compute_tax(self._configuration, total_average.AccountingMethod(), self._parse(asset)) for asset in _ASSETS
+        }
+        with self.assertRaisesRegex(RP2TypeError, "is not of type AbstractLotPairingMethod"):
+            create_lot_snapshot(self._configuration, total_average.AccountingMethod(), asset_to_computed_data, date(2020, 6, 1))
+
+        configuration: Configuration = Configuration("./config/test_data.config", US(), to_date=date(2020, 12, 31))
+        asset_to_computed_data = {"B1": compute_tax(configuration, fifo.AccountingMethod(), parse_ods(configuration, "B1", self._input_file_handle))}
+        with self.assertRaisesRegex(RP2ValueError, "later than to_date"):
+            create_lot_snapshot(configuration, fifo.AccountingMethod(), asset_to_computed_data, date(2021, 1, 1))
+
+        with TemporaryDirectory() as output_dir:
+            snapshot_path: Path = Path(output_dir) / Path(LOT_SNAPSHOT_FILE_NAME)
+            snapshot_path.write_text("Asset,Amount\n", encoding="utf-8")
+            with self.assertRaisesRegex(RP2ValueError, "invalid opening lot snapshot header"):
+                read_lot_snapshot(str(snapshot_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from random import Random
+from typing import List
+
+from rp2.max_segment_tree import EMPTY, MaxSegmentTree
+from rp2.rp2_error import RP2ValueError
+
+
+class TestMaxSegmentTree(unittest.TestCase):
+    def _check(self, tree: MaxSegmentTree, values: List[int]) -> None:
+        self.assertEqual(tree.size, len(values))
+        for index, value in enumerate(values):
+            self.assertEqual(tree.get_value(index), value)
+        for start in range(len(values) + 1):
+            for end in range(start, len(values) + 1):
+                self.assertEqual(tree.get_max(start, end), max(values[start:end], default=EMPTY), f"[{start}, {end})")
+
+    def test_empty_tree(self) -> None:
+        tree: MaxSegmentTree = MaxSegmentTree([])
+        self.assertEqual(tree.size, 0)
+        self.assertEqual(tree.get_max(0, 0), EMPTY)
+
+    def test_random_updates(self) -> None:
+        random: Random = Random(7)
+        # Sizes include powers of two and odd sizes
+        for size in [1, 2, 3, 7, 8, 13, 16, 31]:
+            values: List[int] = [random.randint(EMPTY, 20) for _ in range(size)]
+            tree: MaxSegmentTree = MaxSegmentTree(list(values))
+            self._check(tree, values)
+            for _ in range(2 * size):
+                index: int = random.randrange(size)
+                if random.random() < 0.3:
+                    tree.clear_value(index)
+                    values[index] = EMPTY
+                else:
+                    values[index] = random.randint(0, 20)
+                    tree.set_value(index, values[index])
+                self._check(tree, values)
+
+    # LIFO use case: values are the indexes of the available slots, so the prefix maximum is the latest available slot
+    def test_latest_available(self) -> None:
+        tree: MaxSegmentTree = MaxSegmentTree(list(range(5)))
+        self.assertEqual(tree.get_max(0, 3), 2)
+        tree.clear_value(2)
+        tree.clear_value(1)
+        self.assertEqual(tree.get_max(0, 3), 0)
+        tree.clear_value(0)
+        self.assertEqual(tree.get_max(0, 3), EMPTY)
+        self.assertEqual(tree.get_max(0, 5), 4)
+        tree.set_value(1, 1)
+        self.assertEqual(tree.get_max(0, 3), 1)
+
+    def test_bad_tree(self) -> None:
+        with self.assertRaisesRegex(RP2ValueError, "Invalid value -2"):
+            MaxSegmentTree([1, -2])
+        tree: MaxSegmentTree = MaxSegmentTree([1, 2, 3])
+        with self.assertRaisesRegex(RP2ValueError, "Invalid value -5"):
+            tree.set_value(0, -5)
+        with self.assertRaisesRegex(RP2ValueError, "Index 3 out of range"):
+            tree.set_value(3, 1)
+        with self.assertRaisesRegex(RP2ValueError, "Index -1 out of range"):
+            tree.get_value(-1)
+        with self.assertRaisesRegex(RP2ValueError, "Invalid range"):
+            tree.get_max(2, 1)
+        with self.assertRaisesRegex(RP2ValueError, "Invalid range"):
+            tree.get_max(0, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
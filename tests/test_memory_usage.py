@@ -0,0 +1,155 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import tracemalloc
+import unittest
+from typing import Callable, Dict, List, Tuple
+
+from rp2.abstract_entry import AbstractEntry
+from rp2.balance import Balance
+from rp2.configuration import Configuration
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.intra_transaction import IntraTransaction
+from rp2.logger import LOGGER
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method.fifo import AccountingMethod
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+
+_COUNT: int = 2000
+
+
+# Attribute names of the slots of the instance (private names in __slots__ are mangled)
+def _get_slot_names(instance: object) -> List[str]:
+    result: List[str] = []
+    cls: type
+    for cls in type(instance).__mro__:
+        slots: Tuple[str, ...] = getattr(cls, "__slots__", ())
+        name: str
+        for name in slots:
+            result.append(f"_{cls.__name__.lstrip('_')}{name}" if name.startswith("__") else name)
+    return result
+
+
+# Average number of bytes allocated (and still alive) per object created by the factory
+def _get_bytes_per_object(factory: Callable[[int], object]) -> float:
+    tracemalloc.start()
+    try:
+        before: int = tracemalloc.get_traced_memory()[0]
+        objects: List[object] = [factory(index) for index in range(_COUNT)]
+        after: int = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return (after - before) / _COUNT
+
+
+# Memory benchmark: bytes per transaction with __slots__ and with the equivalent __dict__-based layout. The container overhead is measured on
+# instances sharing the same attribute values (so only the instance itself is counted), the total on transactions created from scratch.
+class TestMemoryUsage(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestMemoryUsage._configuration = Configuration("./config/test_data.config", US())
+
+    def _create_in_transaction(self, index: int) -> InTransaction:
+        return InTransaction(
+            self._configuration,
+            f"2021-01-{index % 28 + 1:02d}T08:42:43.883Z",
+            "B1",
+            "Coinbase",
+            "Bob",
+            "Buy",
+            RP2Decimal(f"{1000 + index}.12"),
+            RP2Decimal(f"{index + 1}.0002"),
+            fiat_fee=RP2Decimal("20"),
+            internal_id=index,
+        )
+
+    def _compare(self, name: str, entry: object) -> None:
+        self.assertFalse(hasattr(entry, "__dict__"), name)
+        slot_names: List[str] = _get_slot_names(entry)
+        attributes: List[Tuple[str, object]] = []
+        slot_name: str
+        for slot_name in slot_names:
+            value: object = getattr(entry, slot_name)
+            attributes.append((slot_name, value))
+
+        # Stand-in for the previous layout of the class: same attributes, stored in a per-instance __dict__ (one class per comparison, so that
+        # instances get the same key-sharing dictionaries as instances of the original class)
+        namespace: Dict[str, object] = {}
+        dict_backed_class: type = type(f"DictBacked{name}", (), namespace)
+
+        def create_dict_backed(_: int) -> object:
+            result: object = dict_backed_class()
+            for slot_name, value in attributes:
+                setattr(result, slot_name, value)
+            return result
+
+        # Instances of the slotted class are filled the same way (bypassing __init__, so that only the instance itself is allocated)
+        def create_slotted(_: int) -> object:
+            result: object = object.__new__(type(entry))
+            for slot_name, value in attributes:
+                object.__setattr__(result, slot_name, value)
+            return result
+
+        dict_backed_bytes: float = _get_bytes_per_object(create_dict_backed)
+        slotted_bytes: float = _get_bytes_per_object(create_slotted)
+        LOGGER.debug("%s: %d attributes, %.0f bytes per instance with __dict__, %.0f with __slots__", name, len(slot_names), dict_backed_bytes, slotted_bytes)
+        self.assertLess(slotted_bytes, dict_backed_bytes, name)
+
+    def test_bytes_per_entry(self) -> None:
+        in_transaction: InTransaction = self._create_in_transaction(0)
+        out_transaction: OutTransaction = OutTransaction(
+            self._configuration,
+            "2021-02-01T08:42:43.883Z",
+            "B1",
+            "Coinbase",
+            "Bob",
+            "Sell",
+            RP2Decimal("1100"),
+            RP2Decimal("0.5"),
+            RP2Decimal("0.01"),
+            internal_id=1,
+        )
+        intra_transaction: IntraTransaction = IntraTransaction(
+            self._configuration,
+            "2021-02-02T08:42:43.883Z",
+            "B1",
+            "Coinbase",
+            "Bob",
+            "BlockFi",
+            "Bob",
+            RP2Decimal("1100"),
+            RP2Decimal("0.5"),
+            RP2Decimal("0.49"),
+            internal_id=2,
+        )
+        gain_loss: GainLoss = GainLoss(self._configuration, AccountingMethod(), RP2Decimal("0.5"), out_transaction, in_transaction)
+        balance: Balance = Balance(self._configuration, "B1", "Coinbase", "Bob", RP2Decimal("1"), RP2Decimal("2"), RP2Decimal("1"), ZERO)
+
+        entry: AbstractEntry
+        for entry in [in_transaction, out_transaction, intra_transaction, gain_loss]:
+            self._compare(type(entry).__name__, entry)
+        self._compare(type(balance).__name__, balance)
+
+        total_bytes: float = _get_bytes_per_object(self._create_in_transaction)
+        LOGGER.debug("InTransaction: %.0f bytes per transaction, including attribute values", total_bytes)
+        self.assertGreater(total_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List
+
+from rp2.abstract_input_reader import AbstractInputReader
+from rp2.computed_data import ComputedData
+from rp2.configuration import Configuration
+from rp2.input_data import InputData
+from rp2.method_comparison import (
+    METHOD_COMPARISON_FILE_NAME,
+    generate_method_comparison,
+)
+from rp2.ods_parser import open_ods, parse_ods
+from rp2.plugin.accounting_method import fifo, hifo, lifo
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.tax_engine import compute_tax, create_unfiltered_taxable_event_set
+from rp2.transaction_set import TransactionSet
+
+
+class TestMethodComparison(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestMethodComparison._configuration = Configuration("./config/test_data.config", US())
+
+    def test_method_comparison(self) -> None:
+        input_file_handle: AbstractInputReader = open_ods(self._configuration, "./input/test_data.ods")
+        method_2_asset_to_computed_data: Dict[str, Dict[str, ComputedData]] = {"fifo": {}, "lifo": {}, "hifo": {}}
+        for asset in ["B1", "B2", "B3", "B4"]:
+            input_data: InputData = parse_ods(self._configuration, asset, input_file_handle)
+            # The taxable event set is shared by all methods and the results are the same as creating it for each method
+            taxable_event_set: TransactionSet = create_unfiltered_taxable_event_set(self._configuration, input_data)
+            method_2_asset_to_computed_data["fifo"][asset] = compute_tax(self._configuration, fifo.AccountingMethod(), input_data, taxable_event_set)
+            method_2_asset_to_computed_data["lifo"][asset] = compute_tax(self._configuration, lifo.AccountingMethod(), input_data, taxable_event_set)
+            method_2_asset_to_computed_data["hifo"][asset] = compute_tax(self._configuration, hifo.AccountingMethod(), input_data, taxable_event_set)
+            self.assertEqual(
+                method_2_asset_to_computed_data["lifo"][asset].yearly_gain_loss_list,
+                compute_tax(self._configuration, lifo.AccountingMethod(), input_data).yearly_gain_loss_list,
+            )
+
+        with TemporaryDirectory() as output_dir:
+            output_file_path: Path = generate_method_comparison(method_2_asset_to_computed_data, output_dir, "test_")
+            self.assertEqual(output_file_path, Path(output_dir) / Path(f"test_{METHOD_COMPARISON_FILE_NAME}"))
+            with open(output_file_path, encoding="utf-8", newline="") as output_file:
+                rows: List[List[str]] = list(csv.reader(output_file))
+
+        self.assertGreater(len(rows), 1)
+        header: List[str] = ["Year", "Asset", "Capital Gains Type", "FIFO Gain/Loss", "LIFO Gain/Loss", "HIFO Gain/Loss"]
+        self.assertEqual(rows[0], header)
+        for column, method in enumerate(["fifo", "lifo", "hifo"], 3):
+            year_2_total: Dict[int, RP2Decimal] = {}
+            for row in rows[1:]:
+                year: int = int(row[0])
+                if row[1] == "Total":
+                    # Yearly totals follow the assets of their year
+                    self.assertEqual(row[column], f"{year_2_total.pop(year):.2f}")
+                    continue
+                expected: RP2Decimal = RP2Decimal.exact_sum(
+                    yearly_gain_loss.fiat_gain_loss
+                    for yearly_gain_loss in method_2_asset_to_computed_data[method][row[1]].yearly_gain_loss_list
+                    if yearly_gain_loss.year == year and ("LONG" if yearly_gain_loss.is_long_term_capital_gains else "SHORT") == row[2]
+                )
+                self.assertEqual(row[column], f"{expected:.2f}", f"{method}: {row}")
+                year_2_total[year] = year_2_total.get(year, ZERO) + expected
+            self.assertEqual(len(year_2_total), 0)
+        years: List[int] = [int(row[0]) for row in rows[1:]]
+        sorted_years: List[int] = sorted(years)
+        self.assertEqual(years, sorted_years)
+
+
+if __name__ == "__main__":
+    unittest.main()
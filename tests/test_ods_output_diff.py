@@ -26,6 +26,8 @@ ROOT_PATH: Path = Path(os.path.dirname(__file__)).parent.absolute()
 class TestODSOutputDiff(AbstractTestODSOutputDiff):  # pylint: disable=too-many-public-methods
 
     output_dir: Path
+    multi_method_output_dir: Path
+    fixed_point_output_dir: Path
 
     @classmethod
     def setUpClass(cls) -> None:
@@ -66,6 +68,26 @@ class TestODSOutputDiff(AbstractTestODSOutputDiff):  # pylint: disable=too-many-
             cls.output_dir, test_name="test_many_year_data", config="test_data", method="fifo", from_date=date(2019, 1, 1), to_date=date(2019, 12, 31)
         )
 
+        # All methods in the same run of rp2: the result must be the same as with one method per run
+        cls.multi_method_output_dir = cls.output_dir / Path("multi_method")
+        methods: str = ",".join(AbstractTestODSOutputDiff.METHODS)
+        AbstractTestODSOutputDiff._generate(cls.multi_method_output_dir, test_name="crypto_example", config="crypto_example", method=methods)
+        AbstractTestODSOutputDiff._generate(cls.multi_method_output_dir, test_name="test_data", config="test_data", method=methods)
+
+        # Fixed-point arithmetic on crypto amounts: the result must be the same as with RP2Decimal arithmetic
+        cls.fixed_point_output_dir = cls.output_dir / Path("fixed_point")
+        AbstractTestODSOutputDiff._generate(cls.fixed_point_output_dir, test_name="crypto_example", config="crypto_example", method=methods, fixed_point=True)
+        AbstractTestODSOutputDiff._generate(cls.fixed_point_output_dir, test_name="test_data", config="test_data", method=methods, fixed_point=True)
+        AbstractTestODSOutputDiff._generate(
+            cls.fixed_point_output_dir,
+            test_name="test_data3",
+            config="test_data",
+            method=methods,
+            from_date=date(2019, 12, 1),
+            to_date=date(2020, 4, 1),
+            fixed_point=True,
+        )
+
     def setUp(self) -> None:
         self.maxDiff = None  # pylint: disable=invalid-name
 
@@ -299,6 +321,38 @@ class TestODSOutputDiff(AbstractTestODSOutputDiff):  # pylint: disable=too-many-
             to_date=date(2019, 12, 31),
         )
 
+    def test_crypto_example_multi_method(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(output_dir=self.multi_method_output_dir, test_name="crypto_example", method=method, output_plugin=output_plugin)
+
+    def test_test_data_multi_method(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(output_dir=self.multi_method_output_dir, test_name="test_data", method=method, output_plugin=output_plugin)
+
+    def test_crypto_example_fixed_point(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(output_dir=self.fixed_point_output_dir, test_name="crypto_example", method=method, output_plugin=output_plugin)
+
+    def test_test_data_fixed_point(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(output_dir=self.fixed_point_output_dir, test_name="test_data", method=method, output_plugin=output_plugin)
+
+    def test_test_data3_fixed_point_2019_12_01_2020_04_01(self) -> None:
+        for method in self.METHODS:
+            for output_plugin in OutputPlugins:
+                self._compare(
+                    output_dir=self.fixed_point_output_dir,
+                    test_name="test_data3",
+                    method=method,
+                    output_plugin=output_plugin,
+                    from_date=date(2019, 12, 1),
+                    to_date=date(2020, 4, 1),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
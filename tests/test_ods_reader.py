@@ -0,0 +1,96 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, List
+from zipfile import ZipFile
+
+import ezodf
+
+from rp2.ods_reader import ODSReader
+from rp2.rp2_error import RP2ValueError
+
+
+class TestODSReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None  # pylint: disable=invalid-name
+
+    # ODSReader must return the same rows as ezodf (modulo trailing padding and numeric values, which are exact Decimals instead of floats)
+    def test_same_rows_as_ezodf(self) -> None:
+        input_file_path: str
+        for input_file_path in ["./input/test_data.ods", "./input/test_bad_data.ods", "./input/crypto_example.ods"]:
+            reader: ODSReader = ODSReader(input_file_path)
+            document: Any = ezodf.opendoc(input_file_path)
+            self.assertEqual(reader.sheet_names, list(document.sheets.names()))
+            for sheet_name in reader.sheet_names:
+                rows: List[List[Any]] = [[float(value) if isinstance(value, Decimal) else value for value in row] for row in reader.rows(sheet_name)]
+                ezodf_rows: List[List[Any]] = [[cell.value for cell in row] for row in document.sheets[sheet_name].rows()]
+                self.assertEqual(len(rows), len(ezodf_rows), f"{input_file_path}/{sheet_name}")
+                for row, ezodf_row in zip(rows, ezodf_rows):
+                    self.assertEqual(row, ezodf_row[: len(row)], f"{input_file_path}/{sheet_name}")
+                    self.assertTrue(all(value is None for value in ezodf_row[len(row) :]), f"{input_file_path}/{sheet_name}")
+
+    # Numeric cells are read from the office:value attribute, so digits beyond float formatting precision are preserved
+    def test_exact_numeric_values(self) -> None:
+        with TemporaryDirectory() as output_dir:
+            input_file_path: str = str(Path(output_dir) / Path("exact.ods"))
+            document: Any = ezodf.newdoc("ods", input_file_path)
+            sheet: Any = ezodf.Table("B1", size=(2, 2))
+            document.sheets += sheet
+            sheet[0, 0].set_value("IN")
+            sheet[0, 1].set_value(0.1234567890123456)
+            sheet[1, 1].set_value(12345678.000000001)
+            document.save()
+
+            rows: List[List[Any]] = list(ODSReader(input_file_path).rows("B1"))
+            self.assertEqual(rows[0][0], "IN")
+            self.assertIsInstance(rows[0][1], Decimal)
+            self.assertEqual(str(rows[0][1]), "0.1234567890123456")
+            self.assertEqual(str(rows[1][1]), "12345678.000000002")
+            self.assertIsNone(rows[1][0])
+
+    # The prefix of the table namespace is the one declared in content.xml, not necessarily "table"
+    def test_table_namespace_prefix(self) -> None:
+        with TemporaryDirectory() as output_dir:
+            input_file_path: str = str(Path(output_dir) / Path("prefix.ods"))
+            with ZipFile("./input/test_data.ods") as input_file, ZipFile(input_file_path, "w") as output_file:
+                for name in input_file.namelist():
+                    data: bytes = input_file.read(name)
+                    if name == "content.xml":
+                        for old, new in [(b"xmlns:table=", b"xmlns:tbl="), (b"<table:", b"<tbl:"), (b"</table:", b"</tbl:"), (b" table:", b" tbl:")]:
+                            data = data.replace(old, new)
+                    output_file.writestr(name, data)
+
+            reader: ODSReader = ODSReader("./input/test_data.ods")
+            prefix_reader: ODSReader = ODSReader(input_file_path)
+            self.assertEqual(prefix_reader.sheet_names, reader.sheet_names)
+            for sheet_name in reader.sheet_names:
+                self.assertEqual(list(prefix_reader.rows(sheet_name)), list(reader.rows(sheet_name)), sheet_name)
+
+    def test_bad_input(self) -> None:
+        with self.assertRaisesRegex(RP2ValueError, "Error: .* does not exist"):
+            ODSReader("./input/non_existent.ods")
+        with self.assertRaisesRegex(RP2ValueError, "Error: .* is not a valid ODS file"):
+            ODSReader("./config/test_data.config")
+        reader: ODSReader = ODSReader("./input/test_data.ods")
+        self.assertFalse(reader.has_sheet("foobar"))
+        with self.assertRaisesRegex(RP2ValueError, "Error: sheet foobar does not exist in .*"):
+            next(reader.rows("foobar"))
+
+
+if __name__ == "__main__":
+    unittest.main()
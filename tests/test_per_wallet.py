@@ -0,0 +1,243 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, cast
+
+from rp2.computed_data import ComputedData
+from rp2.configuration import Configuration
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.intra_transaction import IntraTransaction
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo, hifo, lifo, total_average
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2ValueError
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+
+class TestPerWallet(unittest.TestCase):
+    _configuration: Configuration
+    _per_wallet_configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestPerWallet._configuration = Configuration("./config/test_data.config", US())
+        TestPerWallet._per_wallet_configuration = Configuration("./config/test_data.config", US(), per_wallet=True)
+
+    def setUp(self) -> None:
+        self.__internal_id: int = 0
+
+    def _next_internal_id(self) -> int:
+        self.__internal_id += 1
+        return self.__internal_id
+
+    def _create_in_transaction(self, timestamp: str, exchange: str, holder: str, spot_price: str, crypto_in: str) -> InTransaction:
+        return InTransaction(
+            self._configuration,
+            timestamp,
+            "B1",
+            exchange,
+            holder,
+            "Buy",
+            RP2Decimal(spot_price),
+            RP2Decimal(crypto_in),
+            fiat_fee=ZERO,
+            internal_id=self._next_internal_id(),
+        )
+
+    def _create_out_transaction(self, timestamp: str, exchange: str, holder: str, spot_price: str, crypto_out: str) -> OutTransaction:
+        return OutTransaction(
+            self._configuration,
+            timestamp,
+            "B1",
+            exchange,
+            holder,
+            "Sell",
+            RP2Decimal(spot_price),
+            RP2Decimal(crypto_out),
+            ZERO,
+            internal_id=self._next_internal_id(),
+        )
+
+    def _create_intra_transaction(
+        self, timestamp: str, from_account: Tuple[str, str], to_account: Tuple[str, str], spot_price: str, crypto_sent: str, crypto_received: str
+    ) -> IntraTransaction:
+        return IntraTransaction(
+            self._configuration,
+            timestamp,
+            "B1",
+            from_account[0],
+            from_account[1],
+            to_account[0],
+            to_account[1],
+            RP2Decimal(spot_price),
+            RP2Decimal(crypto_sent),
+            RP2Decimal(crypto_received),
+            internal_id=self._next_internal_id(),
+        )
+
+    def _create_input_data(
+        self,
+        in_transactions: List[InTransaction],
+        out_transactions: List[OutTransaction],
+        intra_transactions: Optional[List[IntraTransaction]] = None,
+    ) -> InputData:
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(self._configuration, "OUT", "B1")
+        intra_transaction_set: TransactionSet = TransactionSet(self._configuration, "INTRA", "B1")
+        for in_transaction in in_transactions:
+            in_transaction_set.add_entry(in_transaction)
+        for out_transaction in out_transactions:
+            out_transaction_set.add_entry(out_transaction)
+        for intra_transaction in intra_transactions or []:
+            intra_transaction_set.add_entry(intra_transaction)
+        return InputData("B1", in_transaction_set, out_transaction_set, intra_transaction_set)
+
+    # Returns (taxable event id, acquired lot id, crypto amount) for each gain/loss
+    def _get_pairings(self, computed_data: ComputedData) -> List[Tuple[str, Optional[str], str]]:
+        result: List[Tuple[str, Optional[str], str]] = []
+        for entry in computed_data.gain_loss_set:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            result.append(
+                (
+                    gain_loss.taxable_event.internal_id,
+                    gain_loss.acquired_lot.internal_id if gain_loss.acquired_lot else None,
+                    str(gain_loss.crypto_amount),
+                )
+            )
+        return result
+
+    # With only one account the per-wallet pool is the global pool
+    def test_single_account(self) -> None:
+        input_data: InputData = self._create_input_data(
+            [
+                self._create_in_transaction("2020-01-01T00:00:00Z", "Coinbase", "Bob", "100", "2"),
+                self._create_in_transaction("2020-02-01T00:00:00Z", "Coinbase", "Bob", "300", "1"),
+                self._create_in_transaction("2020-03-01T00:00:00Z", "Coinbase", "Bob", "200", "3"),
+            ],
+            [
+                self._create_out_transaction("2020-02-15T00:00:00Z", "Coinbase", "Bob", "250", "1.5"),
+                self._create_out_transaction("2020-04-01T00:00:00Z", "Coinbase", "Bob", "400", "2.5"),
+                self._create_out_transaction("2021-04-01T00:00:00Z", "Coinbase", "Bob", "500", "1"),
+            ],
+        )
+        for accounting_method in [fifo.AccountingMethod(), lifo.AccountingMethod(), hifo.AccountingMethod()]:
+            self.assertEqual(
+                self._get_pairings(compute_tax(self._per_wallet_configuration, accounting_method, input_data)),
+                self._get_pairings(compute_tax(self._configuration, accounting_method, input_data)),
+                str(accounting_method),
+            )
+
+    def test_sale_uses_own_account(self) -> None:
+        input_data: InputData = self._create_input_data(
+            [
+                self._create_in_transaction("2020-01-01T00:00:00Z", "Coinbase", "Bob", "100", "1"),
+                self._create_in_transaction("2020-02-01T00:00:00Z", "Kraken", "Bob", "200", "1"),
+                self._create_in_transaction("2020-03-01T00:00:00Z", "Coinbase", "Alice", "300", "1"),
+            ],
+            [
+                self._create_out_transaction("2020-04-01T00:00:00Z", "Kraken", "Bob", "400", "0.5"),
+                self._create_out_transaction("2020-05-01T00:00:00Z", "Coinbase", "Alice", "400", "1"),
+                self._create_out_transaction("2020-06-01T00:00:00Z", "Kraken", "Bob", "400", "0.5"),
+            ],
+        )
+        # Globally FIFO would sell lot 1 first
+        global_pairings: List[Tuple[str, Optional[str], str]] = [("4", "1", "0.5"), ("5", "1", "0.5"), ("5", "2", "0.5"), ("6", "2", "0.5")]
+        self.assertEqual(self._get_pairings(compute_tax(self._configuration, fifo.AccountingMethod(), input_data)), global_pairings)
+        per_wallet_pairings: List[Tuple[str, Optional[str], str]] = [("4", "2", "0.5"), ("5", "3", "1"), ("6", "2", "0.5")]
+        self.assertEqual(self._get_pairings(compute_tax(self._per_wallet_configuration, fifo.AccountingMethod(), input_data)), per_wallet_pairings)
+
+    # A transfer moves the lots with their cost basis and acquisition timestamp, the fee is disposed of from the sender's pool
+    def test_transfer(self) -> None:
+        input_data: InputData = self._create_input_data(
+            [
+                self._create_in_transaction("2020-01-01T00:00:00Z", "Coinbase", "Bob", "100", "1"),
+                self._create_in_transaction("2020-02-01T00:00:00Z", "Coinbase", "Bob", "200", "1"),
+                self._create_in_transaction("2020-03-01T00:00:00Z", "Kraken", "Bob", "300", "1"),
+            ],
+            [
+                self._create_out_transaction("2020-05-01T00:00:00Z", "Kraken", "Bob", "500", "1.5"),
+            ],
+            [
+                self._create_intra_transaction("2020-04-01T00:00:00Z", ("Coinbase", "Bob"), ("Kraken", "Bob"), "400", "1.2", "1"),
+            ],
+        )
+        for accounting_method, expected in [
+            # The fee (0.2) comes from lot 1, the transfer moves 0.8 of lot 1 and 0.2 of lot 2 to Kraken
+            (fifo.AccountingMethod(), [("5", "1", "0.2"), ("4", "1", "0.8"), ("4", "2", "0.2"), ("4", "3", "0.5")]),
+            (lifo.AccountingMethod(), [("5", "2", "0.2"), ("4", "3", "1"), ("4", "2", "0.5")]),
+            (hifo.AccountingMethod(), [("5", "2", "0.2"), ("4", "3", "1"), ("4", "2", "0.5")]),
+        ]:
+            computed_data: ComputedData = compute_tax(self._per_wallet_configuration, accounting_method, input_data)
+            self.assertEqual(self._get_pairings(computed_data), expected, str(accounting_method))
+            for entry in computed_data.gain_loss_set:
+                gain_loss: GainLoss = cast(GainLoss, entry)
+                acquired_lot: InTransaction = cast(InTransaction, gain_loss.acquired_lot)
+                self.assertEqual(gain_loss.fiat_cost_basis, gain_loss.crypto_amount * acquired_lot.spot_price)
+
+    def test_exhausted_account(self) -> None:
+        input_data: InputData = self._create_input_data(
+            [
+                self._create_in_transaction("2020-01-01T00:00:00Z", "Coinbase", "Bob", "100", "2"),
+                self._create_in_transaction("2020-02-01T00:00:00Z", "Kraken", "Alice", "200", "1"),
+            ],
+            [
+                self._create_out_transaction("2020-03-01T00:00:00Z", "Kraken", "Alice", "300", "1.5"),
+            ],
+        )
+        # The global pool has enough crypto, the account doesn't
+        compute_tax(self._configuration, fifo.AccountingMethod(), input_data)
+        with self.assertRaisesRegex(RP2ValueError, "Total in-transaction crypto value < total taxable crypto value in account Kraken/Alice"):
+            compute_tax(self._per_wallet_configuration, fifo.AccountingMethod(), input_data)
+
+    def test_pooled_cost_method(self) -> None:
+        input_data: InputData = self._create_input_data([self._create_in_transaction("2020-01-01T00:00:00Z", "Coinbase", "Bob", "100", "2")], [])
+        with self.assertRaisesRegex(RP2ValueError, "Per-wallet mode is not supported"):
+            compute_tax(self._per_wallet_configuration, total_average.AccountingMethod(), input_data)
+
+    # Independent partitions paired in a pool of workers produce the same results as sequential pairing
+    def test_executor(self) -> None:
+        accounts: List[Tuple[str, str]] = [(exchange, holder) for exchange in ["BlockFi", "Coinbase", "Coinbase Pro", "Kraken"] for holder in ["Bob", "Alice"]]
+        in_transactions: List[InTransaction] = []
+        out_transactions: List[OutTransaction] = []
+        intra_transactions: List[IntraTransaction] = []
+        for month in range(1, 11):
+            for index, (exchange, holder) in enumerate(accounts):
+                in_transactions.append(
+                    self._create_in_transaction(f"2020-{month:02d}-01T{index:02d}:00:00Z", exchange, holder, str(100 + 37 * ((month * index) % 11)), "2")
+                )
+                out_transactions.append(self._create_out_transaction(f"2020-{month:02d}-15T{index:02d}:00:00Z", exchange, holder, "500", "1"))
+            # Transfers connect pairs of accounts, so there are 4 partitions
+            for index in range(0, len(accounts), 2):
+                intra_transactions.append(
+                    self._create_intra_transaction(f"2020-{month:02d}-10T{index:02d}:00:00Z", accounts[index], accounts[index + 1], "400", "0.6", "0.5")
+                )
+        input_data: InputData = self._create_input_data(in_transactions, out_transactions, intra_transactions)
+        for accounting_method in [fifo.AccountingMethod(), lifo.AccountingMethod(), hifo.AccountingMethod()]:
+            expected: List[Tuple[str, Optional[str], str]] = self._get_pairings(compute_tax(self._per_wallet_configuration, accounting_method, input_data))
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                self.assertEqual(
+                    self._get_pairings(compute_tax(self._per_wallet_configuration, accounting_method, input_data, executor=executor)),
+                    expected,
+                    str(accounting_method),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
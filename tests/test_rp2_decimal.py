@@ -13,8 +13,16 @@
 # limitations under the License.
 
 import unittest
-
-from rp2.rp2_decimal import ZERO, RP2Decimal
+from decimal import getcontext
+from threading import Thread
+from typing import Dict, List
+
+from rp2.rp2_decimal import (
+    RP2_DECIMAL_CONTEXT,
+    ZERO,
+    RP2Decimal,
+    install_decimal_context,
+)
 from rp2.rp2_error import RP2TypeError
 
 
@@ -97,6 +105,59 @@ class TestRP2Decimal(unittest.TestCase):
         self.assertTrue(nine % two + decimal3 - decimal1 == one)
         self.assertTrue(nine % two + decimal4 - decimal1 > one)
 
+    def test_exact_sum(self) -> None:
+        values: List[RP2Decimal] = [RP2Decimal("1.5"), RP2Decimal("0.25"), RP2Decimal("-2"), RP2Decimal("100.125")]
+        running_sum: RP2Decimal = ZERO
+        running_sums: List[RP2Decimal] = []
+        for value in values:
+            running_sum += value
+            running_sums.append(running_sum)
+
+        self.assertEqual(RP2Decimal.exact_sum([]), ZERO)
+        self.assertEqual(len(RP2Decimal.exact_prefix_sums([])), 0)
+        self.assertEqual(str(RP2Decimal.exact_sum(values)), str(running_sum))
+        prefix_sums: List[str] = [str(prefix_sum) for prefix_sum in RP2Decimal.exact_prefix_sums(values)]
+        expected_prefix_sums: List[str] = [str(prefix_sum) for prefix_sum in running_sums]
+        self.assertEqual(prefix_sums, expected_prefix_sums)
+        self.assertEqual(str(RP2Decimal.exact_sum(iter(values))), "99.875")
+        self.assertIsInstance(RP2Decimal.exact_sum(values), RP2Decimal)
+        self.assertIsInstance(RP2Decimal.exact_prefix_sums(values)[0], RP2Decimal)
+
+        # Partial sums are not rounded: only the final result is (RP2Decimal operators round every partial sum instead)
+        large: RP2Decimal = RP2Decimal("1E+30")
+        small: RP2Decimal = RP2Decimal("0.3")
+        self.assertEqual(str(large + small - large), "0")
+        self.assertEqual(str(RP2Decimal.exact_sum([large, small, -large])), "0.3")
+        self.assertEqual(str(RP2Decimal.exact_prefix_sums([large, small, -large])[-1]), "0.3")
+        self.assertEqual(str(RP2Decimal.exact_sum([large, small])), str(large + small))
+
+        with self.assertRaisesRegex(RP2TypeError, "Operand has non-Decimal value "):
+            RP2Decimal.exact_sum([RP2Decimal("1"), 1])  # type: ignore
+        with self.assertRaisesRegex(RP2TypeError, "Operand has non-Decimal value "):
+            RP2Decimal.exact_prefix_sums([RP2Decimal("1"), 1.1])  # type: ignore
+
+    # RP2Decimal arithmetic doesn't depend on the (thread-local) current decimal context: new threads start with the default context
+    def test_decimal_context_in_thread(self) -> None:
+        results: Dict[str, str] = {}
+
+        def compute(name: str, install_context: bool) -> None:
+            if install_context:
+                install_decimal_context()
+            results[f"{name}_precision"] = str(getcontext().prec)
+            results[name] = str(RP2Decimal("2") / RP2Decimal("3") * RP2Decimal("123456789.123456789") + RP2Decimal("0.1"))
+
+        compute("main", install_context=False)
+        for name, install_context in [("thread", False), ("installed_thread", True)]:
+            thread: Thread = Thread(target=compute, args=(name, install_context))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(results["main_precision"], str(RP2_DECIMAL_CONTEXT.prec))
+        self.assertNotEqual(results["thread_precision"], str(RP2_DECIMAL_CONTEXT.prec))
+        self.assertEqual(results["installed_thread_precision"], str(RP2_DECIMAL_CONTEXT.prec))
+        self.assertEqual(results["thread"], results["main"])
+        self.assertEqual(results["installed_thread"], results["main"])
+
     def test_bad_rp2_decimal(self) -> None:
         # pylint: disable=pointless-statement
         one: RP2Decimal = RP2Decimal("1")
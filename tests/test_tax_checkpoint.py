@@ -0,0 +1,236 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Tuple, cast
+
+from rp2.abstract_accounting_method import AbstractAccountingMethod
+from rp2.computed_data import ComputedData
+from rp2.configuration import Configuration
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.input_data_cache import InputDataCache
+from rp2.intra_transaction import IntraTransaction
+from rp2.logger import LOGGER
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo, hifo, lifo
+from rp2.plugin.country.us import US
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.tax_checkpoint import TaxCheckpoint
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+
+# Row of the test ledger: kind is IN, OUT or INTRA, amount is crypto in/out/sent (received is 90% of sent)
+class _Row(NamedTuple):
+    kind: str
+    timestamp: str
+    transaction_type: str
+    spot_price: str
+    amount: str
+
+
+_ROWS: List[_Row] = [
+    _Row("IN", "2020-01-01T00:00:00Z", "Buy", "100", "2"),
+    _Row("IN", "2020-02-01T00:00:00Z", "Buy", "300", "1"),
+    _Row("IN", "2020-02-15T00:00:00Z", "Interest", "250", "0.5"),
+    _Row("OUT", "2020-03-01T00:00:00Z", "Sell", "400", "1.5"),
+    _Row("IN", "2020-04-01T00:00:00Z", "Buy", "200", "3"),
+    _Row("INTRA", "2020-05-01T00:00:00Z", "Move", "350", "1"),
+    _Row("OUT", "2020-06-01T00:00:00Z", "Sell", "500", "0.7"),
+]
+
+# Rows appended after the first run: all of them are later than the rows above
+_NEW_ROWS: List[_Row] = [
+    _Row("IN", "2021-01-01T00:00:00Z", "Buy", "600", "1"),
+    _Row("OUT", "2021-02-01T00:00:00Z", "Sell", "700", "2.5"),
+    _Row("IN", "2021-03-01T00:00:00Z", "Buy", "50", "1"),
+    _Row("OUT", "2021-04-01T00:00:00Z", "Gift", "800", "0.5"),
+]
+
+_METHODS: List[AbstractAccountingMethod] = [fifo.AccountingMethod(), lifo.AccountingMethod(), hifo.AccountingMethod()]
+
+# The benchmark runs only if RP2_TEST_BENCHMARK_CHECKPOINT_SIZE is set (to the number of rows of the ledger, e.g. 20000)
+_BENCHMARK_SIZE: int = 0 if "RP2_TEST_BENCHMARK_CHECKPOINT_SIZE" not in os.environ else int(str(os.environ.get("RP2_TEST_BENCHMARK_CHECKPOINT_SIZE")))
+
+
+class TestTaxCheckpoint(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestTaxCheckpoint._configuration = Configuration("./config/test_data.config", US())
+
+    # Internal ids start from first_internal_id: they are row numbers, so they change when rows are added to the tables above
+    def _create_input_data(self, rows: List[_Row], first_internal_id: int = 1) -> InputData:
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(self._configuration, "OUT", "B1")
+        intra_transaction_set: TransactionSet = TransactionSet(self._configuration, "INTRA", "B1")
+        internal_id: int
+        row: _Row
+        for internal_id, row in enumerate(rows, first_internal_id):
+            if row.kind == "IN":
+                in_transaction_set.add_entry(
+                    InTransaction(
+                        self._configuration,
+                        row.timestamp,
+                        "B1",
+                        "Coinbase",
+                        "Bob",
+                        row.transaction_type,
+                        RP2Decimal(row.spot_price),
+                        RP2Decimal(row.amount),
+                        fiat_fee=ZERO,
+                        internal_id=internal_id,
+                    )
+                )
+            elif row.kind == "OUT":
+                out_transaction_set.add_entry(
+                    OutTransaction(
+                        self._configuration,
+                        row.timestamp,
+                        "B1",
+                        "Coinbase",
+                        "Bob",
+                        row.transaction_type,
+                        RP2Decimal(row.spot_price),
+                        RP2Decimal(row.amount),
+                        ZERO,
+                        internal_id=internal_id,
+                    )
+                )
+            else:
+                intra_transaction_set.add_entry(
+                    IntraTransaction(
+                        self._configuration,
+                        row.timestamp,
+                        "B1",
+                        "Coinbase",
+                        "Bob",
+                        "Kraken",
+                        "Bob",
+                        RP2Decimal(row.spot_price),
+                        RP2Decimal(row.amount),
+                        RP2Decimal(row.amount) * RP2Decimal("0.9"),
+                        internal_id=internal_id,
+                    )
+                )
+        return InputData("B1", in_transaction_set, out_transaction_set, intra_transaction_set)
+
+    # Returns (taxable event timestamp, acquired lot timestamp, crypto amount, fiat gain) for each gain/loss (ids change between inputs)
+    def _get_gain_losses(self, computed_data: ComputedData) -> List[Tuple[str, Optional[str], str, str]]:
+        result: List[Tuple[str, Optional[str], str, str]] = []
+        for entry in computed_data.gain_loss_set:
+            gain_loss: GainLoss = cast(GainLoss, entry)
+            result.append(
+                (
+                    str(gain_loss.taxable_event.timestamp),
+                    str(gain_loss.acquired_lot.timestamp) if gain_loss.acquired_lot else None,
+                    str(gain_loss.crypto_amount),
+                    str(gain_loss.fiat_gain),
+                )
+            )
+        return result
+
+    # Computes the second input with the checkpoint of the first one and checks the result against computing it from scratch. Returns the
+    # debug log of the second run.
+    def _compute_incrementally(self, accounting_method: AbstractAccountingMethod, first_input_data: InputData, second_input_data: InputData) -> str:
+        with TemporaryDirectory() as cache_dir:
+            cache: InputDataCache = InputDataCache(cache_dir=cache_dir)
+            self.assertEqual(
+                self._get_gain_losses(compute_tax(self._configuration, accounting_method, first_input_data, cache=cache)),
+                self._get_gain_losses(compute_tax(self._configuration, accounting_method, first_input_data)),
+            )
+            with self.assertLogs(LOGGER, "DEBUG") as log:
+                computed_data: ComputedData = compute_tax(self._configuration, accounting_method, second_input_data, cache=cache)
+            expected_computed_data: ComputedData = compute_tax(self._configuration, accounting_method, second_input_data)
+            self.assertEqual(self._get_gain_losses(computed_data), self._get_gain_losses(expected_computed_data), str(accounting_method))
+            # Fractions too
+            self.assertEqual(str(computed_data.gain_loss_set), str(expected_computed_data.gain_loss_set), str(accounting_method))
+            # The new checkpoint covers the second input
+            checkpoint: Optional[TaxCheckpoint] = cache.load_checkpoint(InputDataCache.get_checkpoint_key(self._configuration, "B1", accounting_method.name))
+            self.assertIsNotNone(checkpoint)
+            self.assertEqual(cast(TaxCheckpoint, checkpoint).taxable_event_count, computed_data.taxable_event_set.count)
+        return "\n".join(log.output)
+
+    def test_resume(self) -> None:
+        for accounting_method in _METHODS:
+            # Rows added to the IN table shift the internal ids of the rows of the OUT and INTRA tables: the checkpoint is resumed anyway
+            log: str = self._compute_incrementally(accounting_method, self._create_input_data(_ROWS), self._create_input_data(_ROWS + _NEW_ROWS, 10))
+            self.assertIn("Resuming", log, str(accounting_method))
+
+    def test_unchanged_input(self) -> None:
+        for accounting_method in _METHODS:
+            log: str = self._compute_incrementally(accounting_method, self._create_input_data(_ROWS), self._create_input_data(_ROWS))
+            self.assertIn("Resuming", log, str(accounting_method))
+
+    def test_changed_input(self) -> None:
+        for accounting_method in _METHODS:
+            for rows in [
+                # Edited amount (beyond the precision shown in reports)
+                _ROWS[:3] + [_ROWS[3]._replace(amount="1.5000000001")] + _ROWS[4:] + _NEW_ROWS,
+                # Edited price (which affects HIFO)
+                [_ROWS[0]._replace(spot_price="400")] + _ROWS[1:] + _NEW_ROWS,
+                # Deleted row
+                _ROWS[:5] + _ROWS[6:] + _NEW_ROWS,
+                # New row earlier than the checkpoint
+                _ROWS + [_Row("IN", "2020-05-15T00:00:00Z", "Buy", "10", "1")] + _NEW_ROWS,
+                # New row at the same time as the latest row of the checkpoint
+                _ROWS + [_Row("IN", "2020-06-01T00:00:00Z", "Buy", "10", "1")] + _NEW_ROWS,
+            ]:
+                log: str = self._compute_incrementally(accounting_method, self._create_input_data(_ROWS), self._create_input_data(rows))
+                self.assertIn("computing from scratch", log, str(accounting_method))
+                self.assertNotIn("Resuming", log, str(accounting_method))
+
+    # Benchmark of the case checkpoints are for: a few rows appended to a large ledger. Compares computing the whole ledger from scratch with
+    # resuming from the checkpoint of the ledger without the tail.
+    def test_benchmark_tail_only(self) -> None:
+        if _BENCHMARK_SIZE <= 0:
+            self.skipTest("RP2_TEST_BENCHMARK_CHECKPOINT_SIZE not set")
+        start_timestamp: datetime = datetime(2015, 1, 1, tzinfo=timezone.utc)
+        rows: List[_Row] = []
+        index: int
+        for index in range(_BENCHMARK_SIZE + 10):
+            timestamp: str = (start_timestamp + timedelta(hours=index)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            if index % 2 == 0:
+                rows.append(_Row("IN", timestamp, "Buy", str(100 + index % 50), "2"))
+            else:
+                rows.append(_Row("OUT", timestamp, "Sell", str(100 + index % 70), "1"))
+        input_data: InputData = self._create_input_data(rows[:_BENCHMARK_SIZE])
+        input_data_with_tail: InputData = self._create_input_data(rows)
+
+        results: List[str] = []
+        for accounting_method in _METHODS:
+            with TemporaryDirectory() as cache_dir:
+                cache: InputDataCache = InputDataCache(cache_dir=cache_dir)
+                compute_tax(self._configuration, accounting_method, input_data, cache=cache)
+                start: float = perf_counter()
+                computed_data: ComputedData = compute_tax(self._configuration, accounting_method, input_data_with_tail, cache=cache)
+                resume_time: float = perf_counter() - start
+            start = perf_counter()
+            expected_computed_data: ComputedData = compute_tax(self._configuration, accounting_method, input_data_with_tail)
+            scratch_time: float = perf_counter() - start
+            self.assertEqual(self._get_gain_losses(computed_data), self._get_gain_losses(expected_computed_data), str(accounting_method))
+            results.append(f"{accounting_method.name}: from scratch {scratch_time:.3f}s, resumed {resume_time:.3f}s")
+
+        LOGGER.info("Checkpoint (%d rows + 10 new rows): %s", _BENCHMARK_SIZE, ", ".join(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,6 +21,7 @@ from rp2.computed_data import ComputedData
 from rp2.configuration import Configuration
 from rp2.input_data import InputData
 from rp2.ods_parser import open_ods, parse_ods
+from rp2.ods_reader import ODSReader
 from rp2.out_transaction import OutTransaction
 from rp2.plugin.accounting_method.fifo import AccountingMethod
 from rp2.plugin.country.us import US
@@ -53,7 +54,7 @@ class TestTaxEngine(unittest.TestCase):
         asset = sheet_name
 
         # Parser is tested separately (on same input) in test_input_parser.py
-        input_file_handle: object = open_ods(self._good_input_configuration, "./input/test_data.ods")
+        input_file_handle: ODSReader = open_ods(self._good_input_configuration, "./input/test_data.ods")
         input_data: InputData = parse_ods(self._good_input_configuration, asset, input_file_handle)
 
         # In table is always present
@@ -64,7 +65,7 @@ class TestTaxEngine(unittest.TestCase):
 
     def test_bad_input(self) -> None:
         asset = "B4"
-        input_file_handle: object = open_ods(self._good_input_configuration, "./input/test_data.ods")
+        input_file_handle: ODSReader = open_ods(self._good_input_configuration, "./input/test_data.ods")
         input_data: InputData = parse_ods(self._bad_input_configuration, asset, input_file_handle)
 
         with self.assertRaisesRegex(RP2TypeError, "Parameter 'configuration' is not of type Configuration: .*"):
@@ -0,0 +1,63 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from datetime import datetime
+
+from dateutil.parser import parse
+
+from rp2.timestamp_parser import TimestampParser, parse_timestamp
+
+
+class TestTimestampParser(unittest.TestCase):
+    # The fast path must return the same datetimes as dateutil, also when the format changes from one timestamp to the next (the stateless
+    # parse_timestamp() too)
+    def test_same_as_dateutil(self) -> None:
+        parser: TimestampParser = TimestampParser()
+        value: str
+        for value in [
+            "2020-01-01 08:41:00+00:00",
+            "2020-01-01 08:41:00 -05:00",
+            "2020-01-01T08:41:00Z",
+            "2020-01-01T08:41:00.5Z",
+            "2020-01-01T08:41:00.123456-0530",
+            "2020-01-01T08:41Z",
+            "2020-01-01 08:41+01:00",
+            "2020-01-01 08:41:00-00:00",
+            "2020-01-01 08:41:00",
+            "Jan 1st 2020 08:41:00 UTC",
+            "2020-01-01 08:41:00+00:00",
+        ]:
+            expected: datetime = parse(value)
+            result: datetime
+            for result in [parser.parse(value), parse_timestamp(value)]:
+                self.assertEqual(result, expected, value)
+                self.assertEqual(result.utcoffset(), expected.utcoffset(), value)
+                self.assertEqual(str(result), str(expected), value)
+
+    def test_bad_timestamps(self) -> None:
+        parser: TimestampParser = TimestampParser()
+        # Values matching a fast-path format but with out-of-range fields fall back to dateutil, which raises the error
+        with self.assertRaises(ValueError):
+            parser.parse("2020-13-01 08:41:00+00:00")
+        with self.assertRaises(ValueError):
+            parser.parse("2020-02-30T08:41Z")
+        with self.assertRaises(ValueError):
+            parser.parse("foobar")
+        with self.assertRaises(ValueError):
+            parse_timestamp("2020-13-01 08:41:00+00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+# Copyright 2022 eprbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from typing import List, Optional, cast
+
+from rp2.computed_data import ComputedData
+from rp2.configuration import Configuration
+from rp2.gain_loss import GainLoss
+from rp2.in_transaction import InTransaction
+from rp2.input_data import InputData
+from rp2.out_transaction import OutTransaction
+from rp2.plugin.accounting_method import fifo, total_average
+from rp2.plugin.country.jp import JP
+from rp2.rp2_decimal import ZERO, RP2Decimal
+from rp2.rp2_error import RP2TypeError, RP2ValueError
+from rp2.tax_engine import compute_tax
+from rp2.transaction_set import TransactionSet
+
+
+class TestTotalAverage(unittest.TestCase):
+    _configuration: Configuration
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestTotalAverage._configuration = Configuration("./config/test_data.config", JP())
+
+    def setUp(self) -> None:
+        self.__internal_id: int = 0
+
+    def _next_internal_id(self) -> int:
+        self.__internal_id += 1
+        return self.__internal_id
+
+    def _create_in_transaction(self, timestamp: str, transaction_type: str, spot_price: str, crypto_in: str, fiat_fee: str = "0") -> InTransaction:
+        return InTransaction(
+            self._configuration,
+            timestamp,
+            "B1",
+            "Coinbase",
+            "Bob",
+            transaction_type,
+            RP2Decimal(spot_price),
+            RP2Decimal(crypto_in),
+            fiat_fee=RP2Decimal(fiat_fee),
+            internal_id=self._next_internal_id(),
+        )
+
+    def _create_out_transaction(self, timestamp: str, spot_price: str, crypto_out: str) -> OutTransaction:
+        return OutTransaction(
+            self._configuration,
+            timestamp,
+            "B1",
+            "Coinbase",
+            "Bob",
+            "Sell",
+            RP2Decimal(spot_price),
+            RP2Decimal(crypto_out),
+            ZERO,
+            internal_id=self._next_internal_id(),
+        )
+
+    def _create_input_data(self, in_transactions: List[InTransaction], out_transactions: List[OutTransaction]) -> InputData:
+        in_transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        out_transaction_set: TransactionSet = TransactionSet(self._configuration, "OUT", "B1")
+        for in_transaction in in_transactions:
+            in_transaction_set.add_entry(in_transaction)
+        for out_transaction in out_transactions:
+            out_transaction_set.add_entry(out_transaction)
+        return InputData("B1", in_transaction_set, out_transaction_set, TransactionSet(self._configuration, "INTRA", "B1"))
+
+    def test_yearly_average_cost(self) -> None:
+        input_data: InputData = self._create_input_data(
+            [
+                self._create_in_transaction("2020-01-10T00:00:00Z", "Buy", "100", "2"),
+                self._create_in_transaction("2020-03-10T00:00:00Z", "Interest", "130", "1"),
+                self._create_in_transaction("2020-09-10T00:00:00Z", "Buy", "190", "3", fiat_fee="10"),
+                self._create_in_transaction("2021-02-01T00:00:00Z", "Buy", "345", "1"),
+                self._create_in_transaction("2023-04-01T00:00:00Z", "Buy", "500", "2"),
+            ],
+            [
+                self._create_out_transaction("2020-06-10T00:00:00Z", "200", "1"),
+                self._create_out_transaction("2020-11-10T00:00:00Z", "300", "2"),
+                self._create_out_transaction("2021-05-01T00:00:00Z", "400", "2"),
+                self._create_out_transaction("2024-01-05T00:00:00Z", "600", "3"),
+            ],
+        )
+        computed_data: ComputedData = compute_tax(self._configuration, total_average.AccountingMethod(), input_data)
+        gain_loss_list: List[GainLoss] = [cast(GainLoss, entry) for entry in computed_data.gain_loss_set]
+
+        # 2020: the pool is 2 + 1 + 3 = 6 B1 for 200 + 130 + 580 = 910 (the interest enters the pool at its fiat value), so the average cost is
+        # 910 / 6. 3 B1 are carried over to 2021 at 455 and the 2021 average cost is (455 + 345) / (3 + 1) = 200. 2022 has no transactions
+        # and the 2023 lot is added to the 2 B1 left (400): the 2024 average cost is (400 + 1000) / (2 + 2) = 350.
+        expected: List[Optional[str]] = [None, "151.6666666667", "303.3333333333", "400.0000000000", "1050.0000000000"]
+        self.assertEqual(len(gain_loss_list), len(expected))
+        for gain_loss, expected_cost_basis in zip(gain_loss_list, expected):
+            self.assertIsNone(gain_loss.acquired_lot)
+            self.assertEqual(gain_loss.crypto_amount, gain_loss.taxable_event.crypto_balance_change)
+            self.assertFalse(gain_loss.is_long_term_capital_gains())
+            self.assertEqual(computed_data.gain_loss_set.get_taxable_event_number_of_fractions(gain_loss.taxable_event), 1)
+            if expected_cost_basis is None:
+                self.assertTrue(gain_loss.taxable_event.transaction_type.is_earn_type())
+                self.assertIsNone(gain_loss.pooled_fiat_cost_basis)
+                self.assertEqual(gain_loss.fiat_cost_basis, ZERO)
+            else:
+                self.assertEqual(f"{gain_loss.fiat_cost_basis:.10f}", expected_cost_basis)
+                self.assertEqual(gain_loss.pooled_fiat_cost_basis, gain_loss.fiat_cost_basis)
+                self.assertEqual(gain_loss.fiat_gain, gain_loss.taxable_event_fiat_amount_with_fee_fraction - gain_loss.fiat_cost_basis)
+
+        # Same crypto amounts as a lot-pairing method, but fewer gain/loss entries
+        fifo_computed_data: ComputedData = compute_tax(self._configuration, fifo.AccountingMethod(), input_data)
+        self.assertGreater(fifo_computed_data.gain_loss_set.count, computed_data.gain_loss_set.count)
+        self.assertEqual(
+            RP2Decimal.exact_sum(cast(GainLoss, entry).crypto_amount for entry in fifo_computed_data.gain_loss_set),
+            RP2Decimal.exact_sum(gain_loss.crypto_amount for gain_loss in gain_loss_list),
+        )
+
+    def test_pool_exhausted(self) -> None:
+        # The 2020 pool has enough crypto for the sale, but the lot is acquired after it
+        input_data: InputData = self._create_input_data(
+            [
+                self._create_in_transaction("2020-01-10T00:00:00Z", "Buy", "100", "1"),
+                self._create_in_transaction("2020-06-10T00:00:00Z", "Buy", "100", "5"),
+            ],
+            [self._create_out_transaction("2020-03-10T00:00:00Z", "200", "2")],
+        )
+        with self.assertRaisesRegex(RP2ValueError, "Total in-transaction crypto value < total taxable crypto value"):
+            compute_tax(self._configuration, total_average.AccountingMethod(), input_data)
+
+    def test_bad_pooled_gain_loss(self) -> None:
+        acquired_lot: InTransaction = self._create_in_transaction("2020-01-10T00:00:00Z", "Buy", "100", "2")
+        earn_event: InTransaction = self._create_in_transaction("2020-03-10T00:00:00Z", "Interest", "130", "1")
+        taxable_event: OutTransaction = self._create_out_transaction("2020-06-10T00:00:00Z", "200", "2")
+        method: total_average.AccountingMethod = total_average.AccountingMethod()
+
+        with self.assertRaisesRegex(RP2TypeError, "acquired_lot must be None for taxable_events with pooled cost basis"):
+            GainLoss(self._configuration, method, RP2Decimal("2"), taxable_event, acquired_lot, RP2Decimal("200"))
+        with self.assertRaisesRegex(RP2ValueError, "crypto_amount must be == taxable_event.crypto_balance_change"):
+            GainLoss(self._configuration, method, RP2Decimal("1"), taxable_event, None, RP2Decimal("100"))
+        with self.assertRaisesRegex(RP2TypeError, "pooled_fiat_cost_basis must be None for earn-typed taxable_events"):
+            GainLoss(self._configuration, method, RP2Decimal("1"), earn_event, None, RP2Decimal("100"))
+        with self.assertRaisesRegex(RP2ValueError, "Parameter 'pooled_fiat_cost_basis' has non-positive value"):
+            GainLoss(self._configuration, method, RP2Decimal("2"), taxable_event, None, RP2Decimal("-1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
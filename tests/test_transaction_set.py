@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import unittest
+from datetime import date, datetime
 from typing import List, Optional, cast
 
 from dateutil.parser import parse
@@ -213,6 +214,149 @@ class TestTransactionSet(unittest.TestCase):
 
         self.assertTrue(str(transaction_set).startswith("TransactionSet:\n  configuration=./config/test_data.config\n  entry_set_type=EntrySetType.MIXED"))
 
+    # Views created by duplicate() share the sorted storage of their set and find their time window by bisection: the result must be the same
+    # as a linear scan that skips entries before from_date and stops at the first entry after to_date.
+    def test_time_window_view(self) -> None:
+        # pylint: disable=protected-access
+        transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        # Timestamps in different timezones: local dates are not monotonic around 2021-01-02
+        timestamps: List[str] = [
+            "2020-12-31T10:00:00Z",
+            "2021-01-01T23:30:00-05:00",
+            "2021-01-02T05:00:00Z",
+            "2021-01-02T06:00:00+08:00",
+            "2021-01-02T23:00:00Z",
+            "2021-01-03T10:00:00Z",
+            "2021-01-05T10:00:00Z",
+            "2021-01-05T11:00:00Z",
+            "2021-02-01T10:00:00Z",
+        ]
+        for internal_id, timestamp in enumerate(timestamps):
+            transaction_set.add_entry(
+                InTransaction(
+                    self._configuration,
+                    timestamp,
+                    "B1",
+                    "Coinbase",
+                    "Bob",
+                    "Buy",
+                    RP2Decimal("1000"),
+                    RP2Decimal("1"),
+                    fiat_fee=RP2Decimal("0"),
+                    internal_id=internal_id,
+                )
+            )
+        all_entries: List[AbstractEntry] = list(transaction_set)
+        self.assertEqual(len(all_entries), len(timestamps))
+
+        dates: List[date] = sorted({entry.timestamp.date() for entry in all_entries})
+        window_dates: List[date] = [date(2020, 1, 1)] + dates + [date(2021, 1, 4), date(2022, 1, 1)]
+        for from_date in window_dates:
+            for to_date in window_dates:
+                if to_date < from_date:
+                    continue
+                expected: List[AbstractEntry] = []
+                for entry in all_entries:
+                    if entry.timestamp.date() > to_date:
+                        break
+                    if entry.timestamp.date() >= from_date:
+                        expected.append(entry)
+                view: TransactionSet = cast(TransactionSet, transaction_set.duplicate(from_date=from_date, to_date=to_date))
+                view_entries: List[AbstractEntry] = list(view)
+                self.assertEqual(view_entries, expected, f"{from_date} - {to_date}")
+                self.assertIs(view._entry_list, transaction_set._entry_list)
+                self.assertEqual((view.from_date, view.to_date), (from_date, to_date))
+                # The original set is not affected by its views
+                entries: List[AbstractEntry] = list(transaction_set)
+                self.assertEqual(entries, all_entries)
+
+    # Entries are kept sorted as they are added: reads interleaved with out-of-order adds must see the same order as a stable sort by timestamp
+    def test_interleaved_add_and_read(self) -> None:
+        transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        timestamps: List[str] = [
+            "2021-01-05T10:00:00Z",
+            "2021-01-06T10:00:00Z",
+            "2021-01-01T10:00:00Z",
+            "2021-01-06T10:00:00Z",
+            "2021-01-03T10:00:00Z",
+            "2021-01-03T05:00:00-05:00",
+            "2021-01-07T10:00:00Z",
+            "2020-12-31T10:00:00Z",
+            "2021-01-03T10:00:00Z",
+            "2021-01-07T10:00:00Z",
+        ]
+        added: List[AbstractEntry] = []
+        for internal_id, timestamp in enumerate(timestamps):
+            transaction: InTransaction = InTransaction(
+                self._configuration,
+                timestamp,
+                "B1",
+                "Coinbase",
+                "Bob",
+                "Buy",
+                RP2Decimal("1000"),
+                RP2Decimal("1"),
+                fiat_fee=RP2Decimal("0"),
+                internal_id=internal_id,
+            )
+            transaction_set.add_entry(transaction)
+            added.append(transaction)
+
+            expected: List[AbstractEntry] = sorted(added, key=_get_timestamp)
+            internal_ids: List[str] = [entry.internal_id for entry in transaction_set]
+            expected_internal_ids: List[str] = [entry.internal_id for entry in expected]
+            self.assertEqual(internal_ids, expected_internal_ids)
+            self.assertEqual(transaction_set.count, len(added))
+            parent: Optional[AbstractEntry] = None
+            for entry in expected:
+                self.assertIs(transaction_set.get_parent(entry), parent)
+                parent = entry
+            view: TransactionSet = cast(TransactionSet, transaction_set.duplicate(from_date=date(2021, 1, 3), to_date=date(2021, 1, 6)))
+            view_internal_ids: List[str] = [entry.internal_id for entry in view]
+            expected_view_internal_ids: List[str] = [entry.internal_id for entry in expected if date(2021, 1, 3) <= entry.timestamp.date() <= date(2021, 1, 6)]
+            self.assertEqual(view_internal_ids, expected_view_internal_ids)
+
+    # Views keep iterating over the entries the set had when they were created, even if the set is modified afterwards
+    def test_view_of_modified_set(self) -> None:
+        transaction_set: TransactionSet = TransactionSet(self._configuration, "IN", "B1")
+        timestamps: List[str] = [
+            "2021-01-03T10:00:00Z",
+            "2021-01-05T10:00:00Z",
+            "2021-01-07T10:00:00Z",
+            "2021-01-04T10:00:00Z",
+            "2021-01-08T10:00:00Z",
+            "2021-01-01T10:00:00Z",
+        ]
+        transactions: List[InTransaction] = [
+            InTransaction(
+                self._configuration,
+                timestamp,
+                "B1",
+                "Coinbase",
+                "Bob",
+                "Buy",
+                RP2Decimal("1000"),
+                RP2Decimal("1"),
+                fiat_fee=RP2Decimal("0"),
+                internal_id=internal_id,
+            )
+            for internal_id, timestamp in enumerate(timestamps)
+        ]
+        for transaction in transactions[:3]:
+            transaction_set.add_entry(transaction)
+        view: TransactionSet = cast(TransactionSet, transaction_set.duplicate(from_date=date(2021, 1, 2)))
+        for transaction in transactions[3:]:
+            transaction_set.add_entry(transaction)
+
+        internal_ids: List[str] = [entry.internal_id for entry in transaction_set]
+        expected_internal_ids: List[str] = ["5", "0", "3", "1", "2", "4"]
+        self.assertEqual(internal_ids, expected_internal_ids)
+        view_internal_ids: List[str] = [entry.internal_id for entry in view]
+        expected_view_internal_ids: List[str] = ["0", "1", "2"]
+        self.assertEqual(view_internal_ids, expected_view_internal_ids)
+        self.assertIs(view.get_parent(transactions[1]), transactions[0])
+        self.assertIs(transaction_set.get_parent(transactions[1]), transactions[3])
+
     def test_bad_transaction_set(self) -> None:
         in_transaction = InTransaction(
             self._configuration,
@@ -352,5 +496,9 @@ class TestTransactionSet(unittest.TestCase):
             in_transaction_set.add_entry(in_transaction2)
 
 
+def _get_timestamp(entry: AbstractEntry) -> datetime:
+    return entry.timestamp
+
+
 if __name__ == "__main__":
     unittest.main()